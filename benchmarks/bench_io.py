@@ -0,0 +1,111 @@
+"""X-Plane Connect packet handling and RPDO construction."""
+
+import struct
+
+import canopen
+import numpy as np
+from harness import EDS_PATH, benchmark
+
+import electrak
+import xpc
+import xplane_data
+from bench_motion import sample_values
+from Get_data import DREFS
+
+
+def getd_response(values: list) -> bytes:
+    """
+    Build the X-Plane Connect reply to a GETD request.
+
+    :param values: List of value tuples, one per dataref.
+    :return: RESP packet bytes.
+    """
+    buffer = struct.pack(b"<4sxB", b"RESP", len(values))
+    for row in values:
+        buffer += struct.pack(f"<B{len(row)}f".encode(), len(row), *row)
+    return buffer
+
+
+class LoopbackClient(xpc.XPlaneConnect):
+    """
+    XPlaneConnect without a socket: sends are dropped and reads return a canned reply.
+    """
+
+    def __init__(self, reply: bytes = b"") -> None:
+        """
+        :param reply: Bytes returned by every readUDP.
+        """
+        self.reply = reply
+        self.sent = 0
+
+    def sendUDP(self, buffer) -> None:
+        self.sent += len(buffer)
+
+    def readUDP(self) -> bytes:
+        return self.reply
+
+    def getPOSI(self, ac=0):
+        return (0.0, 0.0, 0.0, 0.0, 0.0, 90.0, 0.0)
+
+    def close(self) -> None:
+        pass
+
+
+@benchmark("xpc.getDREFs")
+def get_drefs():
+    # Request packing for the full Get_data dataref set plus reply parsing
+    client = LoopbackClient(getd_response(sample_values()))
+    return lambda: client.getDREFs(DREFS)
+
+
+@benchmark("xpc.sendDREFs")
+def send_drefs():
+    client = LoopbackClient()
+    drefs = ["sim/operation/override/override_planepath", "sim/flightmodel/position/psi"]
+    values = [[1.0] * 20, 90.0]
+    return lambda: client.sendDREFs(drefs, values)
+
+
+@benchmark("electrak.move_actuator")
+def move_actuator():
+    # Real RPDO1 encoding from the EDS onto a virtual bus nobody listens to
+    network = canopen.Network()
+    network.connect(interface="virtual", channel="benchmark")
+    with open(EDS_PATH, encoding="latin-1") as eds:
+        node = network.add_node(1, eds)
+    node.rpdo.read(from_od=True)
+
+    def command():
+        electrak.move_actuator(node, 150.0)
+
+    command.close = network.disconnect
+    return command
+
+
+def data_output_packet() -> bytes:
+    """
+    :return: A Data Output packet with the eight data sets a typical rig enables.
+    """
+    buffer = struct.pack(b"<4sx", b"DATA")
+    for index in (1, 3, 4, 16, 17, 20, 21, 25):
+        buffer += struct.pack(b"<I8f", index, *[float(index)] * 8)
+    return buffer
+
+
+@benchmark("xpc.readDATA", unit="packet")
+def read_data():
+    client = LoopbackClient(data_output_packet())
+    return client.readDATA
+
+
+@benchmark("xplane_data.parse", unit="packet")
+def parse_data_output():
+    # View the packet and scatter it into the per-data-set table
+    packet = bytearray(data_output_packet())
+    table = np.full((xplane_data.DATA_SETS, 8), np.nan, dtype=np.float32)
+
+    def parse():
+        rows = xplane_data.parse(packet)
+        table[rows["index"]] = rows["values"]
+
+    return parse
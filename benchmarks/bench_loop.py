@@ -0,0 +1,54 @@
+"""Full control tick throughput against local stand-ins for X-Plane and the bus."""
+
+import canopen
+from harness import EDS_PATH, benchmark
+
+from bench_io import LoopbackClient, getd_response
+from bench_motion import bare_get_data, sample_values
+from command_scheduler import CommandScheduler
+from geometry import RIG_GEOMETRY, Geometry
+from pipeline import MotionCore
+
+NODE_IDS = range(1, 7)
+
+
+class ReplayClient(LoopbackClient):
+    """
+    Loopback client replying with a slowly varying sample on every request.
+    """
+
+    def __init__(self, replies: int = 256) -> None:
+        """
+        :param replies: Distinct replies cycled through.
+        """
+        super().__init__()
+        self.replies = [getd_response(sample_values(0.05 * i)) for i in range(replies)]
+        self.n = 0
+
+    def readUDP(self) -> bytes:
+        self.n += 1
+        return self.replies[self.n % len(self.replies)]
+
+
+@benchmark("loop.tick", unit="tick")
+def control_tick():
+    # getDREFs, input processing, washout, IK and six scheduled RPDO1 commands
+    network = canopen.Network()
+    network.connect(interface="virtual", channel="benchmark")
+    nodes = {}
+    for node_id in NODE_IDS:
+        with open(EDS_PATH, encoding="latin-1") as eds:
+            nodes[node_id] = network.add_node(node_id, eds)
+        nodes[node_id].rpdo.read(from_od=True)
+    data = bare_get_data(ReplayClient())
+    core = MotionCore(Geometry(**RIG_GEOMETRY))
+    scheduler = CommandScheduler(deadband_mm=0.0)
+
+    def tick():
+        data.run()
+        lengths = core.step(data.faa, data.oaa)
+        for idx, node in enumerate(nodes.values()):
+            scheduler.submit(node, lengths[idx] * 1000.0)
+
+    tick.close = network.disconnect
+    return tick
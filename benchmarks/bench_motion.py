@@ -0,0 +1,129 @@
+"""Motion math: inverse kinematics, rotation matrices, washout and input processing."""
+
+import math
+
+from harness import benchmark
+
+from Get_data import Get_data
+from geometry import RIG_GEOMETRY, Geometry
+from interpolation import PoseInterpolator
+from Position import Position
+from Washout import Washout
+
+FAA = [0.4, -0.2, -9.6]
+OAA = [0.05, 0.01, -0.03]
+
+
+def _pose() -> Position:
+    """
+    :return: A tilted, displaced platform pose.
+    """
+    geometry = Geometry(**RIG_GEOMETRY)
+    pos = Position(mid_height=geometry.mid_height)
+    pos.give_positions(OAA, [0.01, -0.02, geometry.mid_height + 0.01])
+    return pos
+
+
+@benchmark("geometry.inverse_kinematics")
+def inverse_kinematics():
+    geometry = Geometry(**RIG_GEOMETRY)
+    pos = _pose()
+    return lambda: geometry.inverse_kinematics(pos)
+
+
+@benchmark("geometry.rot_matrix")
+def geometry_rot_matrix():
+    geometry = Geometry(**RIG_GEOMETRY)
+    return lambda: geometry.rot_matrix(0.01, -0.03, 0.05)
+
+
+@benchmark("washout.compute2")
+def compute2():
+    washout = Washout()
+    pos = _pose()
+    return lambda: washout.compute2(FAA, OAA, pos)
+
+
+@benchmark("washout.scale_and_limit")
+def scale_and_limit():
+    washout = Washout()
+    return lambda: washout.scale_and_limit(FAA, "F_HP")
+
+
+@benchmark("washout.sub_g")
+def sub_g():
+    washout = Washout()
+    pos = _pose()
+    return lambda: washout.sub_g(FAA, pos)
+
+
+@benchmark("washout.faa_rot")
+def faa_rot():
+    washout = Washout()
+    pos = _pose()
+    return lambda: washout.faa_rot(FAA, pos)
+
+
+@benchmark("washout.hp_filter_faa")
+def hp_filter_faa():
+    washout = Washout()
+    return lambda: washout.hp_filter_faa(FAA)
+
+
+@benchmark("washout.integrate2x")
+def integrate2x():
+    washout = Washout()
+    return lambda: washout.integrate2x(FAA)
+
+
+def sample_values(t: float = 1.0) -> list:
+    """
+    getDREFs-shaped values for the Get_data dataref set.
+
+    :param t: Sim time used to vary the sample.
+    :return: List of one-element tuples in Get_data.drefs order.
+    """
+    values = [
+        60.0,  # groundspeed
+        5000.0, 100.0, 2000.0,  # prop forces
+        60000.0, -300.0, -1500.0,  # aero forces
+        0.0, 0.0, 0.0,  # gear forces
+        6000.0,  # m_total
+        3.0 + math.sin(t), 90.0, -2.0,  # theta, psi, phi
+        0.0,  # paused
+        t,  # total_running_time_sec
+    ]
+    return [(v,) for v in values]
+
+
+def bare_get_data(client=None) -> Get_data:
+    """
+    Get_data without an input log file.
+
+    :param client: Stand-in client, None when only get_values is used.
+    :return: Get_data instance, connected if a client was given.
+    """
+    data = Get_data(client=client, log_inputs=False)
+    if client is not None:
+        data.connect()
+    else:
+        data.psiprev = 90.0
+    return data
+
+
+@benchmark("get_data.get_values")
+def get_values():
+    data = bare_get_data()
+    values = sample_values()
+    return lambda: data.get_values(values)
+
+
+@benchmark("interpolation.sample")
+def interpolation_sample():
+    interpolator = PoseInterpolator(delay=0.0)
+    for i in range(3):
+        pos = _pose()
+        pos.phi += 0.01 * i
+        interpolator.push(0.05 * i, pos)
+    out = _pose()
+    return lambda: interpolator.sample(0.075, out)
@@ -0,0 +1,173 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable
+
+# Benchmarks import the flight_sim modules the same way the tests do
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FLIGHT_SIM_DIR = os.path.join(REPO_ROOT, "flight_sim")
+if FLIGHT_SIM_DIR not in sys.path:
+    sys.path.insert(0, FLIGHT_SIM_DIR)
+
+EDS_PATH = os.path.join(REPO_ROOT, "config", "Electrak_HD-20200113.eds")
+
+# name -> (setup, unit); setup returns the zero-argument callable to time
+BENCHMARKS = {}
+
+
+def benchmark(name: str, unit: str = "call") -> Callable:
+    """
+    Register a benchmark.
+
+    The decorated function does the setup and returns the callable to time,
+    so setup cost is never measured.
+
+    :param name: Benchmark name, e.g. 'geometry.inverse_kinematics'.
+    :param unit: What one call of the timed callable represents.
+    :return: Decorator.
+    """
+
+    def decorator(setup: Callable[[], Callable[[], object]]) -> Callable:
+        if name in BENCHMARKS:
+            raise ValueError(f"Duplicate benchmark name: {name}")
+        BENCHMARKS[name] = (setup, unit)
+        return setup
+
+    return decorator
+
+
+def time_callable(
+    func: Callable[[], object], repeats: int = 5, min_time: float = 0.2
+) -> dict:
+    """
+    Time a callable.
+
+    The iteration count is calibrated so one repeat lasts at least min_time,
+    then the best and median of the repeats are reported per call. The best
+    repeat is the least disturbed by the rest of the system and is what
+    comparisons use.
+
+    :param func: Zero-argument callable.
+    :param repeats: Timed repeats.
+    :param min_time: Minimum duration of one repeat (seconds).
+    :return: Dictionary with best and median seconds per call, iterations and repeats.
+    """
+    clock = time.perf_counter
+    iterations = 1
+    while True:
+        start = clock()
+        for _ in range(iterations):
+            func()
+        elapsed = clock() - start
+        if elapsed >= min_time:
+            break
+        iterations = max(iterations * 2, int(iterations * min_time / max(elapsed, 1e-9)))
+    samples = []
+    for _ in range(repeats):
+        start = clock()
+        for _ in range(iterations):
+            func()
+        samples.append((clock() - start) / iterations)
+    return {
+        "best": min(samples),
+        "median": statistics.median(samples),
+        "iterations": iterations,
+        "repeats": repeats,
+    }
+
+
+def run(names: list = None, repeats: int = 5, min_time: float = 0.2, log=print) -> dict:
+    """
+    Run registered benchmarks.
+
+    :param names: Substrings selecting benchmarks, all if None or empty.
+    :param repeats: Timed repeats per benchmark.
+    :param min_time: Minimum duration of one repeat (seconds).
+    :param log: Called with one progress line per benchmark.
+    :return: Results document with metadata and per-benchmark timings.
+    """
+    results = {}
+    for name, (setup, unit) in sorted(BENCHMARKS.items()):
+        if names and not any(n in name for n in names):
+            continue
+        func = setup()
+        try:
+            result = time_callable(func, repeats, min_time)
+        finally:
+            close = getattr(func, "close", None)
+            if close is not None:
+                close()
+        result["unit"] = unit
+        results[name] = result
+        log(f"{name:<40}{result['best'] * 1e6:>12.2f} us/{unit}")
+    return {"meta": metadata(), "results": results}
+
+
+def metadata() -> dict:
+    """
+    :return: Dictionary describing the commit, interpreter and machine of a run.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "node": platform.node(),
+    }
+
+
+def save(document: dict, path: str) -> None:
+    """
+    Write a results document as JSON.
+
+    :param document: Document returned by run.
+    :param path: Output path.
+    """
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path: str) -> dict:
+    """
+    :param path: JSON file written by save.
+    :return: The results document.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.2) -> list:
+    """
+    Compare two results documents on their best per-call times.
+
+    :param baseline: Reference document.
+    :param current: New document.
+    :param threshold: Allowed slowdown as a fraction, e.g. 0.2 for 20%.
+    :return: List of (name, baseline_s, current_s, ratio, regressed) for benchmarks in both.
+    """
+    rows = []
+    for name, result in sorted(current["results"].items()):
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["best"] / base["best"] if base["best"] > 0 else float("inf")
+        rows.append((name, base["best"], result["best"], ratio, ratio > 1.0 + threshold))
+    return rows
@@ -0,0 +1,72 @@
+"""
+Run the motion stack benchmarks.
+
+    python benchmarks/run.py                          # run all, print per-call times
+    python benchmarks/run.py washout geometry         # run benchmarks matching a name
+    python benchmarks/run.py --save results.json      # store results for later comparison
+    python benchmarks/run.py --compare results.json   # fail if anything regressed
+
+With --compare the exit status is 1 when any benchmark's best time is more
+than --threshold slower than in the baseline file. Compare results from the
+same machine only.
+"""
+
+import argparse
+import sys
+
+import harness
+
+# Importing the benchmark modules registers their benchmarks
+import bench_io  # noqa: F401
+import bench_loop  # noqa: F401
+import bench_motion  # noqa: F401
+
+
+def main() -> int:
+    """
+    Command line entry point.
+
+    :return: Process exit status, 1 if a regression was found.
+    """
+    parser = argparse.ArgumentParser(description="Run the motion stack benchmarks")
+    parser.add_argument("names", nargs="*", help="only run benchmarks containing these names")
+    parser.add_argument("--save", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to compare against")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="allowed slowdown fraction (default 0.2)"
+    )
+    parser.add_argument("--repeats", type=int, default=5, help="timed repeats per benchmark")
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="minimum seconds per repeat"
+    )
+    parser.add_argument("--list", action="store_true", help="list benchmarks and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name in sorted(harness.BENCHMARKS):
+            print(name)
+        return 0
+
+    document = harness.run(args.names, args.repeats, args.min_time)
+    if args.save:
+        harness.save(document, args.save)
+        print(f"Saved results to {args.save}")
+
+    if not args.compare:
+        return 0
+    baseline = harness.load(args.compare)
+    rows = harness.compare(baseline, document, args.threshold)
+    print(f"\nCompared with {args.compare} (commit {baseline['meta'].get('commit')})")
+    regressed = 0
+    for name, base, current, ratio, bad in rows:
+        flag = "REGRESSED" if bad else ""
+        print(f"{name:<40}{base * 1e6:>12.2f}{current * 1e6:>12.2f} us {ratio:>7.2f}x  {flag}")
+        regressed += bad
+    if regressed:
+        print(f"{regressed} benchmark(s) slower than the {args.threshold:.0%} threshold")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
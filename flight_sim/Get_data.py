@@ -1,43 +1,62 @@
 import logging
 import os
+import time
 from datetime import datetime
 
 import Utilities as util
+from profiling import profiled
+from session_log import SessionLog, SessionLogHandler
 import xpc
 
 
+# X-Plane datarefs queried each tick (see X-Plane Data Output settings)
+DREFS = [
+    # within X-Plane, go to settings -> Data Output -> Dataref Read/Write
+    "sim/flightmodel/position/groundspeed",
+    "sim/flightmodel/forces/fnrml_prop",
+    "sim/flightmodel/forces/fside_prop",
+    "sim/flightmodel/forces/faxil_prop",
+    "sim/flightmodel/forces/fnrml_aero",
+    "sim/flightmodel/forces/fside_aero",
+    "sim/flightmodel/forces/faxil_aero",
+    "sim/flightmodel/forces/fnrml_gear",
+    "sim/flightmodel/forces/fside_gear",
+    "sim/flightmodel/forces/faxil_gear",
+    "sim/flightmodel/weight/m_total",
+    "sim/flightmodel/position/theta",
+    "sim/flightmodel/position/psi",
+    "sim/flightmodel/position/phi",
+    "sim/time/paused",
+    "sim/time/total_running_time_sec",
+]
+
+
 class Get_data:
     """
     Retrieves and processes flight data from X-Plane using XPlaneConnect.
     Computes normalized accelerations and orientation angles for use in motion cueing and platform control.
-    Logs all input data to a unique file in the data directory.
+    Logs all input data to compressed session log segments in the data directory.
     """
 
-    def __init__(self):
+    def __init__(self, client=None, log_inputs: bool = True, clock=time.time):
         """
-        Initialize the Get_data object, set up datarefs, logging, and prepare state variables.
+        Initialize the Get_data object and prepare state variables.
+
+        No connection or file is opened here; connect() does that, and run()
+        calls it on first use.
+
+        :param client: XPlaneConnect or a stand-in with getDREFs/getPOSI, a new
+            XPlaneConnect is created by connect() if None.
+        :param log_inputs: Write every sample to get_data_*.log.gz segments in the data directory.
+        :param clock: Time source for request/receive times, e.g. a replay clock.
         """
         # List of X-Plane datarefs to query (see X-Plane Data Output settings)
-        self.drefs = [
-            # within X-Plane, go to settings -> Data Output -> Dataref Read/Write
-            "sim/flightmodel/position/groundspeed",
-            "sim/flightmodel/forces/fnrml_prop",
-            "sim/flightmodel/forces/fside_prop",
-            "sim/flightmodel/forces/faxil_prop",
-            "sim/flightmodel/forces/fnrml_aero",
-            "sim/flightmodel/forces/fside_aero",
-            "sim/flightmodel/forces/faxil_aero",
-            "sim/flightmodel/forces/fnrml_gear",
-            "sim/flightmodel/forces/fside_gear",
-            "sim/flightmodel/forces/faxil_gear",
-            "sim/flightmodel/weight/m_total",
-            "sim/flightmodel/position/theta",
-            "sim/flightmodel/position/psi",
-            "sim/flightmodel/position/phi",
-            "sim/time/paused",
-        ]
+        self.drefs = list(DREFS)
         # XPlaneConnect client for communication with X-Plane
-        self.client = xpc.XPlaneConnect()
+        self.client = client
+        self.log_inputs = log_inputs
+        self.clock = clock
+        self.connected = False
         # Acceleration components (normal, side, axial)
         self.a_nrml = None
         self.a_side = None
@@ -47,39 +66,61 @@ class Get_data:
         self.oaa = [None, None, None]  # [phi, psi, theta]
         # Pause state (0 = running, 1 = paused)
         self.paused = 0
+        # X-Plane time of the latest sample and local request/receive times,
+        # used to trace sim-to-actuator latency
+        self.sim_time = float("nan")
+        self.requested = None
+        self.received = None
         # Last position and previous psi for delta calculation
         self.posi = None
+        self.psiprev = None
+        self.logger = None
+
+    def connect(self) -> None:
+        """
+        Open the X-Plane connection, read the initial heading and start the input log.
+        """
+        if self.client is None:
+            self.client = xpc.XPlaneConnect()
         self.psiprev = self.client.getPOSI()[5]
+        if self.log_inputs and self.logger is None:
+            self._open_log()
+        self.connected = True
 
-        # Setup logging to a unique file in the data directory
+    def _open_log(self) -> None:
+        """
+        Set up logging of every sample to compressed, rotating segments in the data directory.
+        """
         data_dir = os.path.join(os.path.dirname(__file__), "../data")
-        os.makedirs(data_dir, exist_ok=True)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        log_filename = f"get_data_{timestamp}.log"
-        log_path = os.path.join(data_dir, log_filename)
-        self.logger = logging.getLogger(f"GetDataLogger_{timestamp}")
-        self.logger.setLevel(logging.INFO)
-        file_handler = logging.FileHandler(log_path)
-        formatter = logging.Formatter("%(asctime)s %(message)s")
-        file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
-        self.logger.propagate = False  # Prevent double logging
-
-        # Write header for CSV-style log
+        # Header for the CSV-style log, repeated at the start of every segment
         header = (
             "groundspeed,fnrml_prop,fside_prop,faxil_prop,fnrml_aero,fside_aero,"
-            "faxil_aero,fnrml_gear,fside_gear,faxil_gear,m_total,theta,psi,phi,paused"
+            "faxil_aero,fnrml_gear,fside_gear,faxil_gear,m_total,theta,psi,phi,paused,"
+            "sim_time"
         )
-        self.logger.info(header)
+        session = SessionLog(data_dir, "get_data", header=header)
+        self.logger = logging.getLogger(f"GetDataLogger_{timestamp}")
+        self.logger.setLevel(logging.INFO)
+        handler = SessionLogHandler(session)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        self.logger.addHandler(handler)
+        self.logger.propagate = False  # Prevent double logging
 
+    @profiled("get_data.run")
     def run(self) -> None:
         """
         Fetch the latest dataref values from X-Plane, log them, and process them.
         """
+        if not self.connected:
+            self.connect()
+        self.requested = self.clock()
         values = self.client.getDREFs(self.drefs)
-        # Flatten and log the raw input values
-        flat_values = [str(v[0]) for v in values]
-        self.logger.info(",".join(flat_values))
+        self.received = self.clock()
+        if self.logger is not None:
+            # Flatten and log the raw input values
+            flat_values = [str(v[0]) for v in values]
+            self.logger.info(",".join(flat_values))
         self.get_values(values)
 
     def initialize_values(self) -> None:
@@ -113,6 +154,8 @@ class Get_data:
         self.psiprev = values[12][0]
         phi = values[13][0]
         self.paused = values[14][0]
+        # Logs recorded before the sim time dataref was added have no column for it
+        self.sim_time = values[15][0] if len(values) > 15 else float("nan")
 
         # Compute normalization ratio based on groundspeed
         ratio = util.MPD_fltlim(groundspeed * 0.2, 0.0, 1.0)
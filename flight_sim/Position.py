@@ -1,3 +1,8 @@
+from array import array
+
+from pose_transform import PoseTransform
+
+
 class Position:
     """
     Represents the pose (orientation and translation) of the motion platform.
@@ -6,9 +11,13 @@ class Position:
         psi (float): Yaw angle (radians).
         theta (float): Pitch angle (radians).
         phi (float): Roll angle (radians).
-        T (list[float]): Translation vector [x, y, z] (meters).
+        T (list[float]): Translation vector [x, y, z] (meters), owned by the pose.
+        transform (PoseTransform): Cached rotation of the current angles, see
+            pose_transform.transform_of.
     """
 
+    __slots__ = ("psi", "theta", "phi", "T", "transform")
+
     def __init__(self, mid_height: float) -> None:
         """
         Initialize the Position object with default orientation and translation.
@@ -19,18 +28,25 @@ class Position:
         self.theta = 0.0  # Pitch angle (radians)
         self.phi = 0.0    # Roll angle (radians)
         self.T = [0.0, 0.0, mid_height]  # Translation vector [x, y, z]
+        self.transform = PoseTransform()
 
     def give_positions(self, oaa: list, T: list) -> None:
         """
         Update the orientation and translation of the platform.
 
+        T is copied into the pose's own vector, so the caller (e.g. the washout's
+        accumulator) may keep mutating its list.
+
         :param oaa: List of orientation angles [phi (roll), psi (yaw), theta (pitch)] in radians.
         :param T: Translation vector [x, y, z] in meters.
         """
         self.psi = oaa[1]
         self.phi = oaa[0]
         self.theta = oaa[2]
-        self.T = T
+        own = self.T
+        own[0] = T[0]
+        own[1] = T[1]
+        own[2] = T[2]
 
     def display_positions(self) -> None:
         """
@@ -42,3 +58,153 @@ class Position:
         print("T (translation):", self.T)
 
 
+# Each PoseHistory record is seven floats: t, psi, theta, phi, x, y, z
+HISTORY_FIELDS = 7
+
+
+class PoseHistory:
+    """
+    Fixed-capacity ring of timestamped poses with finite-difference derivatives.
+
+    Poses are copied into one preallocated float array, so push is O(1) and
+    allocates nothing, and no caller's list is ever aliased. Derivatives are
+    written into caller-provided lists as [psi, theta, phi, x, y, z] rates.
+    Ages count back from the newest pose (age 0).
+    """
+
+    __slots__ = ("capacity", "_data", "_head", "_count")
+
+    def __init__(self, capacity: int = 64) -> None:
+        """
+        :param capacity: Poses kept; older ones are overwritten.
+        :raises ValueError: If capacity is below 3, the minimum for accelerations.
+        """
+        if capacity < 3:
+            raise ValueError("capacity must be at least 3")
+        self.capacity = capacity
+        self._data = array("d", bytes(8 * HISTORY_FIELDS * capacity))
+        self._head = 0  # slot of the next push
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def clear(self) -> None:
+        """
+        Forget all poses, e.g. after the sim was repositioned.
+        """
+        self._count = 0
+
+    def push(self, t: float, pos: Position) -> None:
+        """
+        Record a pose.
+
+        A pose at or before the newest time replaces the newest one (a paused
+        or repeated frame), and one at or before the previous pose starts the
+        history over, so derivatives never divide by a zero or negative step.
+
+        :param t: Time of the pose (seconds).
+        :param pos: Pose; its values are copied.
+        """
+        data = self._data
+        if self._count > 1 and t <= data[self._base(1)]:
+            self._count = 0  # time went backwards
+        if self._count and t <= data[self._base(0)]:
+            base = self._base(0)
+        else:
+            base = self._head * HISTORY_FIELDS
+            self._head = (self._head + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+        T = pos.T
+        data[base] = t
+        data[base + 1] = pos.psi
+        data[base + 2] = pos.theta
+        data[base + 3] = pos.phi
+        data[base + 4] = T[0]
+        data[base + 5] = T[1]
+        data[base + 6] = T[2]
+
+    def _base(self, age: int) -> int:
+        """
+        :param age: 0 for the newest pose.
+        :return: Offset of the pose's record in the array.
+        """
+        return ((self._head - 1 - age) % self.capacity) * HISTORY_FIELDS
+
+    def time(self, age: int = 0) -> float:
+        """
+        :param age: 0 for the newest pose.
+        :return: Time of the pose.
+        :raises IndexError: If fewer than age + 1 poses are held.
+        """
+        if not 0 <= age < self._count:
+            raise IndexError("pose history index out of range")
+        return self._data[self._base(age)]
+
+    def get(self, out: Position, age: int = 0) -> float:
+        """
+        Copy a recorded pose.
+
+        :param out: Position receiving the pose.
+        :param age: 0 for the newest pose.
+        :return: Time of the pose.
+        :raises IndexError: If fewer than age + 1 poses are held.
+        """
+        t = self.time(age)
+        data = self._data
+        base = self._base(age)
+        out.psi = data[base + 1]
+        out.theta = data[base + 2]
+        out.phi = data[base + 3]
+        T = out.T
+        T[0] = data[base + 4]
+        T[1] = data[base + 5]
+        T[2] = data[base + 6]
+        return t
+
+    def velocity(self, out: list) -> bool:
+        """
+        Rates of change at the newest pose.
+
+        Uses the derivative of the parabola through the three newest poses,
+        or the backward difference while only two are held.
+
+        :param out: List of six floats receiving [psi, theta, phi, x, y, z] rates.
+        :return: False if fewer than two poses are held.
+        """
+        if self._count < 2:
+            return False
+        data = self._data
+        b2, b1 = self._base(0), self._base(1)
+        h2 = data[b2] - data[b1]
+        if self._count == 2:
+            for k in range(6):
+                out[k] = (data[b2 + 1 + k] - data[b1 + 1 + k]) / h2
+            return True
+        b0 = self._base(2)
+        h1 = data[b1] - data[b0]
+        for k in range(6):
+            x0, x1, x2 = data[b0 + 1 + k], data[b1 + 1 + k], data[b2 + 1 + k]
+            slope2 = (x2 - x1) / h2
+            curvature = 2.0 * (slope2 - (x1 - x0) / h1) / (h1 + h2)
+            out[k] = slope2 + 0.5 * h2 * curvature
+        return True
+
+    def acceleration(self, out: list) -> bool:
+        """
+        Second derivatives at the newest pose, from the three newest poses.
+
+        :param out: List of six floats receiving [psi, theta, phi, x, y, z] accelerations.
+        :return: False if fewer than three poses are held.
+        """
+        if self._count < 3:
+            return False
+        data = self._data
+        b2, b1, b0 = self._base(0), self._base(1), self._base(2)
+        h2 = data[b2] - data[b1]
+        h1 = data[b1] - data[b0]
+        for k in range(6):
+            x0, x1, x2 = data[b0 + 1 + k], data[b1 + 1 + k], data[b2 + 1 + k]
+            out[k] = 2.0 * ((x2 - x1) / h2 - (x1 - x0) / h1) / (h1 + h2)
+        return True
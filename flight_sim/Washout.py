@@ -1,4 +1,7 @@
-import math
+import copy
+
+import pose_transform
+from profiling import profiled
 
 
 class Washout:
@@ -7,9 +10,13 @@ class Washout:
     Processes acceleration and orientation data to generate actuator commands.
     """
 
-    def __init__(self):
+    def __init__(self, params: dict = None):
         """
         Initialize washout filter parameters, filter states, and accumulators.
+
+        :param params: Per-rig tuning replacing entries of the default parameters,
+            e.g. {"Faa_scale_hp": [0.6, 0.6, 0.6]}.
+        :raises ValueError: If params names an unknown parameter.
         """
         # Filter and scaling parameters for each axis
         self.params = {
@@ -30,6 +37,11 @@ class Washout:
                 {"a1": 0.0, "a2": 0.0, "a3": 0.0, "b1": 0.0, "b2": 0.0},
             ],
         }
+        if params:
+            unknown = set(params) - set(self.params)
+            if unknown:
+                raise ValueError(f"Unknown washout parameters: {sorted(unknown)}")
+            self.params.update(copy.deepcopy(params))
         # Filter states for cascaded filters (two per axis)
         self.fs = [{"in_prev": [0.0, 0.0], "out_prev": [0.0, 0.0]} for _ in range(6)]
 
@@ -55,6 +67,7 @@ class Washout:
     #     print("faa integrate:", faa_integrate)
     #     return faa_integrate
 
+    @profiled("washout.compute2")
     def compute2(self, faa, oaa, pos):
         self.faa_sum = [0.0, 0.0, 0.0]
         self.faa_sum2 = [0.0, 0.0, 0.0]
@@ -110,9 +123,10 @@ class Washout:
         """
         output = [0, 0, 0]
         g = 9.8  # m/s^2
-        output[0] = input_values[0] - g * math.sin(pos.theta)
-        output[1] = input_values[1] + g * math.cos(pos.theta) * math.sin(pos.phi)
-        output[2] = input_values[2] + g * math.cos(pos.theta) * math.cos(pos.phi)
+        tf = pose_transform.transform_of(pos)
+        output[0] = input_values[0] - g * tf.sin_theta
+        output[1] = input_values[1] + g * tf.cos_theta * tf.sin_phi
+        output[2] = input_values[2] + g * tf.cos_theta * tf.cos_phi
         return output
 
     def filter(self, cf: dict, in_val: float, fs: dict) -> float:
@@ -180,27 +194,7 @@ class Washout:
         :param phi: Roll angle (radians).
         :return: Flattened 3x3 rotation matrix as a list of 9 floats.
         """
-        RB = [0] * 9
-        RB[0] = math.cos(psi) * math.cos(theta)
-        RB[1] = math.sin(psi) * math.cos(theta)
-        RB[2] = -math.sin(theta)
-
-        RB[3] = -math.sin(psi) * math.cos(phi) + math.cos(psi) * math.sin(
-            theta
-        ) * math.sin(phi)
-        RB[4] = math.cos(psi) * math.cos(phi) + math.sin(psi) * math.sin(
-            theta
-        ) * math.sin(phi)
-        RB[5] = math.cos(theta) * math.sin(phi)
-
-        RB[6] = math.sin(psi) * math.sin(phi) + math.cos(psi) * math.sin(
-            theta
-        ) * math.cos(phi)
-        RB[7] = -math.cos(psi) * math.sin(phi) + math.sin(psi) * math.sin(
-            theta
-        ) * math.cos(phi)
-        RB[8] = math.cos(theta) * math.cos(phi)
-        return RB
+        return pose_transform.rot_matrix(psi, theta, phi)
 
     def faa_rot(self, input_values: list, pos) -> list:
         """
@@ -211,7 +205,7 @@ class Washout:
         :return: Rotated acceleration vector.
         """
         out = [0, 0, 0]
-        RB = self.rot_matrix(pos.psi, pos.theta, pos.phi)
+        RB = pose_transform.transform_of(pos).matrix
         for i in range(3):
             out[i] = (
                 RB[i] * input_values[0]
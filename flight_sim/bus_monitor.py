@@ -0,0 +1,358 @@
+import argparse
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+import can
+import canopen
+
+import electrak
+from histogram import LatencyHistogram
+
+logger = logging.getLogger("bus_monitor")
+
+# CANopen function codes (upper four bits of the 11-bit COB-ID)
+FUNCTION_MASK = 0x780
+NODE_MASK = 0x7F
+TPDO1 = 0x180
+RPDO1 = 0x200
+
+
+def frame_bits(dlc: int, extended: bool = False) -> int:
+    """
+    Worst-case number of bits a data frame occupies on the bus.
+
+    Includes the fixed frame fields, interframe space and maximum bit stuffing,
+    so bus load estimates err on the high side.
+
+    :param dlc: Number of data bytes.
+    :param extended: True for 29-bit identifiers.
+    :return: Frame length in bits.
+    """
+    # Bits covered by stuffing: SOF through CRC
+    stuffed = (54 if extended else 34) + 8 * dlc
+    # Stuffed region plus CRC delimiter, ACK, EOF and interframe space
+    return stuffed + (stuffed - 1) // 4 + 13
+
+
+class BusMonitor(can.Listener):
+    """
+    Rolling CAN bus statistics collected from a canopen.Network.
+
+    Tracks bus load, frame rates per node, error frames and the latency between
+    an RPDO1 command and the next TPDO1 whose content changes. Frames are kept
+    for one window only, and queries can be made from any thread. Cyclic
+    frames the listener cannot see (electrak.unmonitored_cyclic_messages) are
+    added to the rates and bus load at their nominal period.
+    """
+
+    def __init__(
+        self,
+        bitrate: int = electrak.CAN_BITRATE,
+        window: float = 1.0,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Initialize the monitor.
+
+        :param bitrate: Bus bitrate (bit/s) used for the load estimate.
+        :param window: Length of the rolling statistics window (seconds).
+        :param clock: Time source matching frame timestamps, injectable for testing.
+        """
+        if window <= 0:
+            raise ValueError("window must be positive")
+        self.bitrate = bitrate
+        self.window = window
+        self.clock = clock
+        self.total_frames = 0
+        self.error_frames = 0
+        self.feedback_latency = LatencyHistogram()
+        self._frames = deque()  # (timestamp, bits, cob_id, is_error)
+        self._pending_command = {}  # node_id -> timestamp of unanswered RPDO
+        self._last_command = {}  # node_id -> last RPDO payload
+        self._last_feedback = {}  # node_id -> last TPDO payload
+        self._lock = threading.Lock()
+        self._network = None
+
+    def attach(self, network: canopen.Network) -> None:
+        """
+        Start listening to a connected network.
+
+        :param network: Network returned by electrak.connect_can_network.
+        """
+        electrak.add_bus_listener(network, self)
+        self._network = network
+
+    def detach(self) -> None:
+        """
+        Stop listening to the attached network.
+        """
+        if self._network is not None:
+            electrak.remove_bus_listener(self._network, self)
+            self._network = None
+
+    def on_message_received(self, msg: can.Message) -> None:
+        """
+        Account for one frame seen on the bus (received or transmitted).
+
+        :param msg: The CAN frame.
+        """
+        ts = msg.timestamp
+        cob_id = msg.arbitration_id
+        with self._lock:
+            self.total_frames += 1
+            if msg.is_error_frame:
+                self.error_frames += 1
+                self._frames.append((ts, 0, -1, True))
+            else:
+                bits = frame_bits(msg.dlc, msg.is_extended_id)
+                self._frames.append((ts, bits, cob_id, False))
+                if not msg.is_remote_frame:
+                    self._track_latency(cob_id, bytes(msg.data), ts)
+            self._prune(ts)
+
+    def _track_latency(self, cob_id: int, data: bytes, ts: float) -> None:
+        """
+        Match RPDO1 commands to the TPDO1 feedback that first reflects them.
+
+        :param cob_id: COB-ID of the frame.
+        :param data: Frame payload.
+        :param ts: Frame timestamp.
+        """
+        function = cob_id & FUNCTION_MASK
+        node_id = cob_id & NODE_MASK
+        if function == RPDO1:
+            # Keep-alives repeat the last payload and do not restart the clock
+            if self._last_command.get(node_id) != data:
+                self._last_command[node_id] = data
+                self._pending_command.setdefault(node_id, ts)
+        elif function == TPDO1:
+            if self._last_feedback.get(node_id) != data:
+                self._last_feedback[node_id] = data
+                sent = self._pending_command.pop(node_id, None)
+                if sent is not None:
+                    self.feedback_latency.record(ts - sent)
+
+    def _prune(self, now: float) -> None:
+        """
+        Drop frames older than the window.
+
+        :param now: Current time on the frame timestamp clock.
+        """
+        horizon = now - self.window
+        frames = self._frames
+        while frames and frames[0][0] <= horizon:
+            frames.popleft()
+
+    def _window_frames(self) -> list:
+        """
+        :return: Snapshot of the frames inside the current window.
+        """
+        with self._lock:
+            self._prune(self.clock())
+            return list(self._frames)
+
+    def bus_load(self) -> float:
+        """
+        :return: Estimated bus utilization over the window (percent).
+        """
+        return self.stats()["bus_load_pct"]
+
+    def frames_per_second(self) -> float:
+        """
+        :return: Total frame rate over the window.
+        """
+        return self.stats()["frames_per_second"]
+
+    def node_frames_per_second(self) -> dict:
+        """
+        :return: Dictionary of node_id to frame rate over the window. Broadcast
+            frames such as NMT and SYNC are counted under node 0.
+        """
+        return self.stats()["node_frames_per_second"]
+
+    def stats(self) -> dict:
+        """
+        Collect all statistics in one snapshot.
+
+        :return: Dictionary with bus load, frame rates, error count and latency summary.
+        """
+        frames = self._window_frames()
+        bits = 0
+        errors = 0
+        counts = {}
+        for _, length, cob_id, is_error in frames:
+            if is_error:
+                errors += 1
+                continue
+            bits += length
+            node_id = cob_id & NODE_MASK
+            counts[node_id] = counts.get(node_id, 0) + 1
+        # Unseen cyclic frames, as the counts they add over one window
+        cyclic = 0.0
+        if self._network is not None:
+            for msg, period in electrak.unmonitored_cyclic_messages(self._network):
+                n = self.window / period
+                cyclic += n
+                bits += frame_bits(msg.dlc, msg.is_extended_id) * n
+                node_id = msg.arbitration_id & NODE_MASK
+                counts[node_id] = counts.get(node_id, 0) + n
+        return {
+            "bus_load_pct": 100.0 * bits / (self.bitrate * self.window),
+            "frames_per_second": (len(frames) + cyclic) / self.window,
+            "cyclic_frames_per_second": cyclic / self.window,
+            "node_frames_per_second": {
+                node_id: n / self.window for node_id, n in counts.items()
+            },
+            "error_frames": self.error_frames,
+            "error_frames_per_second": errors / self.window,
+            "total_frames": self.total_frames,
+            "feedback_latency": self.feedback_latency.summary(),
+        }
+
+
+class CyclicJitterMonitor(can.Listener):
+    """
+    Transmit-interval jitter of cyclic frames, such as the RPDO1 keep-alives.
+
+    Records, per COB-ID, how far each interval between successive frames
+    deviates from the nominal period. Immediate command frames share the
+    COB-ID, so measure while targets hold still. The listener must see the
+    transmitted frames: on socketcan the kernel loops BCM frames back to the
+    network's own socket, while a virtual bus's thread fallback is only seen
+    from a second bus on the same channel.
+    """
+
+    def __init__(self, period: float, function: int = RPDO1) -> None:
+        """
+        :param period: Nominal transmit period (seconds).
+        :param function: CANopen function code of the frames to time.
+        :raises ValueError: If the period is not positive.
+        """
+        if period <= 0:
+            raise ValueError("period must be positive")
+        self.period = period
+        self.function = function
+        self.jitter = LatencyHistogram()
+        self.max_interval = 0.0
+        self._last = {}  # cob_id -> timestamp of the previous frame
+        self._lock = threading.Lock()
+
+    def on_message_received(self, msg: can.Message) -> None:
+        """
+        Time one frame.
+
+        :param msg: The CAN frame.
+        """
+        cob_id = msg.arbitration_id
+        if msg.is_error_frame or cob_id & FUNCTION_MASK != self.function:
+            return
+        with self._lock:
+            last = self._last.get(cob_id)
+            self._last[cob_id] = msg.timestamp
+            if last is not None:
+                interval = msg.timestamp - last
+                self.jitter.record(abs(interval - self.period))
+                if interval > self.max_interval:
+                    self.max_interval = interval
+
+    def summary(self) -> dict:
+        """
+        :return: Dictionary with the nominal period, the longest interval seen
+            and the jitter summary (seconds).
+        """
+        with self._lock:
+            return {
+                "period": self.period,
+                "max_interval": self.max_interval,
+                "jitter": self.jitter.summary(),
+            }
+
+
+def measure_cyclic_jitter(
+    interface: str = "virtual",
+    channel: str = "cyclic_jitter",
+    period: float = electrak.RPDO_REFRESH_PERIOD_S,
+    duration: float = 5.0,
+    node_ids: tuple = (1, 2, 3, 4, 5, 6),
+    load: bool = True,
+) -> dict:
+    """
+    Measure cyclic RPDO1 transmit jitter while this process is busy.
+
+    Six neutral RPDO1 frames are handed to bus.send_periodic, exactly as
+    electrak.start_cyclic_rpdo does through canopen, and timed from a
+    second bus on the same channel. Use a vcan or real socketcan channel to
+    measure the kernel BCM and the default virtual bus for the thread fallback.
+
+    :param interface: python-can interface type.
+    :param channel: Channel name.
+    :param period: Transmit period (seconds).
+    :param duration: Measurement time (seconds).
+    :param node_ids: Node IDs whose RPDO1 is sent.
+    :param load: Run the synthetic front end load (GC churn, formatting) meanwhile.
+    :return: CyclicJitterMonitor summary plus 'offloaded', True if python-can did
+        not fall back to a transmit thread.
+    """
+    # Imported here; only the measurement needs the motion process's load generator
+    from motion_process import FrontEndLoad
+
+    sender = can.Bus(interface=interface, channel=channel)
+    listener_bus = can.Bus(interface=interface, channel=channel)
+    monitor = CyclicJitterMonitor(period)
+    notifier = can.Notifier(listener_bus, [monitor])
+    stop = threading.Event()
+    tasks = []
+    try:
+        for node_id in node_ids:
+            msg = can.Message(arbitration_id=RPDO1 + node_id, is_extended_id=False, data=bytes(8))
+            tasks.append(sender.send_periodic(msg, period))
+        if load:
+            FrontEndLoad(stop).start()
+        time.sleep(duration)
+    finally:
+        stop.set()
+        for task in tasks:
+            task.stop()
+        notifier.stop()
+        listener_bus.shutdown()
+        sender.shutdown()
+    result = monitor.summary()
+    result["offloaded"] = not any(
+        isinstance(task, can.broadcastmanager.ThreadBasedCyclicSendTask) for task in tasks
+    )
+    return result
+
+
+def main() -> None:
+    """
+    Command line entry point printing the cyclic RPDO jitter.
+    """
+    parser = argparse.ArgumentParser(description="Measure cyclic RPDO transmit jitter")
+    parser.add_argument("--interface", default="virtual", help="python-can interface type")
+    parser.add_argument("--channel", default="cyclic_jitter", help="e.g. vcan0 with socketcan")
+    parser.add_argument("--period", type=float, default=electrak.RPDO_REFRESH_PERIOD_S)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds to measure")
+    parser.add_argument("--no-load", action="store_true", help="skip the synthetic front end load")
+    args = parser.parse_args()
+    result = measure_cyclic_jitter(
+        args.interface, args.channel, args.period, args.duration, load=not args.no_load
+    )
+    summary = result["jitter"]
+    logger.info(
+        "%s: intervals=%d mean=%.1fus p50=%.1fus p99=%.1fus max=%.1fus longest=%.1fms",
+        "kernel" if result["offloaded"] else "thread fallback",
+        summary["count"],
+        summary["mean"] * 1e6,
+        summary["p50"] * 1e6,
+        summary["p99"] * 1e6,
+        summary["max"] * 1e6,
+        result["max_interval"] * 1e3,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
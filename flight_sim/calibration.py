@@ -0,0 +1,259 @@
+import argparse
+import copy
+import json
+import logging
+import time
+
+import numpy as np
+
+import vector_kinematics as vk
+from geometry import RIG_GEOMETRY, Geometry
+
+logger = logging.getLogger("calibration")
+
+# Parameters of one leg: base point (3), platform point (3), length offset
+LEG_PARAMS = 7
+MEASUREMENT_SIGMA_M = 0.0001  # TPDO position resolution, 0.1 mm
+POINT_SIGMA_M = 0.005  # trust in the tape-measured attachment points
+OFFSET_SIGMA_M = 0.005  # trust in the nominal retracted length of each leg
+# Shortfall below the retracted length that marks TPDO stroke passed as lengths
+STROKE_SUSPECT_M = 0.05
+
+
+def load_samples(path: str) -> tuple:
+    """
+    Load calibration samples saved by save_samples.
+
+    :param path: .npz file.
+    :return: Tuple (psi, theta, phi, T, positions) of arrays: N angles (radians),
+        (N, 3) translations and (N, 6) actuator stroke positions (meters).
+    """
+    with np.load(path) as data:
+        return data["psi"], data["theta"], data["phi"], data["T"], data["positions"]
+
+
+def save_samples(path: str, psi, theta, phi, T, positions) -> None:
+    """
+    Save calibration samples, e.g. poses set on a jig with the feedback read at each.
+
+    :param path: .npz file.
+    :param psi: Yaw angles (radians).
+    :param theta: Pitch angles (radians).
+    :param phi: Roll angles (radians).
+    :param T: (N, 3) translations (meters).
+    :param positions: (N, 6) actuator stroke positions (meters), i.e. the TPDO
+        Measured Position in mm / 1000.
+    """
+    np.savez(path, psi=psi, theta=theta, phi=phi, T=T, positions=positions)
+
+
+def positions_to_lengths(geometry: Geometry, positions) -> np.ndarray:
+    """
+    Convert actuator stroke positions to leg lengths, as the inverse kinematics computes them.
+
+    :param geometry: Nominal geometry, whose act_min is the fully retracted leg length.
+    :param positions: (N, 6) stroke positions (meters), 0 when fully retracted.
+    :return: (N, 6) leg lengths (meters).
+    """
+    return np.asarray(positions, dtype=float) + geometry.act_min
+
+
+class _Model:
+    """
+    Leg-length model of all six legs for a fixed batch of poses.
+
+    A leg's length depends only on its own base point, platform point and
+    offset, so the problem splits into six independent 7-parameter problems
+    that are solved side by side as (6, 7) arrays.
+    """
+
+    def __init__(self, psi, theta, phi, T, measured) -> None:
+        """
+        :param psi: Yaw angles (radians).
+        :param theta: Pitch angles (radians).
+        :param phi: Roll angles (radians).
+        :param T: (N, 3) translations (meters).
+        :param measured: (N, 6) actuator positions (meters).
+        """
+        self.rb = vk.rotation_matrices(psi, theta, phi).reshape(-1, 3, 3)
+        self.T = np.asarray(T, dtype=float)
+        self.measured = np.asarray(measured, dtype=float)
+
+    def residuals(self, x: np.ndarray) -> tuple:
+        """
+        :param x: (6, LEG_PARAMS) parameters [base xyz, platform xyz, offset] per leg.
+        :return: Tuple (residuals, units) of the (N, 6) model-minus-measured lengths
+            and the (N, 6, 3) unit leg vectors.
+        """
+        arms = np.einsum("lk,nkj->nlj", x[:, 3:6], self.rb)
+        legs = self.T[:, None, :] + arms - x[None, :, 0:3]
+        lengths = np.linalg.norm(legs, axis=2)
+        return lengths - x[None, :, 6] - self.measured, legs / lengths[:, :, None]
+
+    def jacobian(self, units: np.ndarray) -> np.ndarray:
+        """
+        :param units: (N, 6, 3) unit leg vectors at the current parameters.
+        :return: (N, 6, LEG_PARAMS) derivatives of each residual by its leg's parameters.
+        """
+        J = np.empty(units.shape[:2] + (LEG_PARAMS,))
+        J[:, :, 0:3] = -units
+        # d|L| / dp_k = sum_j u_j rb[k, j]
+        J[:, :, 3:6] = np.einsum("nkj,nlj->nlk", self.rb, units)
+        J[:, :, 6] = -1.0
+        return J
+
+
+def calibrate(
+    geometry: Geometry,
+    psi,
+    theta,
+    phi,
+    T,
+    measured,
+    point_sigma: float = POINT_SIGMA_M,
+    offset_sigma: float = OFFSET_SIGMA_M,
+    measurement_sigma: float = MEASUREMENT_SIGMA_M,
+    max_iterations: int = 50,
+    tolerance: float = 1e-9,
+) -> tuple:
+    """
+    Fit attachment points and leg offsets to poses paired with measured actuator positions.
+
+    Minimizes, per leg, the squared length residuals over measurement_sigma
+    plus a Tikhonov prior pulling every parameter towards the nominal geometry
+    (weights 1 / sigma^2), with Levenberg-Marquardt steps. The prior keeps
+    directions the poses do not excite (e.g. a platform point shifted along
+    its leg against the offset) at their nominal values.
+
+    The poses must be the platform's actual poses, e.g. set on a jig or
+    verified with an inclinometer, with feedback read after the legs settled.
+    Commanded poses whose lengths came from the nominal geometry only
+    reproduce that geometry.
+
+    :param geometry: Nominal geometry, not modified.
+    :param psi: Yaw angles (radians).
+    :param theta: Pitch angles (radians).
+    :param phi: Roll angles (radians).
+    :param T: (N, 3) translations (meters).
+    :param measured: (N, 6) measured leg lengths (meters), see positions_to_lengths.
+    :param point_sigma: Prior standard deviation of each point coordinate (meters).
+    :param offset_sigma: Prior standard deviation of each leg offset (meters).
+    :param measurement_sigma: Standard deviation of the measured positions (meters).
+    :param max_iterations: Iteration limit.
+    :param tolerance: Largest parameter step (meters) at which the fit has converged.
+    :return: Tuple (corrected geometry, report dict with per-leg RMS residuals
+        before and after, iterations and parameter changes).
+    :raises ValueError: If the arrays disagree in length, hold no samples or hold
+        stroke positions instead of leg lengths.
+    """
+    psi, theta, phi = (np.asarray(a, dtype=float) for a in (psi, theta, phi))
+    T = np.asarray(T, dtype=float).reshape(-1, 3)
+    measured = np.asarray(measured, dtype=float).reshape(-1, 6)
+    if not len(measured) or not len(psi) == len(theta) == len(phi) == len(T) == len(measured):
+        raise ValueError("Calibration needs the same non-zero number of poses and measurements")
+    if measured.min() < geometry.act_min - STROKE_SUSPECT_M:
+        raise ValueError(
+            "Measured lengths are shorter than a retracted leg; "
+            "convert TPDO stroke positions with positions_to_lengths"
+        )
+
+    started = time.perf_counter()
+    model = _Model(psi, theta, phi, T, measured)
+    nominal = np.hstack(
+        (
+            np.asarray(geometry.b, dtype=float),
+            np.asarray(geometry.p, dtype=float),
+            np.asarray(geometry.leg_offsets, dtype=float)[:, None],
+        )
+    )
+    prior = np.array([point_sigma] * 6 + [offset_sigma]) ** -2.0
+    weight = measurement_sigma**-2.0
+
+    def cost(x, residuals):
+        return weight * (residuals**2).sum(axis=0) + (prior * (x - nominal) ** 2).sum(axis=1)
+
+    x = nominal.copy()
+    residuals, units = model.residuals(x)
+    rms_before = np.sqrt((residuals**2).mean(axis=0))
+    current = cost(x, residuals)
+    damping = np.full(6, 1e-3)
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        J = model.jacobian(units)
+        A = weight * np.einsum("nli,nlj->lij", J, J) + prior[None, :] * np.eye(LEG_PARAMS)
+        g = weight * np.einsum("nli,nl->li", J, residuals) + prior * (x - nominal)
+        diagonal = np.einsum("lii->li", A)
+        A_damped = A + damping[:, None, None] * (diagonal[:, :, None] * np.eye(LEG_PARAMS))
+        step = -np.linalg.solve(A_damped, g[:, :, None])[:, :, 0]
+        trial = x + step
+        trial_residuals, trial_units = model.residuals(trial)
+        trial_cost = cost(trial, trial_residuals)
+        # Each leg accepts or rejects its own step
+        better = trial_cost < current
+        x[better] = trial[better]
+        residuals[:, better] = trial_residuals[:, better]
+        units[:, better] = trial_units[:, better]
+        current[better] = trial_cost[better]
+        damping = np.where(better, damping / 3.0, damping * 2.0)
+        if np.abs(step).max() < tolerance:
+            break
+
+    corrected = copy.deepcopy(geometry)
+    corrected.set_attachment_points(x[:, 3:6], x[:, 0:3], x[:, 6])
+    report = {
+        "samples": len(measured),
+        "iterations": iterations,
+        "seconds": time.perf_counter() - started,
+        "rms_before_m": rms_before.tolist(),
+        "rms_after_m": np.sqrt((residuals**2).mean(axis=0)).tolist(),
+        "base_shift_m": np.linalg.norm(x[:, 0:3] - nominal[:, 0:3], axis=1).tolist(),
+        "platform_shift_m": np.linalg.norm(x[:, 3:6] - nominal[:, 3:6], axis=1).tolist(),
+        "leg_offsets_m": x[:, 6].tolist(),
+    }
+    return corrected, report
+
+
+def calibrate_from_file(geometry: Geometry, path: str, **kwargs) -> tuple:
+    """
+    Calibrate from a samples file, e.g. the last session's at startup.
+
+    :param geometry: Nominal geometry, not modified.
+    :param path: .npz file written by save_samples.
+    :param kwargs: Further calibrate arguments.
+    :return: Tuple (corrected geometry, report).
+    """
+    psi, theta, phi, T, positions = load_samples(path)
+    measured = positions_to_lengths(geometry, positions)
+    corrected, report = calibrate(geometry, psi, theta, phi, T, measured, **kwargs)
+    logger.info(
+        "Calibrated geometry from %d samples in %.0f ms: RMS %.2f -> %.2f mm",
+        report["samples"],
+        report["seconds"] * 1000.0,
+        max(report["rms_before_m"]) * 1000.0,
+        max(report["rms_after_m"]) * 1000.0,
+    )
+    return corrected, report
+
+
+def main() -> None:
+    """
+    Command line entry point: calibrate the rig geometry from a samples file.
+    """
+    parser = argparse.ArgumentParser(description="Calibrate the platform geometry")
+    parser.add_argument("samples", help=".npz file of poses and TPDO stroke positions")
+    parser.add_argument("--out", help="write the report and corrected points as JSON")
+    args = parser.parse_args()
+
+    corrected, report = calibrate_from_file(Geometry(**RIG_GEOMETRY), args.samples)
+    report["platform_points"] = corrected.p
+    report["base_points"] = corrected.b
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
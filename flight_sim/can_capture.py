@@ -0,0 +1,305 @@
+import argparse
+import logging
+import struct
+import threading
+import time
+from typing import Iterable, Iterator
+
+import can
+import canopen
+
+import electrak
+
+logger = logging.getLogger("can_capture")
+
+# Compact capture format: an 8-byte magic followed by fixed 22-byte records
+#   float64 timestamp, uint32 arbitration id, uint8 flags, uint8 dlc, 8 data bytes
+MAGIC = b"FSCAN\x00\x01\n"
+RECORD = struct.Struct("<dIBB8s")
+FLAG_EXTENDED = 0x01
+FLAG_REMOTE = 0x02
+FLAG_ERROR = 0x04
+FLAG_TX = 0x08
+# Replays default to a virtual CAN interface so they never drive the rig by accident
+REPLAY_CHANNEL = "vcan0"
+
+
+def pack_frame(msg: can.Message) -> bytes:
+    """
+    Encode a CAN frame as one capture record.
+
+    :param msg: The frame.
+    :return: Packed record bytes.
+    """
+    flags = (
+        (FLAG_EXTENDED if msg.is_extended_id else 0)
+        | (FLAG_REMOTE if msg.is_remote_frame else 0)
+        | (FLAG_ERROR if msg.is_error_frame else 0)
+        | (0 if msg.is_rx else FLAG_TX)
+    )
+    return RECORD.pack(
+        msg.timestamp, msg.arbitration_id, flags, msg.dlc, bytes(msg.data)
+    )
+
+
+def unpack_frame(record: bytes, offset: int = 0) -> can.Message:
+    """
+    Decode one capture record.
+
+    :param record: Buffer holding the record.
+    :param offset: Offset of the record in the buffer.
+    :return: The decoded frame.
+    """
+    timestamp, arbitration_id, flags, dlc, data = RECORD.unpack_from(record, offset)
+    return can.Message(
+        timestamp=timestamp,
+        arbitration_id=arbitration_id,
+        is_extended_id=bool(flags & FLAG_EXTENDED),
+        is_remote_frame=bool(flags & FLAG_REMOTE),
+        is_error_frame=bool(flags & FLAG_ERROR),
+        is_rx=not flags & FLAG_TX,
+        dlc=dlc,
+        data=data[:dlc],
+    )
+
+
+class CanRecorder(can.Listener):
+    """
+    Records every frame seen on a canopen.Network to a compact binary capture.
+
+    Frames from the receive thread and transmitted frames are packed into an
+    in-memory buffer and written out in blocks, so recording stays cheap
+    enough to run during real sessions.
+    Cyclic keep-alives on python-can's thread fallback are not captured, see
+    electrak.add_bus_listener.
+    """
+
+    def __init__(self, path: str, block_size: int = 64 * 1024) -> None:
+        """
+        Open the capture file.
+
+        :param path: Output file path.
+        :param block_size: Bytes buffered before a write.
+        """
+        self.path = path
+        self.block_size = block_size
+        self.frames = 0
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._network = None
+
+    def attach(self, network: canopen.Network) -> None:
+        """
+        Start recording a connected network.
+
+        :param network: Network returned by electrak.connect_can_network.
+        """
+        electrak.add_bus_listener(network, self)
+        self._network = network
+
+    def on_message_received(self, msg: can.Message) -> None:
+        """
+        Append a frame to the capture.
+
+        :param msg: The CAN frame.
+        """
+        record = pack_frame(msg)
+        with self._lock:
+            self._buffer += record
+            self.frames += 1
+            if len(self._buffer) >= self.block_size:
+                self._write()
+
+    def _write(self) -> None:
+        """
+        Write buffered records to the file; the caller holds the lock.
+        """
+        self._file.write(self._buffer)
+        self._buffer.clear()
+
+    def stop(self) -> None:
+        """
+        Detach from the network, flush buffered frames and close the file.
+        """
+        if self._network is not None:
+            electrak.remove_bus_listener(self._network, self)
+            self._network = None
+        with self._lock:
+            if self._file is not None:
+                self._write()
+                self._file.close()
+                self._file = None
+        logger.info("Captured %d frames to %s", self.frames, self.path)
+
+
+def read_capture(path: str) -> Iterator[can.Message]:
+    """
+    Iterate over the frames of a capture.
+
+    Files ending in .log are read as candump -l logs, anything else as the
+    binary capture format.
+
+    :param path: Capture file path.
+    :return: Iterator of frames in file order.
+    :raises ValueError: If a binary capture has an unknown header.
+    """
+    if str(path).endswith(".log"):
+        yield from can.CanutilsLogReader(path)
+        return
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a flight_sim CAN capture")
+        while True:
+            block = f.read(RECORD.size * 4096)
+            # A truncated trailing record (e.g. after a crash) is ignored
+            for offset in range(0, len(block) - RECORD.size + 1, RECORD.size):
+                yield unpack_frame(block, offset)
+            if len(block) < RECORD.size * 4096:
+                return
+
+
+def export_candump(path: str, out_path: str, channel: str = electrak.CAN_INTERFACE) -> int:
+    """
+    Convert a binary capture to a candump -l compatible log.
+
+    :param path: Binary capture file.
+    :param out_path: Output .log file.
+    :param channel: Interface name written on each line.
+    :return: Number of frames written.
+    """
+    count = 0
+    with can.CanutilsLogWriter(out_path, channel=channel) as writer:
+        for msg in read_capture(path):
+            writer.on_message_received(msg)
+            count += 1
+    return count
+
+
+def import_candump(path: str, out_path: str) -> int:
+    """
+    Convert a candump -l log to a binary capture.
+
+    :param path: candump .log file.
+    :param out_path: Output binary capture.
+    :return: Number of frames written.
+    """
+    count = 0
+    with open(out_path, "wb") as f:
+        f.write(MAGIC)
+        for msg in can.CanutilsLogReader(path):
+            f.write(pack_frame(msg))
+            count += 1
+    return count
+
+
+def replay(
+    frames: Iterable[can.Message],
+    bus: can.BusABC,
+    speed: float = 1.0,
+    include_tx: bool = True,
+) -> dict:
+    """
+    Send captured frames onto a bus.
+
+    :param frames: Frames in timestamp order, e.g. from read_capture.
+    :param bus: Destination python-can bus (typically a virtual bus).
+    :param speed: Playback speed relative to capture time, 0 for as fast as possible.
+    :param include_tx: Also replay frames this host transmitted during capture.
+    :return: Dictionary with frames sent, elapsed time and achieved frame rate.
+    """
+    if speed < 0:
+        raise ValueError("speed must be non-negative")
+    sent = 0
+    start = time.perf_counter()
+    first = None
+    for msg in frames:
+        if not include_tx and not msg.is_rx:
+            continue
+        if speed:
+            if first is None:
+                first = msg.timestamp
+            due = start + (msg.timestamp - first) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        bus.send(msg)
+        sent += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": sent,
+        "elapsed": elapsed,
+        "frames_per_second": sent / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main(argv: list = None) -> None:
+    """
+    Command line entry point for recording, replaying and converting captures.
+
+    :param argv: Arguments, sys.argv[1:] if None.
+    """
+    parser = argparse.ArgumentParser(description="Capture and replay motion bus traffic")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="record the bus until interrupted")
+    rec.add_argument("path")
+    rec.add_argument("--channel", default=electrak.CAN_INTERFACE)
+    rec.add_argument("--interface", default="socketcan")
+
+    rep = sub.add_parser("replay", help="replay a capture onto a bus")
+    rep.add_argument("path")
+    rep.add_argument(
+        "--channel",
+        default=REPLAY_CHANNEL,
+        help=f"bus to replay onto (default {REPLAY_CHANNEL}, keeping replays off the rig)",
+    )
+    rep.add_argument("--interface", default="socketcan")
+    rep.add_argument("--speed", type=float, default=1.0, help="0 = as fast as possible")
+    rep.add_argument("--rx-only", action="store_true", help="skip frames sent by this host")
+
+    conv = sub.add_parser("export", help="convert a capture to a candump -l log")
+    conv.add_argument("path")
+    conv.add_argument("out_path")
+    conv.add_argument("--channel", default=electrak.CAN_INTERFACE)
+
+    imp = sub.add_parser("import", help="convert a candump -l log to a capture")
+    imp.add_argument("path")
+    imp.add_argument("out_path")
+
+    args = parser.parse_args(argv)
+    if args.command == "record":
+        network = electrak.connect_can_network(args.channel, args.interface)
+        recorder = CanRecorder(args.path)
+        recorder.attach(network)
+        try:
+            while True:
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            recorder.stop()
+            network.disconnect()
+    elif args.command == "replay":
+        with can.Bus(interface=args.interface, channel=args.channel) as bus:
+            result = replay(
+                read_capture(args.path), bus, args.speed, include_tx=not args.rx_only
+            )
+        logger.info(
+            "Replayed %d frames in %.3f s (%.0f frames/s)",
+            result["frames"],
+            result["elapsed"],
+            result["frames_per_second"],
+        )
+    elif args.command == "import":
+        count = import_candump(args.path, args.out_path)
+        logger.info("Imported %d frames to %s", count, args.out_path)
+    else:
+        count = export_candump(args.path, args.out_path, args.channel)
+        logger.info("Exported %d frames to %s", count, args.out_path)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,244 @@
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Callable
+
+import electrak
+
+if TYPE_CHECKING:
+    import canopen
+
+DEFAULT_DEADBAND_MM = 0.1  # One count of the 0.1 mm Target Position resolution
+
+
+class _NodeState:
+    """
+    Last command transmitted to a single actuator.
+    """
+
+    __slots__ = ("target_mm", "settings", "sent_at")
+
+    def __init__(self) -> None:
+        """
+        Initialize an empty state, so the first command is always sent.
+        """
+        self.target_mm = None
+        self.settings = None
+        self.sent_at = None
+
+
+class CommandScheduler:
+    """
+    Change-aware RPDO transmit scheduler for Electrak HD actuators.
+
+    A command is transmitted immediately when its target moves by more than the
+    deadband or any other RPDO field changes. Otherwise the last target is resent
+    as a keep-alive once the refresh period has elapsed, so nodes never hit the
+    PDO timeout or go to sleep while the platform holds still.
+
+    With a cyclic period, each node's keep-alive is handed to a cyclic RPDO
+    task after its first command (see electrak.start_cyclic_rpdo), so the
+    refresh no longer depends on this loop waking on time; only changes are
+    transmitted from here. frames_sent then excludes the cyclic frames, while
+    frames_per_second adds them at the cyclic period.
+    """
+
+    def __init__(
+        self,
+        refresh_period: float = electrak.RPDO_REFRESH_PERIOD_S,
+        deadband_mm: float = DEFAULT_DEADBAND_MM,
+        rate_window: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        send: Callable[..., None] = None,
+        cyclic_period: float = None,
+    ) -> None:
+        """
+        Initialize the scheduler.
+
+        :param refresh_period: Keep-alive period for unchanged commands (seconds).
+        :param deadband_mm: Target change (mm) that triggers an immediate send.
+        :param rate_window: Window over which the frame rate is measured (seconds).
+        :param clock: Monotonic time source, injectable for testing.
+        :param send: Function used to transmit, defaults to electrak.move_actuator.
+        :param cyclic_period: Period of cyclic RPDO keep-alive tasks (seconds), or
+            None to resend keep-alives from submit.
+        :raises ValueError: If the refresh or cyclic period would let nodes time out.
+        """
+        for name, period in (("refresh_period", refresh_period), ("cyclic_period", cyclic_period)):
+            if period is not None and not 0 < period < electrak.PDO_TIMEOUT_S:
+                raise ValueError(f"{name} must be in (0, {electrak.PDO_TIMEOUT_S}) seconds")
+        if deadband_mm < 0:
+            raise ValueError("deadband_mm must be non-negative")
+        if rate_window <= 0:
+            raise ValueError("rate_window must be positive")
+
+        self.refresh_period = refresh_period
+        self.deadband_mm = deadband_mm
+        self.rate_window = rate_window
+        self.clock = clock
+        self.send = send
+        self.cyclic_period = cyclic_period
+        self.frames_sent = 0
+        self.frames_suppressed = 0
+        self._states = {}
+        self._send_times = deque()
+        self._cyclic = {}  # node_id -> (node, True if the kernel keeps the timing)
+
+    def _state(self, node_id: int) -> _NodeState:
+        """
+        Get the transmit state for a node, creating it on first use.
+
+        :param node_id: CANopen node ID.
+        :return: The node's transmit state.
+        """
+        state = self._states.get(node_id)
+        if state is None:
+            state = self._states[node_id] = _NodeState()
+        return state
+
+    def is_due(
+        self, node_id: int, target_mm: float, settings: tuple = (), now: float = None
+    ) -> bool:
+        """
+        Decide whether a command for a node has to be transmitted now.
+
+        :param node_id: CANopen node ID.
+        :param target_mm: Requested target position (mm).
+        :param settings: Remaining RPDO fields; any change forces a send.
+        :param now: Current clock value, read from the clock if None.
+        :return: True if the command should be transmitted.
+        """
+        state = self._state(node_id)
+        if state.sent_at is None or settings != state.settings:
+            return True
+        if abs(target_mm - state.target_mm) > self.deadband_mm:
+            return True
+        if node_id in self._cyclic:
+            return False  # the cyclic task repeats the last command
+        if now is None:
+            now = self.clock()
+        return now - state.sent_at >= self.refresh_period
+
+    def submit(
+        self,
+        node: "canopen.Node",
+        target_position_mm: float,
+        current_limit_a: float = 12.5,
+        target_speed_pct: float = 80.0,
+        movement_profile: int = 0,
+        enable_motion: bool = True,
+    ) -> bool:
+        """
+        Request a target for an actuator, transmitting it only if due.
+
+        When only the keep-alive is due, the latest requested target is sent.
+
+        :param node: canopen.Node instance for the actuator.
+        :param target_position_mm: Target position in mm.
+        :param current_limit_a: Current limit in Amps.
+        :param target_speed_pct: Target speed as percent.
+        :param movement_profile: Movement profile.
+        :param enable_motion: Whether to enable motion.
+        :return: True if an RPDO was transmitted.
+        """
+        now = self.clock()
+        settings = (current_limit_a, target_speed_pct, movement_profile, enable_motion)
+        if not self.is_due(node.id, target_position_mm, settings, now):
+            self.frames_suppressed += 1
+            return False
+
+        send = self.send if self.send is not None else electrak.move_actuator
+        send(
+            node,
+            target_position_mm,
+            current_limit_a=current_limit_a,
+            target_speed_pct=target_speed_pct,
+            movement_profile=movement_profile,
+            enable_motion=enable_motion,
+        )
+        state = self._state(node.id)
+        state.target_mm = target_position_mm
+        state.settings = settings
+        state.sent_at = now
+        if self.cyclic_period is not None and node.id not in self._cyclic:
+            offloaded = electrak.start_cyclic_rpdo(node, self.cyclic_period)
+            self._cyclic[node.id] = (node, offloaded)
+        self.frames_sent += 1
+        self._send_times.append(now)
+        self._prune(now)
+        return True
+
+    def submit_all(self, nodes: dict, targets: dict) -> int:
+        """
+        Request targets for several actuators at once.
+
+        :param nodes: Dictionary of node_id to canopen.Node.
+        :param targets: Dictionary of node_id to target position (mm).
+        :return: Number of RPDOs transmitted.
+        """
+        sent = 0
+        for node_id, node in nodes.items():
+            if node_id in targets and self.submit(node, targets[node_id]):
+                sent += 1
+        return sent
+
+    def forget(self, node_id: int = None) -> None:
+        """
+        Drop the remembered command so the next submit is always sent.
+
+        :param node_id: Node to reset, or None to reset all nodes.
+        """
+        if node_id is None:
+            self._states.clear()
+        else:
+            self._states.pop(node_id, None)
+
+    def cyclic_nodes(self) -> dict:
+        """
+        :return: Dictionary of node_id to True if its cyclic RPDO is timed by the
+            kernel, False for the thread fallback.
+        """
+        return {node_id: offloaded for node_id, (_, offloaded) in self._cyclic.items()}
+
+    def stop_cyclic(self) -> None:
+        """
+        Stop all cyclic RPDO tasks and fall back to keep-alives resent by submit.
+
+        No new tasks are started afterwards; set cyclic_period again to resume them.
+        """
+        self.cyclic_period = None
+        for node, _ in self._cyclic.values():
+            electrak.stop_cyclic_rpdo(node)
+        self._cyclic.clear()
+
+    def _prune(self, now: float) -> None:
+        """
+        Drop send timestamps that fell out of the rate window.
+
+        :param now: Current clock value.
+        """
+        horizon = now - self.rate_window
+        while self._send_times and self._send_times[0] <= horizon:
+            self._send_times.popleft()
+
+    def last_target(self, node_id: int) -> float:
+        """
+        Read-only view for monitoring threads; never creates node state.
+
+        :param node_id: CANopen node ID.
+        :return: Last transmitted target (mm), or None if nothing was sent yet.
+        """
+        state = self._states.get(node_id)
+        return state.target_mm if state is not None else None
+
+    def frames_per_second(self) -> float:
+        """
+        Measure the RPDO frame rate over the rate window.
+
+        :return: Transmitted frames per second, including the cyclic tasks' frames.
+        """
+        self._prune(self.clock())
+        rate = len(self._send_times) / self.rate_window
+        period = self.cyclic_period
+        if period is not None:
+            rate += len(self._cyclic) / period
+        return rate
@@ -0,0 +1,397 @@
+import argparse
+import csv
+import itertools
+import logging
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import vector_kinematics as vk
+from geometry import RIG_GEOMETRY, Geometry
+from session_analysis import (
+    VALUES,
+    find_logs,
+    flight_bounds,
+    group_segments,
+    open_recording,
+    prune_caches,
+)
+from Washout import Washout
+
+logger = logging.getLogger("design_explorer")
+
+# Pose degrees of freedom, in the column order of pose arrays
+DOFS = ("x", "y", "z", "roll", "pitch", "yaw")
+TRANSLATIONS = 3
+# Envelope sweeps: largest excursion tried and step, meters or radians
+SWEEP_TRANSLATION = (0.5, 0.001)
+SWEEP_ROTATION = (1.0, 0.002)
+# Dense workspace grid: half-width per DOF and points per DOF
+WORKSPACE_TRANSLATION = 0.05
+WORKSPACE_ROTATION = 0.15
+WORKSPACE_STEPS = 5
+IK_CHUNK = 65536  # poses per vectorized IK call
+
+
+def neutral_height(geometry: Geometry) -> float:
+    """
+    Platform height at which every leg is at mid stroke.
+
+    Computed from the attachment points as paired for the IK. It differs from
+    Geometry.mid_height, whose closed form assumes another leg pairing.
+
+    :param geometry: Platform geometry.
+    :return: Height (meters).
+    :raises ValueError: If the mid-stroke length cannot span the attachment points.
+    """
+    p = np.asarray(geometry.p, dtype=float)
+    b = np.asarray(geometry.b, dtype=float)
+    horizontal = np.hypot(p[:, 0] - b[:, 0], p[:, 1] - b[:, 1]).max()
+    if geometry.mid_length <= horizontal:
+        raise ValueError("mid_length is shorter than the attachment point offset")
+    return math.sqrt(geometry.mid_length**2 - horizontal**2)
+
+
+def _lengths(geometry: Geometry, poses: np.ndarray) -> np.ndarray:
+    """
+    :param geometry: Platform geometry.
+    :param poses: (N, 6) absolute poses [x, y, z, roll, pitch, yaw].
+    :return: (N, 6) leg lengths.
+    """
+    return vk.leg_lengths(geometry, poses[:, 5], poses[:, 4], poses[:, 3], poses[:, :3])
+
+
+def _reachable(geometry: Geometry, poses: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    :param geometry: Platform geometry.
+    :param poses: (N, 6) poses the lengths belong to.
+    :param lengths: (N, 6) leg lengths.
+    :return: (N,) True where every leg is within its stroke and the platform above the base.
+    """
+    low = geometry.act_min
+    in_stroke = ((lengths >= low) & (lengths <= low + geometry.act_range)).all(axis=1)
+    return in_stroke & (poses[:, 2] > 0.0)
+
+
+def envelope(geometry: Geometry, home: np.ndarray) -> dict:
+    """
+    Reachable excursion along each DOF alone, starting from the home pose.
+
+    :param geometry: Platform geometry.
+    :param home: Home pose [x, y, z, roll, pitch, yaw].
+    :return: Dictionary of DOF name to (negative, positive) reachable excursion.
+    """
+    result = {}
+    for dof, name in enumerate(DOFS):
+        limit, step = SWEEP_TRANSLATION if dof < TRANSLATIONS else SWEEP_ROTATION
+        offsets = np.arange(step, limit + step / 2, step)
+        extents = []
+        for sign in (-1.0, 1.0):
+            poses = np.repeat(home[None, :], len(offsets), axis=0)
+            poses[:, dof] += sign * offsets
+            ok = _reachable(geometry, poses, _lengths(geometry, poses))
+            # Excursion until the first pose leaving the stroke
+            first_out = np.flatnonzero(~ok)
+            reached = len(offsets) if len(first_out) == 0 else first_out[0]
+            extents.append(float(offsets[reached - 1]) if reached else 0.0)
+        result[name] = (-extents[0], extents[1])
+    return result
+
+
+def workspace_grid(
+    home: np.ndarray,
+    translation: float = WORKSPACE_TRANSLATION,
+    rotation: float = WORKSPACE_ROTATION,
+    steps: int = WORKSPACE_STEPS,
+) -> np.ndarray:
+    """
+    Dense grid of combined poses around home.
+
+    :param home: Home pose [x, y, z, roll, pitch, yaw].
+    :param translation: Half-width of the translation axes (meters).
+    :param rotation: Half-width of the rotation axes (radians).
+    :param steps: Points per DOF; the grid has steps**6 poses.
+    :return: (steps**6, 6) poses.
+    """
+    axes = [
+        np.linspace(-half, half, steps)
+        for half in [translation] * TRANSLATIONS + [rotation] * (6 - TRANSLATIONS)
+    ]
+    grid = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 6)
+    return grid + home
+
+
+def dexterity(geometry: Geometry, poses: np.ndarray) -> dict:
+    """
+    Reachability and Jacobian conditioning over a set of poses.
+
+    :param geometry: Platform geometry.
+    :param poses: (N, 6) poses [x, y, z, roll, pitch, yaw].
+    :return: Dictionary with the reachable fraction and the median and worst
+        condition number over the reachable poses.
+    """
+    reachable = 0
+    conditions = []
+    for start in range(0, len(poses), IK_CHUNK):
+        chunk = poses[start : start + IK_CHUNK]
+        ok = _reachable(geometry, chunk, _lengths(geometry, chunk))
+        reachable += int(ok.sum())
+        inside = chunk[ok]
+        conditions.append(
+            vk.condition_numbers(geometry, inside[:, 5], inside[:, 4], inside[:, 3], inside[:, :3])
+        )
+    conditions = np.concatenate(conditions) if conditions else np.empty(0)
+    return {
+        "reachable": reachable / len(poses) if len(poses) else 0.0,
+        "condition_median": float(np.median(conditions)) if len(conditions) else math.inf,
+        "condition_max": float(conditions.max()) if len(conditions) else math.inf,
+    }
+
+
+def flight_poses(paths: list, cache_dir: str = None, washout_params: dict = None) -> np.ndarray:
+    """
+    Platform poses the motion chain commands for recorded flights, relative to level flight.
+
+    The washout does not depend on the geometry, so poses are computed once
+    and replayed through every candidate's IK. Its translation carries the
+    1 g of level flight plus its gravity term (several meters of z), so the
+    translation of a level 1 g sample is subtracted and flight_stroke centres
+    the excursions on each candidate's home pose.
+
+    :param paths: Get_data logs or session segments.
+    :param cache_dir: Directory for .npy recordings, next to the logs if None.
+    :param washout_params: Washout overrides the flights are replayed with.
+    :return: (N, 6) poses [x, y, z, roll, pitch, yaw], translations as excursions
+        from level flight.
+    """
+    washout = Washout(washout_params)
+    level = vk.washout_translation(np.array([[0.0, 0.0, vk.G]]), np.zeros((1, 3)), washout)[0]
+    poses = []
+    for segments in group_segments(paths):
+        recording = open_recording(segments, cache_dir)
+        for start, stop in flight_bounds(recording[:, 0], recording[:, 1 + vk.SIM_TIME]):
+            values = np.asarray(recording[start:stop, VALUES])
+            faa, oaa = vk.accelerations(values)
+            T = vk.washout_translation(faa, oaa, washout) - level
+            # Position.give_positions: oaa is [phi, psi, theta]
+            poses.append(np.column_stack((T, oaa[:, 0], oaa[:, 2], oaa[:, 1])))
+    return np.concatenate(poses) if poses else np.empty((0, 6))
+
+
+def flight_stroke(geometry: Geometry, poses: np.ndarray, home: np.ndarray) -> dict:
+    """
+    Stroke the candidate needs to replay recorded flights.
+
+    :param geometry: Platform geometry.
+    :param poses: (N, 6) poses relative to home, e.g. a memory-mapped flight_poses result.
+    :param home: Home pose [x, y, z, roll, pitch, yaw] the poses are centred on.
+    :return: Dictionary with the largest per-leg length span, whether it fits
+        the stroke, and the fraction of poses reachable as commanded.
+    """
+    low = np.full(6, np.inf)
+    high = np.full(6, -np.inf)
+    reachable = 0
+    for start in range(0, len(poses), IK_CHUNK):
+        chunk = np.asarray(poses[start : start + IK_CHUNK]) + home
+        lengths = _lengths(geometry, chunk)
+        low = np.minimum(low, lengths.min(axis=0))
+        high = np.maximum(high, lengths.max(axis=0))
+        reachable += int(_reachable(geometry, chunk, lengths).sum())
+    needed = float((high - low).max()) if len(poses) else 0.0
+    return {
+        "stroke_needed": needed,
+        "stroke_fits": needed <= geometry.act_range,
+        "flight_reachable": reachable / len(poses) if len(poses) else math.nan,
+    }
+
+
+def evaluate(params: dict, poses_path: str = None, workspace: dict = None) -> dict:
+    """
+    Measure one candidate geometry; runs in a worker process.
+
+    :param params: Geometry arguments.
+    :param poses_path: .npy file of flight_poses, memory-mapped, or None to skip.
+    :param workspace: workspace_grid keyword arguments.
+    :return: Flat result row: the parameters, envelope, dexterity and flight
+        stroke, or the parameters and an error.
+    """
+    row = dict(params)
+    try:
+        geometry = Geometry(**params)
+        height = neutral_height(geometry)
+    except ValueError as e:
+        row["error"] = str(e)
+        return row
+    home = np.array([0.0, 0.0, height, 0.0, 0.0, 0.0])
+    row["neutral_height"] = height
+    for name, (negative, positive) in envelope(geometry, home).items():
+        row[f"{name}_min"] = negative
+        row[f"{name}_max"] = positive
+    row.update(dexterity(geometry, workspace_grid(home, **(workspace or {}))))
+    if poses_path is not None:
+        row.update(flight_stroke(geometry, np.load(poses_path, mmap_mode="r"), home))
+    return row
+
+
+def candidates(ranges: dict, base: dict = RIG_GEOMETRY) -> list:
+    """
+    Full grid of candidate geometries.
+
+    :param ranges: Parameter name to the values to try.
+    :param base: Values of the parameters not varied.
+    :return: List of Geometry argument dictionaries.
+    :raises ValueError: If a parameter is not a Geometry argument.
+    """
+    unknown = set(ranges) - set(base)
+    if unknown:
+        raise ValueError(f"Unknown geometry parameters: {sorted(unknown)}")
+    names = list(ranges)
+    return [
+        {**base, **dict(zip(names, values))}
+        for values in itertools.product(*(ranges[name] for name in names))
+    ]
+
+
+def score(row: dict) -> float:
+    """
+    Ranking score: reachable workspace fraction over the median condition number.
+
+    :param row: evaluate result.
+    :return: Score, higher is better; -inf for failed candidates.
+    """
+    if "error" in row or not row["reachable"]:
+        return -math.inf
+    return row["reachable"] / row["condition_median"]
+
+
+def rank(rows: list) -> list:
+    """
+    Order candidates best first.
+
+    Candidates whose stroke can replay the recorded flights come first, then
+    by score; invalid geometries always come last.
+
+    :param rows: evaluate results.
+    :return: Rows with 'rank' and 'score' added, best first.
+    """
+    ordered = sorted(
+        rows, key=lambda row: ("error" in row, not row.get("stroke_fits", True), -score(row))
+    )
+    for position, row in enumerate(ordered, start=1):
+        row["rank"] = position
+        row["score"] = score(row)
+    return ordered
+
+
+def explore(
+    ranges: dict,
+    flights: list = None,
+    workers: int = None,
+    cache_dir: str = None,
+    washout_params: dict = None,
+    workspace: dict = None,
+) -> list:
+    """
+    Evaluate and rank every candidate of a parameter grid across a process pool.
+
+    :param ranges: Parameter name to the values to try.
+    :param flights: Get_data logs whose commanded poses each candidate must reach.
+    :param workers: Worker processes, os.cpu_count() if None; 1 runs in-process.
+    :param cache_dir: Directory for .npy recordings, next to the logs if None.
+    :param washout_params: Washout overrides the flights are replayed with.
+    :param workspace: workspace_grid keyword arguments.
+    :return: Ranked result rows.
+    """
+    grid = candidates(ranges)
+    with tempfile.TemporaryDirectory() as tmp:
+        poses_path = None
+        if flights:
+            # Shared with the workers through a memory map, not pickled per task
+            poses_path = os.path.join(tmp, "poses.npy")
+            np.save(poses_path, flight_poses(flights, cache_dir, washout_params))
+        if workers == 1 or len(grid) <= 1:
+            rows = [evaluate(params, poses_path, workspace) for params in grid]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(evaluate, params, poses_path, workspace) for params in grid]
+                rows = [future.result() for future in futures]
+    return rank(rows)
+
+
+def write_report(rows: list, path: str) -> None:
+    """
+    Write ranked results as CSV, one candidate per row.
+
+    :param rows: Ranked result rows.
+    :param path: Output file.
+    """
+    fields = ["rank", "score"] + list(RIG_GEOMETRY)
+    for row in rows:
+        fields += [key for key in row if key not in fields]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def parse_range(text: str) -> tuple:
+    """
+    :param text: 'name=v1,v2,...' or 'name=start:stop:count'.
+    :return: Tuple (name, list of values).
+    :raises argparse.ArgumentTypeError: If the text is malformed.
+    """
+    name, sep, values = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Expected name=values, got {text!r}")
+    try:
+        if ":" in values:
+            start, stop, count = values.split(":")
+            return name, np.linspace(float(start), float(stop), int(count)).tolist()
+        return name, [float(v) for v in values.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Bad values for {name}: {values!r}") from None
+
+
+def main() -> None:
+    """
+    Command line entry point: rank candidate geometries into a CSV report.
+    """
+    parser = argparse.ArgumentParser(description="Compare candidate platform geometries")
+    parser.add_argument(
+        "--vary",
+        action="append",
+        type=parse_range,
+        default=[],
+        metavar="NAME=VALUES",
+        help="geometry parameter values, e.g. radius_base=0.7,0.8 or range_val=0.2:0.4:5",
+    )
+    parser.add_argument("--flights", nargs="*", default=[], help="get_data logs or directories")
+    parser.add_argument("--cache", help="directory for .npy recordings (default: next to logs)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all CPUs)")
+    parser.add_argument("--out", default="geometry_report.csv", help="CSV report")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    flights = find_logs(args.flights)
+    prune_caches(flights, args.cache)
+    rows = explore(dict(args.vary), flights, args.workers, args.cache)
+    write_report(rows, args.out)
+    logger.info(
+        "Ranked %d candidates in %.1f s into %s", len(rows), time.perf_counter() - started, args.out
+    )
+    for row in rows[:5]:
+        logger.info(
+            "#%d score=%.3f %s",
+            row["rank"],
+            row["score"],
+            ", ".join(f"{name}={row[name]:g}" for name in RIG_GEOMETRY),
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -1,12 +1,13 @@
 import sys
 
-import xpc
+import sim_hub
 
 import time
 
 
 def monitor():
-    with xpc.XPlaneConnect() as client:
+    # Reads the snapshots published by sim_hub.py, or polls X-Plane itself without a hub
+    with sim_hub.connect() as client:
         while True:
             start_time = time.time()
             posi = client.getPOSI();
@@ -1,43 +1,153 @@
-import canopen
 import logging
-import time
-from canopen import Node
 import os
+import sys
+import time
+from typing import TYPE_CHECKING
+
+from profiling import profiled
+
+if TYPE_CHECKING:
+    import can
+    import canopen
+
+    from command_scheduler import CommandScheduler
+    from telemetry import TelemetrySink
 
-# Configure logging for the electrak module
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("electrak")
 
-# File handler for logging to a file
-file_handler = logging.FileHandler("electrak.log")
-file_handler.setLevel(logging.INFO)
-formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
+# Session log handler for electrak_*.log.gz segments, added by configure_logging
+LOG_FILE = "electrak.log"
+file_handler = None
 
 # Path to the EDS file for the Electrak HD actuator
 EDS_FILE = os.path.join(os.path.dirname(__file__), "Electrak_HD-20200113.eds")
 CAN_INTERFACE = "can0"  # Change if your interface is different (e.g., 'usb0', 'pcan0', etc.)
+CAN_BITRATE = 500000  # Electrak HD default baudrate (bit/s)
 SCAN_TIMEOUT = 5  # seconds
 
+# RPDO timing, see docs/ElectrakHD.md sections 6.1.5 and 6.2.1
+RPDO_REFRESH_PERIOD_S = 0.1  # Preferred RPDO repetition rate
+PDO_TIMEOUT_S = 5.0  # Default PDO Timeout Time (0x2005) before the Message Timeout flag is set
+BUS_INACTIVITY_SLEEP_S = 120.0  # Actuators go to sleep after this much bus inactivity
+
 MAX_CURRENT_LIMIT_A = 20.0  # 20 Amps
 MIN_TARGET_POSITION_MM = 0.0
 MAX_TARGET_POSITION_MM = 360.0
 
 
-def connect_can_network() -> canopen.Network:
+def __getattr__(name: str):
+    """
+    Load python-can and canopen on first use (PEP 562), so importing electrak
+    does not pay for them. Loaded names are cached as module attributes and
+    can be patched like ordinary ones.
+
+    :param name: Attribute name.
+    :return: The module or class.
+    :raises AttributeError: For unknown names.
+    """
+    if name == "can":
+        import can as value
+    elif name == "canopen":
+        import canopen as value
+    elif name == "Node":
+        from canopen import Node as value
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+# Module object, for resolving lazily loaded names inside functions
+_this = sys.modules[__name__]
+
+
+def configure_logging(path: str = LOG_FILE, level: int = logging.INFO) -> logging.Handler:
+    """
+    Also log electrak messages to compressed, rotating session log segments.
+
+    Importing electrak configures no logging; applications call this once at
+    startup. Repeated calls reuse the same handler.
+
+    :param path: Log path; its directory and name without extension select the
+        segments, e.g. electrak.log writes ./electrak_<time>_<n>.log.gz.
+    :param level: Level of the electrak logger and the file handler.
+    :return: The file handler.
+    """
+    global file_handler
+    if file_handler is None:
+        from session_log import SessionLog, SessionLogHandler
+
+        directory, name = os.path.split(path)
+        session = SessionLog(directory or ".", os.path.splitext(name)[0])
+        file_handler = SessionLogHandler(session)
+        file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        logger.addHandler(file_handler)
+    file_handler.setLevel(level)
+    logger.setLevel(level)
+    return file_handler
+
+
+def connect_can_network(
+    channel: str = CAN_INTERFACE,
+    interface: str = "socketcan",
+    bitrate: int = CAN_BITRATE,
+) -> "canopen.Network":
     """
     Connect to the CANopen network using the specified CAN interface.
 
+    :param channel: CAN interface name.
+    :param interface: python-can interface type (e.g. 'socketcan', 'virtual').
+    :param bitrate: Bus bitrate (bit/s).
     :return: Connected canopen.Network object.
     """
-    network = canopen.Network()
-    network.connect(bustype="socketcan", channel=CAN_INTERFACE, bitrate=500000)
-    logger.info("Connected to CAN network on interface %s", CAN_INTERFACE)
+    # Imported here so importing electrak does not load canopen
+    from monitored_network import MonitoredNetwork
+
+    network = MonitoredNetwork()
+    network.connect(interface=interface, channel=channel, bitrate=bitrate)
+    logger.info("Connected to CAN network on interface %s", channel)
     return network
 
 
-def scan_devices(network: canopen.Network) -> list:
+def add_bus_listener(network: "canopen.Network", listener: "can.Listener") -> None:
+    """
+    Observe every frame on a connected network.
+
+    Transmitted frames are only visible on a MonitoredNetwork, as returned by
+    connect_can_network. Frames of cyclic tasks on the thread fallback never
+    reach listeners; rate statistics add them from unmonitored_cyclic_messages.
+
+    :param network: Connected canopen.Network instance.
+    :param listener: python-can listener to notify.
+    :raises RuntimeError: If the network is not connected.
+    """
+    from monitored_network import MonitoredNetwork
+
+    if network.notifier is None:
+        raise RuntimeError("Network must be connected before adding listeners")
+    network.notifier.add_listener(listener)
+    if isinstance(network, MonitoredNetwork):
+        network.tx_listeners.append(listener)
+    else:
+        logger.warning("Network does not report transmitted frames to listeners")
+
+
+def remove_bus_listener(network: "canopen.Network", listener: "can.Listener") -> None:
+    """
+    Stop notifying a listener added with add_bus_listener.
+
+    :param network: The canopen.Network instance.
+    :param listener: Listener to remove.
+    """
+    from monitored_network import MonitoredNetwork
+
+    if network.notifier is not None and listener in network.notifier.listeners:
+        network.notifier.remove_listener(listener)
+    if isinstance(network, MonitoredNetwork) and listener in network.tx_listeners:
+        network.tx_listeners.remove(listener)
+
+
+def scan_devices(network: "canopen.Network") -> list:
     """
     Scan for CANopen devices on the network.
 
@@ -45,12 +155,15 @@ def scan_devices(network: canopen.Network) -> list:
     :return: List of discovered node IDs.
     """
     logger.info("Scanning for CANopen devices...")
-    found_nodes = network.scanner.search(timeout=SCAN_TIMEOUT)
+    # search only sends the SDO requests; answering nodes are collected meanwhile
+    network.scanner.search()
+    time.sleep(SCAN_TIMEOUT)
+    found_nodes = sorted(network.scanner.nodes)
     logger.info("Found nodes: %s", found_nodes)
     return found_nodes
 
 
-def add_nodes(network: canopen.Network, node_ids: list) -> dict:
+def add_nodes(network: "canopen.Network", node_ids: list) -> dict:
     """
     Add nodes to the CANopen network.
 
@@ -60,14 +173,14 @@ def add_nodes(network: canopen.Network, node_ids: list) -> dict:
     """
     nodes = {}
     for node_id in node_ids:
-        node = Node(node_id, EDS_FILE)
+        node = _this.Node(node_id, EDS_FILE)
         network.add_node(node)
         nodes[node_id] = node
         logger.info("Added node %d with EDS %s", node_id, EDS_FILE)
     return nodes
 
 
-def set_operational(network: canopen.Network, nodes: dict) -> None:
+def set_operational(network: "canopen.Network", nodes: dict) -> None:
     """
     Set all nodes to the OPERATIONAL NMT state.
 
@@ -81,19 +194,22 @@ def set_operational(network: canopen.Network, nodes: dict) -> None:
         time.sleep(0.1)  # Allow time for state change
 
 
+@profiled("electrak.move_actuator")
 def move_actuator(
-    node: canopen.Node,
+    node: "canopen.Node",
     target_position_mm: float,
     current_limit_a: float = 12.5,
     target_speed_pct: float = 80.0,
     movement_profile: int = 0,
     enable_motion: bool = True,
+    telemetry: "TelemetrySink" = None,
 ) -> None:
     """
     Send a control command to the actuator using RPDO1.
 
     All values are converted to the correct resolution as per documentation.
-    Enforces max current and position limits.
+    Enforces max current and position limits. Per-command text logging is at
+    DEBUG level, see set_frame_logging.
 
     :param node: canopen.Node instance for the actuator.
     :param target_position_mm: Target position in mm (float).
@@ -101,6 +217,7 @@ def move_actuator(
     :param target_speed_pct: Target speed as percent (float).
     :param movement_profile: Movement profile (int, see documentation).
     :param enable_motion: Whether to enable motion (bool).
+    :param telemetry: Optional TelemetrySink recording the command sent.
     """
     try:
         # Clamp values to allowed ranges
@@ -122,7 +239,18 @@ def move_actuator(
         node.rpdo[1]["Movement Profile"].raw = movement_profile
         node.rpdo[1]["Control Bits"].raw = control_bits
         node.rpdo[1].transmit()
-        logger.info(
+        # Keep a cyclic keep-alive task (start_cyclic_rpdo) repeating the new payload
+        node.rpdo[1].update()
+        if telemetry is not None:
+            telemetry.record_command(
+                node.id,
+                target_position_mm,
+                current_limit_a,
+                target_speed_pct,
+                movement_profile,
+                enable_motion,
+            )
+        logger.debug(
             "Node %d: Move command sent: pos=%.1fmm, curr=%.1fA, speed=%.1f%%, profile=%d, enable=%d",
             node.id,
             target_position_mm,
@@ -135,11 +263,78 @@ def move_actuator(
         logger.error("Error sending move command to node %d: %s", node.id, e)
 
 
-def read_actuator_feedback(node: canopen.Node) -> tuple:
+def start_cyclic_rpdo(node: "canopen.Node", period: float = RPDO_REFRESH_PERIOD_S) -> bool:
+    """
+    Hand a node's RPDO1 keep-alive to a cyclic transmit task.
+
+    On socketcan, python-can registers the task with the kernel's broadcast
+    manager (BCM), which keeps repeating the frame while the Python process is
+    paused by the GC or a blocked read; on interfaces without cyclic support,
+    such as virtual buses, python-can falls back to a transmit thread. The
+    task repeats the RPDO's current payload, so set it with move_actuator
+    first; later move_actuator calls send immediately and update the payload.
+    The task ends with stop_cyclic_rpdo or when the network disconnects.
+
+    :param node: canopen.Node instance for the actuator.
+    :param period: Repetition period (seconds).
+    :return: True if the timing is kept outside Python (kernel BCM or interface
+        hardware), False for the thread fallback.
+    """
+    rpdo = node.rpdo[1]
+    rpdo.start(period)
+    offloaded = _offloaded(getattr(rpdo, "_task", None))
+    logger.info(
+        "Node %d: cyclic RPDO every %.0f ms (%s)",
+        node.id,
+        period * 1000.0,
+        "kernel" if offloaded else "thread fallback",
+    )
+    return offloaded
+
+
+def _offloaded(task: "canopen.network.PeriodicMessageTask") -> bool:
+    """
+    :param task: canopen task, as kept in PdoMap._task.
+    :return: False if python-can runs the task on its transmit thread fallback.
+    """
+    # canopen's PeriodicMessageTask wraps the python-can task
+    task = getattr(task, "_task", None)
+    return not isinstance(task, _this.can.broadcastmanager.ThreadBasedCyclicSendTask)
+
+
+def unmonitored_cyclic_messages(network: "canopen.Network") -> list:
+    """
+    Cyclic frames that bus listeners never see.
+
+    Thread fallback tasks write straight to the bus, bypassing send_message
+    and the notifier. Kernel BCM frames on socketcan loop back to the
+    network's own socket and reach listeners as received frames.
+
+    :param network: Network returned by connect_can_network.
+    :return: List of (can.Message, period) of the network's running fallback tasks;
+        empty for networks that do not track their tasks.
+    """
+    tasks = tuple(getattr(network, "periodic_tasks", ()))
+    return [(task.msg, task.period) for task in tasks if not _offloaded(task)]
+
+
+def stop_cyclic_rpdo(node: "canopen.Node") -> None:
+    """
+    Stop a cyclic RPDO task started with start_cyclic_rpdo.
+
+    :param node: canopen.Node instance for the actuator.
+    """
+    node.rpdo[1].stop()
+
+
+def read_actuator_feedback(
+    node: "canopen.Node", telemetry: "TelemetrySink" = None
+) -> tuple:
     """
     Read feedback from the actuator using TPDO1.
 
     :param node: canopen.Node instance for the actuator.
+    :param telemetry: Optional TelemetrySink recording the feedback received.
     :return: Tuple (position_mm, current_a, speed_pct, motion_flags, error_flags)
     """
     try:
@@ -149,7 +344,11 @@ def read_actuator_feedback(node: canopen.Node) -> tuple:
         speed = node.tpdo[1]["Measured Speed"].raw / 10.0
         motion_flags = node.tpdo[1]["Motion Flags"].raw
         error_flags = node.tpdo[1]["Error Flags"].raw
-        logger.info(
+        if telemetry is not None:
+            telemetry.record_feedback(
+                node.id, position, current, speed, motion_flags, error_flags
+            )
+        logger.debug(
             "Node %d: Feedback: pos=%.1fmm, curr=%.1fA, speed=%.1f%%, motion=0x%02X, error=0x%02X",
             node.id,
             position,
@@ -164,30 +363,66 @@ def read_actuator_feedback(node: canopen.Node) -> tuple:
         return None, None, None, None, None
 
 
-def log_all_feedback(nodes: dict) -> None:
+def log_all_feedback(nodes: dict, telemetry: "TelemetrySink" = None) -> None:
     """
     Log feedback for all nodes.
 
     :param nodes: Dictionary of node_id to canopen.Node.
+    :param telemetry: Optional TelemetrySink recording the feedback received.
     """
     for node in nodes.values():
-        read_actuator_feedback(node)
+        read_actuator_feedback(node, telemetry)
 
 
-def periodic_move(nodes: dict, positions: dict, interval: float = 1.0) -> None:
+def set_frame_logging(enabled: bool) -> None:
     """
-    Periodically send move commands to all actuators.
+    Opt in to (or out of) full-detail text logging of every command and feedback.
+
+    Per-frame messages are logged at DEBUG level and are skipped by default, so
+    high-rate control loops should record numeric telemetry instead.
+
+    :param enabled: True to write per-frame messages to the console and the electrak session log.
+    """
+    level = logging.DEBUG if enabled else logging.INFO
+    logger.setLevel(level)
+    if file_handler is not None:
+        file_handler.setLevel(level)
+
+
+def periodic_move(
+    nodes: dict,
+    positions: dict,
+    interval: float = RPDO_REFRESH_PERIOD_S / 2,
+    duration: float = None,
+    scheduler: "CommandScheduler" = None,
+) -> "CommandScheduler":
+    """
+    Periodically service move commands for all actuators.
+
+    Commands go through a CommandScheduler, so a node is only sent a new RPDO
+    when its target changes beyond the deadband or its keep-alive is due.
+    The positions dictionary may be updated by the caller between polls.
 
     :param nodes: Dictionary of node_id to canopen.Node.
     :param positions: Dictionary of node_id to target position (mm).
-    :param interval: Time between move commands (seconds).
+    :param interval: Time between scheduler polls (seconds).
+    :param duration: Stop after this many seconds, or run forever if None.
+    :param scheduler: CommandScheduler to use, a default one is created if None.
+    :return: The CommandScheduler used, for frame rate reporting.
     """
+    # Imported here because command_scheduler depends on this module
+    from command_scheduler import CommandScheduler
+
+    if scheduler is None:
+        scheduler = CommandScheduler()
     logger.info("Starting periodic move commands...")
-    while True:
+    start = time.monotonic()
+    while duration is None or time.monotonic() - start < duration:
         for node_id, node in nodes.items():
-            pos = positions.get(node_id, 0)
-            move_actuator(node, pos)
+            scheduler.submit(node, positions.get(node_id, 0))
         time.sleep(interval)
+    logger.info("Bus frame rate: %.1f frames/s", scheduler.frames_per_second())
+    return scheduler
 
 
 def main() -> None:
@@ -209,12 +444,15 @@ def main() -> None:
 
         # Example: Move all actuators to 100mm, then 200mm, then 0mm in a loop
         positions = {node_id: 100 for node_id in nodes}
+        scheduler = None
         try:
             while True:
                 for pos in [100, 200, 0]:
                     for node_id in nodes:
                         positions[node_id] = pos
-                    periodic_move(nodes, positions, interval=2.0)
+                    scheduler = periodic_move(
+                        nodes, positions, duration=2.0, scheduler=scheduler
+                    )
         except KeyboardInterrupt:
             logger.info("Exiting on user request.")
 
@@ -224,4 +462,6 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    configure_logging()
     main()
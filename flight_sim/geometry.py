@@ -1,5 +1,18 @@
 import math
 
+import pose_transform
+from profiling import profiled
+
+# Measured parameters of the current rig (meters and radians)
+RIG_GEOMETRY = {
+    "radius_base": 0.791,
+    "radius_platform": 0.7835,
+    "mid_length": 0.74343,
+    "min_length": 0.59706,
+    "range_val": 0.292,
+    "sep_angle": 2.094,
+    "sep_angle_platform": 1.753,
+}
 
 class Geometry:
     """
@@ -42,6 +55,9 @@ class Geometry:
         # Auxiliary arrays for kinematic calculations
         self.p = [[0, 0, 0] for _ in range(6)]
         self.b = [[0, 0, 0] for _ in range(6)]
+        # Per-leg correction: IK length = attachment point distance - offset, so the
+        # result matches the TPDO position plus act_min; zero for the nominal rig
+        self.leg_offsets = [0.0] * 6
 
         # Initialize geometry (computes attachment point positions and heights)
         self.init_geometry()
@@ -120,6 +136,26 @@ class Geometry:
         self.act_min = self.min_length
         self.act_range = self.range_val
 
+    def set_attachment_points(
+        self, platform_points: list, base_points: list, leg_offsets: list = None
+    ) -> None:
+        """
+        Override the attachment points used by the inverse kinematics, e.g. with calibrated ones.
+
+        :param platform_points: Six platform points [x, y, z] in the platform frame, in leg order.
+        :param base_points: Six base points [x, y, z], in leg order.
+        :param leg_offsets: Six leg length offsets (meters), unchanged if None.
+        :raises ValueError: If a list does not hold six entries.
+        """
+        if len(platform_points) != 6 or len(base_points) != 6:
+            raise ValueError("Six platform and six base points are required")
+        if leg_offsets is not None and len(leg_offsets) != 6:
+            raise ValueError("Six leg offsets are required")
+        self.p = [[float(v) for v in point] for point in platform_points]
+        self.b = [[float(v) for v in point] for point in base_points]
+        if leg_offsets is not None:
+            self.leg_offsets = [float(v) for v in leg_offsets]
+
     def rot_matrix(self, psi: float, theta: float, phi: float) -> list:
         """
         Compute a 3x3 rotation matrix (flattened) from Euler angles.
@@ -129,28 +165,9 @@ class Geometry:
         :param phi: Roll angle (radians).
         :return: Flattened 3x3 rotation matrix as a list of 9 floats.
         """
-        RB = [0] * 9
-        RB[0] = math.cos(psi) * math.cos(theta)
-        RB[1] = math.sin(psi) * math.cos(theta)
-        RB[2] = -math.sin(theta)
-
-        RB[3] = -math.sin(psi) * math.cos(phi) + math.cos(psi) * math.sin(
-            theta
-        ) * math.sin(phi)
-        RB[4] = math.cos(psi) * math.cos(phi) + math.sin(psi) * math.sin(
-            theta
-        ) * math.sin(phi)
-        RB[5] = math.cos(theta) * math.sin(phi)
-
-        RB[6] = math.sin(psi) * math.sin(phi) + math.cos(psi) * math.sin(
-            theta
-        ) * math.cos(phi)
-        RB[7] = -math.cos(psi) * math.sin(phi) + math.sin(psi) * math.sin(
-            theta
-        ) * math.cos(phi)
-        RB[8] = math.cos(theta) * math.cos(phi)
-        return RB
+        return pose_transform.rot_matrix(psi, theta, phi)
 
+    @profiled("geometry.inverse_kinematics")
     def inverse_kinematics(self, pos) -> list:
         """
         Calculate the required actuator lengths for a given platform pose.
@@ -160,9 +177,10 @@ class Geometry:
             - theta: Pitch angle (radians)
             - phi: Roll angle (radians)
             - T: Translation vector [x, y, z] (meters)
-        :return: List of six actuator lengths (meters).
+        :return: List of six actuator lengths (meters), less the leg offsets.
         """
-        RB = self.rot_matrix(pos.psi, pos.theta, pos.phi)
+        # Shared with the washout, which usually evaluated this pose already
+        RB = pose_transform.transform_of(pos).matrix
         leg_lengths = []
 
         for i in range(6):
@@ -175,6 +193,6 @@ class Geometry:
             ]
             # Euclidean norm gives actuator length
             length = math.sqrt(sum(x**2 for x in L))
-            leg_lengths.append(length)
+            leg_lengths.append(length - self.leg_offsets[i])
 
         return leg_lengths
@@ -0,0 +1,104 @@
+import bisect
+import math
+
+
+class LatencyHistogram:
+    """
+    Fixed-size histogram of durations with logarithmically spaced buckets.
+
+    Recording is O(log buckets) with no allocation, so it can sit in a control
+    loop. Percentiles are resolved to the upper edge of their bucket, which
+    bounds the relative error by the bucket spacing.
+    """
+
+    def __init__(
+        self,
+        min_value: float = 1e-6,
+        max_value: float = 10.0,
+        buckets_per_decade: int = 20,
+    ) -> None:
+        """
+        Initialize an empty histogram.
+
+        :param min_value: Upper edge of the first bucket (seconds).
+        :param max_value: Largest value resolved, larger values land in the last bucket.
+        :param buckets_per_decade: Resolution of the bucket spacing.
+        :raises ValueError: If the range or resolution is invalid.
+        """
+        if min_value <= 0 or max_value <= min_value:
+            raise ValueError("Require 0 < min_value < max_value")
+        if buckets_per_decade < 1:
+            raise ValueError("buckets_per_decade must be at least 1")
+        decades = math.log10(max_value / min_value)
+        n = int(math.ceil(decades * buckets_per_decade)) + 1
+        step = 10.0 ** (1.0 / buckets_per_decade)
+        # Upper edge of each bucket; the last bucket is open-ended
+        self.edges = [min_value * step**i for i in range(n)]
+        self.counts = [0] * (n + 1)
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Clear all recorded values.
+        """
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        """
+        Add one value to the histogram.
+
+        :param value: Duration to record (seconds). Negative values count as zero.
+        """
+        if value < 0.0:
+            value = 0.0
+        self.counts[bisect.bisect_left(self.edges, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def mean(self) -> float:
+        """
+        :return: Mean of recorded values, or 0.0 if empty.
+        """
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, pct: float) -> float:
+        """
+        Estimate a percentile of the recorded values.
+
+        :param pct: Percentile in [0, 100].
+        :return: Upper bucket edge containing the percentile, capped at the maximum.
+        """
+        if not self.count:
+            return 0.0
+        rank = max(1, int(math.ceil(self.count * pct / 100.0)))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                if i >= len(self.edges):
+                    return self.max
+                return min(self.edges[i], self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """
+        Summarize the distribution.
+
+        :return: Dictionary with count, mean, p50, p99 and max (seconds).
+        """
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
@@ -0,0 +1,211 @@
+import math
+
+from Position import Position
+
+# Keyframes kept for tangent estimation
+KEYFRAMES = 3
+# Keyframes over which the sim-to-local clock offset is tracked
+OFFSET_WINDOW = 32
+
+
+def euler_to_quat(psi: float, theta: float, phi: float) -> tuple:
+    """
+    Quaternion of the yaw-pitch-roll rotation used by Geometry.rot_matrix.
+
+    :param psi: Yaw angle (radians).
+    :param theta: Pitch angle (radians).
+    :param phi: Roll angle (radians).
+    :return: Unit quaternion (w, x, y, z).
+    """
+    cy, sy = math.cos(psi * 0.5), math.sin(psi * 0.5)
+    cp, sp = math.cos(theta * 0.5), math.sin(theta * 0.5)
+    cr, sr = math.cos(phi * 0.5), math.sin(phi * 0.5)
+    return (
+        cr * cp * cy + sr * sp * sy,
+        sr * cp * cy - cr * sp * sy,
+        cr * sp * cy + sr * cp * sy,
+        cr * cp * sy - sr * sp * cy,
+    )
+
+
+def quat_to_euler(q: tuple) -> tuple:
+    """
+    Inverse of euler_to_quat.
+
+    :param q: Unit quaternion (w, x, y, z).
+    :return: Tuple (psi, theta, phi) in radians.
+    """
+    w, x, y, z = q
+    phi = math.atan2(2.0 * (w * x + y * z), 1.0 - 2.0 * (x * x + y * y))
+    theta = math.asin(max(-1.0, min(1.0, 2.0 * (w * y - z * x))))
+    psi = math.atan2(2.0 * (w * z + x * y), 1.0 - 2.0 * (y * y + z * z))
+    return psi, theta, phi
+
+
+def slerp(q0: tuple, q1: tuple, u: float) -> tuple:
+    """
+    Spherical linear interpolation between two unit quaternions.
+
+    u outside [0, 1] extrapolates along the same great circle.
+
+    :param q0: Start quaternion.
+    :param q1: End quaternion.
+    :param u: Blend factor, 0 gives q0 and 1 gives q1.
+    :return: Unit quaternion.
+    """
+    dot = q0[0] * q1[0] + q0[1] * q1[1] + q0[2] * q1[2] + q0[3] * q1[3]
+    if dot < 0.0:
+        # Take the short way round
+        q1 = (-q1[0], -q1[1], -q1[2], -q1[3])
+        dot = -dot
+    if dot > 0.9995:
+        # Nearly parallel: normalized lerp avoids dividing by sin(~0)
+        a, b = 1.0 - u, u
+    else:
+        angle = math.acos(dot)
+        s = math.sin(angle)
+        a = math.sin((1.0 - u) * angle) / s
+        b = math.sin(u * angle) / s
+    w = a * q0[0] + b * q1[0]
+    x = a * q0[1] + b * q1[1]
+    y = a * q0[2] + b * q1[2]
+    z = a * q0[3] + b * q1[3]
+    n = math.sqrt(w * w + x * x + y * y + z * z)
+    return (w / n, x / n, y / n, z / n)
+
+
+class PoseInterpolator:
+    """
+    Upsamples platform poses from sim frames to the control rate.
+
+    Keyframes are pushed with their sim timestamps as the washout produces
+    them. Sampling at time t blends orientation with SLERP and translation
+    with a cubic Hermite spline whose tangents come from neighbouring
+    keyframes. The spline runs `delay` behind the newest keyframe so it
+    usually interpolates; past the newest keyframe it extrapolates for at
+    most max_extrapolation seconds and then holds.
+    """
+
+    def __init__(self, delay: float = 0.05, max_extrapolation: float = 0.1) -> None:
+        """
+        :param delay: Time the output trails the sim (seconds), about one sim frame.
+        :param max_extrapolation: Longest extrapolation past the newest keyframe (seconds).
+        """
+        self.delay = delay
+        self.max_extrapolation = max_extrapolation
+        # Keyframes (t, quaternion, translation), oldest first. The tuple is
+        # replaced, never mutated, so a sampling thread always sees a consistent set.
+        self._keys = ()
+        self._offsets = []
+        self.offset = None
+
+    @property
+    def ready(self) -> bool:
+        """
+        :return: True once a keyframe was pushed.
+        """
+        return bool(self._keys)
+
+    def reset(self) -> None:
+        """
+        Drop all keyframes, e.g. after the sim was paused or repositioned.
+        """
+        self._keys = ()
+        self._offsets = []
+        self.offset = None
+
+    def push(self, t: float, pos: Position, received: float = None) -> None:
+        """
+        Add a keyframe.
+
+        :param t: Sim time of the pose (seconds).
+        :param pos: Pose; its values are copied.
+        :param received: Local clock time the sample arrived, used to map local time to sim time.
+        """
+        key = (
+            t,
+            euler_to_quat(pos.psi, pos.theta, pos.phi),
+            (pos.T[0], pos.T[1], pos.T[2]),
+        )
+        keys = self._keys
+        if keys and t <= keys[-1][0]:
+            # Sim paused or a repeated frame: replace the newest pose
+            keys = keys[:-1]
+            if keys and t < keys[-1][0]:
+                keys = ()  # sim time went backwards, start over
+        self._keys = (keys + (key,))[-KEYFRAMES:]
+        if received is not None:
+            # Network delay only ever adds to the offset, so the smallest
+            # recent offset is the best estimate of the clock difference
+            self._offsets.append(received - t)
+            del self._offsets[:-OFFSET_WINDOW]
+            self.offset = min(self._offsets)
+
+    def sim_time(self, local_time: float) -> float:
+        """
+        :param local_time: Local clock time.
+        :return: Estimated sim time at local_time.
+        """
+        return local_time - (self.offset or 0.0)
+
+    def sample_local(self, local_time: float, out: Position) -> bool:
+        """
+        Sample the pose for a local clock time.
+
+        :param local_time: Local clock time, on the clock passed as received to push.
+        :param out: Position receiving the pose.
+        :return: False if no keyframe was pushed yet.
+        """
+        return self.sample(self.sim_time(local_time) - self.delay, out)
+
+    def sample(self, t: float, out: Position) -> bool:
+        """
+        Sample the pose at a sim time.
+
+        :param t: Sim time (seconds).
+        :param out: Position receiving the pose; out.T is updated in place.
+        :return: False if no keyframe was pushed yet.
+        """
+        keys = self._keys
+        if not keys:
+            return False
+        if len(keys) == 1:
+            _, q, p = keys[0]
+            out.psi, out.theta, out.phi = quat_to_euler(q)
+            out.T[:] = p
+            return True
+
+        # Segment ending at the first keyframe after t, or the newest segment
+        i = len(keys) - 1
+        while i > 1 and t < keys[i - 1][0]:
+            i -= 1
+        t0, q0, p0 = keys[i - 1]
+        t1, q1, p1 = keys[i]
+        h = t1 - t0
+        t = max(t0, min(t, t1 + self.max_extrapolation))
+        u = (t - t0) / h
+
+        # Tangents (per unit u): centered at t0 when an older keyframe exists,
+        # one-sided at t1 since the next frame is unknown
+        if i >= 2:
+            tp, _, pp = keys[i - 2]
+            m0 = [(p1[k] - pp[k]) * h / (t1 - tp) for k in range(3)]
+        else:
+            m0 = [p1[k] - p0[k] for k in range(3)]
+        if u <= 1.0:
+            u2 = u * u
+            u3 = u2 * u
+            h00 = 2.0 * u3 - 3.0 * u2 + 1.0
+            h10 = u3 - 2.0 * u2 + u
+            h01 = -2.0 * u3 + 3.0 * u2
+            h11 = u3 - u2
+            T = out.T
+            for k in range(3):
+                T[k] = h00 * p0[k] + h10 * m0[k] + h01 * p1[k] + h11 * (p1[k] - p0[k])
+        else:
+            # Linear extrapolation along the last segment's end tangent
+            T = out.T
+            for k in range(3):
+                T[k] = p1[k] + (u - 1.0) * (p1[k] - p0[k])
+        out.psi, out.theta, out.phi = quat_to_euler(slerp(q0, q1, u))
+        return True
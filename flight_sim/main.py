@@ -1,69 +1,427 @@
 # Example integration of geometry.py, position.py, and washout.py
 
-from geometry import Geometry
+import time
+
+# Startup time is reported relative to this point
+LAUNCH_TIME = time.perf_counter()
+
+from geometry import RIG_GEOMETRY, Geometry
+from interpolation import PoseInterpolator
 from Position import Position
 from Washout import Washout
 from Get_data import Get_data
+from command_scheduler import CommandScheduler
+from pipeline import MotionCore, MotionPipeline, control_tick
+from rate_loop import RateLoop
+from telemetry import TelemetrySink
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from array import array
+import argparse
 import electrak
+import profiling
 import logging
-import time
+import os
+import sys
+import threading
 
-# Configure logging for this script
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("main")
 
-# 1. Initialize system
-geometry = Geometry(
-    radius_base=0.791,
-    radius_platform=0.7835,
-    mid_length=0.74343,
-    min_length=0.59706,
-    range_val=0.292,
-    sep_angle=2.094,
-    sep_angle_platform=1.753,
-)
-position = Position(mid_height=geometry.mid_height)
-washout = Washout()
-data_getter = Get_data()
-
-# Initialize CAN network and actuators
-network = electrak.connect_can_network()
-try:
-    node_ids = electrak.scan_devices(network)
-    if not node_ids:
-        logger.error("No CANopen nodes found. Exiting.")
-        exit(1)
-    nodes = electrak.add_nodes(network, node_ids)
-    electrak.set_operational(network, nodes)
-
-    # Main loop
-    while True:
-        # Get current acceleration and orientation (from Get_data.py)
-        data_getter.run()
-        faa = data_getter.faa  # [side, axial, normal]
-        oaa = data_getter.oaa  # [phi, psi, theta]
-
-        # Washout filter: process motion cues
-        filtered_motion = washout.compute2(faa, oaa, position)
-
-        # Update platform pose
-        position.give_positions(oaa, filtered_motion)
-
-        # Compute actuator lengths
-        actuator_lengths = geometry.inverse_kinematics(position)
-
-        # Send actuator lengths to each actuator over CAN and log the messages
-        for idx, (node_id, node) in enumerate(nodes.items()):
-            # Convert length from meters to mm for actuator command
-            target_position_mm = actuator_lengths[idx] * 1000.0
-            electrak.move_actuator(node, target_position_mm)
-            logger.info(
-                f"Sent actuator command to node {node_id}: target_position_mm={target_position_mm:.2f}"
+FRAME_RATE_REPORT_PERIOD = 5.0  # seconds between bus frame rate reports
+MIN_RATE_HZ = 20.0  # control rates the washout and actuator bus are tuned for
+MAX_RATE_HZ = 500.0
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    """
+    Parse the command line.
+
+    :param argv: Arguments, sys.argv[1:] if None.
+    :return: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Drive the motion platform from X-Plane")
+    parser.add_argument(
+        "--threaded",
+        action="store_true",
+        help="run acquisition, motion and CAN transmit as separate pipeline stages",
+    )
+    parser.add_argument(
+        "--isolated",
+        action="store_true",
+        help="run washout, IK and CAN transmit in a dedicated process",
+    )
+    parser.add_argument(
+        "--upsample",
+        action="store_true",
+        help="with --threaded, interpolate poses between sim frames at the control rate",
+    )
+    parser.add_argument(
+        "--hub",
+        action="store_true",
+        help="read the sim through a running sim_hub.py instead of a private connection",
+    )
+    parser.add_argument(
+        "--data-output",
+        type=int,
+        nargs="?",
+        const=49003,
+        metavar="PORT",
+        help="read the sim from X-Plane's Data Output UDP stream (default port 49003)",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=20.0,
+        help=f"control loop rate in Hz ({MIN_RATE_HZ:g}-{MAX_RATE_HZ:g})",
+    )
+    parser.add_argument(
+        "--profile",
+        type=float,
+        metavar="SECONDS",
+        help="time the hot-path stages and log a summary every SECONDS; "
+        "SIGUSR1 dumps one on demand",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=int,
+        nargs="?",
+        const=9105,
+        metavar="PORT",
+        help="serve Prometheus metrics on http://localhost:PORT/metrics (default port 9105)",
+    )
+    parser.add_argument(
+        "--can-interface",
+        default="socketcan",
+        help="python-can interface of the actuator bus (default socketcan)",
+    )
+    parser.add_argument(
+        "--can-channel",
+        default=electrak.CAN_INTERFACE,
+        help=f"channel of the actuator bus (default {electrak.CAN_INTERFACE})",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="write a per-tick sim-to-actuator latency trace to the data directory",
+    )
+    parser.add_argument(
+        "--cyclic-rpdo",
+        action="store_true",
+        help="repeat RPDO keep-alives from a cyclic task (kernel BCM on socketcan) "
+        "instead of the control loop",
+    )
+    parser.add_argument(
+        "--calibration",
+        metavar="FILE",
+        help="correct the geometry with calibration samples (.npz, see calibration.py) at startup",
+    )
+    args = parser.parse_args(argv)
+    if not MIN_RATE_HZ <= args.rate <= MAX_RATE_HZ:
+        parser.error(f"--rate must be within {MIN_RATE_HZ:g}-{MAX_RATE_HZ:g} Hz")
+    if args.upsample and not args.threaded:
+        parser.error("--upsample needs --threaded")
+    if args.isolated:
+        given = {
+            "--calibration": args.calibration is not None,
+            "--cyclic-rpdo": args.cyclic_rpdo,
+            "--threaded": args.threaded,
+            "--upsample": args.upsample,
+            "--trace": args.trace,
+            "--metrics": args.metrics is not None,
+        }
+        in_process = [option for option, used in given.items() if used]
+        if in_process:
+            parser.error(f"{', '.join(in_process)} apply to the in-process core, not --isolated")
+    if args.hub and args.data_output is not None:
+        parser.error("--hub and --data-output select different sim sources")
+    return args
+
+
+def log_startup(what: str) -> None:
+    """
+    Report the time from launch to a startup milestone.
+
+    :param what: Milestone description.
+    """
+    logger.info("%s %.3f s after launch", what, time.perf_counter() - LAUNCH_TIME)
+
+
+def can_config(args: argparse.Namespace) -> dict:
+    """
+    :param args: Parsed command line.
+    :return: Keyword arguments for electrak.connect_can_network.
+    """
+    return {"interface": args.can_interface, "channel": args.can_channel}
+
+
+def build_core(args: argparse.Namespace) -> MotionCore:
+    """
+    Precompute the platform geometry and set up washout and pose.
+
+    :param args: Parsed command line.
+    :return: MotionCore for the rig.
+    """
+    geometry = Geometry(**RIG_GEOMETRY)
+    if args.calibration:
+        import calibration
+
+        geometry, _ = calibration.calibrate_from_file(geometry, args.calibration)
+    position = Position(mid_height=geometry.mid_height)
+    washout = Washout()
+    interpolator = PoseInterpolator() if args.upsample else None
+    return MotionCore(geometry, washout, position, interpolator)
+
+
+def bring_up_can(args: argparse.Namespace) -> tuple:
+    """
+    Connect the bus, find the actuators, make them operational and start the watchdog.
+
+    :param args: Parsed command line.
+    :return: Tuple (network, nodes, watchdog).
+    :raises RuntimeError: If no actuators answer the scan.
+    """
+    # Imported here so paths without a bus never load canopen
+    from watchdog import HeartbeatWatchdog
+
+    network = electrak.connect_can_network(**can_config(args))
+    try:
+        node_ids = electrak.scan_devices(network)
+        if not node_ids:
+            raise RuntimeError("No CANopen nodes found")
+        nodes = electrak.add_nodes(network, node_ids)
+        electrak.set_operational(network, nodes)
+
+        # Watch heartbeats, EMCY and error flags; any fault freezes all legs
+        watchdog = HeartbeatWatchdog(network, nodes)
+        watchdog.configure()
+        watchdog.start()
+    except Exception:
+        network.disconnect()
+        raise
+    return network, nodes, watchdog
+
+
+def make_data_getter(args: argparse.Namespace) -> Get_data:
+    """
+    Set up the sim source selected on the command line.
+
+    :param args: Parsed command line.
+    :return: Unconnected Get_data.
+    """
+    if args.hub:
+        from sim_hub import HubClient
+
+        return Get_data(client=HubClient())
+    if args.data_output is not None:
+        from xplane_data import DataOutputClient, DataOutputListener
+
+        return Get_data(client=DataOutputClient(DataOutputListener(args.data_output)))
+    return Get_data()
+
+
+def run_isolated(args: argparse.Namespace, data_getter: Get_data) -> None:
+    """
+    Feed sim samples to a motion process that owns the CAN bus, until it exits.
+
+    Exits with status 1 when the motion process fails, e.g. finds no actuators.
+
+    :param args: Parsed command line.
+    :param data_getter: Unconnected sim source.
+    """
+    from motion_process import OUTPUT_FIELDS, MotionProcess
+
+    # The motion process owns the CAN bus; this process only feeds it sim
+    # samples, so its logging and garbage collection cannot delay commands
+    motion = MotionProcess(RIG_GEOMETRY, rate_hz=args.rate, can_config=can_config(args))
+    exitcode = 0
+    try:
+        with ThreadPoolExecutor(thread_name_prefix="init") as pool:
+            sim_ready = pool.submit(data_getter.connect)
+            motion.start()
+            sim_ready.result()
+        feed = RateLoop(args.rate)
+        output = array("d", [0.0] * OUTPUT_FIELDS)
+        first_command = False
+        while motion.alive:
+            feed.wait()
+            data_getter.run()
+            motion.publish_sample(data_getter.faa, data_getter.oaa)
+            if not first_command and motion.latest_output(output) >= 0:
+                first_command = True
+                log_startup("First actuator command")
+        exitcode = motion.process.exitcode
+    finally:
+        motion.stop()
+        logger.info("Motion process stopped.")
+    if exitcode:
+        logger.error("Motion process exited with code %d", exitcode)
+        sys.exit(1)
+
+
+def run_in_process(args: argparse.Namespace, data_getter: Get_data) -> None:
+    """
+    Run washout, IK and CAN transmit in this process, in one loop or as pipeline stages.
+
+    :param args: Parsed command line.
+    :param data_getter: Unconnected sim source.
+    """
+    # Numeric command telemetry replaces per-command log lines; call
+    # electrak.set_frame_logging(True) for full-detail text logs
+    data_dir = os.path.join(os.path.dirname(__file__), "../data")
+    os.makedirs(data_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    telemetry = TelemetrySink(os.path.join(data_dir, f"telemetry_{timestamp}.bin"))
+    first_command = threading.Event()
+
+    def send_command(node, target_position_mm: float, **settings) -> None:
+        """
+        Scheduler send function: move_actuator with telemetry, reporting the first command.
+
+        :param node: canopen.Node instance for the actuator.
+        :param target_position_mm: Target position in mm.
+        :param settings: Remaining move_actuator arguments.
+        """
+        electrak.move_actuator(node, target_position_mm, telemetry=telemetry, **settings)
+        if not first_command.is_set():
+            first_command.set()
+            log_startup("First actuator command")
+
+    scheduler = CommandScheduler(
+        send=send_command,
+        cyclic_period=electrak.RPDO_REFRESH_PERIOD_S if args.cyclic_rpdo else None,
+    )
+
+    # Sim connection, CAN bring-up and geometry precomputation run concurrently
+    with ThreadPoolExecutor(thread_name_prefix="init") as pool:
+        sim_ready = pool.submit(data_getter.connect)
+        can_ready = pool.submit(bring_up_can, args)
+        core = pool.submit(build_core, args).result()
+        try:
+            sim_ready.result()
+            network, nodes, watchdog = can_ready.result()
+        except Exception as e:
+            logger.error("Startup failed: %s. Exiting.", e)
+            if can_ready.exception() is None:
+                can_ready.result()[0].disconnect()
+            sys.exit(1)
+    log_startup("Initialized")
+
+    telemetry.start()
+    tracer = None
+    if args.trace:
+        from tracing import LatencyTracer
+
+        tracer = LatencyTracer(os.path.join(data_dir, f"trace_{timestamp}.csv"))
+        tracer.attach(network)
+
+    metrics = None
+    if args.metrics is not None:
+        # Scrapes run on the HTTP thread and only read state the control path keeps anyway
+        from bus_monitor import BusMonitor
+        from metrics_server import (
+            ActuatorMetrics,
+            MetricsServer,
+            bus_metrics,
+            loop_metrics,
+            sim_metrics,
+        )
+
+        metrics = MetricsServer(args.metrics)
+        metrics.add(sim_metrics(data_getter))
+        bus_monitor = BusMonitor()
+        bus_monitor.attach(network)
+        metrics.add(bus_metrics(bus_monitor))
+        actuator_metrics = ActuatorMetrics(network, nodes, scheduler)
+        actuator_metrics.start()
+        metrics.add(actuator_metrics.collect)
+    try:
+        if args.threaded:
+            # Sim acquisition, motion and CAN transmit each on their own thread
+            pipeline = MotionPipeline(
+                data_getter,
+                core,
+                nodes,
+                scheduler,
+                transmit_rate_hz=args.rate,
+                watchdog=watchdog,
+                tracer=tracer,
             )
+            if metrics is not None:
+                metrics.add(loop_metrics(pipeline.transmit_loop))
+                metrics.start()
+            pipeline.start()
+            try:
+                while pipeline.running:
+                    time.sleep(FRAME_RATE_REPORT_PERIOD)
+                    logger.info("Pipeline: %s", pipeline.stats())
+            finally:
+                pipeline.stop()
+        else:
+            loop = RateLoop(args.rate)
+            if metrics is not None:
+                metrics.add(loop_metrics(loop))
+                metrics.start()
+            frozen = False
+            last_report = time.monotonic()
+
+            # Main loop, released on absolute deadlines at the control rate
+            loop.start()
+            while True:
+                loop.wait()
+
+                if watchdog.check() and not frozen:
+                    logger.error("Actuator fault, freezing all legs: %s", watchdog.faults)
+                    frozen = True
+
+                # Sim sample, washout, IK and CAN commands; telemetry records them
+                control_tick(
+                    data_getter, core, nodes, scheduler, enable_motion=not frozen, tracer=tracer
+                )
+
+                now = time.monotonic()
+                if now - last_report >= FRAME_RATE_REPORT_PERIOD:
+                    logger.info(
+                        "Bus frame rate: %.1f frames/s", scheduler.frames_per_second()
+                    )
+                    logger.info("Control loop: %s", loop.stats())
+                    last_report = now
+
+    finally:
+        if metrics is not None:
+            metrics.stop()
+            actuator_metrics.stop()
+            bus_monitor.detach()
+        if tracer is not None:
+            tracer.stop()
+        telemetry.stop()
+        network.disconnect()
+        logger.info("Disconnected from CAN network.")
+
+
+def main(argv: list = None) -> None:
+    """
+    Command line entry point: drive the platform from the sim until interrupted.
+
+    Everything runs from here rather than at import, because the --isolated
+    motion process is spawned and re-imports this module as __mp_main__.
+
+    :param argv: Arguments, sys.argv[1:] if None.
+    """
+    args = parse_args(argv)
+    electrak.configure_logging()
+
+    if args.profile:
+        profiling.enable()
+        profiling.install_dump_signal()
+        profiling.ProfileReporter(args.profile).start()
+
+    data_getter = make_data_getter(args)
+    if args.isolated:
+        run_isolated(args, data_getter)
+    else:
+        run_in_process(args, data_getter)
 
-        # Wait for next cycle
-        time.sleep(0.05)  # 20 Hz update rate
 
-finally:
-    network.disconnect()
-    logger.info("Disconnected from CAN network.")
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,421 @@
+import logging
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Callable
+
+from histogram import LatencyHistogram
+from rate_loop import RateLoop
+
+if TYPE_CHECKING:
+    import canopen
+
+    from bus_monitor import BusMonitor
+    from command_scheduler import CommandScheduler
+
+logger = logging.getLogger("metrics_server")
+
+DEFAULT_PORT = 9105
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+TPDO1_BASE = 0x180
+TEMPERATURE_INDEX = 0x200F  # Measured Temperature, SDO only (not PDO mappable)
+
+
+class Metric:
+    """
+    One metric family: name, type, help text and labelled samples.
+    """
+
+    __slots__ = ("name", "kind", "help", "samples")
+
+    def __init__(self, name: str, kind: str, help: str, samples: list = None) -> None:
+        """
+        :param name: Metric name, e.g. 'flight_sim_loop_overruns_total'.
+        :param kind: 'gauge', 'counter' or 'summary'.
+        :param help: One-line description.
+        :param samples: List of (suffix, labels, value); suffix is appended to the name.
+        """
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.samples = samples if samples is not None else []
+
+    def add(self, value: float, labels: dict = None, suffix: str = "") -> "Metric":
+        """
+        Append a sample.
+
+        :param value: Sample value.
+        :param labels: Label names to values.
+        :param suffix: Name suffix such as '_sum' or '_count' for summaries.
+        :return: self, for chaining.
+        """
+        self.samples.append((suffix, labels or {}, value))
+        return self
+
+
+def _format_value(value: float) -> str:
+    """
+    :param value: Sample value.
+    :return: Prometheus text representation.
+    """
+    if value is None or math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _format_labels(labels: dict) -> str:
+    """
+    :param labels: Label names to values.
+    :return: '{name="value",...}', or '' without labels.
+    """
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def render(metrics: list) -> str:
+    """
+    Format metrics in the Prometheus text exposition format.
+
+    :param metrics: List of Metric.
+    :return: Exposition text.
+    """
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for suffix, labels, value in metric.samples:
+            labels = _format_labels(labels)
+            lines.append(f"{metric.name}{suffix}{labels} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _summary(name: str, help: str, histogram: LatencyHistogram, labels: dict) -> Metric:
+    """
+    :param name: Metric name.
+    :param help: One-line description.
+    :param histogram: Recorded durations (seconds).
+    :param labels: Labels of every sample.
+    :return: Summary metric with p50, p99, sum and count.
+    """
+    metric = Metric(name, "summary", help)
+    metric.add(histogram.percentile(50), {**labels, "quantile": "0.5"})
+    metric.add(histogram.percentile(99), {**labels, "quantile": "0.99"})
+    metric.add(histogram.total, labels, "_sum")
+    metric.add(histogram.count, labels, "_count")
+    return metric
+
+
+def loop_metrics(loop: RateLoop, labels: dict = None) -> Callable[[], list]:
+    """
+    Collector for a control loop's rate, jitter and overruns.
+
+    :param loop: The loop, e.g. the serial loop or MotionPipeline.transmit_loop.
+    :param labels: Labels added to every sample, e.g. {"platform": "a"}.
+    :return: Collector returning a list of Metric.
+    """
+    labels = labels or {}
+
+    def collect() -> list:
+        return [
+            Metric("flight_sim_loop_target_rate_hz", "gauge", "Configured control loop rate.")
+            .add(loop.rate_hz, labels),
+            Metric("flight_sim_loop_rate_hz", "gauge", "Average achieved control loop rate.")
+            .add(loop.achieved_rate(), labels),
+            Metric("flight_sim_loop_ticks_total", "counter", "Control loop ticks released.")
+            .add(loop.ticks, labels),
+            Metric(
+                "flight_sim_loop_overruns_total",
+                "counter",
+                "Ticks whose previous tick's work ran past their deadline.",
+            ).add(loop.overruns, labels),
+            Metric(
+                "flight_sim_loop_skipped_total", "counter", "Ticks dropped by the overrun policy."
+            ).add(loop.skipped, labels),
+            _summary(
+                "flight_sim_loop_jitter_seconds",
+                "Lateness of tick release relative to the deadline.",
+                loop.jitter,
+                labels,
+            ),
+            Metric("flight_sim_loop_jitter_max_seconds", "gauge", "Largest tick lateness.")
+            .add(loop.jitter.max, labels),
+        ]
+
+    return collect
+
+
+def sim_metrics(data_getter, clock: Callable[[], float] = time.time) -> Callable[[], list]:
+    """
+    Collector for the age of the newest sim sample.
+
+    :param data_getter: Get_data instance (or anything with received and paused).
+    :param clock: Clock of data_getter.received.
+    :return: Collector returning a list of Metric.
+    """
+
+    def collect() -> list:
+        received = data_getter.received
+        age = clock() - received if received is not None else math.nan
+        return [
+            Metric(
+                "flight_sim_sim_sample_age_seconds",
+                "gauge",
+                "Time since the newest sim sample arrived.",
+            ).add(age),
+            Metric("flight_sim_sim_paused", "gauge", "1 while the sim reports pause.")
+            .add(float(data_getter.paused or 0)),
+        ]
+
+    return collect
+
+
+def bus_metrics(monitor: "BusMonitor", labels: dict = None) -> Callable[[], list]:
+    """
+    Collector for CAN bus load and errors.
+
+    :param monitor: BusMonitor attached to the network.
+    :param labels: Labels added to every sample, e.g. {"bus": "can0"}.
+    :return: Collector returning a list of Metric.
+    """
+    labels = labels or {}
+
+    def collect() -> list:
+        stats = monitor.stats()
+        return [
+            Metric("flight_sim_can_bus_load_percent", "gauge", "Estimated CAN bus utilization.")
+            .add(stats["bus_load_pct"], labels),
+            Metric("flight_sim_can_frames_per_second", "gauge", "CAN frame rate.")
+            .add(stats["frames_per_second"], labels),
+            Metric("flight_sim_can_frames_total", "counter", "CAN frames seen.")
+            .add(monitor.total_frames, labels),
+            Metric("flight_sim_can_error_frames_total", "counter", "CAN error frames seen.")
+            .add(monitor.error_frames, labels),
+            _summary(
+                "flight_sim_can_feedback_latency_seconds",
+                "Time from a new RPDO1 command to the first changed TPDO1.",
+                monitor.feedback_latency,
+                labels,
+            ),
+        ]
+
+    return collect
+
+
+class ActuatorMetrics:
+    """
+    Per-actuator command, feedback, current and temperature.
+
+    Feedback comes from TPDO1 frames on the network's receive thread and
+    commands from the scheduler's last transmitted targets, so the control
+    thread does no extra work. Measured Temperature is not PDO mappable and
+    is read over SDO by a slow background poller.
+    """
+
+    def __init__(
+        self,
+        network: "canopen.Network",
+        nodes: dict,
+        scheduler: "CommandScheduler",
+        temperature_period: float = 5.0,
+        labels: dict = None,
+    ) -> None:
+        """
+        :param network: Connected network of the nodes.
+        :param nodes: Dictionary of node_id to canopen.Node.
+        :param scheduler: CommandScheduler sending the commands.
+        :param temperature_period: Time between SDO temperature reads (seconds), 0 disables them.
+        :param labels: Labels added to every sample.
+        """
+        self.network = network
+        self.nodes = nodes
+        self.scheduler = scheduler
+        self.temperature_period = temperature_period
+        self.labels = labels or {}
+        # node_id -> [position_mm, current_a, timestamp, temperature]
+        self.feedback = {node_id: [math.nan, math.nan, math.nan, math.nan] for node_id in nodes}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Subscribe to feedback and start the temperature poller.
+        """
+        for node_id in self.nodes:
+            self.network.subscribe(TPDO1_BASE + node_id, self._on_feedback)
+        if self.temperature_period > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._poll_temperatures, name="metrics-temperature", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Unsubscribe and stop the poller.
+        """
+        for node_id in self.nodes:
+            self.network.unsubscribe(TPDO1_BASE + node_id, self._on_feedback)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _on_feedback(self, can_id: int, data: bytearray, timestamp: float) -> None:
+        """
+        Network callback for TPDO1: Measured Position and Current, 16 bits in 0.1 units.
+        """
+        entry = self.feedback.get(can_id - TPDO1_BASE)
+        if entry is None or len(data) < 4:
+            return
+        entry[0] = int.from_bytes(data[0:2], "little") / 10.0
+        entry[1] = int.from_bytes(data[2:4], "little") / 10.0
+        entry[2] = timestamp
+
+    def _poll_temperatures(self) -> None:
+        """
+        Background loop reading Measured Temperature from every node over SDO.
+        """
+        while not self._stop.is_set():
+            for node_id, node in list(self.nodes.items()):
+                try:
+                    self.feedback[node_id][3] = float(node.sdo[TEMPERATURE_INDEX].raw)
+                except Exception as e:
+                    logger.debug("Temperature read from node %d failed: %s", node_id, e)
+                if self._stop.is_set():
+                    return
+            self._stop.wait(self.temperature_period)
+
+    def collect(self) -> list:
+        """
+        :return: List of Metric with one sample per node.
+        """
+        targets = Metric(
+            "flight_sim_actuator_command_mm", "gauge", "Last transmitted target position."
+        )
+        positions = Metric(
+            "flight_sim_actuator_position_mm", "gauge", "Measured position from TPDO1."
+        )
+        errors = Metric(
+            "flight_sim_actuator_error_mm", "gauge", "Commanded minus measured position."
+        )
+        currents = Metric("flight_sim_actuator_current_amperes", "gauge", "Measured current.")
+        ages = Metric(
+            "flight_sim_actuator_feedback_age_seconds", "gauge", "Time since the last TPDO1."
+        )
+        temperatures = Metric(
+            "flight_sim_actuator_temperature",
+            "gauge",
+            "Measured Temperature object 0x200F as reported by the actuator.",
+        )
+        now = time.time()
+        for node_id, (position, current, stamp, temperature) in sorted(self.feedback.items()):
+            labels = {**self.labels, "node": node_id}
+            target = self.scheduler.last_target(node_id)
+            if target is None:
+                target = math.nan
+            targets.add(target, labels)
+            positions.add(position, labels)
+            errors.add(target - position, labels)
+            currents.add(current, labels)
+            ages.add(now - stamp, labels)
+            temperatures.add(temperature, labels)
+        return [targets, positions, errors, currents, ages, temperatures]
+
+
+class MetricsServer:
+    """
+    Prometheus text endpoint on a background HTTP thread.
+
+    Collectors are called on the HTTP thread for each scrape and only read
+    state the control path already maintains.
+    """
+
+    def __init__(self, port: int = DEFAULT_PORT, host: str = "127.0.0.1") -> None:
+        """
+        :param port: TCP port, 0 for any free port.
+        :param host: Address to bind; localhost keeps the endpoint off the network.
+        """
+        self.host = host
+        self.requested_port = port
+        self.collectors = []
+        self.scrapes = 0
+        self.httpd = None
+        self._thread = None
+
+    def add(self, collector: Callable[[], list]) -> None:
+        """
+        Register a collector.
+
+        :param collector: Callable returning a list of Metric.
+        """
+        self.collectors.append(collector)
+
+    def collect(self) -> str:
+        """
+        Run every collector; a failing collector is logged and left out.
+
+        :return: Exposition text.
+        """
+        metrics = []
+        for collector in self.collectors:
+            try:
+                metrics.extend(collector())
+            except Exception:
+                logger.exception("Metrics collector failed")
+        self.scrapes += 1
+        return render(metrics)
+
+    @property
+    def port(self) -> int:
+        """
+        :return: Bound port, once started.
+        """
+        return self.httpd.server_address[1] if self.httpd is not None else self.requested_port
+
+    def start(self) -> None:
+        """
+        Bind and start serving on a daemon thread.
+        """
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = server.collect().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                logger.debug(format, *args)
+
+        self.httpd = ThreadingHTTPServer((self.host, self.requested_port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, name="metrics-http", daemon=True
+        )
+        self._thread.start()
+        logger.info("Serving metrics on http://%s:%d/metrics", self.host, self.port)
+
+    def stop(self) -> None:
+        """
+        Stop serving and close the socket.
+        """
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self._thread.join()
+            self.httpd = None
+            self._thread = None
@@ -1,9 +1,10 @@
 import sys
 
-import xpc
+import sim_hub
 
 def monitor():
-    with xpc.XPlaneConnect() as client:
+    # Reads the snapshots published by sim_hub.py, or polls X-Plane itself without a hub
+    with sim_hub.connect() as client:
         while True:
             posi = client.getPOSI();
             ctrl = client.getCTRL();
@@ -0,0 +1,84 @@
+import time
+
+import can
+import canopen
+
+
+class MonitoredPeriodicTask(canopen.network.PeriodicMessageTask):
+    """
+    PeriodicMessageTask that leaves its network's periodic_tasks when stopped.
+    """
+
+    def __init__(self, network: "MonitoredNetwork", *args) -> None:
+        """
+        :param network: Network tracking the task.
+        :param args: PeriodicMessageTask arguments.
+        """
+        super().__init__(*args)
+        self.network = network
+        network.periodic_tasks.add(self)
+
+    def stop(self) -> None:
+        """
+        Stop transmission.
+        """
+        self.network.periodic_tasks.discard(self)
+        super().stop()
+
+
+class MonitoredNetwork(canopen.Network):
+    """
+    canopen.Network that also reports transmitted frames to bus listeners.
+
+    Received frames reach listeners through the network's notifier; frames sent
+    through send_message (SDO, NMT, PDO transmit) are passed to the same
+    listeners so instrumentation sees both directions of traffic. Cyclic
+    tasks started with send_periodic transmit outside send_message, so they
+    are kept in periodic_tasks while they run (see
+    electrak.unmonitored_cyclic_messages).
+    """
+
+    def __init__(self, bus: can.BusABC = None) -> None:
+        """
+        Initialize the network.
+
+        :param bus: Optional python-can bus to re-use.
+        """
+        super().__init__(bus)
+        self.tx_listeners = []
+        self.periodic_tasks = set()
+
+    def send_message(self, can_id: int, data: bytes, remote: bool = False) -> None:
+        """
+        Send a raw CAN message and notify transmit listeners.
+
+        :param can_id: CAN-ID of the message.
+        :param data: Data to be transmitted.
+        :param remote: Set to True to send a remote frame.
+        """
+        super().send_message(can_id, data, remote)
+        if self.tx_listeners:
+            msg = can.Message(
+                timestamp=time.time(),
+                arbitration_id=can_id,
+                is_extended_id=can_id > 0x7FF,
+                is_remote_frame=remote,
+                is_rx=False,
+                data=data,
+            )
+            for listener in self.tx_listeners:
+                listener.on_message_received(msg)
+
+    def send_periodic(
+        self, can_id: int, data: bytes, period: float, remote: bool = False
+    ) -> MonitoredPeriodicTask:
+        """
+        Start sending a message periodically and track the task until it stops.
+
+        :param can_id: CAN-ID of the message.
+        :param data: Data to be transmitted.
+        :param period: Seconds between each message.
+        :param remote: Set to True to send remote frames.
+        :return: Task with stop() and update() methods.
+        """
+        return MonitoredPeriodicTask(self, can_id, data, period, self.bus, remote)
@@ -0,0 +1,442 @@
+import argparse
+import gc
+import logging
+import math
+import multiprocessing
+import threading
+import time
+from array import array
+
+from geometry import RIG_GEOMETRY, Geometry
+from histogram import LatencyHistogram
+from pipeline import MotionCore
+from rate_loop import RateLoop
+from shm_ring import ShmRing
+from Washout import Washout
+
+logger = logging.getLogger("motion_process")
+
+LEGS = 6
+# Sample record: receive time, faa[3], oaa[3]
+SAMPLE_FIELDS = 7
+# Output record: tick time, sample receive time, tick lateness, commanded
+# lengths[6] (meters), measured positions[6] (mm, NaN until TPDO1 is received)
+OUTPUT_FIELDS = 3 + 2 * LEGS
+OUT_TICK = 0
+OUT_SAMPLE = 1
+OUT_LATE = 2
+OUT_LENGTHS = 3
+OUT_MEASURED = OUT_LENGTHS + LEGS
+TPDO1_BASE = 0x180
+
+
+def run_motion_core(
+    sample_ring: str,
+    output_ring: str,
+    capacity: int,
+    geometry_params: dict,
+    rate_hz: float,
+    can_config: dict,
+    stop,
+    washout_params: dict = None,
+    node_ids: list = None,
+) -> None:
+    """
+    Motion process entry point: washout, IK and CAN transmit at a fixed rate.
+
+    Reads the newest sim sample from the sample ring each tick and appends one
+    output record per tick. Nothing is pickled after startup; all exchange is
+    through the shared memory rings.
+
+    :param sample_ring: Name of the ring the front end publishes samples to.
+    :param output_ring: Name of the ring this process publishes outputs to.
+    :param capacity: Slots in each ring.
+    :param geometry_params: Keyword arguments for Geometry.
+    :param rate_hz: Control loop rate.
+    :param can_config: Keyword arguments for electrak.connect_can_network, or None
+        to compute lengths without a bus.
+    :param stop: multiprocessing.Event ending the loop when set.
+    :param washout_params: Washout parameter overrides for this rig.
+    :param node_ids: Actuator node IDs in leg order, scanned for if None.
+    """
+    # Spawned children share the parent's resource tracker, which owns the rings
+    samples = ShmRing(sample_ring, SAMPLE_FIELDS, capacity, untrack=False)
+    outputs = ShmRing(output_ring, OUTPUT_FIELDS, capacity, untrack=False)
+    network = watchdog = None
+    try:
+        core = MotionCore(Geometry(**geometry_params), Washout(washout_params))
+        loop = RateLoop(rate_hz)
+        sample = array("d", [0.0] * SAMPLE_FIELDS)
+        out = array("d", [0.0] * OUTPUT_FIELDS)
+        for idx in range(LEGS):
+            out[OUT_MEASURED + idx] = math.nan
+
+        nodes = scheduler = None
+        if can_config is not None:
+            # CAN is imported here so a bus-less motion process does not need it
+            import electrak
+            from command_scheduler import CommandScheduler
+            from watchdog import HeartbeatWatchdog
+
+            network = electrak.connect_can_network(**can_config)
+            if node_ids is None:
+                node_ids = electrak.scan_devices(network)
+                if not node_ids:
+                    raise RuntimeError("No CANopen nodes found")
+            nodes = electrak.add_nodes(network, node_ids)
+            electrak.set_operational(network, nodes)
+            scheduler = CommandScheduler()
+            watchdog = HeartbeatWatchdog(network, nodes)
+            watchdog.configure()
+            watchdog.start()
+            for idx, node_id in enumerate(nodes):
+                network.subscribe(TPDO1_BASE + node_id, _feedback_writer(out, OUT_MEASURED + idx))
+
+        # Everything allocated so far lives for the whole process; keep the
+        # collector from rescanning it on every generation 2 pass
+        gc.freeze()
+        last = -1
+        frozen = False
+        lengths = None
+        loop.start()
+        while not stop.is_set():
+            late = loop.wait()
+            index = samples.read_latest(sample)
+            if index > last:
+                last = index
+                lengths = core.step(sample[1:4], sample[4:7])
+            if lengths is None:
+                continue
+            if watchdog is not None and watchdog.check() and not frozen:
+                logger.error("Actuator fault, freezing all legs: %s", watchdog.faults)
+                frozen = True
+            if nodes is not None:
+                for idx, node in enumerate(nodes.values()):
+                    # Convert length from meters to mm for actuator command
+                    scheduler.submit(node, lengths[idx] * 1000.0, enable_motion=not frozen)
+            out[OUT_TICK] = time.time()
+            out[OUT_SAMPLE] = sample[0]
+            out[OUT_LATE] = late
+            out[OUT_LENGTHS : OUT_LENGTHS + LEGS] = array("d", lengths)
+            outputs.write(out)
+    finally:
+        # Also reached when setup fails, so the ring views never outlive the process
+        if watchdog is not None:
+            watchdog.stop()
+        if network is not None:
+            network.disconnect()
+        samples.close()
+        outputs.close()
+
+
+def _feedback_writer(out: array, slot: int):
+    """
+    Build a TPDO1 callback storing the measured position in the output record.
+
+    :param out: Output record buffer.
+    :param slot: Index of the leg's measured position field.
+    :return: Callback for canopen.Network.subscribe.
+    """
+
+    def on_tpdo(can_id: int, data: bytearray, timestamp: float) -> None:
+        # Measured Position is the first mapped object, 16 bits in 0.1 mm
+        out[slot] = int.from_bytes(data[0:2], "little") / 10.0
+
+    return on_tpdo
+
+
+class MotionProcess:
+    """
+    Runs the motion core (washout, IK and optionally CAN) in a dedicated process.
+
+    The front end publishes sim samples with publish_sample and reads the
+    core's output with latest_output/outputs_since. Both directions go through
+    ShmRing buffers, so front end logging, CSV writing and garbage collection
+    no longer hold the GIL the control loop needs.
+    """
+
+    def __init__(
+        self,
+        geometry_params: dict = RIG_GEOMETRY,
+        rate_hz: float = 100.0,
+        can_config: dict = None,
+        capacity: int = 64,
+        washout_params: dict = None,
+        node_ids: list = None,
+        name: str = "motion_core",
+    ) -> None:
+        """
+        :param geometry_params: Keyword arguments for Geometry in the motion process.
+        :param rate_hz: Control loop rate of the motion process.
+        :param can_config: Keyword arguments for electrak.connect_can_network, None for no bus.
+        :param capacity: Slots in each ring.
+        :param washout_params: Washout parameter overrides for the rig.
+        :param node_ids: Actuator node IDs in leg order, scanned for if None.
+        :param name: Process name.
+        """
+        self._ctx = multiprocessing.get_context("spawn")
+        self.geometry_params = dict(geometry_params)
+        self.rate_hz = rate_hz
+        self.can_config = can_config
+        self.capacity = capacity
+        self.washout_params = washout_params
+        self.node_ids = node_ids
+        self.name = name
+        self.samples = None
+        self.outputs = None
+        self.process = None
+        self._stop = self._ctx.Event()
+        self._sample = array("d", [0.0] * SAMPLE_FIELDS)
+
+    def start(self) -> None:
+        """
+        Create the rings and start the motion process.
+        """
+        self.samples = ShmRing(fields=SAMPLE_FIELDS, capacity=self.capacity, create=True)
+        self.outputs = ShmRing(fields=OUTPUT_FIELDS, capacity=self.capacity, create=True)
+        self._stop.clear()
+        self.process = self._ctx.Process(
+            target=run_motion_core,
+            name=self.name,
+            args=(
+                self.samples.name,
+                self.outputs.name,
+                self.capacity,
+                self.geometry_params,
+                self.rate_hz,
+                self.can_config,
+                self._stop,
+                self.washout_params,
+                self.node_ids,
+            ),
+            daemon=True,
+        )
+        try:
+            self.process.start()
+        except BaseException:
+            # Release the ring views now; left to the GC, closing them raises BufferError
+            self.process = None
+            self.stop()
+            raise
+        logger.info("Motion process %s started (pid %d)", self.name, self.process.pid)
+
+    def publish_sample(self, faa: list, oaa: list, received: float = None) -> int:
+        """
+        Hand a sim sample to the motion process.
+
+        :param faa: Accelerations [side, axial, normal].
+        :param oaa: Orientation [phi, psi, theta].
+        :param received: Receive time (time.time()), now if None.
+        :return: Index of the sample record.
+        """
+        sample = self._sample
+        sample[0] = time.time() if received is None else received
+        sample[1], sample[2], sample[3] = faa
+        sample[4], sample[5], sample[6] = oaa
+        return self.samples.write(sample)
+
+    def latest_output(self, out: array) -> int:
+        """
+        Copy the newest output record.
+
+        :param out: array('d') of OUTPUT_FIELDS values.
+        :return: Index of the record, or -1 if none was written yet.
+        """
+        return self.outputs.read_latest(out)
+
+    def outputs_since(self, index: int, out: array, callback) -> int:
+        """
+        Pass every output record after index to callback.
+
+        Records already overwritten in the ring are skipped.
+
+        :param index: Last record index already handled, -1 for none.
+        :param out: array('d') of OUTPUT_FIELDS values, reused for each record.
+        :param callback: Called with out for each record.
+        :return: Index of the last record handled.
+        """
+        head = self.outputs.head
+        for i in range(max(index + 1, head - self.capacity), head):
+            if self.outputs.read(i, out):
+                callback(out)
+                index = i
+        return index
+
+    @property
+    def alive(self) -> bool:
+        """
+        :return: True while the motion process is running.
+        """
+        return self.process is not None and self.process.is_alive()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """
+        Stop the motion process and release the rings.
+
+        :param timeout: Time to wait for a clean exit before terminating (seconds).
+        """
+        if self.process is not None:
+            self._stop.set()
+            self.process.join(timeout)
+            if self.process.is_alive():
+                logger.warning("Motion process did not stop, terminating")
+                self.process.terminate()
+                self.process.join(timeout)
+            self.process = None
+        for ring in (self.samples, self.outputs):
+            if ring is not None:
+                ring.close()
+        self.samples = self.outputs = None
+
+
+class FrontEndLoad(threading.Thread):
+    """
+    Synthetic front end work: string formatting, log lines and garbage.
+
+    Stands in for logging, CSV writing and the GC churn of the real front end
+    when comparing loop jitter.
+    """
+
+    def __init__(self, stop: threading.Event, path: str = None) -> None:
+        """
+        :param stop: Event ending the load when set.
+        :param path: File the synthetic CSV lines are written to, discarded if None.
+        """
+        super().__init__(name="front_end_load", daemon=True)
+        self.stop_event = stop
+        self.path = path
+
+    def run(self) -> None:
+        """
+        Generate load until stopped.
+        """
+        sink = open(self.path, "w") if self.path else None
+        try:
+            n = 0
+            while not self.stop_event.is_set():
+                rows = [
+                    ",".join(f"{math.sin(i * 0.001 + j):.6f}" for j in range(16))
+                    for i in range(200)
+                ]
+                garbage = [{"row": r, "n": n} for r in rows]
+                for node in garbage:
+                    node["self"] = node  # reference cycles only the GC can free
+                if sink is not None:
+                    sink.write("\n".join(rows))
+                n += 1
+        finally:
+            if sink is not None:
+                sink.close()
+
+
+def _synthetic_sample(t: float) -> tuple:
+    """
+    :param t: Time (seconds).
+    :return: Tuple (faa, oaa) of a gentle synthetic manoeuvre.
+    """
+    faa = [0.5 * math.sin(t), 0.3 * math.sin(0.7 * t), -9.81 + 0.2 * math.sin(1.3 * t)]
+    oaa = [0.1 * math.sin(0.5 * t), 0.0, 0.05 * math.sin(0.3 * t)]
+    return faa, oaa
+
+
+def measure_single_process(rate_hz: float, duration: float, load: bool = True) -> dict:
+    """
+    Jitter of the motion loop running in this process next to the front end.
+
+    :param rate_hz: Control loop rate.
+    :param duration: Measurement time (seconds).
+    :param load: Run the synthetic front end load on a thread.
+    :return: RateLoop statistics.
+    """
+    stop = threading.Event()
+    if load:
+        FrontEndLoad(stop).start()
+    core = MotionCore(Geometry(**RIG_GEOMETRY))
+    loop = RateLoop(rate_hz)
+    start = time.perf_counter()
+
+    def step() -> None:
+        faa, oaa = _synthetic_sample(time.perf_counter() - start)
+        core.step(faa, oaa)
+
+    try:
+        loop.run(step, max_ticks=int(duration * rate_hz))
+    finally:
+        stop.set()
+    return loop.stats()
+
+
+def measure_isolated(rate_hz: float, duration: float, load: bool = True) -> dict:
+    """
+    Jitter of the motion loop in a MotionProcess while this process runs the front end.
+
+    :param rate_hz: Control loop rate.
+    :param duration: Measurement time (seconds).
+    :param load: Run the synthetic front end load on a thread.
+    :return: Dictionary with ticks and the jitter summary reported by the motion process.
+    """
+    stop = threading.Event()
+    motion = MotionProcess(rate_hz=rate_hz)
+    jitter = LatencyHistogram()
+    out = array("d", [0.0] * OUTPUT_FIELDS)
+    motion.start()
+    if load:
+        FrontEndLoad(stop).start()
+    try:
+        # Discard ticks while the motion process is still importing and starting up
+        while motion.latest_output(out) < 0 and motion.alive:
+            motion.publish_sample(*_synthetic_sample(0.0))
+            time.sleep(0.01)
+        last = motion.outputs.head - 1
+        start = time.perf_counter()
+        while time.perf_counter() - start < duration:
+            motion.publish_sample(*_synthetic_sample(time.perf_counter() - start))
+            last = motion.outputs_since(last, out, lambda rec: jitter.record(rec[OUT_LATE]))
+            time.sleep(0.005)
+    finally:
+        stop.set()
+        motion.stop()
+    return {"ticks": jitter.count, "jitter": jitter.summary()}
+
+
+def compare_jitter(rate_hz: float = 200.0, duration: float = 5.0, load: bool = True) -> dict:
+    """
+    Compare control loop jitter in-process versus in a dedicated motion process.
+
+    :param rate_hz: Control loop rate.
+    :param duration: Measurement time of each run (seconds).
+    :param load: Run the synthetic front end load during both runs.
+    :return: Dictionary with 'single_process' and 'isolated' jitter summaries.
+    """
+    single = measure_single_process(rate_hz, duration, load)
+    isolated = measure_isolated(rate_hz, duration, load)
+    return {"single_process": single["jitter"], "isolated": isolated["jitter"]}
+
+
+def main() -> None:
+    """
+    Command line entry point printing the jitter comparison.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare motion loop jitter in-process and process-isolated"
+    )
+    parser.add_argument("--rate", type=float, default=200.0, help="loop rate in Hz")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per run")
+    parser.add_argument("--no-load", action="store_true", help="skip the synthetic front end load")
+    args = parser.parse_args()
+    result = compare_jitter(args.rate, args.duration, not args.no_load)
+    for name, summary in result.items():
+        logger.info(
+            "%-14s ticks=%d mean=%.1fus p50=%.1fus p99=%.1fus max=%.1fus",
+            name,
+            summary["count"],
+            summary["mean"] * 1e6,
+            summary["p50"] * 1e6,
+            summary["p99"] * 1e6,
+            summary["max"] * 1e6,
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
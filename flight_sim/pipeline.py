@@ -0,0 +1,480 @@
+import logging
+import math
+import threading
+import time
+from typing import TYPE_CHECKING, Callable
+
+from command_scheduler import CommandScheduler
+from geometry import Geometry
+from histogram import LatencyHistogram
+from interpolation import PoseInterpolator
+from Position import PoseHistory, Position
+from rate_loop import RateLoop
+from Washout import Washout
+
+if TYPE_CHECKING:
+    from tracing import LatencyTracer, TickTrace
+    from watchdog import HeartbeatWatchdog
+
+logger = logging.getLogger("pipeline")
+
+
+class Mailbox:
+    """
+    Single-slot, latest-value handoff between two threads.
+
+    put never blocks and overwrites any value the reader has not taken yet, so
+    a slow consumer always sees the newest sample instead of a backlog. Every
+    put increments a sequence number that readers use to detect new values.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize an empty mailbox.
+        """
+        self.seq = 0
+        self.overwritten = 0
+        self._value = None
+        self._taken = 0
+        self._cond = threading.Condition()
+
+    def put(self, value) -> None:
+        """
+        Publish a new value.
+
+        :param value: Value to publish; it must not be mutated afterwards.
+        """
+        with self._cond:
+            if self.seq and self._taken < self.seq:
+                self.overwritten += 1
+            self._value = value
+            self.seq += 1
+            self._cond.notify_all()
+
+    def get(self) -> tuple:
+        """
+        Take the latest value without waiting.
+
+        :return: Tuple (seq, value); seq is 0 and value None if nothing was published.
+        """
+        with self._cond:
+            self._taken = self.seq
+            return self.seq, self._value
+
+    def wait(self, after_seq: int, timeout: float = None) -> tuple:
+        """
+        Wait for a value newer than after_seq.
+
+        :param after_seq: Sequence number the reader already has.
+        :param timeout: Maximum wait (seconds), None waits forever.
+        :return: Tuple (seq, value); seq equals after_seq on timeout.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > after_seq, timeout)
+            self._taken = self.seq
+            return self.seq, self._value
+
+
+class StageStats:
+    """
+    Throughput statistics of one pipeline stage.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize empty statistics.
+        """
+        self.iterations = 0
+        self.busy = 0.0
+        self.started = None
+        self.step_time = LatencyHistogram()
+
+    def record(self, duration: float) -> None:
+        """
+        Account for one completed step.
+
+        :param duration: Time the step took (seconds).
+        """
+        self.iterations += 1
+        self.busy += duration
+        self.step_time.record(duration)
+
+    def summary(self, now: float) -> dict:
+        """
+        :param now: Current perf_counter time.
+        :return: Dictionary with iterations, rate (Hz), utilization and step time summary.
+        """
+        elapsed = now - self.started if self.started is not None else 0.0
+        return {
+            "iterations": self.iterations,
+            "rate_hz": self.iterations / elapsed if elapsed > 0 else 0.0,
+            "utilization": self.busy / elapsed if elapsed > 0 else 0.0,
+            "step_time": self.step_time.summary(),
+        }
+
+
+class Stage(threading.Thread):
+    """
+    Daemon thread repeatedly running one pipeline step and timing it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        step: Callable[[], None],
+        stop: threading.Event,
+        wait: Callable[[], bool] = None,
+    ) -> None:
+        """
+        :param name: Stage name used for the thread and metrics.
+        :param step: Work done per iteration, timed for the stage metrics.
+        :param stop: Event ending the stage when set.
+        :param wait: Optional untimed wait before each step; returning False skips the step.
+        """
+        super().__init__(name=name, daemon=True)
+        self.step = step
+        self.wait = wait
+        self.stop_event = stop
+        self.stats = StageStats()
+        self.error = None
+
+    def run(self) -> None:
+        """
+        Run step until stopped; an exception stops the whole pipeline.
+        """
+        self.stats.started = time.perf_counter()
+        try:
+            while not self.stop_event.is_set():
+                if self.wait is not None and not self.wait():
+                    continue
+                start = time.perf_counter()
+                self.step()
+                self.stats.record(time.perf_counter() - start)
+        except Exception as e:
+            self.error = e
+            logger.exception("Stage %s failed", self.name)
+            self.stop_event.set()
+
+
+class MotionCore:
+    """
+    Washout, platform pose and inverse kinematics for one sim sample.
+    """
+
+    def __init__(
+        self,
+        geometry: Geometry,
+        washout: Washout = None,
+        position: Position = None,
+        interpolator: PoseInterpolator = None,
+        history: PoseHistory = None,
+    ) -> None:
+        """
+        :param geometry: Platform geometry.
+        :param washout: Washout filter, a default one is created if None.
+        :param position: Platform pose, created at mid height if None.
+        :param interpolator: Optional PoseInterpolator for update/lengths_at upsampling.
+        :param history: Optional PoseHistory recording every washout pose by sim time.
+        """
+        self.geometry = geometry
+        self.washout = washout if washout is not None else Washout()
+        self.position = (
+            position if position is not None else Position(mid_height=geometry.mid_height)
+        )
+        self.interpolator = interpolator
+        self.history = history
+        self._sampled = Position(mid_height=geometry.mid_height)
+
+    def step(
+        self, faa: list, oaa: list, trace: "TickTrace" = None, sim_time: float = None
+    ) -> list:
+        """
+        Compute actuator lengths for one sample.
+
+        :param faa: Accelerations [side, axial, normal].
+        :param oaa: Orientation [phi, psi, theta].
+        :param trace: Optional latency trace of the tick, marked after washout and IK.
+        :param sim_time: Sim time of the sample, recorded in the history if one is kept.
+        :return: List of six actuator lengths (meters).
+        """
+        # Washout filter: process motion cues
+        filtered_motion = self.washout.compute2(faa, oaa, self.position)
+        if trace is not None:
+            trace.mark("washout")
+        # Update platform pose
+        self.position.give_positions(oaa, filtered_motion)
+        if self.history is not None and sim_time is not None:
+            self.history.push(sim_time, self.position)
+        # Compute actuator lengths
+        lengths = self.geometry.inverse_kinematics(self.position)
+        if trace is not None:
+            trace.mark("ik")
+        return lengths
+
+    def update(
+        self,
+        faa: list,
+        oaa: list,
+        sim_time: float,
+        received: float = None,
+        trace: "TickTrace" = None,
+    ) -> None:
+        """
+        Run the washout for one sample and push the pose to the interpolator.
+
+        :param faa: Accelerations [side, axial, normal].
+        :param oaa: Orientation [phi, psi, theta].
+        :param sim_time: Sim time of the sample (seconds).
+        :param received: Local time the sample arrived.
+        :param trace: Optional latency trace of the sample, marked after washout.
+        """
+        filtered_motion = self.washout.compute2(faa, oaa, self.position)
+        if trace is not None:
+            trace.mark("washout")
+        self.position.give_positions(oaa, filtered_motion)
+        if self.history is not None:
+            self.history.push(sim_time, self.position)
+        self.interpolator.push(sim_time, self.position, received)
+
+    def lengths_at(self, local_time: float) -> list:
+        """
+        Actuator lengths of the interpolated pose at a control tick.
+
+        :param local_time: Local time of the tick, on the clock of update's received.
+        :return: List of six actuator lengths (meters), None before the first update.
+        """
+        if not self.interpolator.sample_local(local_time, self._sampled):
+            return None
+        return self.geometry.inverse_kinematics(self._sampled)
+
+
+def sample_time(data_getter) -> float:
+    """
+    Time a sim sample is keyed by in the interpolator and pose history.
+
+    Poses are timed by the sim; sims without a sim time use the receive time.
+
+    :param data_getter: Get_data instance after run().
+    :return: Sim time, or the local receive time if the sim reports none.
+    """
+    sim_time = data_getter.sim_time
+    return data_getter.received if math.isnan(sim_time) else sim_time
+
+
+def control_tick(
+    data_getter,
+    core: MotionCore,
+    nodes: dict,
+    scheduler: CommandScheduler,
+    enable_motion: bool = True,
+    tracer: "LatencyTracer" = None,
+) -> list:
+    """
+    One serial control tick: fetch a sim sample, compute and command leg lengths.
+
+    The sim and the actuators are reached only through data_getter and the
+    scheduler's send function, so the same tick runs live against X-Plane and
+    CAN or headless against a recorded log (see replay.py).
+
+    :param data_getter: Get_data instance (or anything with run(), faa, oaa and sim_time).
+    :param core: MotionCore computing leg lengths.
+    :param nodes: Dictionary of node_id to node, in leg order.
+    :param scheduler: CommandScheduler sending the commands.
+    :param enable_motion: False holds all legs (e.g. after a watchdog fault).
+    :param tracer: Optional LatencyTracer tagging the tick.
+    :return: List of six actuator lengths (meters).
+    """
+    # Get current acceleration and orientation (from Get_data.py)
+    data_getter.run()
+    trace = None
+    if tracer is not None:
+        trace = tracer.begin(data_getter.sim_time, data_getter.requested, data_getter.received)
+
+    # Washout, platform pose and actuator lengths
+    sim_time = sample_time(data_getter) if core.history is not None else None
+    lengths = core.step(data_getter.faa, data_getter.oaa, trace, sim_time)
+
+    # The scheduler only transmits changed targets and due keep-alives
+    sent = False
+    for idx, node in enumerate(nodes.values()):
+        # Convert length from meters to mm for actuator command
+        sent |= scheduler.submit(node, lengths[idx] * 1000.0, enable_motion=enable_motion)
+    if trace is not None:
+        if sent:
+            tracer.transmitted(trace)
+        else:
+            tracer.discard(trace)
+    return lengths
+
+
+class MotionPipeline:
+    """
+    Three-stage threaded motion pipeline.
+
+    - acquisition: blocks on the sim (Get_data.run) and publishes each sample
+    - motion: runs MotionCore on every new sample and publishes leg lengths
+    - transmit: at a fixed rate, sends the latest leg lengths over CAN
+
+    With a PoseInterpolator on the core, the motion stage only runs the
+    washout and pushes pose keyframes, and the transmit stage runs IK on an
+    interpolated pose every tick, upsampling sim frames to the transmit rate.
+
+    Stages are connected by Mailboxes, so a slow UDP reply never delays the CAN
+    refresh: the transmit stage keeps sending the last targets on schedule.
+    """
+
+    def __init__(
+        self,
+        data_getter,
+        core: MotionCore,
+        nodes: dict,
+        scheduler: CommandScheduler,
+        transmit_rate_hz: float = 50.0,
+        watchdog: "HeartbeatWatchdog" = None,
+        tracer: "LatencyTracer" = None,
+    ) -> None:
+        """
+        :param data_getter: Get_data instance (or anything with run(), faa, oaa and sim_time).
+        :param core: MotionCore computing leg lengths.
+        :param nodes: Dictionary of node_id to canopen.Node, in leg order.
+        :param scheduler: CommandScheduler used by the transmit stage.
+        :param transmit_rate_hz: Rate of the transmit stage.
+        :param watchdog: Optional HeartbeatWatchdog; a fault freezes all legs.
+        :param tracer: Optional LatencyTracer tagging each sample through to transmit.
+        """
+        self.data_getter = data_getter
+        self.core = core
+        self.nodes = nodes
+        self.scheduler = scheduler
+        self.watchdog = watchdog
+        self.tracer = tracer
+        self._traced = None
+        self.frozen = False
+        self.samples = Mailbox()
+        self.targets = Mailbox()
+        self.transmit_loop = RateLoop(transmit_rate_hz)
+        self._stop = threading.Event()
+        self._motion_seq = 0
+        self._sample = None
+        self.stages = [
+            Stage("acquisition", self._acquire, self._stop),
+            Stage("motion", self._compute, self._stop, wait=self._wait_sample),
+            Stage("transmit", self._transmit, self._stop, wait=self._wait_transmit),
+        ]
+
+    def _acquire(self) -> None:
+        """
+        Acquisition step: fetch one sim sample and publish a copy.
+        """
+        data_getter = self.data_getter
+        data_getter.run()
+        trace = None
+        if self.tracer is not None:
+            trace = self.tracer.begin(
+                data_getter.sim_time, data_getter.requested, data_getter.received
+            )
+        stamp = None
+        if self.core.interpolator is not None or self.core.history is not None:
+            stamp = (sample_time(data_getter), data_getter.received)
+        self.samples.put((list(data_getter.faa), list(data_getter.oaa), stamp, trace))
+
+    def _wait_sample(self) -> bool:
+        """
+        Motion wait: block briefly for a sample newer than the last one used.
+
+        :return: True if a new sample is available.
+        """
+        seq, sample = self.samples.wait(self._motion_seq, timeout=0.1)
+        if seq == self._motion_seq:
+            return False
+        self._motion_seq = seq
+        self._sample = sample
+        return True
+
+    def _compute(self) -> None:
+        """
+        Motion step: turn the newest sample into leg lengths, or into an
+        interpolation keyframe when upsampling.
+        """
+        faa, oaa, stamp, trace = self._sample
+        if self.core.interpolator is None:
+            sim_time = stamp[0] if stamp is not None else None
+            self.targets.put((self.core.step(faa, oaa, trace, sim_time), trace))
+        else:
+            self.core.update(faa, oaa, stamp[0], stamp[1], trace)
+            self.targets.put((None, trace))
+
+    def _wait_transmit(self) -> bool:
+        """
+        Transmit wait: next transmit deadline, skipped until targets exist.
+
+        :return: True once leg lengths have been published.
+        """
+        self.transmit_loop.wait()
+        return self.targets.seq > 0
+
+    def _transmit(self) -> None:
+        """
+        Transmit step: send the latest leg lengths.
+        """
+        if self.watchdog is not None and self.watchdog.check() and not self.frozen:
+            logger.error("Actuator fault, freezing all legs: %s", self.watchdog.faults)
+            self.frozen = True
+        _, (lengths, trace) = self.targets.get()
+        if lengths is None:
+            # Upsampling: a fresh pose between the latest sim frames every tick
+            lengths = self.core.lengths_at(time.time())
+            if trace is not None and trace is not self._traced:
+                trace.mark("ik")
+        sent = False
+        for idx, node in enumerate(self.nodes.values()):
+            # Convert length from meters to mm for actuator command
+            sent |= self.scheduler.submit(
+                node, lengths[idx] * 1000.0, enable_motion=not self.frozen
+            )
+        if trace is not None and trace is not self._traced:
+            # Each sample is traced on its first transmit only
+            self._traced = trace
+            if sent:
+                self.tracer.transmitted(trace)
+            else:
+                self.tracer.discard(trace)
+
+    def start(self) -> None:
+        """
+        Start all stages.
+        """
+        self._stop.clear()
+        self.transmit_loop.start()
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """
+        Stop all stages and wait for them to finish.
+
+        :param timeout: Maximum wait per stage (seconds).
+        """
+        self._stop.set()
+        for stage in self.stages:
+            stage.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        """
+        :return: True while no stage has stopped the pipeline.
+        """
+        return not self._stop.is_set()
+
+    def stats(self) -> dict:
+        """
+        Per-stage throughput metrics and mailbox overwrite counts.
+
+        :return: Dictionary keyed by stage name, plus dropped sample counts.
+        """
+        now = time.perf_counter()
+        result = {stage.name: stage.stats.summary(now) for stage in self.stages}
+        result["samples_overwritten"] = self.samples.overwritten
+        result["targets_overwritten"] = self.targets.overwritten
+        result["bus_frames_per_second"] = self.scheduler.frames_per_second()
+        return result
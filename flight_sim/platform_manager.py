@@ -0,0 +1,506 @@
+import argparse
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import electrak
+from command_scheduler import CommandScheduler
+from geometry import RIG_GEOMETRY, Geometry
+from Get_data import Get_data
+from motion_process import MotionProcess
+from pipeline import Mailbox, MotionCore, Stage
+from rate_loop import RateLoop
+from Washout import Washout
+
+logger = logging.getLogger("platform_manager")
+
+DEFAULT_SOURCE = "xplane"
+STATS_REPORT_PERIOD = 5.0  # seconds between stats reports of the command line tool
+
+
+class PlatformConfig:
+    """
+    Everything that differs between rigs: bus, actuators, geometry, tuning and sim source.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        can_config: dict = None,
+        node_ids: list = None,
+        geometry_params: dict = RIG_GEOMETRY,
+        washout_params: dict = None,
+        rate_hz: float = 50.0,
+        source: str = DEFAULT_SOURCE,
+        isolated: bool = False,
+    ) -> None:
+        """
+        :param name: Unique platform name, used for threads, processes and stats.
+        :param can_config: Keyword arguments for electrak.connect_can_network
+            (channel, interface, bitrate), or None to compute lengths without a bus.
+        :param node_ids: Actuator node IDs in leg order, scanned for if None.
+        :param geometry_params: Keyword arguments for Geometry.
+        :param washout_params: Washout parameter overrides for this rig.
+        :param rate_hz: Control loop rate.
+        :param source: Name of the sim source feeding this platform.
+        :param isolated: Run the platform's control loop in its own process.
+        """
+        self.name = name
+        self.can_config = can_config
+        self.node_ids = list(node_ids) if node_ids is not None else None
+        self.geometry_params = dict(geometry_params)
+        self.washout_params = washout_params
+        self.rate_hz = rate_hz
+        self.source = source
+        self.isolated = isolated
+
+    @classmethod
+    def from_dict(cls, config: dict) -> "PlatformConfig":
+        """
+        :param config: Dictionary of constructor arguments, e.g. one entry of a JSON file.
+        :return: PlatformConfig; geometry_params entries override the rig defaults.
+        """
+        config = dict(config)
+        config["geometry_params"] = {**RIG_GEOMETRY, **config.get("geometry_params", {})}
+        return cls(**config)
+
+
+class Platform:
+    """
+    One rig driven from a thread of this process.
+
+    The platform owns its CAN network, nodes, scheduler and motion core, and
+    runs washout, IK and transmit on its own rate-loop thread. Sim samples
+    arrive through a Mailbox, so neither a slow sim source nor another
+    platform's slow bus can hold up its ticks, and a blocking send on its own
+    bus only delays itself.
+    """
+
+    def __init__(self, config: PlatformConfig, send=None) -> None:
+        """
+        :param config: Platform configuration.
+        :param send: Scheduler send function, defaults to electrak.move_actuator.
+        """
+        self.config = config
+        self.name = config.name
+        self.core = MotionCore(
+            Geometry(**config.geometry_params), Washout(config.washout_params)
+        )
+        self.scheduler = CommandScheduler(send=send)
+        self.samples = Mailbox()
+        # Sleep-only waits: spinning threads would compete for the GIL with
+        # the other platforms' loops
+        self.loop = RateLoop(config.rate_hz, spin_threshold=0.0)
+        self.network = None
+        self.nodes = {}
+        self.watchdog = None
+        self.lengths = None
+        self.frozen = False
+        self._seq = 0
+        self._stop = threading.Event()
+        self.stage = Stage(f"{self.name}.control", self._step, self._stop, wait=self._wait)
+
+    def connect(self) -> None:
+        """
+        Bring up the platform's bus and actuators; no-op without a CAN configuration.
+        """
+        config = self.config
+        if config.can_config is None:
+            return
+        # Imported here so bus-less platforms never load canopen
+        from watchdog import HeartbeatWatchdog
+
+        network = electrak.connect_can_network(**config.can_config)
+        try:
+            node_ids = config.node_ids
+            if node_ids is None:
+                node_ids = electrak.scan_devices(network)
+            if not node_ids:
+                raise RuntimeError(f"No CANopen nodes found for platform {self.name}")
+            nodes = electrak.add_nodes(network, node_ids)
+            electrak.set_operational(network, nodes)
+            watchdog = HeartbeatWatchdog(network, nodes)
+            watchdog.configure()
+            watchdog.start()
+        except Exception:
+            network.disconnect()
+            raise
+        self.network, self.nodes, self.watchdog = network, nodes, watchdog
+
+    def start(self) -> None:
+        """
+        Start the control loop thread; call connect first.
+        """
+        self._stop.clear()
+        self.loop.start()
+        self.stage.start()
+
+    def submit_sample(self, faa: list, oaa: list, received: float = None) -> None:
+        """
+        Hand a sim sample to the platform without blocking.
+
+        :param faa: Accelerations [side, axial, normal].
+        :param oaa: Orientation [phi, psi, theta].
+        :param received: Receive time, unused by in-process platforms.
+        """
+        self.samples.put((list(faa), list(oaa)))
+
+    def _wait(self) -> bool:
+        """
+        Control wait: next tick deadline.
+
+        :return: Always True.
+        """
+        self.loop.wait()
+        return True
+
+    def _step(self) -> None:
+        """
+        Control step: washout and IK on a new sample, then refresh the actuators.
+        """
+        seq, sample = self.samples.get()
+        if seq != self._seq:
+            self._seq = seq
+            self.lengths = self.core.step(sample[0], sample[1])
+        if self.lengths is None:
+            return
+        if self.watchdog is not None and self.watchdog.check() and not self.frozen:
+            logger.error(
+                "Platform %s actuator fault, freezing all legs: %s",
+                self.name,
+                self.watchdog.faults,
+            )
+            self.frozen = True
+        for idx, node in enumerate(self.nodes.values()):
+            # Convert length from meters to mm for actuator command
+            self.scheduler.submit(node, self.lengths[idx] * 1000.0, enable_motion=not self.frozen)
+
+    @property
+    def running(self) -> bool:
+        """
+        :return: True while the control loop runs.
+        """
+        return self.stage.is_alive() and not self._stop.is_set()
+
+    def stats(self) -> dict:
+        """
+        :return: Dictionary with control step and loop timing, dropped samples and bus frame rate.
+        """
+        return {
+            "control": self.stage.stats.summary(time.perf_counter()),
+            "loop": self.loop.stats(),
+            "samples_overwritten": self.samples.overwritten,
+            "bus_frames_per_second": self.scheduler.frames_per_second(),
+        }
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """
+        Stop the control loop and release the bus.
+
+        :param timeout: Maximum wait for the thread (seconds).
+        """
+        self._stop.set()
+        if self.stage.is_alive():
+            self.stage.join(timeout)
+        if self.network is not None:
+            self.watchdog.stop()
+            self.network.disconnect()
+            self.network = None
+
+
+class ProcessPlatform:
+    """
+    One rig driven from its own motion process (see motion_process.py).
+
+    The process has its own interpreter, GIL and garbage collector, so the
+    platform's timing is independent of this process and of the other platforms.
+    """
+
+    def __init__(self, config: PlatformConfig) -> None:
+        """
+        :param config: Platform configuration.
+        """
+        self.config = config
+        self.name = config.name
+        self.motion = MotionProcess(
+            config.geometry_params,
+            rate_hz=config.rate_hz,
+            can_config=config.can_config,
+            washout_params=config.washout_params,
+            node_ids=config.node_ids,
+            name=f"{config.name}.motion",
+        )
+
+    def connect(self) -> None:
+        """
+        Nothing to do here: the motion process brings up its own bus.
+        """
+
+    def start(self) -> None:
+        """
+        Start the motion process.
+        """
+        self.motion.start()
+
+    def submit_sample(self, faa: list, oaa: list, received: float = None) -> None:
+        """
+        Hand a sim sample to the motion process without blocking.
+
+        :param faa: Accelerations [side, axial, normal].
+        :param oaa: Orientation [phi, psi, theta].
+        :param received: Receive time (time.time()), now if None.
+        """
+        self.motion.publish_sample(faa, oaa, received)
+
+    @property
+    def running(self) -> bool:
+        """
+        :return: True while the motion process is alive.
+        """
+        return self.motion.alive
+
+    def stats(self) -> dict:
+        """
+        :return: Dictionary with the process state and ticks published.
+        """
+        outputs = self.motion.outputs
+        return {
+            "alive": self.motion.alive,
+            "ticks": outputs.head if outputs is not None else 0,
+        }
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """
+        Stop the motion process.
+
+        :param timeout: Time to wait for a clean exit (seconds).
+        """
+        self.motion.stop(timeout)
+
+
+class SimSource:
+    """
+    One sim connection fanned out to every platform it feeds.
+
+    Acquisition blocks on the sim on its own thread and hands each sample to
+    the subscribed platforms with non-blocking puts.
+    """
+
+    def __init__(self, name: str, data_getter) -> None:
+        """
+        :param name: Source name referenced by PlatformConfig.source.
+        :param data_getter: Get_data instance (or anything with connect(), run(), faa, oaa and received).
+        """
+        self.name = name
+        self.data_getter = data_getter
+        self.platforms = []
+        self._stop = threading.Event()
+        self.stage = Stage(f"{name}.acquisition", self._acquire, self._stop)
+
+    def _acquire(self) -> None:
+        """
+        Acquisition step: fetch one sim sample and pass it to every platform.
+        """
+        data_getter = self.data_getter
+        data_getter.run()
+        for platform in self.platforms:
+            platform.submit_sample(data_getter.faa, data_getter.oaa, data_getter.received)
+
+    def start(self) -> None:
+        """
+        Start the acquisition thread; the data getter connects on its first run.
+        """
+        self._stop.clear()
+        self.stage.start()
+
+    @property
+    def running(self) -> bool:
+        """
+        :return: True while the acquisition thread runs.
+        """
+        return self.stage.is_alive() and not self._stop.is_set()
+
+    @property
+    def error(self) -> Exception:
+        """
+        :return: Exception that ended acquisition, None while it runs or after a clean stop.
+        """
+        return self.stage.error
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """
+        Stop acquisition.
+
+        :param timeout: Maximum wait for the thread (seconds).
+        """
+        self._stop.set()
+        if self.stage.is_alive():
+            self.stage.join(timeout)
+
+
+class PlatformManager:
+    """
+    Runs several platforms, each with its own bus, geometry and tuning.
+
+    Platforms are brought up concurrently; one that fails to start is logged
+    and left out while the others run. Each running platform has its own
+    control thread (or process, when isolated), and sim sources are shared by
+    every platform naming them.
+    """
+
+    def __init__(self, configs: list, sources: dict = None, send=None) -> None:
+        """
+        :param configs: List of PlatformConfig.
+        :param sources: Dictionary of source name to data getter; sources named by a
+            config but missing here get a default Get_data.
+        :param send: Scheduler send function for in-process platforms, defaults to
+            electrak.move_actuator.
+        :raises ValueError: If two platforms share a name.
+        """
+        names = [config.name for config in configs]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate platform names: {names}")
+        sources = dict(sources or {})
+        self.platforms = {}
+        self.sources = {}
+        for config in configs:
+            if config.isolated:
+                platform = ProcessPlatform(config)
+            else:
+                platform = Platform(config, send=send)
+            self.platforms[config.name] = platform
+            if config.source not in self.sources:
+                data_getter = sources.get(config.source)
+                if data_getter is None:
+                    data_getter = Get_data()
+                self.sources[config.source] = SimSource(config.source, data_getter)
+        self.failed = {}
+
+    def start(self) -> None:
+        """
+        Bring up all platforms concurrently, then start them and their sim sources.
+
+        :raises RuntimeError: If no platform could be brought up.
+        """
+        with ThreadPoolExecutor(thread_name_prefix="platform_init") as pool:
+            futures = {
+                name: pool.submit(platform.connect) for name, platform in self.platforms.items()
+            }
+        for name, future in futures.items():
+            error = future.exception()
+            if error is not None:
+                logger.error("Platform %s failed to start: %s", name, error)
+                self.failed[name] = error
+                del self.platforms[name]
+        if not self.platforms:
+            raise RuntimeError(f"No platform could be started: {self.failed}")
+
+        for name, platform in self.platforms.items():
+            platform.start()
+            self.sources[platform.config.source].platforms.append(platform)
+            logger.info("Platform %s running at %.0f Hz", name, platform.config.rate_hz)
+        for source in self.sources.values():
+            if source.platforms:
+                source.start()
+
+    @property
+    def running(self) -> bool:
+        """
+        :return: True while any platform runs and its sim source still feeds it.
+        """
+        return any(
+            platform.running and self.sources[platform.config.source].running
+            for platform in self.platforms.values()
+        )
+
+    def supervise(self) -> bool:
+        """
+        Stop the platforms of sim sources whose acquisition failed.
+
+        A failed source leaves its platforms holding the last sample's lengths
+        forever, so they are stopped and moved to failed with the source's error.
+
+        :return: Whether any platform is still running, see running.
+        """
+        for name, source in self.sources.items():
+            if source.error is None or not source.platforms:
+                continue
+            logger.error("Sim source %s failed, stopping its platforms: %s", name, source.error)
+            for platform in source.platforms:
+                platform.stop()
+                self.failed[platform.name] = source.error
+                del self.platforms[platform.name]
+            source.platforms = []
+        return self.running
+
+    def stats(self) -> dict:
+        """
+        :return: Dictionary of platform name to its stats, plus acquisition stats per source.
+        """
+        now = time.perf_counter()
+        result = {name: platform.stats() for name, platform in self.platforms.items()}
+        result["sources"] = {
+            name: source.stage.stats.summary(now) for name, source in self.sources.items()
+        }
+        return result
+
+    def stop(self) -> None:
+        """
+        Stop the sim sources and all platforms.
+        """
+        for source in self.sources.values():
+            source.stop()
+        for platform in self.platforms.values():
+            platform.stop()
+
+
+def load_config(path: str) -> tuple:
+    """
+    Read a platform file.
+
+    The file is JSON with a "platforms" list of PlatformConfig arguments and
+    an optional "sources" object mapping source names to XPlaneConnect
+    arguments (xpHost, xpPort, ...).
+
+    :param path: JSON file.
+    :return: Tuple (configs, sources) for PlatformManager.
+    """
+    import xpc
+
+    with open(path) as f:
+        document = json.load(f)
+    configs = [PlatformConfig.from_dict(entry) for entry in document["platforms"]]
+    sources = {
+        name: Get_data(client=xpc.XPlaneConnect(**client_args))
+        for name, client_args in document.get("sources", {}).items()
+    }
+    return configs, sources
+
+
+def main() -> None:
+    """
+    Command line entry point: run every platform of a platform file until interrupted.
+    """
+    parser = argparse.ArgumentParser(description="Drive several motion platforms")
+    parser.add_argument("config", help="JSON platform file")
+    args = parser.parse_args()
+
+    electrak.configure_logging()
+    configs, sources = load_config(args.config)
+    manager = PlatformManager(configs, sources)
+    manager.start()
+    try:
+        while manager.supervise():
+            time.sleep(STATS_REPORT_PERIOD)
+            logger.info("Platforms: %s", manager.stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,94 @@
+import math
+
+
+class PoseTransform:
+    """
+    Sine/cosine terms and rotation matrix of one platform orientation.
+
+    update() recomputes only when the angles differ from the cached ones, so
+    every consumer of the same pose in a tick (the washout's gravity
+    compensation and rotation, up to 100 times per compute2, and the inverse
+    kinematics) shares one evaluation. The matrix is the flattened 3x3 list
+    of Geometry.rot_matrix; consumers must not modify it.
+    """
+
+    __slots__ = (
+        "psi",
+        "theta",
+        "phi",
+        "sin_psi",
+        "cos_psi",
+        "sin_theta",
+        "cos_theta",
+        "sin_phi",
+        "cos_phi",
+        "matrix",
+        "updates",
+    )
+
+    def __init__(self) -> None:
+        """
+        Initialize an empty transform; NaN angles never match, so the first update computes.
+        """
+        self.psi = self.theta = self.phi = math.nan
+        self.sin_psi = self.cos_psi = math.nan
+        self.sin_theta = self.cos_theta = math.nan
+        self.sin_phi = self.cos_phi = math.nan
+        self.matrix = [0.0] * 9
+        self.updates = 0  # evaluations so far, for tests and profiling
+
+    def update(self, psi: float, theta: float, phi: float) -> "PoseTransform":
+        """
+        Bring the terms up to date for an orientation.
+
+        :param psi: Yaw angle (radians).
+        :param theta: Pitch angle (radians).
+        :param phi: Roll angle (radians).
+        :return: self.
+        """
+        if psi == self.psi and theta == self.theta and phi == self.phi:
+            return self
+        cpsi, spsi = math.cos(psi), math.sin(psi)
+        cth, sth = math.cos(theta), math.sin(theta)
+        cphi, sphi = math.cos(phi), math.sin(phi)
+        RB = self.matrix
+        RB[0] = cpsi * cth
+        RB[1] = spsi * cth
+        RB[2] = -sth
+        RB[3] = -spsi * cphi + cpsi * sth * sphi
+        RB[4] = cpsi * cphi + spsi * sth * sphi
+        RB[5] = cth * sphi
+        RB[6] = spsi * sphi + cpsi * sth * cphi
+        RB[7] = -cpsi * sphi + spsi * sth * cphi
+        RB[8] = cth * cphi
+        self.psi, self.theta, self.phi = psi, theta, phi
+        self.sin_psi, self.cos_psi = spsi, cpsi
+        self.sin_theta, self.cos_theta = sth, cth
+        self.sin_phi, self.cos_phi = sphi, cphi
+        self.updates += 1
+        return self
+
+
+def transform_of(pos) -> PoseTransform:
+    """
+    Up-to-date transform of a pose, shared through the pose's cache when it has one.
+
+    :param pos: Position, or any object with psi, theta and phi.
+    :return: PoseTransform of the pose's current angles.
+    """
+    cache = getattr(pos, "transform", None)
+    if cache is None:
+        cache = PoseTransform()
+    return cache.update(pos.psi, pos.theta, pos.phi)
+
+
+def rot_matrix(psi: float, theta: float, phi: float) -> list:
+    """
+    Compute a 3x3 rotation matrix (flattened) from Euler angles.
+
+    :param psi: Yaw angle (radians).
+    :param theta: Pitch angle (radians).
+    :param phi: Roll angle (radians).
+    :return: New flattened 3x3 rotation matrix as a list of 9 floats.
+    """
+    return list(PoseTransform().update(psi, theta, phi).matrix)
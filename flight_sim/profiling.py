@@ -0,0 +1,189 @@
+import functools
+import logging
+import os
+import signal
+import threading
+import time
+from typing import Callable
+
+from histogram import LatencyHistogram
+
+logger = logging.getLogger("profiling")
+
+# Set FLIGHT_SIM_PROFILE=1 to enable profiling from process start
+ENV_VAR = "FLIGHT_SIM_PROFILE"
+
+_enabled = os.environ.get(ENV_VAR, "") not in ("", "0")
+_stages = {}
+_locks = {}  # stage name -> lock guarding its histogram
+_registry_lock = threading.Lock()
+
+
+def enable() -> None:
+    """
+    Start recording profiled calls.
+    """
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """
+    Stop recording profiled calls; recorded statistics are kept.
+    """
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    """
+    :return: True while profiled calls are recorded.
+    """
+    return _enabled
+
+
+def stage(name: str) -> LatencyHistogram:
+    """
+    Get the histogram of a stage, creating it on first use.
+
+    :param name: Stage name, e.g. 'washout.compute2'.
+    :return: The stage's LatencyHistogram.
+    """
+    hist = _stages.get(name)
+    if hist is None:
+        with _registry_lock:
+            hist = _stages.get(name)
+            if hist is None:
+                _locks[name] = threading.Lock()
+                hist = _stages[name] = LatencyHistogram()
+    return hist
+
+
+def profiled(name: str) -> Callable:
+    """
+    Decorator timing every call of a function into the named stage histogram.
+
+    While profiling is disabled the wrapper costs one global lookup and one
+    extra call. Records go through the stage's lock, so a stage may be called
+    from several threads, e.g. the platforms of a PlatformManager.
+
+    :param name: Stage name.
+    :return: Decorator.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        hist = stage(name)
+        record = hist.record
+        lock = _locks[name]
+        clock = time.perf_counter
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                with lock:
+                    record(elapsed)
+
+        return wrapper
+
+    return decorator
+
+
+def reset() -> None:
+    """
+    Clear all stage histograms.
+    """
+    for name, hist in list(_stages.items()):
+        with _locks[name]:
+            hist.reset()
+
+
+def stats() -> dict:
+    """
+    :return: Dictionary of stage name to histogram summary, for stages with calls.
+    """
+    result = {}
+    for name, hist in sorted(_stages.items()):
+        with _locks[name]:
+            if hist.count:
+                result[name] = hist.summary()
+    return result
+
+
+def format_stats() -> str:
+    """
+    Render the stage statistics as a fixed-width table in microseconds.
+
+    :return: Multi-line table.
+    """
+    lines = [f"{'stage':<32}{'calls':>10}{'mean':>10}{'p50':>10}{'p99':>10}{'max':>10}"]
+    for name, s in stats().items():
+        lines.append(
+            f"{name:<32}{s['count']:>10d}{s['mean'] * 1e6:>10.1f}"
+            f"{s['p50'] * 1e6:>10.1f}{s['p99'] * 1e6:>10.1f}{s['max'] * 1e6:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def dump(path: str = None) -> str:
+    """
+    Log the stage statistics and optionally write them to a file.
+
+    :param path: File to write the table to, only logged if None.
+    :return: The table.
+    """
+    table = format_stats()
+    logger.info("Stage timings (us):\n%s", table)
+    if path is not None:
+        with open(path, "w") as f:
+            f.write(table + "\n")
+    return table
+
+
+def install_dump_signal(signum: int = getattr(signal, "SIGUSR1", None)) -> None:
+    """
+    Dump the stage statistics whenever the process receives a signal,
+    e.g. `kill -USR1 <pid>` while the platform is running.
+
+    :param signum: Signal number; must be called from the main thread.
+    :raises ValueError: If the signal is unavailable on this platform.
+    """
+    if signum is None:
+        raise ValueError("No dump signal available on this platform")
+    signal.signal(signum, lambda *_: dump())
+
+
+class ProfileReporter(threading.Thread):
+    """
+    Background thread logging the stage statistics periodically.
+    """
+
+    def __init__(self, interval: float = 10.0, reset_after: bool = False) -> None:
+        """
+        :param interval: Seconds between reports.
+        :param reset_after: Clear the histograms after each report, so each one covers one interval.
+        """
+        super().__init__(name="profile_reporter", daemon=True)
+        self.interval = interval
+        self.reset_after = reset_after
+        self.stop_event = threading.Event()
+
+    def run(self) -> None:
+        """
+        Report until stopped.
+        """
+        while not self.stop_event.wait(self.interval):
+            dump()
+            if self.reset_after:
+                reset()
+
+    def stop(self) -> None:
+        """
+        Stop reporting.
+        """
+        self.stop_event.set()
@@ -0,0 +1,168 @@
+import math
+import threading
+import time
+from typing import Callable
+
+from histogram import LatencyHistogram
+
+MIN_RATE_HZ = 1.0
+MAX_RATE_HZ = 1000.0
+SKIP = "skip"
+CATCH_UP = "catch_up"
+
+
+class RateLoop:
+    """
+    Fixed-rate loop timer driven by absolute monotonic deadlines.
+
+    Each tick is released at start + n * period, so time spent doing work does
+    not stretch the period. Waiting sleeps until shortly before the deadline
+    and spins for the remainder, trading a little CPU for sub-millisecond
+    release precision. When work overruns a deadline the missed ticks are
+    either skipped (the loop realigns to the next deadline) or caught up by
+    releasing them back to back, up to max_catch_up ticks.
+    """
+
+    def __init__(
+        self,
+        rate_hz: float,
+        spin_threshold: float = 0.002,
+        overrun_policy: str = SKIP,
+        max_catch_up: int = 5,
+        clock: Callable[[], float] = time.perf_counter,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """
+        Initialize the loop timer.
+
+        :param rate_hz: Loop rate (Hz).
+        :param spin_threshold: Final part of each wait spent spinning (seconds).
+        :param overrun_policy: 'skip' or 'catch_up'.
+        :param max_catch_up: Most missed ticks released back to back before realigning.
+        :param clock: Monotonic high resolution clock.
+        :param sleep: Sleep function, injectable for testing.
+        :raises ValueError: On an out-of-range rate or unknown policy.
+        """
+        if not MIN_RATE_HZ <= rate_hz <= MAX_RATE_HZ:
+            raise ValueError(f"rate_hz must be within [{MIN_RATE_HZ}, {MAX_RATE_HZ}]")
+        if overrun_policy not in (SKIP, CATCH_UP):
+            raise ValueError(f"Unknown overrun policy: {overrun_policy}")
+        if spin_threshold < 0:
+            raise ValueError("spin_threshold must be non-negative")
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self.spin_threshold = spin_threshold
+        self.overrun_policy = overrun_policy
+        self.max_catch_up = max_catch_up
+        self.clock = clock
+        self.sleep = sleep
+        self.jitter = LatencyHistogram()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Clear statistics; the next wait starts a new deadline sequence.
+        """
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.jitter.reset()
+        self._deadline = None
+        self._started = None
+
+    def start(self) -> None:
+        """
+        Anchor the deadline sequence at the current time.
+        """
+        self._started = self._deadline = self.clock()
+        self._released = False  # no tick's work has run yet
+        self._backlog = 0  # caught-up ticks still to release back to back
+
+    def wait(self) -> float:
+        """
+        Block until the next deadline and advance it by one period.
+
+        :return: How late the tick was released relative to its deadline (seconds).
+        """
+        if self._deadline is None:
+            self.start()
+        deadline = self._deadline
+        now = self.clock()
+        if now > deadline and self._released:
+            if self._backlog:
+                # A caught-up tick, late because of an overrun already counted
+                self._backlog -= 1
+            else:
+                # The previous tick's work ran past this tick's deadline
+                self.overruns += 1
+        elif now < deadline:
+            remaining = deadline - now
+            if remaining > self.spin_threshold:
+                self.sleep(remaining - self.spin_threshold)
+            while self.clock() < deadline:
+                pass
+            now = self.clock()
+        late = now - deadline
+        self.jitter.record(late)
+        self.ticks += 1
+        self._released = True
+
+        next_deadline = deadline + self.period
+        if now > next_deadline:
+            # Released more than a period late: later deadlines passed as well
+            missed = int(math.floor((now - deadline) / self.period))
+            if self.overrun_policy == SKIP or missed > self.max_catch_up:
+                self.skipped += missed
+                next_deadline = deadline + (missed + 1) * self.period
+            else:
+                self._backlog = missed
+        self._deadline = next_deadline
+        return late
+
+    def run(
+        self,
+        step: Callable[[], None],
+        stop: threading.Event = None,
+        max_ticks: int = None,
+    ) -> None:
+        """
+        Call step once per period until stopped.
+
+        :param step: Work for one tick.
+        :param stop: Event ending the loop when set.
+        :param max_ticks: End the loop after this many ticks, run forever if None.
+        """
+        self.start()
+        count = 0
+        while (stop is None or not stop.is_set()) and (
+            max_ticks is None or count < max_ticks
+        ):
+            self.wait()
+            step()
+            count += 1
+
+    def achieved_rate(self) -> float:
+        """
+        :return: Average tick rate since start (Hz).
+        """
+        if self._started is None:
+            return 0.0
+        elapsed = self.clock() - self._started
+        return self.ticks / elapsed if elapsed > 0 else 0.0
+
+    def stats(self) -> dict:
+        """
+        Overruns count ticks released late because the previous tick's work ran
+        past their deadline (caught-up ticks excluded); skipped counts ticks
+        dropped by the overrun policy.
+
+        :return: Dictionary with tick counts, overruns, skipped ticks and jitter summary.
+        """
+        return {
+            "rate_hz": self.rate_hz,
+            "achieved_rate_hz": self.achieved_rate(),
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "jitter": self.jitter.summary(),
+        }
@@ -0,0 +1,254 @@
+import argparse
+import csv
+import gzip
+import logging
+import time
+from datetime import datetime
+from typing import Iterator
+
+from command_scheduler import CommandScheduler
+from geometry import RIG_GEOMETRY, Geometry
+from Get_data import Get_data
+from pipeline import MotionCore, control_tick
+
+logger = logging.getLogger("replay")
+
+LEGS = 6
+NODE_IDS = tuple(range(1, LEGS + 1))
+# Get_data log lines start with logging's default asctime
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+TIMESTAMP_LENGTH = 23
+PSI_COLUMN = 12
+
+
+class ReplayFinished(Exception):
+    """
+    Raised by ReplayClient when the recorded session is exhausted.
+    """
+
+
+def read_get_data_log(path: str) -> Iterator[tuple]:
+    """
+    Iterate over the samples of a get_data log.
+
+    :param path: Log written by Get_data, a plain .log or a compressed .log.gz segment.
+    :return: Iterator of (timestamp, values) with timestamp in epoch seconds and
+        values a list of one-element tuples, as returned by getDREFs.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if len(line) <= TIMESTAMP_LENGTH:
+                continue
+            fields = line[TIMESTAMP_LENGTH + 1 :].split(",")
+            try:
+                values = [(float(v),) for v in fields]
+            except ValueError:
+                continue  # CSV header, written when a session starts
+            stamp = datetime.strptime(line[:TIMESTAMP_LENGTH], TIMESTAMP_FORMAT)
+            yield stamp.timestamp(), values
+
+
+class SimulatedClock:
+    """
+    Clock that only moves when told to, standing in for time.time during replay.
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        """
+        :param start: Initial time (seconds).
+        """
+        self.now = start
+
+    def __call__(self) -> float:
+        """
+        :return: Current simulated time.
+        """
+        return self.now
+
+    def advance_to(self, t: float) -> None:
+        """
+        Move the clock forward; it never goes backwards.
+
+        :param t: New time (seconds).
+        """
+        if t > self.now:
+            self.now = t
+
+
+class ReplayClient:
+    """
+    Stand-in for XPlaneConnect serving samples from a recorded Get_data log.
+
+    Each getDREFs call returns the next recorded sample and advances the
+    simulated clock to the time it was logged.
+    """
+
+    def __init__(self, samples, clock: SimulatedClock = None) -> None:
+        """
+        :param samples: Iterable of (timestamp, values), e.g. read_get_data_log(path).
+        :param clock: Clock advanced to each sample's time, a new one if None.
+        """
+        self._samples = iter(samples)
+        self.clock = clock if clock is not None else SimulatedClock()
+        self.count = 0
+        self._next = next(self._samples, None)
+        if self._next is not None:
+            self.clock.advance_to(self._next[0])
+
+    def getPOSI(self, ac: int = 0) -> tuple:
+        """
+        :param ac: Aircraft number, ignored.
+        :return: POSI tuple with only the heading (index 5) taken from the recording.
+        """
+        heading = self._next[1][PSI_COLUMN][0] if self._next is not None else 0.0
+        return (0.0, 0.0, 0.0, 0.0, 0.0, heading, 0.0)
+
+    def getDREFs(self, drefs: list) -> list:
+        """
+        :param drefs: Requested datarefs; the recording's columns are returned regardless.
+        :return: Next recorded sample.
+        :raises ReplayFinished: When the recording is exhausted.
+        """
+        if self._next is None:
+            raise ReplayFinished()
+        timestamp, values = self._next
+        self.clock.advance_to(timestamp)
+        self.count += 1
+        self._next = next(self._samples, None)
+        return values
+
+    def close(self) -> None:
+        pass
+
+
+class ReplayNode:
+    """
+    Actuator stand-in carrying only the node ID the scheduler needs.
+    """
+
+    def __init__(self, node_id: int) -> None:
+        """
+        :param node_id: CANopen node ID.
+        """
+        self.id = node_id
+
+
+class RecordingActuators:
+    """
+    CAN stand-in recording every command the scheduler sends.
+
+    Use send as the CommandScheduler's send function in place of
+    electrak.move_actuator.
+    """
+
+    def __init__(self, clock: SimulatedClock, node_ids: tuple = NODE_IDS) -> None:
+        """
+        :param clock: Clock stamping each command.
+        :param node_ids: Node IDs in leg order.
+        """
+        self.clock = clock
+        self.nodes = {node_id: ReplayNode(node_id) for node_id in node_ids}
+        self.commands = []
+
+    def send(self, node: ReplayNode, target_position_mm: float, **settings) -> None:
+        """
+        Record one command.
+
+        :param node: Target node.
+        :param target_position_mm: Commanded position (mm).
+        :param settings: Remaining move_actuator arguments, enable_motion is recorded.
+        """
+        self.commands.append(
+            (self.clock(), node.id, target_position_mm, settings.get("enable_motion", True))
+        )
+
+
+def run_replay(
+    samples,
+    core: MotionCore = None,
+    scheduler_args: dict = None,
+    limit: int = None,
+) -> dict:
+    """
+    Run the serial control tick over recorded samples as fast as possible.
+
+    :param samples: Iterable of (timestamp, values), e.g. read_get_data_log(path).
+    :param core: MotionCore to drive, one with the rig geometry and default washout if None.
+    :param scheduler_args: Extra CommandScheduler keyword arguments.
+    :param limit: Stop after this many ticks, all samples if None.
+    :return: Dictionary with the commanded 'trajectory' (one (time, lengths_mm) per
+        tick), the 'commands' the scheduler sent, and tick/time statistics.
+    """
+    clock = SimulatedClock()
+    client = ReplayClient(samples, clock)
+    data_getter = Get_data(client=client, log_inputs=False, clock=clock)
+    core = core if core is not None else MotionCore(Geometry(**RIG_GEOMETRY))
+    actuators = RecordingActuators(clock)
+    scheduler = CommandScheduler(clock=clock, send=actuators.send, **(scheduler_args or {}))
+
+    trajectory = []
+    start_time = clock()
+    wall_start = time.perf_counter()
+    while limit is None or len(trajectory) < limit:
+        try:
+            lengths = control_tick(data_getter, core, actuators.nodes, scheduler)
+        except ReplayFinished:
+            break
+        trajectory.append((clock(), [length * 1000.0 for length in lengths]))
+    wall = time.perf_counter() - wall_start
+    sim = clock() - start_time
+    return {
+        "trajectory": trajectory,
+        "commands": actuators.commands,
+        "ticks": len(trajectory),
+        "sim_duration": sim,
+        "wall_time": wall,
+        "speedup": sim / wall if wall > 0 else 0.0,
+    }
+
+
+def write_trajectory(trajectory: list, path: str) -> None:
+    """
+    Write a commanded leg-length trajectory as CSV.
+
+    :param trajectory: List of (time, lengths_mm) from run_replay.
+    :param path: Output file.
+    """
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["t"] + [f"leg{i + 1}_mm" for i in range(LEGS)])
+        for t, lengths in trajectory:
+            writer.writerow([f"{t:.3f}"] + [f"{v:.4f}" for v in lengths])
+
+
+def main() -> None:
+    """
+    Command line entry point: replay a log and write the commanded trajectory.
+    """
+    parser = argparse.ArgumentParser(
+        description="Replay a get_data log through the motion pipeline without X-Plane or CAN"
+    )
+    parser.add_argument("log", help="get_data_*.log or .log.gz file")
+    parser.add_argument("--out", help="trajectory CSV to write")
+    parser.add_argument("--limit", type=int, help="stop after this many ticks")
+    args = parser.parse_args()
+
+    result = run_replay(read_get_data_log(args.log), limit=args.limit)
+    logger.info(
+        "Replayed %d ticks (%.1f s of flight) in %.3f s, %.0fx real time, %d commands",
+        result["ticks"],
+        result["sim_duration"],
+        result["wall_time"],
+        result["speedup"],
+        len(result["commands"]),
+    )
+    if args.out:
+        write_trajectory(result["trajectory"], args.out)
+        logger.info("Wrote trajectory to %s", args.out)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,508 @@
+import argparse
+import glob
+import gzip
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+import vector_kinematics as vk
+from geometry import RIG_GEOMETRY, Geometry
+from replay import TIMESTAMP_LENGTH
+from session_log import SEGMENT_SUFFIX, read_index
+from Washout import Washout
+
+logger = logging.getLogger("session_analysis")
+
+# Recording array columns: log timestamp (epoch seconds), then Get_data.DREFS
+COLUMNS = 17
+TIME = 0
+VALUES = slice(1, COLUMNS)
+CONVERT_BATCH = 65536  # log lines parsed per array write
+CHUNK_ROWS = 65536  # rows analyzed at a time, a multiple of SPECTRUM_SEGMENT
+SPECTRUM_SEGMENT = 256  # samples per averaged spectrum segment
+FLIGHT_GAP_S = 5.0  # a longer gap in the log starts a new flight
+STROKE_MARGIN_M = 0.01
+AXES = ("side", "axial", "normal")
+
+
+def _parse_lines(lines: list, minutes: dict) -> np.ndarray:
+    """
+    Parse Get_data log lines into recording rows, skipping headers.
+
+    Timestamps are split into a cached minute and the seconds, which is much
+    cheaper than strptime per line.
+
+    :param lines: Log lines, each '<asctime> <v0>,<v1>,...'.
+    :param minutes: Cache of 'YYYY-mm-dd HH:MM' prefixes to epoch seconds.
+    :return: (n, COLUMNS) array.
+    """
+    rows = []
+    for line in lines:
+        if len(line) <= TIMESTAMP_LENGTH:
+            continue
+        fields = line[TIMESTAMP_LENGTH + 1 :].split(",")
+        try:
+            values = [float(v) for v in fields]
+        except ValueError:
+            continue  # CSV header
+        minute = line[:16]
+        base = minutes.get(minute)
+        if base is None:
+            base = minutes[minute] = datetime.strptime(minute, "%Y-%m-%d %H:%M").timestamp()
+        if len(values) < COLUMNS - 1:
+            # Logs recorded before the sim time dataref was added
+            values += [np.nan] * (COLUMNS - 1 - len(values))
+        seconds = float(line[17:TIMESTAMP_LENGTH].replace(",", "."))
+        rows.append([base + seconds] + values[: COLUMNS - 1])
+    return np.array(rows, dtype=np.float64).reshape(-1, COLUMNS)
+
+
+def _log_paths(log_path) -> list:
+    """
+    :param log_path: Log path, or list of consecutive segment paths of one session.
+    :return: List of log paths.
+    """
+    return [log_path] if isinstance(log_path, str) else list(log_path)
+
+
+def convert(log_path, npy_path: str) -> int:
+    """
+    Convert a Get_data log (.log or .log.gz) to a .npy recording, streaming.
+
+    Rows are appended to a raw file batch by batch and the .npy header is
+    written once the row count is known, so no more than one batch is held
+    in memory.
+
+    :param log_path: Get_data log or session log segment, or a list of
+        consecutive segments converted into one recording.
+    :param npy_path: Output .npy file.
+    :return: Number of samples.
+    """
+    raw_path = npy_path + ".raw"
+    minutes = {}
+    count = 0
+    with open(raw_path, "wb") as raw:
+        for path in _log_paths(log_path):
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rt") as f:
+                while True:
+                    lines = f.readlines(CONVERT_BATCH * 128)
+                    if not lines:
+                        break
+                    rows = _parse_lines([line.rstrip("\n") for line in lines], minutes)
+                    raw.write(rows.tobytes())
+                    count += len(rows)
+    header = {"descr": "<f8", "fortran_order": False, "shape": (count, COLUMNS)}
+    tmp_path = npy_path + ".tmp"
+    with open(tmp_path, "wb") as out, open(raw_path, "rb") as raw:
+        np.lib.format.write_array_header_2_0(out, header)
+        shutil.copyfileobj(raw, out)
+    os.remove(raw_path)
+    os.replace(tmp_path, npy_path)
+    return count
+
+
+def cache_path(log_path, cache_dir: str = None) -> str:
+    """
+    :param log_path: Log path, or list of consecutive segment paths of one session.
+    :param cache_dir: Directory for .npy recordings, next to the (first) log if None.
+    :return: Path of the .npy recording, named after the first log.
+    """
+    first = _log_paths(log_path)[0]
+    directory = cache_dir if cache_dir is not None else os.path.dirname(first)
+    return os.path.join(directory, os.path.basename(first) + ".npy")
+
+
+def open_recording(log_path, cache_dir: str = None) -> np.ndarray:
+    """
+    Memory-map a log's recording, converting it first if the cache is missing or stale.
+
+    :param log_path: Get_data log or session log segment, or a list of
+        consecutive segments of one session (see group_segments).
+    :param cache_dir: Directory for .npy recordings, next to the (first) log if None.
+    :return: Read-only (N, COLUMNS) memory map.
+    """
+    npy_path = cache_path(log_path, cache_dir)
+    os.makedirs(os.path.dirname(npy_path) or ".", exist_ok=True)
+    newest = max(os.path.getmtime(path) for path in _log_paths(log_path))
+    if not os.path.exists(npy_path) or os.path.getmtime(npy_path) < newest:
+        convert(log_path, npy_path)
+    return np.load(npy_path, mmap_mode="r")
+
+
+def _segment_session(path: str) -> tuple:
+    """
+    :param path: Log path.
+    :return: (directory, prefix) of a session log segment, None for other logs.
+    """
+    directory, name = os.path.split(path)
+    if not name.endswith(SEGMENT_SUFFIX):
+        return None
+    # <prefix>_<YYYYmmdd>_<HHMMSS>_<n>.log.gz
+    parts = name[: -len(SEGMENT_SUFFIX)].rsplit("_", 3)
+    return (directory, parts[0]) if len(parts) == 4 else None
+
+
+def group_segments(logs: list, gap: float = FLIGHT_GAP_S) -> list:
+    """
+    Group the segments a session log rotated one session into, so each session is one recording.
+
+    A segment continues the previous one when both belong to the same
+    directory and prefix and its first line follows the previous segment's
+    last line within gap, according to their indexes. Plain logs and
+    segments without an index are recordings of their own.
+
+    :param logs: Log paths, sorted as find_logs returns them.
+    :param gap: Largest time (seconds) between two segments of one session.
+    :return: List of recordings, each a list of log paths in time order.
+    """
+    recordings = []
+    previous = None  # (session, last line time) of the previous segment
+    for path in logs:
+        session = _segment_session(path)
+        entries = read_index(path) if session is not None else []
+        first = min((entry["first"] for entry in entries), default=None)
+        if (
+            first is not None
+            and previous is not None
+            and previous[0] == session
+            and first - previous[1] <= gap
+        ):
+            recordings[-1].append(path)
+        else:
+            recordings.append([path])
+        previous = (session, max(entry["last"] for entry in entries)) if entries else None
+    return recordings
+
+
+def prune_caches(logs: list, cache_dir: str = None) -> list:
+    """
+    Delete .npy recordings whose log no longer exists, e.g. after session log retention.
+
+    :param logs: Log paths found in the directories analyzed.
+    :param cache_dir: Directory for .npy recordings, next to the logs if None. A
+        separate cache directory also loses the recordings of logs not in logs.
+    :return: Deleted cache paths.
+    """
+    if cache_dir is not None:
+        directories = {cache_dir}
+    else:
+        directories = {os.path.dirname(path) for path in logs}
+    names = {os.path.basename(path) for path in logs}
+    deleted = []
+    for directory in directories:
+        for pattern in ("get_data_*.log.npy", "get_data_*.log.gz.npy"):
+            for path in glob.glob(os.path.join(glob.escape(directory or "."), pattern)):
+                name = os.path.basename(path)[: -len(".npy")]
+                source = os.path.join(directory, name)
+                if name not in names and not os.path.exists(source):
+                    os.remove(path)
+                    deleted.append(path)
+    if deleted:
+        logger.info("Deleted %d recordings of deleted logs", len(deleted))
+    return deleted
+
+
+def flight_bounds(times: np.ndarray, sim_time: np.ndarray, gap: float = FLIGHT_GAP_S) -> list:
+    """
+    Split a recording into flights at log gaps and sim time resets.
+
+    :param times: Log timestamps (seconds).
+    :param sim_time: X-Plane total running time, NaN in old logs.
+    :param gap: Log gap (seconds) starting a new flight.
+    :return: List of (start, stop) row ranges.
+    """
+    if len(times) == 0:
+        return []
+    with np.errstate(invalid="ignore"):
+        breaks = (np.diff(times) > gap) | (np.diff(sim_time) < 0.0)
+    edges = np.concatenate(([0], np.flatnonzero(breaks) + 1, [len(times)]))
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:])]
+
+
+def intervals(mask: np.ndarray, times: np.ndarray) -> list:
+    """
+    :param mask: Boolean per sample.
+    :param times: Sample times (seconds).
+    :return: List of [start, end] times of the runs where mask is set.
+    """
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    changes = np.diff(padded)
+    starts = np.flatnonzero(changes == 1)
+    stops = np.flatnonzero(changes == -1) - 1
+    return [[float(times[a]), float(times[b])] for a, b in zip(starts, stops)]
+
+
+class FlightAnalysis:
+    """
+    Accumulates one flight's summary over consecutive chunks of its rows.
+
+    Every statistic is kept as running sums, maxima or averaged spectra, so a
+    flight of any length is analyzed in CHUNK_ROWS-sized pieces of the memory
+    map. The washout and heading carry over between chunks, as in the live loop.
+    """
+
+    def __init__(self, geometry: Geometry, washout: Washout, margin: float = STROKE_MARGIN_M):
+        """
+        :param geometry: Rig geometry for the stroke limits.
+        :param washout: Washout whose parameters the rig ran with.
+        :param margin: Distance to a stroke end (meters) counted as near the limit.
+        """
+        self.geometry = geometry
+        self.washout = washout
+        self.margin = margin
+        self.samples = 0
+        self.active = 0
+        self.peak = np.zeros(3)
+        self.peak_time = np.full(3, np.nan)
+        self.square_sum = np.zeros(3)
+        self.near_min = np.zeros(6, dtype=np.int64)
+        self.near_max = np.zeros(6, dtype=np.int64)
+        self.outside = np.zeros(6, dtype=np.int64)
+        self.length_min = np.full(6, np.inf)
+        self.length_max = np.full(6, -np.inf)
+        self.spectrum = np.zeros((3, SPECTRUM_SEGMENT // 2 + 1))
+        self.segments = 0
+        self.pauses = []
+        self._paused_at_end = False
+        self._psi = None
+        self._pose = None
+
+    def add(self, rows: np.ndarray) -> None:
+        """
+        Analyze the next rows of the flight.
+
+        :param rows: (n, COLUMNS) rows, a slice of the memory map.
+        """
+        times = np.asarray(rows[:, TIME])
+        values = np.asarray(rows[:, VALUES])
+        faa, oaa = vk.accelerations(values, self._psi)
+        T = vk.washout_translation(faa, oaa, self.washout, self._pose)
+        self._psi = values[-1, vk.PSI]
+        self._pose = oaa[-1]
+        lengths = vk.leg_lengths(self.geometry, oaa[:, 1], oaa[:, 2], oaa[:, 0], T)
+
+        paused = values[:, vk.PAUSED] != 0.0
+        for interval in intervals(paused, times):
+            # A pause running on from the previous chunk is extended
+            if self._paused_at_end and interval[0] == times[0]:
+                self.pauses[-1][1] = interval[1]
+            else:
+                self.pauses.append(interval)
+        self._paused_at_end = bool(paused[-1])
+        running = ~paused
+        self.samples += len(rows)
+        self.active += int(running.sum())
+
+        magnitude = np.abs(faa[running])
+        if len(magnitude):
+            rows_max = magnitude.argmax(axis=0)
+            for axis in range(3):
+                value = magnitude[rows_max[axis], axis]
+                if value > self.peak[axis] or np.isnan(self.peak_time[axis]):
+                    self.peak[axis] = value
+                    self.peak_time[axis] = times[running][rows_max[axis]]
+            self.square_sum += (magnitude**2).sum(axis=0)
+
+        legs = lengths[running]
+        low = self.geometry.act_min
+        high = low + self.geometry.act_range
+        self.outside += ((legs < low) | (legs > high)).sum(axis=0)
+        self.near_min += ((legs >= low) & (legs < low + self.margin)).sum(axis=0)
+        self.near_max += ((legs <= high) & (legs > high - self.margin)).sum(axis=0)
+        if len(legs):
+            self.length_min = np.minimum(self.length_min, legs.min(axis=0))
+            self.length_max = np.maximum(self.length_max, legs.max(axis=0))
+
+        # Averaged periodogram of whole segments with a Hann window
+        whole = len(faa) // SPECTRUM_SEGMENT * SPECTRUM_SEGMENT
+        if whole:
+            window = np.hanning(SPECTRUM_SEGMENT)
+            segments = faa[:whole].T.reshape(3, -1, SPECTRUM_SEGMENT)
+            segments = segments - segments.mean(axis=2, keepdims=True)
+            power = np.abs(np.fft.rfft(segments * window, axis=2)) ** 2
+            self.spectrum += power.sum(axis=1)
+            self.segments += segments.shape[1]
+
+    def summary(self, times: np.ndarray) -> dict:
+        """
+        :param times: Timestamps of the whole flight (a memory map slice).
+        :return: JSON-serializable flight summary.
+        """
+        start, end = float(times[0]), float(times[-1])
+        duration = end - start
+        rate = (len(times) - 1) / duration if duration > 0 else float("nan")
+        period = 1.0 / rate if rate == rate else 0.0
+
+        summary = {
+            "start": start,
+            "end": end,
+            "duration_s": duration,
+            "samples": self.samples,
+            "rate_hz": rate,
+            "paused_s": (self.samples - self.active) * period,
+            "pauses": self.pauses,
+            "peaks": {},
+            "stroke": {
+                "margin_m": self.margin,
+                "near_min_s": (self.near_min * period).tolist(),
+                "near_max_s": (self.near_max * period).tolist(),
+                "outside_s": (self.outside * period).tolist(),
+                "length_min_m": self.length_min.tolist(),
+                "length_max_m": self.length_max.tolist(),
+            },
+        }
+        for axis, name in enumerate(AXES):
+            summary["peaks"][name] = {
+                "max_abs": float(self.peak[axis]),
+                "time": float(self.peak_time[axis]),
+                "rms": float(np.sqrt(self.square_sum[axis] / max(self.active, 1))),
+            }
+        if self.segments and rate == rate:
+            window = np.hanning(SPECTRUM_SEGMENT)
+            # One-sided power spectral density, (m/s^2)^2 per Hz
+            psd = self.spectrum / (self.segments * rate * (window**2).sum())
+            psd[:, 1:-1] *= 2.0
+            freq = np.fft.rfftfreq(SPECTRUM_SEGMENT, 1.0 / rate)
+            summary["spectrum"] = {"freq_hz": freq.tolist()}
+            for axis, name in enumerate(AXES):
+                summary["spectrum"][name] = psd[axis].tolist()
+                # Strongest cue above DC, None for a constant signal
+                strongest = 1 + psd[axis, 1:].argmax()
+                dominant = float(freq[strongest]) if psd[axis, strongest] > 0.0 else None
+                summary["peaks"][name]["dominant_hz"] = dominant
+        return summary
+
+
+def analyze_recording(
+    recording: np.ndarray,
+    geometry: Geometry = None,
+    washout: Washout = None,
+    margin: float = STROKE_MARGIN_M,
+    gap: float = FLIGHT_GAP_S,
+) -> list:
+    """
+    Summarize every flight of a recording.
+
+    :param recording: (N, COLUMNS) array or memory map.
+    :param geometry: Rig geometry, RIG_GEOMETRY if None.
+    :param washout: Washout the rig ran with, the defaults if None.
+    :param margin: Distance to a stroke end (meters) counted as near the limit.
+    :param gap: Log gap (seconds) starting a new flight.
+    :return: List of flight summaries.
+    """
+    geometry = geometry if geometry is not None else Geometry(**RIG_GEOMETRY)
+    washout = washout if washout is not None else Washout()
+    times = recording[:, TIME]
+    flights = []
+    for start, stop in flight_bounds(times, recording[:, 1 + vk.SIM_TIME], gap):
+        analysis = FlightAnalysis(geometry, washout, margin)
+        for chunk in range(start, stop, CHUNK_ROWS):
+            analysis.add(recording[chunk : min(chunk + CHUNK_ROWS, stop)])
+        flights.append(analysis.summary(times[start:stop]))
+    return flights
+
+
+def analyze_file(
+    log_path: str,
+    cache_dir: str = None,
+    geometry_params: dict = None,
+    washout_params: dict = None,
+    margin: float = STROKE_MARGIN_M,
+) -> list:
+    """
+    Summarize the flights of one log; runs in a worker process.
+
+    :param log_path: Get_data log or session log segment, or a list of
+        consecutive segments of one session.
+    :param cache_dir: Directory for .npy recordings, next to the log if None.
+    :param geometry_params: Geometry arguments, RIG_GEOMETRY if None.
+    :param washout_params: Washout overrides the rig ran with.
+    :param margin: Distance to a stroke end (meters) counted as near the limit.
+    :return: List of flight summaries, each tagged with its source (the first
+        log), its segments and its index.
+    """
+    paths = _log_paths(log_path)
+    recording = open_recording(paths, cache_dir)
+    geometry = Geometry(**(geometry_params or RIG_GEOMETRY))
+    flights = analyze_recording(recording, geometry, Washout(washout_params), margin)
+    for index, flight in enumerate(flights):
+        flight["source"] = paths[0]
+        flight["segments"] = paths
+        flight["flight"] = index
+    return flights
+
+
+def find_logs(paths: list) -> list:
+    """
+    :param paths: Log files and directories holding get_data logs.
+    :return: Log paths, directories expanded and sorted.
+    """
+    logs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in ("get_data_*.log", "get_data_*.log.gz"):
+                logs.extend(glob.glob(os.path.join(glob.escape(path), pattern)))
+        else:
+            logs.append(path)
+    return sorted(set(logs))
+
+
+def analyze_files(paths: list, workers: int = None, **kwargs) -> list:
+    """
+    Summarize many logs in parallel, one recording per task.
+
+    Consecutive segments of one session are analyzed as one recording (see
+    group_segments), so flights crossing a rotation stay whole.
+
+    :param paths: Log paths, as returned by find_logs.
+    :param workers: Worker processes, os.cpu_count() if None; 1 runs in-process.
+    :param kwargs: Further analyze_file arguments.
+    :return: Flight summaries of all logs, in path order.
+    """
+    recordings = group_segments(paths)
+    if workers == 1 or len(recordings) <= 1:
+        results = [analyze_file(recording, **kwargs) for recording in recordings]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(analyze_file, recording, **kwargs) for recording in recordings]
+            results = [future.result() for future in futures]
+    return [flight for flights in results for flight in flights]
+
+
+def main() -> None:
+    """
+    Command line entry point: summarize session logs into a JSON file.
+    """
+    parser = argparse.ArgumentParser(description="Summarize recorded flights")
+    parser.add_argument("paths", nargs="+", help="get_data logs or directories of them")
+    parser.add_argument("--out", default="flights.json", help="JSON summary file")
+    parser.add_argument("--cache", help="directory for .npy recordings (default: next to logs)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all CPUs)")
+    parser.add_argument("--margin", type=float, default=STROKE_MARGIN_M, help="stroke margin (m)")
+    args = parser.parse_args()
+
+    logs = find_logs(args.paths)
+    started = time.perf_counter()
+    prune_caches(logs, args.cache)
+    flights = analyze_files(logs, args.workers, cache_dir=args.cache, margin=args.margin)
+    with open(args.out, "w") as f:
+        json.dump(flights, f)
+    logger.info(
+        "Summarized %d flights from %d logs in %.1f s into %s",
+        len(flights),
+        len(logs),
+        time.perf_counter() - started,
+        args.out,
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
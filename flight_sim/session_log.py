@@ -0,0 +1,409 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Callable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: segments in use by other logs are not detected
+    fcntl = None
+
+logger = logging.getLogger("session_log")
+
+SEGMENT_SUFFIX = ".log.gz"
+INDEX_SUFFIX = ".idx"  # JSON lines, one per gzip member of the segment
+GZIP_WBITS = 31  # zlib window bits selecting the gzip container
+
+
+def index_path(segment: str) -> str:
+    """
+    :param segment: Segment file path.
+    :return: Path of the segment's index.
+    """
+    return segment[: -len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+
+
+def in_use(segment: str) -> bool:
+    """
+    :param segment: Segment file path.
+    :return: True while a SessionLog, in this or another process, is writing the segment.
+    """
+    if fcntl is None:
+        return False
+    try:
+        with open(segment, "rb") as f:
+            # Writers hold an exclusive lock on their open segment until it is closed
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    except FileNotFoundError:
+        pass
+    return False
+
+
+def segments(directory: str, prefix: str) -> list:
+    """
+    :param directory: Directory holding the session logs.
+    :param prefix: Log name, e.g. 'get_data'.
+    :return: Segment paths, oldest first.
+    """
+    name = f"{glob.escape(prefix)}_[0-9]*{SEGMENT_SUFFIX}"
+    pattern = os.path.join(glob.escape(directory), name)
+    return sorted(glob.glob(pattern))
+
+
+class SessionLog:
+    """
+    Text log for long sessions, compressed in the background and rotated.
+
+    write() only appends the line to a pending list. A background thread
+    compresses the pending lines every flush interval into one gzip member
+    and appends it to the current segment, so a segment is a valid .gz file
+    (zcat, gzip.open) at all times, even after a crash. For every member the
+    segment's index gets a JSON line with its offset, length and time range,
+    which lets read_range decompress only the blocks of a time window.
+
+    Segments rotate when they reach max_bytes or max_age; after each rotation
+    the oldest segments of the same prefix are deleted beyond max_segments or
+    max_total_bytes, skipping segments another log is still writing. When the writer falls behind by max_pending lines, new
+    lines are dropped and counted rather than queued without bound.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str,
+        max_bytes: int = 64 * 2**20,
+        max_age: float = 3600.0,
+        max_segments: int = 48,
+        max_total_bytes: int = 2**30,
+        flush_interval: float = 1.0,
+        max_pending: int = 100000,
+        header: str = None,
+        level: int = 6,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        :param directory: Directory for segments and indexes, created if missing.
+        :param prefix: Log name; segments are <prefix>_<YYYYmmdd_HHMMSS>_<n>.log.gz.
+        :param max_bytes: Compressed size at which a segment is rotated.
+        :param max_age: Age (seconds) at which a segment is rotated.
+        :param max_segments: Segments kept, the current one included; 0 keeps all.
+        :param max_total_bytes: Compressed bytes kept over all segments; 0 keeps all.
+        :param flush_interval: Time between background compressions (seconds).
+        :param max_pending: Lines buffered between two flushes before dropping.
+        :param header: Line written at the start of every segment, e.g. a CSV header.
+        :param level: zlib compression level.
+        :param clock: Wall-clock time source for line timestamps and rotation.
+        """
+        if max_bytes <= 0 or max_age <= 0:
+            raise ValueError("max_bytes and max_age must be positive")
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_segments = max_segments
+        self.max_total_bytes = max_total_bytes
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.header = header
+        self.level = level
+        self.clock = clock
+        self.path = None
+        self.lines_written = 0
+        self.bytes_written = 0
+        self.dropped = 0
+        self._pending = []
+        self._first = None
+        self._last = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._file = None
+        self._index = None
+        self._opened = None
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self) -> None:
+        """
+        Start the background compression thread.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"session-log-{self.prefix}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background thread, flush remaining lines and close the segment.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        with self._flush_lock:
+            self._close_segment()
+
+    def __enter__(self) -> "SessionLog":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def write(self, line: str, timestamp: float = None) -> None:
+        """
+        Queue a line for the next flush.
+
+        :param line: Text without trailing newline.
+        :param timestamp: Time the line describes, read from the clock if None.
+        """
+        t = self.clock() if timestamp is None else timestamp
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending.append(line)
+            if self._first is None or t < self._first:
+                self._first = t
+            if self._last is None or t > self._last:
+                self._last = t
+
+    def flush(self) -> int:
+        """
+        Compress pending lines into one gzip member of the current segment.
+
+        :return: Number of lines written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                lines, self._pending = self._pending, []
+                first, last = self._first, self._last
+                self._first = self._last = None
+            if not lines:
+                return 0
+            now = self.clock()
+            if (
+                self._file is None
+                or self._file.tell() >= self.max_bytes
+                or now - self._opened >= self.max_age
+            ):
+                self._rotate(now)
+            if self._file.tell() == 0 and self.header is not None:
+                lines.insert(0, self.header)
+            data = ("\n".join(lines) + "\n").encode()
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, GZIP_WBITS)
+            member = compressor.compress(data) + compressor.flush()
+            offset = self._file.tell()
+            self._file.write(member)
+            self._file.flush()
+            entry = {
+                "offset": offset,
+                "length": len(member),
+                "first": first,
+                "last": last,
+                "lines": len(lines),
+            }
+            self._index.write(json.dumps(entry) + "\n")
+            self._index.flush()
+            self.lines_written += len(lines)
+            self.bytes_written += len(member)
+            return len(lines)
+
+    def _rotate(self, now: float) -> None:
+        """
+        Close the current segment, open the next one and apply the retention policy.
+
+        :param now: Current clock value.
+        """
+        self._close_segment()
+        stamp = datetime.fromtimestamp(now).strftime("%Y%m%d_%H%M%S")
+        sequence = 0
+        while True:
+            name = f"{self.prefix}_{stamp}_{sequence:03d}{SEGMENT_SUFFIX}"
+            path = os.path.join(self.directory, name)
+            if not os.path.exists(path):
+                break
+            sequence += 1
+        self._file = open(path, "ab")
+        if fcntl is not None:
+            # Marks the segment as in use for other logs' prune until it is closed
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        self._index = open(index_path(path), "a")
+        self._opened = now
+        self.path = path
+        self.prune()
+
+    def _close_segment(self) -> None:
+        """
+        Close the current segment and its index.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._index.close()
+            self._file = self._index = None
+
+    def prune(self) -> list:
+        """
+        Delete the oldest segments beyond the retention limits.
+
+        The current segment and segments other logs of the same prefix are still
+        writing are kept and left out of the limits.
+
+        :return: Deleted segment paths.
+        """
+        existing = [
+            path
+            for path in segments(self.directory, self.prefix)
+            if path != self.path and not in_use(path)
+        ]
+        sizes = [os.path.getsize(path) for path in existing]
+        total = sum(sizes) + (os.path.getsize(self.path) if self.path else 0)
+        kept = len(existing) + (1 if self.path else 0)
+        deleted = []
+        for path, size in zip(existing, sizes):
+            over_count = self.max_segments and kept > self.max_segments
+            over_size = self.max_total_bytes and total > self.max_total_bytes
+            if not (over_count or over_size):
+                break
+            for victim in (path, index_path(path)):
+                try:
+                    os.remove(victim)
+                except FileNotFoundError:
+                    pass
+            kept -= 1
+            total -= size
+            deleted.append(path)
+        if deleted:
+            logger.info("Deleted %d old %s segments", len(deleted), self.prefix)
+        return deleted
+
+    def _run(self) -> None:
+        """
+        Background loop: flush periodically and report dropped lines.
+        """
+        reported = 0
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("Writing %s failed", self.path)
+            if self.dropped != reported:
+                logger.warning(
+                    "Session log %s dropped %d lines", self.prefix, self.dropped - reported
+                )
+                reported = self.dropped
+
+
+class SessionLogHandler(logging.Handler):
+    """
+    Logging handler writing formatted records to a SessionLog.
+
+    emit only queues the line, so logging from a control loop never waits for
+    the disk. Closing the handler (logging.shutdown does so at exit) stops the
+    session log and flushes it.
+    """
+
+    def __init__(self, session: SessionLog, level: int = logging.NOTSET) -> None:
+        """
+        :param session: Session log to write to; started here.
+        :param level: Handler level.
+        """
+        super().__init__(level)
+        self.session = session
+        session.start()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        Queue a formatted record, stamped with its creation time.
+
+        :param record: Log record.
+        """
+        try:
+            self.session.write(self.format(record), record.created)
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        """
+        Flush and close the session log.
+        """
+        self.session.stop()
+        super().close()
+
+
+def read_index(segment: str) -> list:
+    """
+    :param segment: Segment file path.
+    :return: Index entries of the segment's gzip members, in file order.
+    """
+    try:
+        with open(index_path(segment)) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def find_blocks(directory: str, prefix: str, start: float = None, end: float = None) -> list:
+    """
+    Find the blocks overlapping a time range from the indexes alone.
+
+    :param directory: Directory holding the session logs.
+    :param prefix: Log name.
+    :param start: Range start (epoch seconds), unbounded if None.
+    :param end: Range end (epoch seconds), unbounded if None.
+    :return: List of (segment path, index entry).
+    """
+    blocks = []
+    for segment in segments(directory, prefix):
+        for entry in read_index(segment):
+            if start is not None and entry["last"] < start:
+                continue
+            if end is not None and entry["first"] > end:
+                continue
+            blocks.append((segment, entry))
+    return blocks
+
+
+def read_range(
+    directory: str, prefix: str, start: float = None, end: float = None
+) -> Iterator[str]:
+    """
+    Read the lines of the blocks overlapping a time range, decompressing nothing else.
+
+    Blocks are whole flush intervals, so lines slightly outside the range are
+    included; callers filter on their own timestamp format.
+
+    :param directory: Directory holding the session logs.
+    :param prefix: Log name.
+    :param start: Range start (epoch seconds), unbounded if None.
+    :param end: Range end (epoch seconds), unbounded if None.
+    :return: Iterator of lines without newline.
+    """
+    current = None
+    f = None
+    try:
+        for segment, entry in find_blocks(directory, prefix, start, end):
+            if segment != current:
+                if f is not None:
+                    f.close()
+                f = open(segment, "rb")
+                current = segment
+            f.seek(entry["offset"])
+            data = zlib.decompress(f.read(entry["length"]), GZIP_WBITS)
+            yield from data.decode().splitlines()
+    finally:
+        if f is not None:
+            f.close()
@@ -0,0 +1,144 @@
+from array import array
+from multiprocessing import resource_tracker, shared_memory
+
+WORD = 8  # bytes per header word and per float64 field
+
+
+class ShmRing:
+    """
+    Single-writer ring buffer of fixed-length float64 records in shared memory.
+
+    The layout is one int64 head counter (records written so far) followed by
+    `capacity` slots of [int64 seq, float64 fields...]. Each slot is guarded by
+    a seqlock: the writer makes seq odd while writing and even when done, and
+    readers retry when seq is odd or changed under them. Records are copied
+    between processes without pickling or locks.
+    """
+
+    def __init__(
+        self,
+        name: str = None,
+        fields: int = 1,
+        capacity: int = 64,
+        create: bool = False,
+        untrack: bool = True,
+    ) -> None:
+        """
+        Create or attach to a ring.
+
+        :param name: Shared memory block name, generated when creating if None.
+        :param fields: float64 values per record.
+        :param capacity: Number of slots.
+        :param create: True to allocate the block, False to attach to an existing one.
+        :param untrack: When attaching, drop the block from this process's resource
+            tracker so exiting does not unlink it. Pass False in processes spawned by
+            the creator, which share the creator's tracker.
+        """
+        if fields < 1 or capacity < 1:
+            raise ValueError("fields and capacity must be at least 1")
+        self.fields = fields
+        self.capacity = capacity
+        self.slot_words = fields + 1
+        size = WORD * (1 + capacity * self.slot_words)
+        self._owner = create
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        if not create and untrack:
+            # Only the creating process may unlink the block
+            resource_tracker.unregister(self.shm._name, "shared_memory")
+        self.name = self.shm.name
+        self._ints = self.shm.buf[:size].cast("q")
+        self._floats = self.shm.buf[:size].cast("d")
+
+    @property
+    def size(self) -> int:
+        """
+        :return: Bytes of the block the ring addresses; less than its layout needs
+            when attached to a block created for fewer fields or slots.
+        """
+        return self._ints.nbytes
+
+    @property
+    def head(self) -> int:
+        """
+        :return: Number of records written since creation.
+        """
+        return self._ints[0]
+
+    def write(self, values) -> int:
+        """
+        Append one record, overwriting the oldest slot when full.
+
+        :param values: Sequence of exactly `fields` floats.
+        :return: Index (count) of the record written.
+        """
+        n = self._ints[0]
+        base = 1 + (n % self.capacity) * self.slot_words
+        self._ints[base] = 2 * n + 1
+        self._floats[base + 1 : base + 1 + self.fields] = _as_doubles(values)
+        self._ints[base] = 2 * n + 2
+        self._ints[0] = n + 1
+        return n
+
+    def read(self, index: int, out) -> bool:
+        """
+        Copy record `index` into out if it is still in the ring.
+
+        :param index: Record count returned by write (0-based).
+        :param out: Writable float64 buffer of length `fields` (e.g. array('d')).
+        :return: False if the record was overwritten or not written yet.
+        :raises TypeError: If out is not a float64 buffer.
+        """
+        base = 1 + (index % self.capacity) * self.slot_words
+        expected = 2 * index + 2
+        target = memoryview(out)
+        if target.format != "d":
+            raise TypeError("out must be a writable float64 buffer such as array('d')")
+        while True:
+            seq = self._ints[base]
+            if seq != expected:
+                if seq == expected - 1:
+                    continue  # writer is mid-update of this very record
+                return False
+            target[:] = self._floats[base + 1 : base + 1 + self.fields]
+            if self._ints[base] == seq:
+                return True
+
+    def read_latest(self, out) -> int:
+        """
+        Copy the newest record into out.
+
+        :param out: Writable float64 buffer of length `fields`.
+        :return: Index of the record copied, or -1 if the ring is empty.
+        """
+        while True:
+            head = self._ints[0]
+            if head == 0:
+                return -1
+            if self.read(head - 1, out):
+                return head - 1
+
+    def close(self) -> None:
+        """
+        Release this process's mapping; the creator also unlinks the block.
+        """
+        self._ints.release()
+        self._floats.release()
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def _as_doubles(values) -> memoryview:
+    """
+    View a sequence of floats as a float64 memoryview, copying only if needed.
+
+    :param values: array('d'), memoryview or sequence of floats.
+    :return: float64 memoryview of the values.
+    """
+    try:
+        view = memoryview(values)
+        if view.format == "d":
+            return view
+    except TypeError:
+        pass
+    return memoryview(array("d", values))
@@ -0,0 +1,525 @@
+import argparse
+import logging
+import socket
+import struct
+import threading
+import time
+import zlib
+from array import array
+
+from Get_data import DREFS
+from pipeline import Stage
+from rate_loop import RateLoop
+from shm_ring import WORD, ShmRing
+
+logger = logging.getLogger("sim_hub")
+
+# Datarefs published by default: everything Get_data and the monitors read
+HUB_DREFS = DREFS + [
+    "sim/flightmodel/position/local_ax",
+    "sim/flightmodel/position/local_ay",
+    "sim/flightmodel/position/local_az",
+]
+DEFAULT_NAME = "flight_sim_hub"
+# Snapshots kept in shared memory; readers only need the newest, a few slots
+# let slow readers finish copying one while the next is written
+CAPACITY = 8
+MULTICAST_GROUP = ("239.255.42.99", 49100)
+MULTICAST_MAGIC = b"SHUB"
+MULTICAST_HEADER = struct.Struct("<4sq")  # magic, snapshot index
+POLL_INTERVAL = 0.0005  # seconds between shared memory checks while waiting
+# Snapshot record: receive time, layout checksum, POSI[7], CTRL[7], dataref values
+POSI_FIELDS = 7
+CTRL_FIELDS = 7
+REC_RECEIVED = 0
+REC_LAYOUT = 1
+REC_POSI = 2
+REC_CTRL = REC_POSI + POSI_FIELDS
+REC_DREFS = REC_CTRL + CTRL_FIELDS
+
+# Names of the hubs running in this process
+_local_hubs = set()
+
+
+class SnapshotLayout:
+    """
+    Field positions of the datarefs in a snapshot record.
+
+    The hub and its readers must agree on the dataref list and value widths;
+    the checksum stored in every record lets readers detect a mismatch.
+    """
+
+    def __init__(self, drefs: list = HUB_DREFS, widths: list = None) -> None:
+        """
+        :param drefs: Published datarefs, in order.
+        :param widths: Values per dataref, 1 for each if None.
+        :raises ValueError: If widths does not match drefs.
+        """
+        widths = list(widths) if widths is not None else [1] * len(drefs)
+        if len(widths) != len(drefs) or min(widths, default=1) < 1:
+            raise ValueError("widths must give a positive width for every dataref")
+        self.drefs = list(drefs)
+        self.widths = widths
+        self.offsets = {}
+        offset = REC_DREFS
+        for dref, width in zip(self.drefs, widths):
+            self.offsets[dref] = (offset, width)
+            offset += width
+        self.fields = offset
+        description = ";".join(f"{d}:{w}" for d, w in zip(self.drefs, widths))
+        # Below 2**53, so it survives the round trip through a float64 field
+        self.checksum = float(zlib.crc32(description.encode()))
+
+
+class SimHub:
+    """
+    Single X-Plane connection publishing snapshots to any number of local readers.
+
+    Each poll fetches POSI, CTRL and the configured datarefs once and writes
+    them as one record to a shared memory seqlock ring (see shm_ring.py), and
+    optionally sends the same record as a UDP multicast datagram for readers
+    that cannot map the ring. Readers use HubClient, which stands in for
+    XPlaneConnect, so adding a monitor adds no load on the sim.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        layout: SnapshotLayout = None,
+        name: str = DEFAULT_NAME,
+        multicast: tuple = MULTICAST_GROUP,
+        rate_hz: float = None,
+    ) -> None:
+        """
+        :param client: XPlaneConnect or a stand-in, a new XPlaneConnect is created on start if None.
+        :param layout: Published datarefs, HUB_DREFS if None.
+        :param name: Shared memory block name readers attach to.
+        :param multicast: (group, port) to also publish snapshots to, None to disable.
+        :param rate_hz: Poll rate; None polls as fast as the sim answers.
+        """
+        self.client = client
+        self.layout = layout if layout is not None else SnapshotLayout()
+        self.name = name
+        self.multicast = multicast
+        self.loop = RateLoop(rate_hz) if rate_hz is not None else None
+        self.ring = None
+        self.sock = None
+        self.timeouts = 0
+        self._record = array("d", [0.0] * self.layout.fields)
+        self._record[REC_LAYOUT] = self.layout.checksum
+        self._stop = threading.Event()
+        self.stage = Stage("sim_hub", self.poll, self._stop, wait=self._wait)
+
+    def start(self) -> None:
+        """
+        Connect to X-Plane, create the ring and start polling.
+
+        :raises FileExistsError: If another hub already publishes under this name.
+        """
+        if self.client is None:
+            import xpc
+
+            self.client = xpc.XPlaneConnect()
+        self.ring = ShmRing(self.name, self.layout.fields, CAPACITY, create=True)
+        _local_hubs.add(self.name)
+        if self.multicast is not None:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+            # Keep the datagrams on this network segment
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+        self._stop.clear()
+        if self.loop is not None:
+            self.loop.start()
+        self.stage.start()
+        logger.info(
+            "Sim hub publishing %d fields as %s%s",
+            self.layout.fields,
+            self.name,
+            f" and to {self.multicast[0]}:{self.multicast[1]}" if self.sock else "",
+        )
+
+    def _wait(self) -> bool:
+        """
+        Poll wait: next deadline when rate limited.
+
+        :return: Always True.
+        """
+        if self.loop is not None:
+            self.loop.wait()
+        return True
+
+    def poll(self) -> int:
+        """
+        Fetch one snapshot from X-Plane and publish it.
+
+        :return: Index of the snapshot, or -1 if X-Plane did not answer.
+        """
+        record = self._record
+        layout = self.layout
+        client = self.client
+        try:
+            posi = client.getPOSI()
+            ctrl = client.getCTRL()
+            values = client.getDREFs(layout.drefs)
+        except socket.timeout:
+            self.timeouts += 1
+            return -1
+        record[REC_RECEIVED] = time.time()
+        record[REC_POSI : REC_POSI + POSI_FIELDS] = array("d", posi)
+        record[REC_CTRL : REC_CTRL + CTRL_FIELDS] = array("d", ctrl)
+        for dref, value in zip(layout.drefs, values):
+            offset, width = layout.offsets[dref]
+            if len(value) != width:
+                raise ValueError(f"{dref} has {len(value)} values, the layout expects {width}")
+            record[offset : offset + width] = array("d", value)
+        index = self.ring.write(record)
+        if self.sock is not None:
+            try:
+                header = MULTICAST_HEADER.pack(MULTICAST_MAGIC, index)
+                self.sock.sendto(header + record.tobytes(), self.multicast)
+            except OSError as e:
+                logger.warning("Multicast publishing disabled: %s", e)
+                self.sock.close()
+                self.sock = None
+        return index
+
+    @property
+    def running(self) -> bool:
+        """
+        :return: True while polling.
+        """
+        return self.stage.is_alive() and not self._stop.is_set()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """
+        Stop polling and remove the ring.
+
+        :param timeout: Maximum wait for the polling thread (seconds).
+        """
+        self._stop.set()
+        if self.stage.is_alive():
+            self.stage.join(timeout)
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+            _local_hubs.discard(self.name)
+
+
+class HubClient:
+    """
+    Read-only stand-in for XPlaneConnect served by a SimHub.
+
+    getPOSI, getCTRL and getDREFs return values from the newest snapshot.
+    Asking for the same kind of data twice waits for the next snapshot, so a
+    monitor loop runs at the hub's rate just as it ran at the sim's reply rate
+    with its own connection. Readers attach to the hub's shared memory ring
+    and fall back to its multicast datagrams when the ring is not available
+    on this machine.
+    """
+
+    def __init__(
+        self,
+        layout: SnapshotLayout = None,
+        name: str = DEFAULT_NAME,
+        multicast: tuple = MULTICAST_GROUP,
+        timeout: float = 1.0,
+    ) -> None:
+        """
+        :param layout: Dataref layout published by the hub, HUB_DREFS if None.
+        :param name: Shared memory block name of the hub.
+        :param multicast: (group, port) to listen on when the ring is not found, None to
+            require the ring.
+        :param timeout: Longest wait for a snapshot (seconds).
+        :raises FileNotFoundError: If no ring exists and multicast is None.
+        """
+        self.layout = layout if layout is not None else SnapshotLayout()
+        self.name = name
+        self.multicast = multicast
+        self.timeout = timeout
+        self.ring = None
+        self.sock = None
+        self.index = -1
+        self._served = set()
+        self._record = array("d", [0.0] * self.layout.fields)
+        self._datagram = bytearray(MULTICAST_HEADER.size + 8 * self.layout.fields)
+        self._attach()
+
+    def _attach(self) -> None:
+        """
+        Attach to the hub's ring, or join its multicast group if there is none.
+        """
+        try:
+            self.ring = self._open_ring()
+            return
+        except FileNotFoundError:
+            if self.multicast is None:
+                raise
+        group, port = self.multicast
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("", port))
+        membership = struct.pack("4s4s", socket.inet_aton(group), socket.inet_aton("0.0.0.0"))
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        sock.settimeout(self.timeout)
+        self.sock = sock
+        logger.info("No sim hub ring %s, listening on %s:%d", self.name, group, port)
+
+    def _open_ring(self) -> ShmRing:
+        """
+        :return: The hub's ring, attached.
+        :raises FileNotFoundError: If no hub publishes under the name.
+        :raises RuntimeError: If the hub's records are shorter than the layout.
+        """
+        # A hub in this process shares our resource tracker registration,
+        # which must stay for it to unlink the ring
+        ring = ShmRing(
+            self.name, self.layout.fields, CAPACITY, untrack=self.name not in _local_hubs
+        )
+        if ring.size < WORD * (1 + CAPACITY * ring.slot_words):
+            ring.close()
+            raise RuntimeError("Sim hub publishes a different dataref layout")
+        return ring
+
+    @property
+    def transport(self) -> str:
+        """
+        :return: 'shm' or 'multicast'.
+        """
+        return "shm" if self.ring is not None else "multicast"
+
+    def _next_from_ring(self) -> bool:
+        """
+        Wait for a ring snapshot newer than the current one.
+
+        :return: False on timeout.
+        """
+        ring = self.ring
+        record = self._record
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if ring.head - 1 > self.index:
+                index = ring.read_latest(record)
+                # A ring left by a stopped hub holds an old snapshot; wait for a live one
+                if index > self.index and time.time() - record[REC_RECEIVED] < self.timeout:
+                    self.index = index
+                    return True
+            time.sleep(POLL_INTERVAL)
+        return False
+
+    def _next_from_multicast(self) -> bool:
+        """
+        Wait for a multicast snapshot newer than the current one.
+
+        :return: False on timeout.
+        """
+        datagram = self._datagram
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            try:
+                size = self.sock.recv_into(datagram)
+            except socket.timeout:
+                return False
+            if size != len(datagram):
+                continue
+            magic, index = MULTICAST_HEADER.unpack_from(datagram)
+            if magic != MULTICAST_MAGIC:
+                continue
+            if index > self.index or index < self.index - CAPACITY:
+                # A lower index means the hub restarted
+                self.index = index
+                self._record[:] = array("d", datagram[MULTICAST_HEADER.size :])
+                return True
+        return False
+
+    def _reopen(self) -> None:
+        """
+        Switch to a new ring if the hub was restarted, keeping the current one otherwise.
+        """
+        try:
+            ring = self._open_ring()
+        except (FileNotFoundError, RuntimeError):
+            return
+        self.ring.close()
+        self.ring = ring
+        # A restarted hub counts snapshots from zero again
+        self.index = -1
+
+    def _snapshot(self, kind: str) -> array:
+        """
+        Newest snapshot for one kind of request, waiting if this kind was already served.
+
+        :param kind: 'posi', 'ctrl' or 'drefs'.
+        :return: The snapshot record.
+        :raises TimeoutError: If no new snapshot arrives within the timeout.
+        :raises RuntimeError: If the hub publishes a different dataref layout.
+        """
+        if self.index < 0 or kind in self._served:
+            if not self._next():
+                raise TimeoutError(
+                    f"No snapshot from sim hub {self.name} within {self.timeout} s"
+                )
+        self._served.add(kind)
+        return self._record
+
+    def _next(self) -> bool:
+        """
+        Wait for a new snapshot and make it the current one.
+
+        :return: False on timeout.
+        :raises RuntimeError: If the hub publishes a different dataref layout.
+        """
+        if self.ring is not None:
+            fresh = self._next_from_ring()
+        else:
+            fresh = self._next_from_multicast()
+        if not fresh:
+            if self.ring is not None:
+                self._reopen()
+            return False
+        self._served.clear()
+        if self._record[REC_LAYOUT] != self.layout.checksum:
+            raise RuntimeError("Sim hub publishes a different dataref layout")
+        return True
+
+    def ready(self) -> bool:
+        """
+        Wait for the first snapshot, without using it up for any kind of request.
+
+        :return: False if no hub published one within the timeout.
+        :raises RuntimeError: If the hub publishes a different dataref layout.
+        """
+        return self.index >= 0 or self._next()
+
+    def getPOSI(self, ac: int = 0) -> tuple:
+        """
+        :param ac: Aircraft number; only the player aircraft (0) is published.
+        :return: Position tuple as returned by XPlaneConnect.getPOSI.
+        :raises ValueError: For another aircraft.
+        """
+        if ac != 0:
+            raise ValueError("The sim hub only publishes aircraft 0")
+        record = self._snapshot("posi")
+        return tuple(record[REC_POSI : REC_POSI + POSI_FIELDS])
+
+    def getCTRL(self, ac: int = 0) -> tuple:
+        """
+        :param ac: Aircraft number; only the player aircraft (0) is published.
+        :return: Control tuple as returned by XPlaneConnect.getCTRL.
+        :raises ValueError: For another aircraft.
+        """
+        if ac != 0:
+            raise ValueError("The sim hub only publishes aircraft 0")
+        record = self._snapshot("ctrl")
+        return tuple(record[REC_CTRL : REC_CTRL + CTRL_FIELDS])
+
+    def getDREFs(self, drefs: list) -> list:
+        """
+        :param drefs: Dataref names, all published by the hub.
+        :return: List of value tuples, as returned by XPlaneConnect.getDREFs.
+        :raises ValueError: If a dataref is not published by the hub.
+        """
+        offsets = self.layout.offsets
+        missing = [dref for dref in drefs if dref not in offsets]
+        if missing:
+            raise ValueError(f"Datarefs not published by the sim hub: {missing}")
+        record = self._snapshot("drefs")
+        result = []
+        for dref in drefs:
+            offset, width = offsets[dref]
+            result.append(tuple(record[offset : offset + width]))
+        return result
+
+    def getDREF(self, dref: str) -> tuple:
+        """
+        :param dref: Dataref name.
+        :return: Value tuple of the dataref.
+        """
+        return self.getDREFs([dref])[0]
+
+    def close(self) -> None:
+        """
+        Detach from the hub.
+        """
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def __enter__(self) -> "HubClient":
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        self.close()
+
+
+def connect(
+    name: str = DEFAULT_NAME, multicast: tuple = MULTICAST_GROUP, timeout: float = 1.0
+):
+    """
+    Client for a monitor script: the sim hub if one is running, X-Plane otherwise.
+
+    :param name: Shared memory block name of the hub.
+    :param multicast: (group, port) of the hub, None to only look for its ring.
+    :param timeout: Longest wait for a hub snapshot (seconds).
+    :return: HubClient, or xpc.XPlaneConnect when no hub answered.
+    """
+    try:
+        client = HubClient(name=name, multicast=multicast, timeout=timeout)
+    except OSError as e:
+        logger.info("No sim hub reachable (%s), connecting to X-Plane directly", e)
+    else:
+        if client.ready():
+            return client
+        client.close()
+        logger.info("No sim hub answered within %.1f s, connecting to X-Plane directly", timeout)
+    import xpc
+
+    return xpc.XPlaneConnect()
+
+
+def main() -> None:
+    """
+    Command line entry point: publish X-Plane snapshots until interrupted.
+    """
+    parser = argparse.ArgumentParser(
+        description="Share one X-Plane connection with local readers"
+    )
+    parser.add_argument("--host", default="localhost", help="X-Plane host")
+    parser.add_argument("--port", type=int, default=49009, help="XPlaneConnect plugin port")
+    parser.add_argument(
+        "--rate", type=float, help="poll rate in Hz, as fast as X-Plane answers if omitted"
+    )
+    parser.add_argument(
+        "--no-multicast", action="store_true", help="publish to shared memory only"
+    )
+    args = parser.parse_args()
+
+    import xpc
+
+    hub = SimHub(
+        xpc.XPlaneConnect(args.host, args.port),
+        multicast=None if args.no_multicast else MULTICAST_GROUP,
+        rate_hz=args.rate,
+    )
+    hub.start()
+    try:
+        while hub.running:
+            time.sleep(5.0)
+            logger.info(
+                "Sim hub: %s, %d timeouts",
+                hub.stage.stats.summary(time.perf_counter()),
+                hub.timeouts,
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        hub.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
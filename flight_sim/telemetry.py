@@ -0,0 +1,275 @@
+import logging
+import threading
+import time
+from array import array
+from typing import Callable
+
+logger = logging.getLogger("telemetry")
+
+# Record kinds
+COMMAND = 0
+FEEDBACK = 1
+
+# Each record is eight native float64 values:
+#   timestamp, kind, node_id, v0, v1, v2, v3, v4
+# COMMAND:  target_mm, current_limit_a, target_speed_pct, movement_profile, enable
+# FEEDBACK: position_mm, current_a, speed_pct, motion_flags, error_flags
+RECORD_FIELDS = 8
+RECORD_BYTES = RECORD_FIELDS * 8
+
+
+class TelemetrySink:
+    """
+    Low-overhead recorder for actuator command and feedback tuples.
+
+    Records are written as numbers into a preallocated buffer; a background
+    thread swaps buffers, appends the filled one to a binary file and emits a
+    human-readable per-node summary at a lower rate. When the buffer fills up
+    before a flush, new records are dropped and counted rather than allocating.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        capacity: int = 4096,
+        flush_interval: float = 0.5,
+        summary_interval: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initialize the sink.
+
+        :param path: Binary output file, or None to keep only the summaries.
+        :param capacity: Records held between two flushes.
+        :param flush_interval: Time between background flushes (seconds).
+        :param summary_interval: Time between log summaries (seconds), 0 disables them.
+        :param clock: Time source for record timestamps.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.summary_interval = summary_interval
+        self.clock = clock
+        self.records_written = 0
+        self.dropped = 0
+        size = capacity * RECORD_FIELDS
+        self._active = array("d", bytes(8 * size))
+        self._spare = array("d", bytes(8 * size))
+        self._count = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._file = None
+        self._last_summary = None
+        # node_id -> [last command record, last feedback record, commands, feedbacks]
+        self._nodes = {}
+
+    def start(self) -> None:
+        """
+        Open the output file and start the background flush thread.
+        """
+        if self._thread is not None:
+            return
+        if self.path is not None:
+            self._file = open(self.path, "ab")
+        self._last_summary = self.clock()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="telemetry-flush", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background thread, flush remaining records and close the file.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "TelemetrySink":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def _record(
+        self,
+        kind: int,
+        node_id: int,
+        v0: float,
+        v1: float,
+        v2: float,
+        v3: float,
+        v4: float,
+    ) -> None:
+        """
+        Store one record in the active buffer.
+        """
+        t = self.clock()
+        with self._lock:
+            idx = self._count
+            if idx >= self.capacity:
+                self.dropped += 1
+                return
+            buf = self._active
+            base = idx * RECORD_FIELDS
+            buf[base] = t
+            buf[base + 1] = kind
+            buf[base + 2] = node_id
+            buf[base + 3] = v0
+            buf[base + 4] = v1
+            buf[base + 5] = v2
+            buf[base + 6] = v3
+            buf[base + 7] = v4
+            self._count = idx + 1
+
+    def record_command(
+        self,
+        node_id: int,
+        target_position_mm: float,
+        current_limit_a: float,
+        target_speed_pct: float,
+        movement_profile: int,
+        enable_motion: bool,
+    ) -> None:
+        """
+        Record an RPDO command sent to an actuator.
+
+        :param node_id: CANopen node ID.
+        :param target_position_mm: Target position (mm).
+        :param current_limit_a: Current limit (A).
+        :param target_speed_pct: Target speed (%).
+        :param movement_profile: Movement profile.
+        :param enable_motion: Motion enable bit.
+        """
+        self._record(
+            COMMAND,
+            node_id,
+            target_position_mm,
+            current_limit_a,
+            target_speed_pct,
+            movement_profile,
+            enable_motion,
+        )
+
+    def record_feedback(
+        self,
+        node_id: int,
+        position_mm: float,
+        current_a: float,
+        speed_pct: float,
+        motion_flags: int,
+        error_flags: int,
+    ) -> None:
+        """
+        Record TPDO feedback received from an actuator.
+
+        :param node_id: CANopen node ID.
+        :param position_mm: Measured position (mm).
+        :param current_a: Measured current (A).
+        :param speed_pct: Measured speed (%).
+        :param motion_flags: Motion flags byte.
+        :param error_flags: Error flags byte.
+        """
+        self._record(
+            FEEDBACK, node_id, position_mm, current_a, speed_pct, motion_flags, error_flags
+        )
+
+    def flush(self) -> int:
+        """
+        Write buffered records to the file and update the summary state.
+
+        :return: Number of records flushed.
+        """
+        with self._flush_lock:
+            with self._lock:
+                buf, count = self._active, self._count
+                self._active, self._spare = self._spare, buf
+                self._count = 0
+            if not count:
+                return 0
+            if self._file is not None:
+                self._file.write(memoryview(buf).cast("B")[: count * RECORD_BYTES])
+                self._file.flush()
+            self._update_nodes(buf, count)
+            self.records_written += count
+            return count
+
+    def _update_nodes(self, buf: array, count: int) -> None:
+        """
+        Track the latest command and feedback per node from flushed records.
+
+        :param buf: Flushed buffer.
+        :param count: Number of valid records in the buffer.
+        """
+        for i in range(count):
+            base = i * RECORD_FIELDS
+            node_id = int(buf[base + 2])
+            entry = self._nodes.get(node_id)
+            if entry is None:
+                entry = self._nodes[node_id] = [None, None, 0, 0]
+            kind = int(buf[base + 1])
+            entry[kind] = tuple(buf[base : base + RECORD_FIELDS])
+            entry[2 + kind] += 1
+
+    def summary(self) -> list:
+        """
+        Build human-readable lines describing the latest state of each node.
+
+        :return: List of summary strings, one per node.
+        """
+        lines = []
+        for node_id in sorted(self._nodes):
+            command, feedback, n_cmd, n_fb = self._nodes[node_id]
+            target = "-" if command is None else f"{command[3]:.1f}mm"
+            if feedback is None:
+                measured = "-"
+            else:
+                measured = (
+                    f"{feedback[3]:.1f}mm {feedback[4]:.1f}A "
+                    f"motion=0x{int(feedback[6]):02X} error=0x{int(feedback[7]):02X}"
+                )
+            lines.append(
+                f"Node {node_id}: target={target} feedback={measured} "
+                f"({n_cmd} commands, {n_fb} feedbacks)"
+            )
+        return lines
+
+    def _run(self) -> None:
+        """
+        Background loop: flush periodically and log summaries at a lower rate.
+        """
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            now = self.clock()
+            if self.summary_interval and now - self._last_summary >= self.summary_interval:
+                self._last_summary = now
+                for line in self.summary():
+                    logger.info(line)
+                if self.dropped:
+                    logger.warning("Telemetry dropped %d records", self.dropped)
+
+
+def read_telemetry(path: str) -> list:
+    """
+    Read a binary telemetry file written by TelemetrySink.
+
+    :param path: Path of the file.
+    :return: List of (timestamp, kind, node_id, v0, v1, v2, v3, v4) tuples.
+    """
+    data = array("d")
+    with open(path, "rb") as f:
+        data.frombytes(f.read())
+    return [
+        tuple(data[i : i + RECORD_FIELDS]) for i in range(0, len(data), RECORD_FIELDS)
+    ]
@@ -0,0 +1,204 @@
+import time
+
+import can
+import canopen
+import pytest
+from canopen.objectdictionary import UNSIGNED8, UNSIGNED16, ObjectDictionary, ODRecord, ODVariable
+
+import electrak
+from bus_monitor import BusMonitor, CyclicJitterMonitor, frame_bits, measure_cyclic_jitter
+
+
+def make_msg(cob_id, data, ts, is_error=False):
+    return can.Message(
+        timestamp=ts,
+        arbitration_id=cob_id,
+        is_extended_id=False,
+        is_error_frame=is_error,
+        data=data,
+    )
+
+
+def test_unit_frame_bits_worst_case():
+    # 8-byte standard frame: 111 bits plus 24 stuff bits
+    assert frame_bits(8) == 135
+    assert frame_bits(0) == 55
+    assert frame_bits(8, extended=True) > frame_bits(8)
+
+
+def test_unit_bus_load_and_node_rates():
+    clock = [10.0]
+    monitor = BusMonitor(bitrate=500000, window=1.0, clock=lambda: clock[0])
+    for i in range(100):
+        ts = 9.0 + (i + 1) * 0.01
+        monitor.on_message_received(make_msg(0x201, bytes(8), ts))
+        monitor.on_message_received(make_msg(0x182, bytes(8), ts))
+
+    stats = monitor.stats()
+    assert stats["frames_per_second"] == pytest.approx(200.0)
+    assert stats["node_frames_per_second"] == {1: 100.0, 2: 100.0}
+    assert stats["bus_load_pct"] == pytest.approx(100 * 200 * 135 / 500000)
+
+    clock[0] = 20.0
+    assert monitor.bus_load() == 0.0
+
+
+def test_unit_error_frames_are_counted():
+    monitor = BusMonitor(clock=lambda: 1.0)
+    monitor.on_message_received(make_msg(0x0, b"", 0.5, is_error=True))
+
+    stats = monitor.stats()
+    assert stats["error_frames"] == 1
+    assert stats["error_frames_per_second"] == 1.0
+    assert stats["node_frames_per_second"] == {}
+
+
+def test_unit_feedback_latency_matches_changed_tpdo():
+    monitor = BusMonitor(clock=lambda: 1.0)
+    command = bytes([0xE8, 0x03, 0x7D, 0x00, 0x20, 0x03, 0x00, 0x01])
+    monitor.on_message_received(make_msg(0x181, bytes(8), 0.0))  # initial feedback
+    monitor.on_message_received(make_msg(0x201, command, 0.100))
+    monitor.on_message_received(make_msg(0x201, command, 0.150))  # keep-alive
+    monitor.on_message_received(make_msg(0x181, bytes(8), 0.160))  # unchanged
+    monitor.on_message_received(make_msg(0x181, b"\x01" + bytes(7), 0.130 + 0.1))
+
+    summary = monitor.feedback_latency.summary()
+    assert summary["count"] == 1
+    assert summary["max"] == pytest.approx(0.130)
+
+
+def test_integration_monitor_on_virtual_bus():
+    network = electrak.connect_can_network(channel="monitor_test", interface="virtual")
+    actuator = can.Bus(interface="virtual", channel="monitor_test")
+    monitor = BusMonitor(window=5.0)
+    try:
+        monitor.attach(network)
+        network.send_message(0x213, bytes([0xE8, 0x03, 0x7D, 0x00, 0x20, 0x03, 0x00, 0x01]))
+        assert actuator.recv(timeout=1.0).arbitration_id == 0x213
+        actuator.send(can.Message(arbitration_id=0x193, is_extended_id=False, data=b"\x10" + bytes(7)))
+
+        deadline = time.time() + 2.0
+        while monitor.feedback_latency.count == 0 and time.time() < deadline:
+            time.sleep(0.001)
+
+        stats = monitor.stats()
+        assert stats["node_frames_per_second"][0x13] == pytest.approx(2 / 5.0)
+        assert stats["feedback_latency"]["count"] == 1
+        assert 0.0 <= stats["feedback_latency"]["max"] < 1.0
+    finally:
+        monitor.detach()
+        actuator.shutdown()
+        network.disconnect()
+
+
+class FakeRpdo:
+    """RPDO map whose start hands its frame to the network like canopen's PdoMap."""
+
+    def __init__(self, network, cob_id):
+        self.network = network
+        self.cob_id = cob_id
+        self._task = None
+
+    def start(self, period):
+        self._task = self.network.send_periodic(self.cob_id, bytes(8), period)
+
+    def stop(self):
+        self._task.stop()
+
+
+def electrak_node(network, node_id):
+    """Remote node with the Electrak RPDO1 layout, mapped locally instead of from the EDS."""
+    od = ObjectDictionary()
+    od.add_object(ODRecord("RPDO1 communication parameter", 0x1400))
+    od.add_object(ODRecord("RPDO1 mapping parameter", 0x1600))
+    fields = [
+        ("Target Position", UNSIGNED16),
+        ("Current Limit", UNSIGNED16),
+        ("Target Speed", UNSIGNED16),
+        ("Movement Profile", UNSIGNED8),
+        ("Control Bits", UNSIGNED8),
+    ]
+    for offset, (name, data_type) in enumerate(fields):
+        variable = ODVariable(name, 0x2001 + offset)
+        variable.data_type = data_type
+        variable.access_type = "rw"
+        od.add_object(variable)
+    node = canopen.RemoteNode(node_id, od)
+    network.add_node(node)
+    rpdo = node.rpdo[1]
+    rpdo.clear()
+    for name, _ in fields:
+        rpdo.add_variable(name)
+    rpdo.cob_id = 0x200 + node_id
+    rpdo.enabled = True
+    return node
+
+
+def test_integration_monitor_counts_unseen_cyclic_rpdo():
+    network = electrak.connect_can_network(channel="cyclic_load_test", interface="virtual")
+    sniffer = can.Bus(interface="virtual", channel="cyclic_load_test")
+    monitor = BusMonitor(window=1.0)
+    node = electrak_node(network, 3)
+    try:
+        monitor.attach(network)
+        electrak.move_actuator(node, 10.0)
+        assert not electrak.start_cyclic_rpdo(node, 0.01)
+        # A new command goes out at once and becomes the cyclic payload
+        electrak.move_actuator(node, 20.0)
+        while sniffer.recv(timeout=1.0).data[:2] != b"\xc8\x00":
+            pass
+        assert all(sniffer.recv(timeout=1.0).data[:2] == b"\xc8\x00" for _ in range(3))
+
+        [(msg, period)] = electrak.unmonitored_cyclic_messages(network)
+        assert msg.arbitration_id == 0x203 and period == 0.01
+        stats = monitor.stats()
+        assert stats["cyclic_frames_per_second"] == pytest.approx(100.0)
+        # The two commands went through send_message and were seen directly
+        assert stats["node_frames_per_second"][3] == pytest.approx(102.0)
+        assert stats["bus_load_pct"] == pytest.approx(100.0 * 102 * frame_bits(8) / electrak.CAN_BITRATE)
+
+        electrak.stop_cyclic_rpdo(node)
+        assert electrak.unmonitored_cyclic_messages(network) == []
+        assert monitor.stats()["cyclic_frames_per_second"] == 0.0
+    finally:
+        monitor.detach()
+        sniffer.shutdown()
+        network.disconnect()
+
+
+def test_unit_cyclic_jitter_monitor_times_rpdo_intervals():
+    monitor = CyclicJitterMonitor(0.1)
+    for ts in (0.0, 0.1, 0.2, 0.35):
+        monitor.on_message_received(make_msg(0x201, bytes(8), ts))
+    monitor.on_message_received(make_msg(0x181, bytes(8), 0.4))  # feedback, ignored
+    monitor.on_message_received(make_msg(0x202, bytes(8), 0.4))  # first frame of node 2
+
+    summary = monitor.summary()
+    assert summary["jitter"]["count"] == 3
+    assert summary["jitter"]["max"] == pytest.approx(0.05)
+    assert summary["max_interval"] == pytest.approx(0.15)
+
+
+def test_integration_cyclic_rpdo_falls_back_to_thread_on_virtual_bus(mocker):
+    network = electrak.connect_can_network(channel="cyclic_test", interface="virtual")
+    sniffer = can.Bus(interface="virtual", channel="cyclic_test")
+    node = mocker.Mock()
+    node.id = 1
+    node.rpdo = {1: FakeRpdo(network, 0x201)}
+    try:
+        assert not electrak.start_cyclic_rpdo(node, 0.01)
+        frames = [sniffer.recv(timeout=1.0) for _ in range(3)]
+        electrak.stop_cyclic_rpdo(node)
+        assert all(msg.arbitration_id == 0x201 for msg in frames)
+        assert frames[2].timestamp - frames[0].timestamp == pytest.approx(0.02, abs=0.015)
+    finally:
+        sniffer.shutdown()
+        network.disconnect()
+
+
+def test_integration_measure_cyclic_jitter_on_virtual_bus():
+    result = measure_cyclic_jitter(channel="jitter_test", period=0.01, duration=0.3, load=False)
+
+    assert not result["offloaded"]
+    assert result["jitter"]["count"] > 6 * 10
+    assert result["max_interval"] < 0.5
@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+
+import vector_kinematics as vk
+from calibration import (
+    calibrate,
+    calibrate_from_file,
+    load_samples,
+    positions_to_lengths,
+    save_samples,
+)
+from design_explorer import neutral_height
+from geometry import RIG_GEOMETRY, Geometry
+from Position import Position
+
+
+def random_poses(count, seed=0):
+    rng = np.random.default_rng(seed)
+    height = neutral_height(Geometry(**RIG_GEOMETRY))
+    psi = rng.uniform(-0.08, 0.08, count)
+    theta = rng.uniform(-0.08, 0.08, count)
+    phi = rng.uniform(-0.08, 0.08, count)
+    T = rng.uniform(-0.03, 0.03, (count, 3)) + [0.0, 0.0, height]
+    return psi, theta, phi, T
+
+
+def true_geometry(seed=1):
+    """Rig geometry with millimeter-scale build errors."""
+    rng = np.random.default_rng(seed)
+    nominal = Geometry(**RIG_GEOMETRY)
+    true = Geometry(**RIG_GEOMETRY)
+    true.set_attachment_points(
+        np.asarray(nominal.p) + rng.normal(0.0, 0.003, (6, 3)),
+        np.asarray(nominal.b) + rng.normal(0.0, 0.003, (6, 3)),
+        rng.normal(0.0, 0.004, 6),
+    )
+    return nominal, true
+
+
+def test_unit_calibration_recovers_perturbed_geometry():
+    nominal, true = true_geometry()
+    psi, theta, phi, T = random_poses(400)
+    rng = np.random.default_rng(2)
+    measured = vk.leg_lengths(true, psi, theta, phi, T) + rng.normal(0.0, 0.0001, (400, 6))
+
+    corrected, report = calibrate(nominal, psi, theta, phi, T, measured)
+
+    assert max(report["rms_before_m"]) > 0.002
+    assert max(report["rms_after_m"]) < 0.00015
+    assert nominal.leg_offsets == [0.0] * 6  # the nominal geometry is untouched
+    # Held-out poses match the true rig to well under a millimeter
+    check = random_poses(100, seed=3)
+    error = vk.leg_lengths(corrected, *check) - vk.leg_lengths(true, *check)
+    assert np.abs(error).max() < 0.0003
+
+
+def test_unit_calibrated_geometry_drives_inverse_kinematics():
+    nominal, true = true_geometry()
+    psi, theta, phi, T = random_poses(200)
+    measured = vk.leg_lengths(true, psi, theta, phi, T)
+    corrected, _ = calibrate(nominal, psi, theta, phi, T, measured)
+
+    pos = Position(mid_height=T[0, 2])
+    pos.psi, pos.theta, pos.phi = psi[0], theta[0], phi[0]
+    pos.T = list(T[0])
+    assert corrected.inverse_kinematics(pos) == pytest.approx(list(measured[0]), abs=1e-5)
+
+
+def test_unit_consistent_samples_keep_nominal_geometry():
+    nominal = Geometry(**RIG_GEOMETRY)
+    psi, theta, phi, T = random_poses(50)
+    measured = vk.leg_lengths(nominal, psi, theta, phi, T)
+
+    corrected, report = calibrate(nominal, psi, theta, phi, T, measured)
+
+    assert np.allclose(corrected.p, nominal.p, atol=1e-9)
+    assert np.allclose(corrected.b, nominal.b, atol=1e-9)
+    assert max(report["rms_after_m"]) < 1e-9
+
+
+def test_unit_calibration_is_fast():
+    nominal, true = true_geometry()
+    psi, theta, phi, T = random_poses(2000)
+    measured = vk.leg_lengths(true, psi, theta, phi, T)
+
+    _, report = calibrate(nominal, psi, theta, phi, T, measured)
+
+    assert report["seconds"] < 1.0
+
+
+def test_unit_calibration_rejects_mismatched_samples():
+    nominal = Geometry(**RIG_GEOMETRY)
+    psi, theta, phi, T = random_poses(10)
+    with pytest.raises(ValueError):
+        calibrate(nominal, psi, theta, phi, T, np.zeros((9, 6)))
+    with pytest.raises(ValueError):
+        calibrate(nominal, [], [], [], np.zeros((0, 3)), np.zeros((0, 6)))
+
+
+def test_unit_set_attachment_points_validates_counts():
+    geometry = Geometry(**RIG_GEOMETRY)
+    with pytest.raises(ValueError):
+        geometry.set_attachment_points(geometry.p[:5], geometry.b)
+    with pytest.raises(ValueError):
+        geometry.set_attachment_points(geometry.p, geometry.b, [0.0] * 5)
+
+
+def test_unit_stroke_positions_are_rejected_as_lengths():
+    nominal, true = true_geometry()
+    psi, theta, phi, T = random_poses(50)
+    stroke = vk.leg_lengths(true, psi, theta, phi, T) - nominal.act_min
+    with pytest.raises(ValueError, match="positions_to_lengths"):
+        calibrate(nominal, psi, theta, phi, T, stroke)
+
+
+def test_integration_calibrate_from_saved_stroke_samples(tmp_path):
+    nominal, true = true_geometry()
+    psi, theta, phi, T = random_poses(200)
+    lengths = vk.leg_lengths(true, psi, theta, phi, T)
+    # The TPDO reports stroke from the retracted length, as the file stores it
+    stroke = lengths - nominal.act_min
+    assert stroke.max() < nominal.act_range
+    path = str(tmp_path / "samples.npz")
+    save_samples(path, psi, theta, phi, T, stroke)
+
+    loaded = load_samples(path)
+    corrected, report = calibrate_from_file(nominal, path)
+
+    assert np.array_equal(loaded[4], stroke)
+    assert np.allclose(positions_to_lengths(nominal, stroke), lengths)
+    assert report["samples"] == 200
+    assert max(report["rms_after_m"]) < 0.0001
+    # Base points land near the true ones, well inside their 3 mm build error
+    base_error = np.linalg.norm(np.asarray(corrected.b) - np.asarray(true.b), axis=1)
+    assert base_error.max() < 0.003
+    assert np.abs(np.subtract(corrected.leg_offsets, true.leg_offsets)).max() < 0.003
+    # The corrected IK still returns leg lengths
+    check = random_poses(100, seed=3)
+    error = vk.leg_lengths(corrected, *check) - vk.leg_lengths(true, *check)
+    assert np.abs(error).max() < 0.0003
@@ -0,0 +1,146 @@
+import time
+
+import can
+import pytest
+
+import electrak
+from can_capture import (
+    MAGIC,
+    RECORD,
+    REPLAY_CHANNEL,
+    CanRecorder,
+    export_candump,
+    import_candump,
+    main,
+    pack_frame,
+    read_capture,
+    replay,
+    unpack_frame,
+)
+
+
+def make_msg(cob_id, data, ts, is_rx=True):
+    return can.Message(
+        timestamp=ts, arbitration_id=cob_id, is_extended_id=False, data=data, is_rx=is_rx
+    )
+
+
+def write_capture(path, frames):
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        for msg in frames:
+            f.write(pack_frame(msg))
+
+
+def test_unit_record_round_trip():
+    msg = make_msg(0x213, [0xE8, 0x03, 0x7D], 12.5, is_rx=False)
+    decoded = unpack_frame(pack_frame(msg))
+    assert decoded.equals(msg, timestamp_delta=0)
+    assert not decoded.is_rx
+    assert RECORD.size == 22
+
+
+def test_unit_read_capture_ignores_truncated_tail(tmp_path):
+    path = tmp_path / "session.fscan"
+    write_capture(path, [make_msg(0x181, bytes(8), i * 0.01) for i in range(3)])
+    with open(path, "ab") as f:
+        f.write(b"\x00" * 5)
+
+    frames = list(read_capture(str(path)))
+    assert [m.timestamp for m in frames] == [0.0, 0.01, 0.02]
+
+
+def test_unit_candump_conversion_round_trip(tmp_path):
+    path = tmp_path / "session.fscan"
+    frames = [make_msg(0x181 + i, bytes([i] * 8), 1000.0 + i * 0.1) for i in range(4)]
+    write_capture(path, frames)
+
+    log_path = tmp_path / "session.log"
+    assert export_candump(str(path), str(log_path), channel="can0") == 4
+    first_line = log_path.read_text().splitlines()[0]
+    assert first_line == "(1000.000000) can0 181#0000000000000000 R"
+
+    back = tmp_path / "back.fscan"
+    assert import_candump(str(log_path), str(back)) == 4
+    for original, restored in zip(frames, read_capture(str(back))):
+        assert restored.arbitration_id == original.arbitration_id
+        assert restored.data == original.data
+        assert restored.timestamp == pytest.approx(original.timestamp)
+
+
+def test_unit_cli_imports_candump_log(tmp_path):
+    log_path = tmp_path / "session.log"
+    log_path.write_text("(1000.000000) can0 181#0102030405060708 R\n")
+    out = tmp_path / "session.fscan"
+
+    main(["import", str(log_path), str(out)])
+
+    (msg,) = read_capture(str(out))
+    assert msg.arbitration_id == 0x181
+    assert msg.data == bytes(range(1, 9))
+
+
+def test_mocked_cli_replays_onto_virtual_can_by_default(tmp_path, mocker):
+    path = tmp_path / "session.fscan"
+    write_capture(path, [])
+    bus = mocker.patch("can_capture.can.Bus")
+
+    main(["replay", str(path), "--speed", "0"])
+
+    bus.assert_called_once_with(interface="socketcan", channel=REPLAY_CHANNEL)
+    assert REPLAY_CHANNEL != electrak.CAN_INTERFACE
+
+
+def test_unit_replay_honours_speed_and_direction(mocker):
+    bus = mocker.Mock()
+    frames = [make_msg(0x181, bytes(8), i * 0.02, is_rx=i % 2 == 0) for i in range(6)]
+
+    result = replay(frames, bus, speed=2.0, include_tx=False)
+    assert result["frames"] == 3
+    assert bus.send.call_count == 3
+    # 40 ms of capture between the first and last rx frame at 2x speed
+    assert result["elapsed"] >= 0.02
+
+    fast = replay(frames, mocker.Mock(), speed=0)
+    assert fast["frames"] == 6
+    assert fast["elapsed"] < 0.02
+
+
+def test_integration_record_and_replay_on_virtual_bus(tmp_path):
+    path = tmp_path / "session.fscan"
+    network = electrak.connect_can_network(channel="capture_src", interface="virtual")
+    actuator = can.Bus(interface="virtual", channel="capture_src")
+    recorder = CanRecorder(str(path))
+    try:
+        recorder.attach(network)
+        network.send_message(0x213, bytes([0xE8, 0x03, 0x7D, 0x00, 0x20, 0x03, 0x00, 0x01]))
+        for i in range(50):
+            actuator.send(make_msg(0x193, bytes([i, 0, 0, 0, 0, 0, 0, 0]), 0.0))
+        deadline = time.time() + 2.0
+        while recorder.frames < 51 and time.time() < deadline:
+            time.sleep(0.005)
+    finally:
+        recorder.stop()
+        actuator.shutdown()
+        network.disconnect()
+
+    frames = list(read_capture(str(path)))
+    assert len(frames) == 51
+    assert sum(not m.is_rx for m in frames) == 1
+
+    # Replay the feedback at full speed into a second network
+    received = []
+    target = electrak.connect_can_network(channel="capture_dst", interface="virtual")
+    target.subscribe(0x193, lambda can_id, data, ts: received.append(data[0]))
+    source = can.Bus(interface="virtual", channel="capture_dst")
+    try:
+        result = replay(frames, source, speed=0, include_tx=False)
+        deadline = time.time() + 2.0
+        while len(received) < 50 and time.time() < deadline:
+            time.sleep(0.005)
+    finally:
+        source.shutdown()
+        target.disconnect()
+
+    assert result["frames"] == 50
+    assert received == list(range(50))
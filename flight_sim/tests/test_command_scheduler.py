@@ -0,0 +1,178 @@
+import pytest
+
+import electrak
+from command_scheduler import CommandScheduler
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(mocker, **kwargs):
+    clock = FakeClock()
+    send = mocker.Mock()
+    scheduler = CommandScheduler(clock=clock, send=send, **kwargs)
+    return scheduler, clock, send
+
+
+def make_node(mocker, node_id):
+    node = mocker.Mock()
+    node.id = node_id
+    return node
+
+
+def test_unit_first_command_is_always_sent(mocker):
+    scheduler, clock, send = make_scheduler(mocker)
+    node = make_node(mocker, 1)
+
+    assert scheduler.submit(node, 100.0)
+    send.assert_called_once()
+    assert send.call_args.args == (node, 100.0)
+
+
+def test_unit_change_beyond_deadband_is_sent_immediately(mocker):
+    scheduler, clock, send = make_scheduler(mocker, deadband_mm=0.5)
+    node = make_node(mocker, 1)
+    scheduler.submit(node, 100.0)
+
+    clock.now = 0.01
+    assert not scheduler.submit(node, 100.4)
+    assert scheduler.submit(node, 100.6)
+    assert send.call_count == 2
+    assert scheduler.frames_suppressed == 1
+
+
+def test_unit_unchanged_target_is_refreshed_at_keep_alive_period(mocker):
+    scheduler, clock, send = make_scheduler(mocker, refresh_period=0.1)
+    node = make_node(mocker, 1)
+    scheduler.submit(node, 100.0)
+
+    sent = []
+    for step in range(1, 21):
+        clock.now = step * 0.01
+        sent.append(scheduler.submit(node, 100.0))
+
+    # Over 200 ms at a 10 ms tick only the two keep-alives go out
+    assert sum(sent) == 2
+    assert sent[9] and sent[19]
+
+
+def test_unit_keep_alive_sends_latest_target_inside_deadband(mocker):
+    scheduler, clock, send = make_scheduler(mocker, deadband_mm=1.0)
+    node = make_node(mocker, 1)
+    scheduler.submit(node, 100.0)
+
+    clock.now = electrak.RPDO_REFRESH_PERIOD_S
+    assert scheduler.submit(node, 100.3)
+    assert send.call_args.args == (node, 100.3)
+
+
+def test_unit_setting_change_forces_send(mocker):
+    scheduler, clock, send = make_scheduler(mocker)
+    node = make_node(mocker, 1)
+    scheduler.submit(node, 100.0)
+
+    assert scheduler.submit(node, 100.0, enable_motion=False)
+    assert send.call_args.kwargs["enable_motion"] is False
+
+
+def test_unit_nodes_are_scheduled_independently(mocker):
+    scheduler, clock, send = make_scheduler(mocker)
+    nodes = {i: make_node(mocker, i) for i in range(1, 7)}
+
+    assert scheduler.submit_all(nodes, {i: 50.0 for i in nodes}) == 6
+    clock.now = 0.01
+    targets = {i: 50.0 for i in nodes}
+    targets[3] = 60.0
+    assert scheduler.submit_all(nodes, targets) == 1
+    assert send.call_args.args == (nodes[3], 60.0)
+
+
+def test_unit_frames_per_second_uses_rolling_window(mocker):
+    # Binary-exact tick and period keep the keep-alive phase deterministic
+    scheduler, clock, send = make_scheduler(mocker, refresh_period=0.125)
+    nodes = {i: make_node(mocker, i) for i in range(1, 7)}
+
+    for step in range(256):
+        clock.now = step / 64
+        scheduler.submit_all(nodes, {i: 50.0 for i in nodes})
+
+    # Six nodes held still at 8 Hz keep-alive
+    assert scheduler.frames_per_second() == pytest.approx(48.0)
+    clock.now += 5.0
+    assert scheduler.frames_per_second() == 0.0
+
+
+def test_unit_refresh_period_must_beat_pdo_timeout():
+    with pytest.raises(ValueError):
+        CommandScheduler(refresh_period=electrak.PDO_TIMEOUT_S)
+    with pytest.raises(ValueError):
+        CommandScheduler(refresh_period=0.0)
+
+
+def test_mocked_default_send_uses_move_actuator(mocker):
+    move = mocker.patch("electrak.move_actuator")
+    scheduler = CommandScheduler()
+    node = make_node(mocker, 4)
+
+    scheduler.submit(node, 25.0)
+    move.assert_called_once()
+    assert move.call_args.args == (node, 25.0)
+
+
+def test_unit_cyclic_period_hands_keepalive_to_cyclic_task(mocker):
+    start = mocker.patch("electrak.start_cyclic_rpdo", return_value=True)
+    scheduler, clock, send = make_scheduler(mocker, cyclic_period=0.1)
+    node = make_node(mocker, 1)
+
+    assert scheduler.submit(node, 100.0)
+    start.assert_called_once_with(node, 0.1)
+    clock.now = 1.0
+    assert not scheduler.submit(node, 100.0)  # no keep-alive from the loop
+    assert scheduler.submit(node, 120.0)  # changes still go out at once
+    assert send.call_count == 2
+    assert start.call_count == 1
+    assert scheduler.cyclic_nodes() == {1: True}
+
+
+def test_unit_stop_cyclic_restores_loop_keepalive(mocker):
+    start = mocker.patch("electrak.start_cyclic_rpdo", return_value=False)
+    stop = mocker.patch("electrak.stop_cyclic_rpdo")
+    scheduler, clock, send = make_scheduler(mocker, cyclic_period=0.1, refresh_period=0.1)
+    node = make_node(mocker, 1)
+    scheduler.submit(node, 100.0)
+
+    scheduler.stop_cyclic()
+
+    stop.assert_called_once_with(node)
+    assert scheduler.cyclic_nodes() == {}
+    clock.now = 0.2
+    assert scheduler.submit(node, 100.0)
+    assert scheduler.submit(node, 120.0)
+    assert start.call_count == 1  # changed targets do not bring the task back
+    assert scheduler.cyclic_nodes() == {}
+
+
+def test_unit_frames_per_second_counts_cyclic_keepalives(mocker):
+    mocker.patch("electrak.start_cyclic_rpdo", return_value=True)
+    mocker.patch("electrak.stop_cyclic_rpdo")
+    scheduler, clock, send = make_scheduler(mocker, cyclic_period=0.1, rate_window=1.0)
+    nodes = {i: make_node(mocker, i) for i in range(1, 7)}
+    scheduler.submit_all(nodes, {i: 50.0 for i in nodes})
+
+    clock.now = 2.0
+    # The first commands fell out of the window; six tasks repeat at 10 Hz
+    assert scheduler.frames_per_second() == pytest.approx(60.0)
+    scheduler.stop_cyclic()
+    assert scheduler.frames_per_second() == 0.0
+
+
+def test_unit_cyclic_period_must_beat_pdo_timeout():
+    with pytest.raises(ValueError):
+        CommandScheduler(cyclic_period=electrak.PDO_TIMEOUT_S)
@@ -0,0 +1,112 @@
+import csv
+
+import numpy as np
+import pytest
+
+import design_explorer
+import vector_kinematics as vk
+from design_explorer import (
+    candidates,
+    evaluate,
+    explore,
+    flight_stroke,
+    neutral_height,
+    rank,
+    workspace_grid,
+    write_report,
+)
+from geometry import RIG_GEOMETRY, Geometry
+
+
+def write_log(path, count):
+    lines = []
+    for i in range(count):
+        ms = 50 * i
+        stamp = f"2025-03-01 12:00:{ms // 1000:02d},{ms % 1000:03d}"
+        values = [60.0, 60000.0, 3000.0 * (-1) ** i] + [0.0] * 7 + [6000.0, 0.02, 90.0, -0.01, 0.0]
+        lines.append(stamp + " " + ",".join(map(str, values + [100.0 + ms / 1000])))
+    path.write_text("\n".join(lines) + "\n")
+
+
+def test_unit_neutral_height_puts_legs_at_mid_stroke():
+    geometry = Geometry(**RIG_GEOMETRY)
+    height = neutral_height(geometry)
+    lengths = vk.leg_lengths(
+        geometry, np.zeros(1), np.zeros(1), np.zeros(1), np.array([[0.0, 0.0, height]])
+    )
+    assert lengths[0] == pytest.approx([geometry.mid_length] * 6)
+
+
+def test_unit_condition_number_is_finite_and_symmetric_at_home():
+    geometry = Geometry(**RIG_GEOMETRY)
+    home = np.array([[0.0, 0.0, neutral_height(geometry)]])
+    tilted = home + [[0.02, 0.0, 0.0]]
+    zero = np.zeros(1)
+    at_home = vk.condition_numbers(geometry, zero, zero, zero, home)[0]
+    assert 1.0 <= at_home < 100.0
+    assert vk.condition_numbers(geometry, zero, zero, zero, tilted)[0] != at_home
+
+
+def test_unit_envelope_grows_with_stroke():
+    short = evaluate({**RIG_GEOMETRY, "range_val": 0.2})
+    long = evaluate({**RIG_GEOMETRY, "range_val": 0.4})
+    for dof in design_explorer.DOFS:
+        assert short[f"{dof}_min"] <= 0.0 <= short[f"{dof}_max"]
+        assert long[f"{dof}_max"] >= short[f"{dof}_max"]
+    assert long["reachable"] > short["reachable"]
+    assert len(workspace_grid(np.zeros(6), steps=3)) == 3**6
+
+
+def test_unit_invalid_candidates_are_reported_and_ranked_last():
+    rows = explore(
+        {"mid_length": [0.5, RIG_GEOMETRY["mid_length"]]}, workers=1, workspace={"steps": 3}
+    )
+    assert rows[0]["mid_length"] == RIG_GEOMETRY["mid_length"]
+    assert "error" in rows[1] and rows[1]["rank"] == 2
+    with pytest.raises(ValueError):
+        candidates({"not_a_parameter": [1.0]})
+
+
+def test_unit_invalid_candidates_rank_after_ones_that_miss_the_flights():
+    broken = {"error": "bad"}
+    short = {"reachable": 0.5, "condition_median": 3.0, "stroke_fits": False}
+    fits = {"reachable": 0.2, "condition_median": 4.0, "stroke_fits": True}
+    assert rank([broken, short, fits]) == [fits, short, broken]
+    assert broken["rank"] == 3
+
+
+def test_unit_flight_stroke_covers_replayed_poses():
+    geometry = Geometry(**RIG_GEOMETRY)
+    home = np.array([0.0, 0.0, neutral_height(geometry), 0.0, 0.0, 0.0])
+    poses = np.zeros((2, 6))
+    poses[1, 2] = 0.05
+    stroke = flight_stroke(geometry, poses, home)
+    absolute = poses + home
+    lengths = vk.leg_lengths(
+        geometry, absolute[:, 5], absolute[:, 4], absolute[:, 3], absolute[:, :3]
+    )
+    assert stroke["stroke_needed"] == pytest.approx((lengths[1] - lengths[0]).max())
+    assert stroke["stroke_fits"] and stroke["flight_reachable"] == 1.0
+
+
+def test_integration_ranked_report_over_process_pool(tmp_path):
+    write_log(tmp_path / "get_data_f.log", 200)
+    rows = explore(
+        {"range_val": [0.2, 0.4], "radius_platform": [0.6, 0.7835]},
+        flights=[str(tmp_path / "get_data_f.log")],
+        workers=2,
+        workspace={"steps": 3},
+    )
+    assert [row["rank"] for row in rows] == [1, 2, 3, 4]
+    assert all("stroke_needed" in row for row in rows)
+    # Level flight sits at each candidate's home pose, so the long-stroke rigs reach the flights
+    assert all(row["flight_reachable"] > 0 for row in rows if row["range_val"] == 0.4)
+    fitting = [row["stroke_fits"] for row in rows]
+    assert fitting == sorted(fitting, reverse=True)
+
+    report = tmp_path / "report.csv"
+    write_report(rows, str(report))
+    with open(report) as f:
+        written = list(csv.DictReader(f))
+    assert [int(row["rank"]) for row in written] == [1, 2, 3, 4]
+    assert float(written[0]["range_val"]) == rows[0]["range_val"]
@@ -0,0 +1,39 @@
+import pytest
+
+from histogram import LatencyHistogram
+
+
+def test_unit_empty_histogram_summary():
+    hist = LatencyHistogram()
+    assert hist.summary() == {"count": 0, "mean": 0.0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+
+
+def test_unit_percentiles_within_bucket_resolution():
+    hist = LatencyHistogram(buckets_per_decade=20)
+    for i in range(1, 1001):
+        hist.record(i * 1e-5)  # 10 us .. 10 ms
+
+    step = 10 ** (1 / 20)
+    assert hist.count == 1000
+    assert hist.mean() == pytest.approx(5.005e-3)
+    assert 5e-3 <= hist.percentile(50) <= 5e-3 * step
+    assert 9.9e-3 <= hist.percentile(99) <= 9.9e-3 * step
+    assert hist.percentile(100) == hist.max == pytest.approx(1e-2)
+
+
+def test_unit_out_of_range_values_are_clamped():
+    hist = LatencyHistogram(min_value=1e-3, max_value=1.0)
+    hist.record(-1.0)
+    hist.record(50.0)
+
+    assert hist.min == 0.0
+    assert hist.max == 50.0
+    assert hist.percentile(100) == 50.0
+
+
+def test_unit_reset_clears_counts():
+    hist = LatencyHistogram()
+    hist.record(0.01)
+    hist.reset()
+    assert hist.count == 0
+    assert sum(hist.counts) == 0
@@ -0,0 +1,118 @@
+import time
+
+import pytest
+
+from command_scheduler import CommandScheduler
+from geometry import RIG_GEOMETRY, Geometry
+from interpolation import PoseInterpolator, euler_to_quat, quat_to_euler, slerp
+from pipeline import MotionCore, MotionPipeline
+from Position import Position
+
+
+def pose(psi=0.0, theta=0.0, phi=0.0, T=(0.0, 0.0, 0.6)):
+    pos = Position(mid_height=T[2])
+    pos.psi, pos.theta, pos.phi, pos.T = psi, theta, phi, list(T)
+    return pos
+
+
+def test_unit_quaternion_matches_geometry_rotation():
+    geometry = Geometry(**RIG_GEOMETRY)
+    psi, theta, phi = 0.3, -0.2, 0.1
+    w, x, y, z = euler_to_quat(psi, theta, phi)
+    R = [
+        [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+        [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+        [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)],
+    ]
+    column_major = [R[r][c] for c in range(3) for r in range(3)]
+    assert column_major == pytest.approx(geometry.rot_matrix(psi, theta, phi))
+    assert quat_to_euler(euler_to_quat(psi, theta, phi)) == pytest.approx((psi, theta, phi))
+
+
+def test_unit_slerp_halves_single_axis_rotation():
+    q = slerp(euler_to_quat(0.0, 0.0, 0.0), euler_to_quat(0.0, 0.0, 0.4), 0.5)
+    assert quat_to_euler(q) == pytest.approx((0.0, 0.0, 0.2))
+
+
+def test_unit_keyframes_are_reproduced_and_linear_motion_stays_linear():
+    interp = PoseInterpolator(delay=0.0)
+    out = pose()
+    for i in range(4):
+        interp.push(i * 0.05, pose(phi=0.1 * i, T=(0.01 * i, 0.0, 0.6)))
+    assert interp.sample(0.10, out)
+    assert (out.phi, out.T[0]) == pytest.approx((0.2, 0.02))
+    assert interp.sample(0.125, out)
+    assert out.phi == pytest.approx(0.25)
+    assert out.T == pytest.approx([0.025, 0.0, 0.6])
+
+
+def test_unit_extrapolation_is_capped():
+    interp = PoseInterpolator(delay=0.0, max_extrapolation=0.05)
+    out = pose()
+    interp.push(0.0, pose(T=(0.0, 0.0, 0.6)))
+    interp.push(0.1, pose(T=(0.01, 0.0, 0.6)))
+    interp.sample(0.15, out)
+    assert out.T[0] == pytest.approx(0.015)
+    interp.sample(10.0, out)
+    assert out.T[0] == pytest.approx(0.015)
+
+
+def test_unit_repeated_and_backwards_frames():
+    interp = PoseInterpolator(delay=0.0)
+    out = pose()
+    interp.push(1.0, pose(phi=0.1))
+    interp.push(1.0, pose(phi=0.2))  # sim paused: newest pose replaced
+    interp.sample(1.0, out)
+    assert out.phi == pytest.approx(0.2)
+    interp.push(0.5, pose(phi=0.3))  # sim time went backwards
+    interp.sample(5.0, out)
+    assert out.phi == pytest.approx(0.3)
+
+
+def test_unit_local_clock_mapping_uses_smallest_offset():
+    interp = PoseInterpolator(delay=0.05)
+    interp.push(10.0, pose(), received=1000.030)
+    interp.push(10.05, pose(), received=1000.060)
+    assert interp.offset == pytest.approx(990.01)
+    assert interp.sim_time(1000.11) == pytest.approx(10.1)
+
+
+class SimWithTime:
+    """Stand-in for Get_data delivering samples with a sim time at 10 Hz."""
+
+    def __init__(self):
+        self.faa = [0.0, 0.0, 9.8]
+        self.oaa = [0.0, 0.0, 0.0]
+        self.sim_time = 0.0
+        self.requested = self.received = None
+        self.calls = 0
+
+    def run(self):
+        time.sleep(0.1)
+        self.calls += 1
+        self.sim_time = 0.1 * self.calls
+        self.oaa[0] = 0.02 * self.calls
+        self.received = time.time()
+
+
+def test_mocked_pipeline_upsamples_between_sim_frames(mocker):
+    sim = SimWithTime()
+    sent = []
+    scheduler = CommandScheduler(
+        send=lambda node, target, **kw: sent.append((node.id, target)), deadband_mm=0.0
+    )
+    nodes = {}
+    for node_id in range(1, 7):
+        node = mocker.Mock()
+        node.id = node_id
+        nodes[node_id] = node
+    core = MotionCore(Geometry(**RIG_GEOMETRY), interpolator=PoseInterpolator(delay=0.1))
+    pipeline = MotionPipeline(sim, core, nodes, scheduler, transmit_rate_hz=100.0)
+    pipeline.start()
+    time.sleep(0.8)
+    pipeline.stop()
+
+    # Many more distinct leg 1 targets than sim frames
+    targets = [target for node_id, target in sent if node_id == 1]
+    assert len(set(targets)) > 2 * sim.calls
+    assert all(stage.error is None for stage in pipeline.stages)
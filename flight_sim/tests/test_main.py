@@ -0,0 +1,36 @@
+import pytest
+
+from main import parse_args
+
+
+def test_unit_parse_args_defaults():
+    args = parse_args([])
+    assert args.rate == 20.0
+    assert not args.isolated and not args.threaded
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--upsample"],
+        ["--isolated", "--trace"],
+        ["--isolated", "--metrics"],
+        ["--isolated", "--metrics", "0"],
+        ["--isolated", "--threaded"],
+        ["--isolated", "--threaded", "--upsample"],
+        ["--isolated", "--calibration", "samples.npz"],
+        ["--rate", "10"],
+        ["--rate", "1000"],
+        ["--hub", "--data-output"],
+    ],
+)
+def test_unit_parse_args_rejects_conflicting_options(argv, capsys):
+    with pytest.raises(SystemExit) as error:
+        parse_args(argv)
+    assert error.value.code == 2
+    assert "error:" in capsys.readouterr().err
+
+
+def test_unit_parse_args_accepts_supported_combinations():
+    assert parse_args(["--threaded", "--upsample", "--rate", "500"]).upsample
+    assert parse_args(["--isolated", "--rate", "200", "--hub"]).isolated
@@ -0,0 +1,98 @@
+import math
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from command_scheduler import CommandScheduler
+from metrics_server import (
+    ActuatorMetrics,
+    Metric,
+    MetricsServer,
+    loop_metrics,
+    render,
+    sim_metrics,
+)
+from rate_loop import RateLoop
+
+
+def parse_samples(text):
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_unit_render_text_format():
+    metric = Metric("x_total", "counter", "Things.").add(3, {"node": 1, "bus": 'a"b'})
+    metric.add(math.nan, {"node": 2})
+    text = render([metric])
+    assert text.splitlines() == [
+        "# HELP x_total Things.",
+        "# TYPE x_total counter",
+        'x_total{bus="a\\"b",node="1"} 3.0',
+        'x_total{node="2"} NaN',
+    ]
+
+
+def test_unit_loop_and_sim_metrics():
+    loop = RateLoop(200.0)
+    loop.run(lambda: None, max_ticks=5)
+
+    class Sample:
+        received = 100.0
+        paused = 0
+
+    metrics = loop_metrics(loop, {"platform": "a"})()
+    metrics += sim_metrics(Sample(), clock=lambda: 100.25)()
+    samples = parse_samples(render(metrics))
+    assert samples['flight_sim_loop_ticks_total{platform="a"}'] == 5
+    assert samples['flight_sim_loop_jitter_seconds_count{platform="a"}'] == 5
+    assert 'flight_sim_loop_jitter_seconds{platform="a",quantile="0.99"}' in samples
+    assert samples["flight_sim_sim_sample_age_seconds"] == pytest.approx(0.25)
+
+
+def test_mocked_actuator_metrics(mocker):
+    network = mocker.Mock()
+    nodes = {node_id: mocker.Mock(id=node_id) for node_id in (1, 2)}
+    nodes[1].sdo.__getitem__ = mocker.Mock(return_value=mocker.Mock(raw=41))
+    nodes[2].sdo.__getitem__ = mocker.Mock(side_effect=TimeoutError("no SDO response"))
+    scheduler = CommandScheduler(send=mocker.Mock())
+    scheduler.submit(nodes[1], 150.0)
+
+    metrics = ActuatorMetrics(network, nodes, scheduler, temperature_period=0.01)
+    metrics.start()
+    callbacks = {call.args[0]: call.args[1] for call in network.subscribe.call_args_list}
+    # Measured Position 148.0 mm, Measured Current 3.5 A
+    callbacks[0x181](0x181, bytearray([0xC8, 0x05, 0x23, 0x00, 0, 0, 0, 0]), time.time())
+    time.sleep(0.05)
+    metrics.stop()
+
+    samples = parse_samples(render(metrics.collect()))
+    assert samples['flight_sim_actuator_command_mm{node="1"}'] == 150.0
+    assert samples['flight_sim_actuator_position_mm{node="1"}'] == 148.0
+    assert samples['flight_sim_actuator_error_mm{node="1"}'] == pytest.approx(2.0)
+    assert samples['flight_sim_actuator_current_amperes{node="1"}'] == 3.5
+    assert samples['flight_sim_actuator_temperature{node="1"}'] == 41.0
+    assert math.isnan(samples['flight_sim_actuator_command_mm{node="2"}'])
+    assert math.isnan(samples['flight_sim_actuator_temperature{node="2"}'])
+    assert network.unsubscribe.call_count == 2
+
+
+def test_integration_http_endpoint():
+    server = MetricsServer(port=0)
+    server.add(lambda: [Metric("up", "gauge", "Serving.").add(1)])
+    server.add(lambda: 1 / 0)  # a broken collector does not break the scrape
+    server.start()
+    try:
+        url = f"http://127.0.0.1:{server.port}/metrics"
+        with urllib.request.urlopen(url, timeout=2) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert parse_samples(response.read().decode()) == {"up": 1.0}
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{server.port}/other", timeout=2)
+    finally:
+        server.stop()
@@ -1,4 +1,5 @@
 import pytest
+import os
 import logging
 
 def rpdo_frame(node_id, target_position_mm, current_limit_a=200.0, target_speed_pct=80.0, movement_profile=0, enable=True):
@@ -76,4 +77,23 @@ def test_connect_and_log_can_messages_for_6_actuators(caplog, mocker, tmp_path):
         log_contents = f.read()
         print(log_contents)
         for node_id in nodes:
-            assert f"Node {node_id}: RPDO CAN frame - COB-ID: 0x{0x200+node_id:X}" in log_contents
\ No newline at end of file
+            assert f"Node {node_id}: RPDO CAN frame - COB-ID: 0x{0x200+node_id:X}" in log_contents
+
+def test_unit_import_has_no_side_effects(tmp_path):
+    # A fresh interpreter: importing electrak must not load canopen or open a log file
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, electrak; "
+        "assert electrak.file_handler is None; "
+        "assert 'canopen' not in sys.modules"
+    )
+    env_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": env_path},
+        check=True,
+    )
+    assert not (tmp_path / "electrak.log").exists()
@@ -0,0 +1,108 @@
+import os
+import subprocess
+import sys
+import textwrap
+import time
+from array import array
+
+import pytest
+
+from geometry import RIG_GEOMETRY, Geometry
+from motion_process import (
+    LEGS,
+    OUT_LENGTHS,
+    OUT_MEASURED,
+    OUTPUT_FIELDS,
+    MotionProcess,
+    _feedback_writer,
+)
+from pipeline import MotionCore
+
+
+def test_unit_feedback_writer_decodes_position():
+    out = array("d", [0.0] * OUTPUT_FIELDS)
+    on_tpdo = _feedback_writer(out, OUT_MEASURED + 2)
+    on_tpdo(0x183, bytearray([0x10, 0x0E, 0, 0, 0, 0, 0, 0]), 0.0)
+    assert out[OUT_MEASURED + 2] == pytest.approx(360.0)
+
+
+def test_integration_motion_process_matches_in_process_core():
+    faa = [0.4, -0.2, -9.8]
+    oaa = [0.05, 0.0, -0.03]
+    expected = MotionCore(Geometry(**RIG_GEOMETRY)).step(faa, oaa)
+
+    motion = MotionProcess(rate_hz=100.0)
+    out = array("d", [0.0] * OUTPUT_FIELDS)
+    motion.start()
+    try:
+        motion.publish_sample(faa, oaa)
+        deadline = time.monotonic() + 20.0
+        while motion.latest_output(out) < 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert motion.alive
+        assert list(out[OUT_LENGTHS : OUT_LENGTHS + LEGS]) == pytest.approx(expected)
+
+        seen = []
+        last = motion.outputs_since(-1, out, lambda rec: seen.append(rec[0]))
+        assert last >= 0
+        assert seen == sorted(seen)
+    finally:
+        motion.stop()
+    assert not motion.alive
+
+
+def test_unit_failed_start_releases_rings(mocker):
+    motion = MotionProcess()
+    mocker.patch.object(motion._ctx, "Process").return_value.start.side_effect = RuntimeError
+
+    with pytest.raises(RuntimeError):
+        motion.start()
+
+    assert motion.samples is None and motion.outputs is None
+    assert motion.process is None
+
+
+def test_integration_main_isolated_survives_spawn_and_reports_failure(tmp_path):
+    flight_sim = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    harness = tmp_path / "harness.py"
+    # Runs main.py as __main__ like the command line does, with a sim stand-in
+    harness.write_text(
+        textwrap.dedent(
+            f"""
+            import runpy
+            import sys
+
+            sys.path.insert(0, {flight_sim!r})
+            import Get_data
+
+
+            class FakeGetData:
+                def __init__(self, client=None):
+                    self.faa = [0.0, 0.0, -9.8]
+                    self.oaa = [0.0, 0.0, 0.0]
+
+                def connect(self):
+                    pass
+
+                def run(self):
+                    pass
+
+
+            Get_data.Get_data = FakeGetData
+            sys.argv = ["main.py", "--isolated"]
+            sys.argv += ["--can-interface", "virtual", "--can-channel", "empty"]
+            runpy.run_path({os.path.join(flight_sim, "main.py")!r}, run_name="__main__")
+            """
+        )
+    )
+
+    result = subprocess.run(
+        [sys.executable, str(harness)], cwd=tmp_path, capture_output=True, text=True, timeout=60
+    )
+
+    assert "bootstrapping phase" not in result.stderr
+    assert "BufferError" not in result.stderr
+    # Nothing answers on the virtual bus, so the spawned child fails its scan
+    assert "No CANopen nodes found" in result.stderr
+    assert "Motion process exited with code 1" in result.stderr
+    assert result.returncode == 1
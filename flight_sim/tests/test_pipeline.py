@@ -0,0 +1,108 @@
+import threading
+import time
+
+from command_scheduler import CommandScheduler
+from geometry import Geometry
+from pipeline import Mailbox, MotionCore, MotionPipeline
+from Position import Position
+from Washout import Washout
+
+
+def make_geometry():
+    return Geometry(
+        radius_base=0.791,
+        radius_platform=0.7835,
+        mid_length=0.74343,
+        min_length=0.59706,
+        range_val=0.292,
+        sep_angle=2.094,
+        sep_angle_platform=1.753,
+    )
+
+
+class SlowSim:
+    """Stand-in for Get_data whose run() blocks like a slow UDP reply."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.faa = [0.0, 0.0, 9.8]
+        self.oaa = [0.0, 0.0, 0.0]
+        self.calls = 0
+
+    def run(self):
+        time.sleep(self.delay)
+        self.calls += 1
+        self.faa[0] = 0.1 * self.calls
+
+
+def test_unit_mailbox_keeps_latest_value():
+    box = Mailbox()
+    assert box.get() == (0, None)
+    box.put("a")
+    box.put("b")
+    assert box.get() == (2, "b")
+    assert box.overwritten == 1
+    box.put("c")
+    assert box.overwritten == 1
+
+
+def test_unit_mailbox_wait_times_out_and_wakes():
+    box = Mailbox()
+    assert box.wait(0, timeout=0.01) == (0, None)
+
+    timer = threading.Timer(0.02, box.put, args=("sample",))
+    timer.start()
+    assert box.wait(0, timeout=1.0) == (1, "sample")
+    timer.join()
+
+
+def test_unit_motion_core_matches_serial_chain():
+    geometry = make_geometry()
+    core = MotionCore(geometry)
+    position = Position(mid_height=geometry.mid_height)
+    washout = Washout()
+    faa, oaa = [0.5, -0.2, 9.6], [0.02, 0.001, -0.03]
+
+    for _ in range(3):
+        position.give_positions(oaa, washout.compute2(faa, oaa, position))
+        assert core.step(faa, oaa) == geometry.inverse_kinematics(position)
+
+
+def test_mocked_slow_sim_does_not_delay_can_refresh(mocker):
+    sim = SlowSim(delay=0.2)
+    send = mocker.Mock()
+    scheduler = CommandScheduler(send=send, refresh_period=0.05)
+    nodes = {}
+    for node_id in range(1, 7):
+        node = mocker.Mock()
+        node.id = node_id
+        nodes[node_id] = node
+    pipeline = MotionPipeline(
+        sim, MotionCore(make_geometry()), nodes, scheduler, transmit_rate_hz=100.0
+    )
+
+    pipeline.start()
+    time.sleep(0.75)
+    pipeline.stop()
+    stats = pipeline.stats()
+
+    # Only a few sim samples arrived, yet every node kept its 20 Hz keep-alive
+    assert sim.calls <= 4
+    assert stats["motion"]["iterations"] == stats["acquisition"]["iterations"]
+    assert stats["transmit"]["rate_hz"] > 50.0
+    per_node = send.call_count / len(nodes)
+    assert per_node >= 8
+    assert all(stage.error is None for stage in pipeline.stages)
+
+
+def test_mocked_stage_failure_stops_pipeline(mocker):
+    sim = mocker.Mock()
+    sim.run.side_effect = RuntimeError("sim connection lost")
+    pipeline = MotionPipeline(
+        sim, MotionCore(make_geometry()), {}, CommandScheduler(send=mocker.Mock())
+    )
+    pipeline.start()
+    pipeline.stages[0].join(1.0)
+    assert not pipeline.running
+    pipeline.stop()
+    assert isinstance(pipeline.stages[0].error, RuntimeError)
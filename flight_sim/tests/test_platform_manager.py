@@ -0,0 +1,209 @@
+import time
+
+import pytest
+
+from geometry import RIG_GEOMETRY
+from platform_manager import PlatformConfig, PlatformManager
+from Washout import Washout
+
+
+class FakeSim:
+    """Stand-in for Get_data producing a new sample every few milliseconds."""
+
+    def __init__(self, delay=0.005):
+        self.delay = delay
+        self.faa = [0.0, 0.0, 9.8]
+        self.oaa = [0.0, 0.0, 0.0]
+        self.received = None
+        self.calls = 0
+
+    def connect(self):
+        pass
+
+    def run(self):
+        time.sleep(self.delay)
+        self.calls += 1
+        self.faa[0] = 0.5 * (self.calls % 20)
+        self.received = time.time()
+
+
+class Bus:
+    """Stand-in for one rig's actuators; slow buses block on every send."""
+
+    def __init__(self, channel, delay=0.0):
+        self.channel = channel
+        self.delay = delay
+        self.disconnected = False
+
+    def disconnect(self):
+        self.disconnected = True
+
+
+def mock_buses(mocker, delays, failing=()):
+    buses = {}
+
+    def connect(channel, interface="socketcan", bitrate=500000):
+        if channel in failing:
+            raise OSError(f"No such device: {channel}")
+        buses[channel] = Bus(channel, delays.get(channel, 0.0))
+        return buses[channel]
+
+    def add_nodes(network, node_ids):
+        nodes = {}
+        for node_id in node_ids:
+            node = mocker.Mock()
+            node.id = node_id
+            node.bus = network
+            nodes[node_id] = node
+        return nodes
+
+    mocker.patch("electrak.connect_can_network", side_effect=connect)
+    mocker.patch("electrak.add_nodes", side_effect=add_nodes)
+    mocker.patch("electrak.set_operational")
+    watchdog = mocker.patch("watchdog.HeartbeatWatchdog")
+    watchdog.return_value.check.return_value = False
+    return buses
+
+
+def test_unit_config_from_dict_overrides_geometry():
+    config = PlatformConfig.from_dict(
+        {"name": "b", "node_ids": [1, 2], "geometry_params": {"range_val": 0.2}}
+    )
+    assert config.geometry_params["range_val"] == 0.2
+    assert config.geometry_params["radius_base"] == RIG_GEOMETRY["radius_base"]
+    assert config.node_ids == [1, 2]
+
+
+def test_unit_washout_params_override_defaults():
+    washout = Washout({"Faa_scale_hp": [0.5, 0.5, 0.5]})
+    assert washout.params["Faa_scale_hp"] == [0.5, 0.5, 0.5]
+    assert washout.params["Faa_scale_lp"] == [0.8, 0.8, 0.8]
+    with pytest.raises(ValueError):
+        Washout({"Faa_scale": [1.0, 1.0, 1.0]})
+
+
+def test_unit_duplicate_platform_names_rejected():
+    configs = [PlatformConfig("a"), PlatformConfig("a")]
+    with pytest.raises(ValueError):
+        PlatformManager(configs, {"xplane": FakeSim()})
+
+
+def test_mocked_slow_bus_does_not_stall_other_platforms(mocker):
+    buses = mock_buses(mocker, {"can1": 0.05})
+    sent = {"can0": 0, "can1": 0}
+
+    def send(node, target_position_mm, **settings):
+        time.sleep(node.bus.delay)
+        sent[node.bus.channel] += 1
+
+    configs = [
+        PlatformConfig(
+            "fast", {"channel": "can0"}, node_ids=range(1, 7), rate_hz=50.0
+        ),
+        PlatformConfig(
+            "slow",
+            {"channel": "can1"},
+            node_ids=range(1, 7),
+            rate_hz=50.0,
+            washout_params={"Faa_scale_hp": [0.4, 0.4, 0.4]},
+        ),
+    ]
+    manager = PlatformManager(configs, {"xplane": FakeSim()}, send=send)
+    manager.start()
+    time.sleep(0.6)
+    stats = manager.stats()
+    manager.stop()
+
+    # Both rigs share one sim source and both got commands
+    assert sent["can0"] > 0 and sent["can1"] > 0
+    fast = stats["fast"]["loop"]
+    slow = stats["slow"]["loop"]
+    assert fast["ticks"] >= 20
+    assert fast["skipped"] <= 2
+    # The slow bus holds up only its own platform
+    assert slow["ticks"] < fast["ticks"] / 2
+    assert all(bus.disconnected for bus in buses.values())
+
+
+def test_mocked_failed_platform_is_left_out(mocker):
+    mock_buses(mocker, {}, failing=("can1",))
+    configs = [
+        PlatformConfig("a", {"channel": "can0"}, node_ids=[1]),
+        PlatformConfig("b", {"channel": "can1"}, node_ids=[1]),
+    ]
+    manager = PlatformManager(configs, {"xplane": FakeSim()}, send=lambda *a, **k: None)
+    manager.start()
+    try:
+        assert set(manager.platforms) == {"a"}
+        assert isinstance(manager.failed["b"], OSError)
+        assert manager.running
+    finally:
+        manager.stop()
+
+
+def test_integration_platforms_in_processes_with_separate_sources():
+    configs = [
+        PlatformConfig("left", rate_hz=100.0, source="left", isolated=True),
+        PlatformConfig("right", rate_hz=100.0, source="right"),
+    ]
+    manager = PlatformManager(configs, {"left": FakeSim(), "right": FakeSim()})
+    manager.start()
+    try:
+        deadline = time.monotonic() + 10.0
+        while time.monotonic() < deadline:
+            stats = manager.stats()
+            if stats["left"]["ticks"] > 0 and manager.platforms["right"].lengths:
+                break
+            time.sleep(0.05)
+        assert stats["left"]["alive"]
+        assert stats["left"]["ticks"] > 0
+        assert len(manager.platforms["right"].lengths) == 6
+        assert set(stats["sources"]) == {"left", "right"}
+    finally:
+        manager.stop()
+
+
+class BrokenSim(FakeSim):
+    """FakeSim whose connection drops after a few samples."""
+
+    def run(self):
+        super().run()
+        if self.calls > 5:
+            raise ConnectionError("sim went away")
+
+
+def test_unit_failed_source_stops_its_platforms():
+    configs = [
+        PlatformConfig("lost", rate_hz=100.0, source="broken"),
+        PlatformConfig("kept", rate_hz=100.0, source="healthy"),
+    ]
+    manager = PlatformManager(configs, {"broken": BrokenSim(), "healthy": FakeSim()})
+    manager.start()
+    try:
+        deadline = time.monotonic() + 5.0
+        while manager.sources["broken"].running and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert isinstance(manager.sources["broken"].error, ConnectionError)
+        assert manager.running  # "kept" is still fed by its own source
+
+        assert manager.supervise()
+        assert set(manager.platforms) == {"kept"}
+        assert isinstance(manager.failed["lost"], ConnectionError)
+    finally:
+        manager.stop()
+
+
+def test_unit_running_follows_source_liveness():
+    manager = PlatformManager([PlatformConfig("only", rate_hz=100.0)], {"xplane": BrokenSim()})
+    manager.start()
+    try:
+        deadline = time.monotonic() + 5.0
+        while manager.running and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # The platform thread still runs, but nothing feeds it any more
+        assert manager.platforms["only"].running
+        assert not manager.running
+        assert not manager.supervise()
+        assert not manager.platforms
+    finally:
+        manager.stop()
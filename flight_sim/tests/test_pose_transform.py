@@ -0,0 +1,86 @@
+import math
+import random
+
+from geometry import RIG_GEOMETRY, Geometry
+from pipeline import MotionCore
+from pose_transform import PoseTransform, rot_matrix, transform_of
+from Position import Position
+from Washout import Washout
+
+
+def reference_rot_matrix(psi, theta, phi):
+    # The implementation Geometry and Washout each carried before sharing one
+    RB = [0] * 9
+    RB[0] = math.cos(psi) * math.cos(theta)
+    RB[1] = math.sin(psi) * math.cos(theta)
+    RB[2] = -math.sin(theta)
+    RB[3] = -math.sin(psi) * math.cos(phi) + math.cos(psi) * math.sin(theta) * math.sin(phi)
+    RB[4] = math.cos(psi) * math.cos(phi) + math.sin(psi) * math.sin(theta) * math.sin(phi)
+    RB[5] = math.cos(theta) * math.sin(phi)
+    RB[6] = math.sin(psi) * math.sin(phi) + math.cos(psi) * math.sin(theta) * math.cos(phi)
+    RB[7] = -math.cos(psi) * math.sin(phi) + math.sin(psi) * math.sin(theta) * math.cos(phi)
+    RB[8] = math.cos(theta) * math.cos(phi)
+    return RB
+
+
+def angles(count=200, seed=1):
+    rng = random.Random(seed)
+    return [tuple(rng.uniform(-math.pi, math.pi) for _ in range(3)) for _ in range(count)]
+
+
+def test_unit_all_rotations_bitwise_identical():
+    geometry = Geometry(**RIG_GEOMETRY)
+    washout = Washout()
+    transform = PoseTransform()
+    for psi, theta, phi in angles():
+        expected = reference_rot_matrix(psi, theta, phi)
+        assert geometry.rot_matrix(psi, theta, phi) == expected
+        assert washout.rot_matrix(psi, theta, phi) == expected
+        assert rot_matrix(psi, theta, phi) == expected
+        assert transform.update(psi, theta, phi).matrix == expected
+
+
+def test_unit_gravity_compensation_and_ik_unchanged():
+    geometry = Geometry(**RIG_GEOMETRY)
+    washout = Washout()
+    pos = Position(mid_height=geometry.mid_height)
+    for psi, theta, phi in angles(50):
+        pos.psi, pos.theta, pos.phi = psi, theta, phi
+        faa = [0.3, -0.2, 9.0]
+        assert washout.sub_g(faa, pos) == [
+            faa[0] - 9.8 * math.sin(theta),
+            faa[1] + 9.8 * math.cos(theta) * math.sin(phi),
+            faa[2] + 9.8 * math.cos(theta) * math.cos(phi),
+        ]
+        RB = reference_rot_matrix(psi, theta, phi)
+        p, b = geometry.p, geometry.b
+        expected = []
+        for i in range(6):
+            L = [
+                pos.T[j] + sum(p[i][k] * RB[j + k * 3] for k in range(3)) - b[i][j]
+                for j in range(3)
+            ]
+            expected.append(math.sqrt(sum(x**2 for x in L)))
+        assert geometry.inverse_kinematics(pos) == expected
+
+
+def test_unit_transform_recomputes_only_on_change():
+    pos = Position(mid_height=0.5)
+    first = transform_of(pos)
+    assert transform_of(pos) is first and first.updates == 1
+    pos.theta = 0.1  # plain attribute writes are picked up
+    assert transform_of(pos).theta == 0.1 and first.updates == 2
+
+    class Pose:
+        psi, theta, phi = 0.1, 0.2, 0.3
+
+    assert transform_of(Pose()).matrix == reference_rot_matrix(0.1, 0.2, 0.3)
+
+
+def test_integration_one_evaluation_per_tick():
+    core = MotionCore(Geometry(**RIG_GEOMETRY))
+    for i in range(10):
+        core.step([0.1, 0.2, 9.8], [0.01 * i, 0.002, -0.01 * i])
+    # The washout reuses the previous tick's pose, the IK evaluates the new one;
+    # only the first tick also evaluates the initial pose
+    assert core.position.transform.updates == 11
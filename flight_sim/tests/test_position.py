@@ -0,0 +1,102 @@
+import tracemalloc
+
+import pytest
+
+from geometry import RIG_GEOMETRY, Geometry
+from pipeline import MotionCore
+from Position import PoseHistory, Position
+
+
+def pose(psi=0.0, theta=0.0, phi=0.0, T=(0.0, 0.0, 0.5)):
+    pos = Position(mid_height=T[2])
+    pos.give_positions([phi, psi, theta], list(T))
+    return pos
+
+
+def test_unit_give_positions_copies_translation():
+    source = [0.1, 0.2, 0.3]
+    pos = Position(mid_height=0.5)
+    own = pos.T
+    pos.give_positions([0.0, 0.0, 0.0], source)
+    source[0] = 9.0
+    assert pos.T == [0.1, 0.2, 0.3] and pos.T is own
+    with pytest.raises(AttributeError):
+        pos.velocity = 0.0
+
+
+def test_unit_motion_core_does_not_alias_washout_accumulator():
+    core = MotionCore(Geometry(**RIG_GEOMETRY))
+    core.step([0.0, 0.0, 9.8], [0.0, 0.0, 0.0])
+    first = list(core.position.T)
+    core.washout.faa_sum2[0] += 1.0
+    assert core.position.T == first
+
+
+def test_unit_ring_overwrites_oldest():
+    history = PoseHistory(capacity=3)
+    for i in range(5):
+        history.push(float(i), pose(psi=0.1 * i))
+    assert len(history) == 3
+    out = Position(mid_height=0.0)
+    assert history.get(out, age=2) == 2.0 and out.psi == pytest.approx(0.2)
+    assert history.time() == 4.0
+    with pytest.raises(IndexError):
+        history.time(3)
+
+
+def test_unit_derivatives_exact_for_quadratic_with_uneven_steps():
+    history = PoseHistory()
+    out = [0.0] * 6
+    assert not history.velocity(out) and not history.acceleration(out)
+    # x(t) = 1 + 2t + 3t^2 in every field
+    for t in (0.0, 0.02, 0.05):
+        x = 1.0 + 2.0 * t + 3.0 * t * t
+        history.push(t, pose(x, x, x, (x, x, x)))
+    assert history.velocity(out)
+    assert out == pytest.approx([2.0 + 6.0 * 0.05] * 6)
+    assert history.acceleration(out)
+    assert out == pytest.approx([6.0] * 6)
+
+
+def test_unit_repeated_and_backward_times():
+    history = PoseHistory()
+    history.push(1.0, pose(psi=0.1))
+    history.push(2.0, pose(psi=0.2))
+    history.push(2.0, pose(psi=0.3))  # paused frame replaces the newest
+    assert len(history) == 2
+    out = [0.0] * 6
+    history.velocity(out)
+    assert out[0] == pytest.approx(0.2)
+    history.push(0.5, pose())  # sim restarted
+    assert len(history) == 1
+
+
+def test_unit_push_does_not_allocate():
+    history = PoseHistory(capacity=8)
+    pos = pose(0.1, 0.2, 0.3)
+    out = [0.0] * 6
+    for i in range(16):
+        history.push(float(i), pos)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for i in range(16, 1016):
+        history.push(float(i), pos)
+        history.velocity(out)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    grown = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    assert grown < 1024
+
+
+def test_integration_motion_core_records_history():
+    history = PoseHistory()
+    core = MotionCore(Geometry(**RIG_GEOMETRY), history=history)
+    for i in range(4):
+        core.step([0.0, 0.1 * i, 9.8], [0.0, 0.0, 0.01 * i], sim_time=0.05 * i)
+    assert len(history) == 4
+    out = Position(mid_height=0.0)
+    assert history.get(out) == pytest.approx(0.15)
+    assert out.T == core.position.T
+    velocity = [0.0] * 6
+    assert history.velocity(velocity)
+    assert velocity[1] == pytest.approx(0.2)  # theta rate
@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+import profiling
+
+
+@pytest.fixture(autouse=True)
+def clean_profiling():
+    was_enabled = profiling.is_enabled()
+    profiling.reset()
+    yield
+    profiling.reset()
+    (profiling.enable if was_enabled else profiling.disable)()
+
+
+@profiling.profiled("test.square")
+def square(x):
+    return x * x
+
+
+@profiling.profiled("test.fail")
+def fail():
+    raise RuntimeError("boom")
+
+
+def test_unit_disabled_records_nothing():
+    profiling.disable()
+    assert square(3) == 9
+    assert profiling.stage("test.square").count == 0
+    assert "test.square" not in profiling.stats()
+
+
+def test_unit_enabled_records_each_call():
+    profiling.enable()
+    for i in range(5):
+        square(i)
+    summary = profiling.stats()["test.square"]
+    assert summary["count"] == 5
+    assert 0 < summary["p50"] <= summary["p99"]
+    assert square.__name__ == "square"
+
+
+def test_unit_exceptions_are_timed_and_propagated():
+    profiling.enable()
+    with pytest.raises(RuntimeError):
+        fail()
+    assert profiling.stage("test.fail").count == 1
+
+
+def test_unit_dump_writes_table(tmp_path):
+    profiling.enable()
+    square(2)
+    path = tmp_path / "profile.txt"
+    table = profiling.dump(str(path))
+    assert path.read_text().strip() == table
+    assert table.splitlines()[0].split() == ["stage", "calls", "mean", "p50", "p99", "max"]
+    assert any(line.startswith("test.square") for line in table.splitlines())
+
+
+def test_mocked_move_actuator_is_profiled(mocker):
+    import electrak
+
+    profiling.enable()
+    node = mocker.MagicMock()
+    node.id = 1
+    electrak.move_actuator(node, 100.0)
+    assert profiling.stage("electrak.move_actuator").count == 1
+
+
+def test_unit_reporter_can_be_joined_after_stop():
+    reporter = profiling.ProfileReporter(interval=60.0)
+    reporter.start()
+    reporter.stop()
+    reporter.join(timeout=2.0)
+    assert not reporter.is_alive()
+
+
+def test_unit_stage_shared_by_threads_counts_every_call():
+    profiling.enable()
+    calls = 20000
+
+    def worker():
+        for i in range(calls):
+            square(i)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    hist = profiling.stage("test.square")
+    assert hist.count == 4 * calls
+    assert sum(hist.counts) == 4 * calls
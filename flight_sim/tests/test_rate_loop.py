@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+
+from rate_loop import CATCH_UP, SKIP, RateLoop
+
+
+class FakeClock:
+    """Clock that advances on sleep and by a small step on every read (spinning)."""
+
+    def __init__(self, step=1e-5):
+        self.now = 0.0
+        self.step = step
+        self.sleeps = []
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_loop(rate_hz=100.0, **kwargs):
+    clock = FakeClock()
+    loop = RateLoop(rate_hz, clock=clock, sleep=clock.sleep, **kwargs)
+    return loop, clock
+
+
+def test_unit_ticks_follow_absolute_deadlines():
+    loop, clock = make_loop(100.0)
+    releases = []
+
+    def step():
+        releases.append(clock.now)
+        clock.now += 0.004  # work does not stretch the period
+
+    loop.run(step, max_ticks=50)
+
+    assert releases[-1] == pytest.approx(0.49, abs=1e-4)
+    assert loop.overruns == 0
+    assert loop.jitter.max < 1e-4
+    # Sleeps stop short of the deadline by the spin threshold
+    assert all(s == pytest.approx(0.004, abs=1e-4) for s in clock.sleeps)
+
+
+def test_unit_skip_policy_drops_missed_ticks():
+    loop, clock = make_loop(100.0, overrun_policy=SKIP)
+    loop.start()
+    loop.wait()
+    clock.now += 0.035  # stall for 3.5 periods
+    late = loop.wait()
+
+    assert late == pytest.approx(0.025, abs=1e-4)
+    assert loop.overruns == 1
+    assert loop.skipped == 2
+    # Realigned to the 10 ms grid
+    loop.wait()
+    assert clock.now == pytest.approx(0.04, abs=1e-4)
+
+
+def test_unit_catch_up_policy_releases_missed_ticks_back_to_back():
+    loop, clock = make_loop(100.0, overrun_policy=CATCH_UP)
+    loop.start()
+    loop.wait()
+    clock.now += 0.035
+    loop.wait()
+    stalled_at = clock.now
+    loop.wait()
+    loop.wait()
+    assert clock.now == pytest.approx(stalled_at, abs=1e-4)  # no waiting
+    loop.wait()
+    assert clock.now == pytest.approx(0.04, abs=1e-4)
+    assert loop.skipped == 0
+    assert loop.ticks == 5
+
+
+def test_unit_catch_up_is_bounded():
+    loop, clock = make_loop(100.0, overrun_policy=CATCH_UP, max_catch_up=2)
+    loop.start()
+    loop.wait()
+    clock.now += 0.1
+    loop.wait()
+    assert loop.skipped == 9
+
+
+def test_unit_rate_and_policy_validation():
+    with pytest.raises(ValueError):
+        RateLoop(0.0)
+    with pytest.raises(ValueError):
+        RateLoop(5000.0)
+    with pytest.raises(ValueError):
+        RateLoop(100.0, overrun_policy="later")
+
+
+def test_integration_real_clock_jitter_at_500hz():
+    loop = RateLoop(500.0)
+    stop = threading.Event()
+    ticks = []
+
+    def step():
+        ticks.append(time.perf_counter())
+        if len(ticks) == 250:
+            stop.set()
+
+    loop.run(step, stop=stop)
+
+    stats = loop.stats()
+    assert stats["ticks"] == 250
+    assert ticks[-1] - ticks[0] == pytest.approx(249 / 500.0, rel=0.05)
+    assert stats["jitter"]["p50"] < 0.001
+
+
+def test_unit_overrun_shorter_than_a_period_is_counted():
+    loop, clock = make_loop(100.0)
+    loop.start()
+    loop.wait()
+    clock.now += 0.015  # work took 1.5 periods
+    late = loop.wait()
+
+    assert late == pytest.approx(0.005, abs=1e-4)
+    assert loop.overruns == 1
+    assert loop.skipped == 0
+
+
+def test_unit_caught_up_ticks_are_not_counted_as_overruns():
+    loop, clock = make_loop(100.0, overrun_policy=CATCH_UP)
+    loop.start()
+    loop.wait()
+    clock.now += 0.035
+    for _ in range(4):
+        loop.wait()
+    assert loop.overruns == 1
@@ -0,0 +1,86 @@
+import math
+
+import pytest
+
+from geometry import RIG_GEOMETRY, Geometry
+from Get_data import Get_data
+from pipeline import MotionCore
+from replay import ReplayClient, ReplayFinished, read_get_data_log, run_replay, write_trajectory
+
+HEADER = (
+    "groundspeed,fnrml_prop,fside_prop,faxil_prop,fnrml_aero,fside_aero,"
+    "faxil_aero,fnrml_gear,fside_gear,faxil_gear,m_total,theta,psi,phi,paused,sim_time"
+)
+
+
+def sample(i):
+    return [
+        60.0, 5000.0, 100.0 * math.sin(i), 2000.0, 60000.0, -300.0, -1500.0,
+        0.0, 0.0, 0.0, 6000.0, 3.0 + 0.1 * i, 90.0 + 0.01 * i, -2.0, 0.0, 100.0 + 0.05 * i,
+    ]
+
+
+def write_log(path, count, columns=16):
+    lines = [f"2025-03-01 12:00:00,000 {HEADER}"]
+    for i in range(count):
+        ms = 50 * i
+        stamp = f"2025-03-01 12:00:{ms // 1000:02d},{ms % 1000:03d}"
+        lines.append(stamp + " " + ",".join(str(v) for v in sample(i)[:columns]))
+    path.write_text("\n".join(lines) + "\n")
+
+
+def test_unit_read_log_skips_header_and_parses_times(tmp_path):
+    path = tmp_path / "get_data_test.log"
+    write_log(path, 3)
+    rows = list(read_get_data_log(str(path)))
+    assert len(rows) == 3
+    assert rows[1][0] - rows[0][0] == pytest.approx(0.05)
+    assert rows[2][1][12] == (90.02,)
+
+
+def test_unit_replay_client_ends_session(tmp_path):
+    path = tmp_path / "get_data_test.log"
+    write_log(path, 1)
+    client = ReplayClient(read_get_data_log(str(path)))
+    assert client.getPOSI()[5] == 90.0
+    client.getDREFs([])
+    with pytest.raises(ReplayFinished):
+        client.getDREFs([])
+
+
+@pytest.mark.parametrize("columns", [15, 16])
+def test_integration_replay_matches_live_chain(tmp_path, columns):
+    path = tmp_path / "get_data_test.log"
+    write_log(path, 40, columns)
+    result = run_replay(read_get_data_log(str(path)))
+    assert result["ticks"] == 40
+    assert result["sim_duration"] == pytest.approx(39 * 0.05)
+
+    # The same samples through Get_data.get_values and MotionCore directly
+    data = Get_data(client=ReplayClient([(0.0, [(v,) for v in sample(0)])]), log_inputs=False)
+    data.connect()
+    core = MotionCore(Geometry(**RIG_GEOMETRY))
+    for i, (t, lengths_mm) in enumerate(result["trajectory"]):
+        data.get_values([(v,) for v in sample(i)[:columns]])
+        expected = core.step(data.faa, data.oaa)
+        assert lengths_mm == pytest.approx([v * 1000.0 for v in expected])
+
+    # The first tick commands every leg; later ones only legs that changed
+    assert {c[1] for c in result["commands"][:6]} == {1, 2, 3, 4, 5, 6}
+    assert all(enabled for *_, enabled in result["commands"])
+
+    out = tmp_path / "trajectory.csv"
+    write_trajectory(result["trajectory"], str(out))
+    assert len(out.read_text().splitlines()) == 41
+
+
+def test_mocked_get_data_connects_lazily(mocker):
+    client = mocker.Mock()
+    client.getPOSI.return_value = (0.0, 0.0, 0.0, 0.0, 0.0, 45.0, 0.0)
+    data = Get_data(client=client, log_inputs=False)
+    client.getPOSI.assert_not_called()
+    assert not data.connected
+
+    data.connect()
+    assert data.connected
+    assert data.psiprev == 45.0
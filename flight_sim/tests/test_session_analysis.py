@@ -0,0 +1,143 @@
+import gzip
+import math
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import session_analysis
+from session_analysis import (
+    analyze_files,
+    analyze_recording,
+    convert,
+    group_segments,
+    open_recording,
+    prune_caches,
+)
+from session_log import SessionLog, segments
+
+HEADER = (
+    "groundspeed,fnrml_prop,fside_prop,faxil_prop,fnrml_aero,fside_aero,"
+    "faxil_aero,fnrml_gear,fside_gear,faxil_gear,m_total,theta,psi,phi,paused,sim_time"
+)
+RATE_HZ = 20.0
+
+
+def sample(i, paused=0.0):
+    # 2 Hz side acceleration of 1.5 m/s^2 on a 6 t aircraft at speed
+    return [
+        60.0, 60000.0, 9000.0 * math.sin(2 * math.pi * 2.0 * i / RATE_HZ), 0.0, 0.0,
+        0.0, 0.0, 0.0, 0.0, 0.0, 6000.0, 0.0, 90.0, 0.0, paused, 100.0 + i / RATE_HZ,
+    ]
+
+
+def stamp(t):
+    seconds, ms = divmod(round(t * 1000), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    return f"2025-03-01 12:{minutes:02d}:{seconds:02d},{ms:03d}"
+
+
+def write_log(path, count, pause=(), gap_at=None, opener=open):
+    lines = [f"2025-03-01 12:00:00,000 {HEADER}"]
+    for i in range(count):
+        t = i / RATE_HZ + (30.0 if gap_at is not None and i >= gap_at else 0.0)
+        paused = 1.0 if i in pause else 0.0
+        lines.append(stamp(t) + " " + ",".join(repr(v) for v in sample(i, paused)))
+    with opener(path, "wt") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def test_unit_convert_streams_to_npy(tmp_path):
+    log = tmp_path / "get_data_a.log.gz"
+    write_log(log, 50, opener=gzip.open)
+    assert convert(str(log), str(tmp_path / "a.npy")) == 50
+    recording = np.load(tmp_path / "a.npy")
+    assert recording.shape == (50, session_analysis.COLUMNS)
+    assert recording[1, 0] - recording[0, 0] == pytest.approx(0.05)
+    assert recording[3, 1:] == pytest.approx(sample(3))
+
+    cached = open_recording(str(log), str(tmp_path / "cache"))
+    assert isinstance(cached, np.memmap)
+    assert np.array_equal(cached, recording)
+
+
+def test_unit_flights_pauses_peaks_and_spectrum(tmp_path):
+    log = tmp_path / "get_data_b.log"
+    write_log(log, 1200, pause=range(100, 140), gap_at=1000)
+    first, second = analyze_recording(open_recording(str(log)))
+    assert first["samples"] == 1000 and second["samples"] == 200
+    assert first["rate_hz"] == pytest.approx(RATE_HZ)
+    pause_start, pause_end = first["pauses"][0]
+    assert len(first["pauses"]) == 1
+    assert pause_start - first["start"] == pytest.approx(5.0)
+    assert pause_end - first["start"] == pytest.approx(6.95)
+    assert first["paused_s"] == pytest.approx(2.0)
+    side = first["peaks"]["side"]
+    assert side["max_abs"] == pytest.approx(1.5 * math.sin(0.4 * math.pi))
+    assert side["rms"] == pytest.approx(1.5 / math.sqrt(2), rel=1e-2)
+    assert side["dominant_hz"] == pytest.approx(2.0, abs=RATE_HZ / session_analysis.SPECTRUM_SEGMENT)
+    stroke = first["stroke"]
+    assert len(stroke["near_min_s"]) == 6
+    assert all(low <= high for low, high in zip(stroke["length_min_m"], stroke["length_max_m"]))
+
+
+def test_unit_chunked_analysis_matches_whole(tmp_path, monkeypatch):
+    log = tmp_path / "get_data_c.log"
+    write_log(log, 900, pause=range(250, 300))
+    recording = open_recording(str(log))
+    (whole,) = analyze_recording(recording)
+    monkeypatch.setattr(session_analysis, "CHUNK_ROWS", 256)
+    (chunked,) = analyze_recording(recording)
+    assert chunked["pauses"] == whole["pauses"]
+    assert chunked["stroke"] == pytest.approx(whole["stroke"])
+    for axis in session_analysis.AXES:
+        assert chunked["peaks"][axis] == pytest.approx(whole["peaks"][axis])
+    assert chunked["spectrum"]["side"] == pytest.approx(whole["spectrum"]["side"])
+
+
+def test_integration_process_pool_over_files(tmp_path):
+    paths = []
+    for name in ("get_data_d.log", "get_data_e.log"):
+        write_log(tmp_path / name, 300)
+        paths.append(str(tmp_path / name))
+    flights = analyze_files(session_analysis.find_logs([str(tmp_path)]), workers=2)
+    assert [flight["source"] for flight in flights] == paths
+    assert flights[0]["peaks"]["side"] == pytest.approx(flights[1]["peaks"]["side"])
+    assert flights[0]["peaks"]["axial"]["dominant_hz"] is None
+
+
+def write_session(directory, count, rotate_every, start=0.0):
+    # Get_data's session log: one flight rotated over several segments
+    base = datetime(2025, 3, 1, 12).timestamp()
+    log = SessionLog(
+        str(directory), "get_data", max_bytes=1, header=HEADER, clock=lambda: base + start
+    )
+    for i in range(count):
+        t = start + i / RATE_HZ
+        log.write(stamp(t) + " " + ",".join(repr(v) for v in sample(i)), base + t)
+        if (i + 1) % rotate_every == 0:
+            log.flush()
+    log.stop()
+
+
+def test_integration_rotated_session_is_one_recording(tmp_path):
+    write_session(tmp_path, 300, rotate_every=100)
+    write_session(tmp_path, 100, rotate_every=100, start=120.0)
+    logs = session_analysis.find_logs([str(tmp_path)])
+    assert len(logs) == 4
+
+    recordings = group_segments(logs)
+    assert [len(recording) for recording in recordings] == [3, 1]
+    flights = analyze_files(logs, workers=1)
+    assert [flight["samples"] for flight in flights] == [300, 100]
+    assert flights[0]["segments"] == logs[:3]
+    assert flights[0]["source"] == logs[0]
+
+    # Retention removed the first session's segments; its recording goes with them
+    for segment in logs[:3]:
+        os.remove(segment)
+    remaining = session_analysis.find_logs([str(tmp_path)])
+    assert prune_caches(remaining) == [logs[0] + ".npy"]
+    assert sorted(tmp_path.glob("*.npy")) == [tmp_path / (os.path.basename(logs[3]) + ".npy")]
+    assert segments(str(tmp_path), "get_data") == remaining
@@ -0,0 +1,154 @@
+import gzip
+import logging
+
+import pytest
+
+from replay import read_get_data_log
+from session_log import (
+    SessionLog,
+    SessionLogHandler,
+    find_blocks,
+    in_use,
+    index_path,
+    read_index,
+    read_range,
+    segments,
+)
+
+
+class FakeClock:
+    """Manually advanced wall clock."""
+
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_unit_blocks_are_gzip_members_with_index(tmp_path):
+    clock = FakeClock()
+    log = SessionLog(str(tmp_path), "session", header="a,b", clock=clock)
+    for block in range(3):
+        for i in range(4):
+            clock.now += 0.25
+            log.write(f"{block},{i}")
+        assert log.flush() == 4 + (block == 0)
+    log.stop()
+
+    (segment,) = segments(str(tmp_path), "session")
+    with gzip.open(segment, "rt") as f:
+        lines = f.read().splitlines()
+    assert lines[0] == "a,b"
+    assert lines[1:] == [f"{b},{i}" for b in range(3) for i in range(4)]
+
+    entries = read_index(segment)
+    assert [e["lines"] for e in entries] == [5, 4, 4]
+    assert entries[1]["offset"] == entries[0]["offset"] + entries[0]["length"]
+    assert entries[1]["first"] == pytest.approx(1_700_000_001.25)
+    assert entries[1]["last"] == pytest.approx(1_700_000_002.0)
+
+
+def test_unit_time_range_reads_only_matching_blocks(tmp_path):
+    clock = FakeClock(1000.0)
+    log = SessionLog(str(tmp_path), "session", clock=clock)
+    for block in range(5):
+        log.write(f"block {block}", timestamp=1000.0 + 10 * block)
+        log.write(f"block {block} end", timestamp=1005.0 + 10 * block)
+        log.flush()
+    log.stop()
+
+    blocks = find_blocks(str(tmp_path), "session", 1012.0, 1031.0)
+    assert [entry["first"] for _, entry in blocks] == [1010.0, 1020.0, 1030.0]
+    lines = list(read_range(str(tmp_path), "session", 1021.0, 1024.0))
+    assert lines == ["block 2", "block 2 end"]
+    assert len(list(read_range(str(tmp_path), "session"))) == 10
+
+
+def test_unit_rotation_and_retention(tmp_path):
+    clock = FakeClock()
+    log = SessionLog(
+        str(tmp_path), "session", max_bytes=1, max_age=60.0, max_segments=3, clock=clock
+    )
+    for i in range(5):
+        clock.now += 1.0
+        log.write(f"line {i}")
+        log.flush()
+    log.stop()
+
+    # Every flush rotates at one byte; only the newest three segments survive
+    kept = segments(str(tmp_path), "session")
+    assert len(kept) == 3
+    assert list(read_range(str(tmp_path), "session")) == ["line 2", "line 3", "line 4"]
+    assert len(list(tmp_path.glob("*.idx"))) == 3
+
+    log = SessionLog(str(tmp_path), "session", max_age=60.0, max_segments=0, clock=clock)
+    log.write("first")
+    log.flush()
+    clock.now += 30.0
+    log.write("same segment")
+    log.flush()
+    clock.now += 31.0
+    log.write("new segment")
+    log.flush()
+    log.stop()
+    assert len(segments(str(tmp_path), "session")) == 5
+    assert [e["lines"] for e in read_index(log.path)] == [1]
+    assert index_path(log.path).endswith(".idx")
+
+
+def test_unit_prune_skips_segments_other_logs_are_writing(tmp_path):
+    clock = FakeClock()
+    first = SessionLog(str(tmp_path), "session", max_bytes=1, max_segments=1, clock=clock)
+    second = SessionLog(str(tmp_path), "session", max_bytes=1, max_segments=1, clock=clock)
+    first.write("from first")
+    first.flush()
+    clock.now += 1.0
+    second.write("from second")
+    second.flush()
+
+    # Each log only keeps one segment, but neither deletes the other's open one
+    assert in_use(first.path) and in_use(second.path)
+    assert segments(str(tmp_path), "session") == sorted([first.path, second.path])
+    clock.now += 1.0
+    first.write("first again")
+    first.flush()
+    # The first log's closed segment is its own to prune; the second's open one stays
+    assert segments(str(tmp_path), "session") == sorted([first.path, second.path])
+
+    second.stop()
+    assert not in_use(second.path)
+    clock.now += 1.0
+    first.write("last")
+    first.flush()
+    first.stop()
+    assert segments(str(tmp_path), "session") == [first.path]
+
+
+def test_unit_full_backlog_drops_lines(tmp_path):
+    log = SessionLog(str(tmp_path), "session", max_pending=3)
+    for i in range(5):
+        log.write(str(i))
+    assert log.dropped == 2
+    assert log.flush() == 3
+    log.stop()
+
+
+def test_integration_handler_feeds_replay(tmp_path):
+    session = SessionLog(str(tmp_path), "get_data", header="groundspeed,psi")
+    handler = SessionLogHandler(session)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    sample_logger = logging.getLogger("test_session_log_samples")
+    sample_logger.propagate = False
+    sample_logger.setLevel(logging.INFO)
+    sample_logger.addHandler(handler)
+    try:
+        sample_logger.info("12.5,90.0")
+        sample_logger.info("13.0,91.0")
+    finally:
+        sample_logger.removeHandler(handler)
+        handler.close()
+
+    (segment,) = segments(str(tmp_path), "get_data")
+    samples = list(read_get_data_log(segment))
+    assert [values for _, values in samples] == [[(12.5,), (90.0,)], [(13.0,), (91.0,)]]
@@ -0,0 +1,67 @@
+from array import array
+
+import pytest
+
+from shm_ring import ShmRing
+
+
+@pytest.fixture
+def ring():
+    ring = ShmRing(fields=3, capacity=4, create=True)
+    yield ring
+    ring.close()
+
+
+def test_unit_read_latest_empty_ring(ring):
+    out = array("d", [0.0] * 3)
+    assert ring.read_latest(out) == -1
+
+
+def test_unit_write_and_read_records(ring):
+    out = array("d", [0.0] * 3)
+    assert ring.write([1.0, 2.0, 3.0]) == 0
+    assert ring.write(array("d", [4.0, 5.0, 6.0])) == 1
+    assert ring.head == 2
+    assert ring.read(0, out)
+    assert list(out) == [1.0, 2.0, 3.0]
+    assert ring.read_latest(out) == 1
+    assert list(out) == [4.0, 5.0, 6.0]
+
+
+def test_unit_overwritten_and_future_records_are_rejected(ring):
+    out = array("d", [0.0] * 3)
+    for i in range(6):
+        ring.write([float(i)] * 3)
+    assert not ring.read(0, out)
+    assert not ring.read(1, out)
+    assert ring.read(2, out)
+    assert list(out) == [2.0] * 3
+    assert not ring.read(6, out)
+
+
+def test_unit_read_requires_float_buffer(ring):
+    ring.write([1.0, 2.0, 3.0])
+    with pytest.raises(TypeError):
+        ring.read(0, [0.0] * 3)
+
+
+def test_unit_attached_ring_sees_writes(ring):
+    reader = ShmRing(ring.name, fields=3, capacity=4, untrack=False)
+    try:
+        out = array("d", [0.0] * 3)
+        ring.write([7.0, 8.0, 9.0])
+        assert reader.read_latest(out) == 0
+        assert list(out) == [7.0, 8.0, 9.0]
+    finally:
+        reader.close()
+
+
+def test_unit_size_shows_a_smaller_block(ring):
+    assert ring.size == 8 * (1 + 4 * 4)
+    reader = ShmRing(ring.name, fields=5, capacity=4, untrack=False)
+    try:
+        # The block was created for three fields; only its own bytes are addressable
+        assert reader.size == ring.size
+        assert reader.size < 8 * (1 + 4 * reader.slot_words)
+    finally:
+        reader.close()
@@ -0,0 +1,161 @@
+import os
+import time
+
+import pytest
+
+import sim_hub
+from Get_data import Get_data
+from sim_hub import HUB_DREFS, REC_DREFS, HubClient, SimHub, SnapshotLayout
+
+
+class FakeXPlane:
+    """Stand-in for XPlaneConnect counting requests; every poll changes the values."""
+
+    def __init__(self):
+        self.requests = 0
+        self.polls = 0
+
+    def getPOSI(self, ac=0):
+        self.requests += 1
+        self.polls += 1
+        return (47.0, 8.0, 500.0, 1.0, 2.0, 90.0 + self.polls, 1.0)
+
+    def getCTRL(self, ac=0):
+        self.requests += 1
+        return (0.1, 0.2, 0.3, 0.5, 1, 0.0, 0.0)
+
+    def getDREFs(self, drefs):
+        self.requests += 1
+        return [(float(i) + self.polls,) for i in range(len(drefs))]
+
+
+def hub_name():
+    return f"test_hub_{os.getpid()}_{time.monotonic_ns()}"
+
+
+def test_unit_layout_offsets_and_checksum():
+    layout = SnapshotLayout(["a", "b", "c"], [1, 3, 1])
+    assert layout.offsets == {
+        "a": (REC_DREFS, 1),
+        "b": (REC_DREFS + 1, 3),
+        "c": (REC_DREFS + 4, 1),
+    }
+    assert layout.fields == REC_DREFS + 5
+    assert layout.checksum != SnapshotLayout(["a", "b", "c"]).checksum
+    with pytest.raises(ValueError):
+        SnapshotLayout(["a"], [1, 2])
+
+
+def test_integration_readers_share_one_connection():
+    xplane = FakeXPlane()
+    name = hub_name()
+    hub = SimHub(xplane, name=name, multicast=None, rate_hz=200.0)
+    hub.start()
+    try:
+        readers = [HubClient(name=name, multicast=None) for _ in range(3)]
+        for reader in readers:
+            assert reader.transport == "shm"
+            posi = reader.getPOSI()
+            ctrl = reader.getCTRL()
+            values = reader.getDREFs(HUB_DREFS[:2] + ["sim/flightmodel/position/local_az"])
+            assert len(posi) == 7 and posi[0] == 47.0
+            assert ctrl[:3] == pytest.approx((0.1, 0.2, 0.3))
+            # All three kinds come from the same snapshot
+            polls = posi[5] - 90.0
+            assert values == [(polls,), (polls + 1,), (len(HUB_DREFS) - 1 + polls,)]
+        # Asking again waits for the next snapshot
+        first = readers[0].getPOSI()[5]
+        second = readers[0].getPOSI()[5]
+        assert second > first
+        with pytest.raises(ValueError):
+            readers[0].getDREFs(["sim/not/published"])
+        for reader in readers:
+            reader.close()
+    finally:
+        hub.stop()
+    # Three requests per snapshot, however many readers there are
+    assert xplane.requests == 3 * xplane.polls
+
+
+def test_integration_get_data_reads_through_hub():
+    name = hub_name()
+    hub = SimHub(FakeXPlane(), name=name, multicast=None, rate_hz=200.0)
+    hub.start()
+    try:
+        with HubClient(name=name, multicast=None) as reader:
+            data = Get_data(client=reader, log_inputs=False)
+            data.run()
+            data.run()
+            assert data.faa[2] is not None
+            assert data.sim_time > 0
+    finally:
+        hub.stop()
+
+
+def test_integration_connect_prefers_hub_and_falls_back_to_xplane(mocker):
+    xplane = mocker.patch("xpc.XPlaneConnect")
+    name = hub_name()
+    hub = SimHub(FakeXPlane(), name=name, multicast=None, rate_hz=200.0)
+    hub.start()
+    try:
+        with sim_hub.connect(name=name, multicast=None) as client:
+            assert isinstance(client, HubClient)
+            # Waiting for the hub did not use up the first snapshot
+            assert client.index >= 0 and client.getPOSI()[0] == 47.0
+    finally:
+        hub.stop()
+    time.sleep(0.15)
+
+    # A stopped hub's ring and no ring at all both mean direct polling
+    assert sim_hub.connect(name=name, multicast=None, timeout=0.1) is xplane.return_value
+    assert sim_hub.connect(name="missing_" + name, multicast=None) is xplane.return_value
+
+
+def test_integration_reader_times_out_without_hub():
+    name = hub_name()
+    hub = SimHub(FakeXPlane(), name=name, multicast=None, rate_hz=200.0)
+    hub.start()
+    reader = HubClient(name=name, multicast=None, timeout=0.1)
+    reader.getPOSI()
+    hub.stop()
+    # Snapshots written just before the stop are still valid; later ones never come
+    time.sleep(0.15)
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            reader.getPOSI()
+    reader.close()
+
+
+def test_integration_layout_mismatch_detected():
+    name = hub_name()
+    hub = SimHub(FakeXPlane(), name=name, multicast=None, rate_hz=200.0)
+    hub.start()
+    try:
+        layout = SnapshotLayout(list(reversed(HUB_DREFS)))
+        with HubClient(layout, name=name, multicast=None) as reader:
+            with pytest.raises(RuntimeError):
+                reader.getPOSI()
+    finally:
+        hub.stop()
+
+
+def test_integration_multicast_fallback():
+    name = hub_name()
+    group = ("239.255.42.99", 49000 + os.getpid() % 500)
+    hub = SimHub(FakeXPlane(), name=name, multicast=group, rate_hz=200.0)
+    try:
+        reader = HubClient(name="missing_" + name, multicast=group, timeout=0.5)
+    except OSError as e:
+        pytest.skip(f"No multicast support: {e}")
+    hub.start()
+    try:
+        assert reader.transport == "multicast"
+        try:
+            posi = reader.getPOSI()
+        except TimeoutError:
+            pytest.skip("Multicast datagrams are not looped back on this host")
+        assert posi[0] == 47.0
+        assert reader.getDREF(HUB_DREFS[0])[0] == posi[5] - 90.0
+    finally:
+        reader.close()
+        hub.stop()
@@ -0,0 +1,91 @@
+import logging
+
+from telemetry import COMMAND, FEEDBACK, TelemetrySink, read_telemetry
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_unit_records_round_trip_through_file(tmp_path):
+    path = tmp_path / "telemetry.bin"
+    clock = FakeClock()
+    sink = TelemetrySink(str(path), capacity=16, clock=clock)
+    sink.start()
+    clock.now = 1.5
+    sink.record_command(3, 150.0, 12.5, 80.0, 0, True)
+    clock.now = 1.6
+    sink.record_feedback(3, 149.9, 2.1, 80.0, 0x01, 0x00)
+    sink.stop()
+
+    records = read_telemetry(str(path))
+    assert records == [
+        (1.5, COMMAND, 3, 150.0, 12.5, 80.0, 0.0, 1.0),
+        (1.6, FEEDBACK, 3, 149.9, 2.1, 80.0, 1.0, 0.0),
+    ]
+    assert sink.records_written == 2
+
+
+def test_unit_full_buffer_drops_instead_of_growing():
+    sink = TelemetrySink(capacity=4)
+    for i in range(10):
+        sink.record_command(1, float(i), 12.5, 80.0, 0, True)
+
+    assert sink.dropped == 6
+    assert sink.flush() == 4
+    sink.record_command(1, 99.0, 12.5, 80.0, 0, True)
+    assert sink.flush() == 1
+
+
+def test_unit_summary_reports_latest_per_node():
+    sink = TelemetrySink(capacity=8)
+    sink.record_command(1, 100.0, 12.5, 80.0, 0, True)
+    sink.record_command(1, 110.0, 12.5, 80.0, 0, True)
+    sink.record_feedback(1, 105.2, 3.4, 80.0, 0x01, 0x20)
+    sink.record_command(2, 50.0, 12.5, 80.0, 0, True)
+    sink.flush()
+
+    lines = sink.summary()
+    assert lines[0] == (
+        "Node 1: target=110.0mm feedback=105.2mm 3.4A motion=0x01 error=0x20 "
+        "(2 commands, 1 feedbacks)"
+    )
+    assert lines[1] == "Node 2: target=50.0mm feedback=- (1 commands, 0 feedbacks)"
+
+
+def test_mocked_move_actuator_records_command_without_info_logs(mocker, caplog):
+    import electrak
+
+    caplog.set_level(logging.INFO, logger="electrak")
+    sink = TelemetrySink(capacity=8)
+    node = mocker.MagicMock()
+    node.id = 5
+
+    electrak.move_actuator(node, 500.0, current_limit_a=30.0, telemetry=sink)
+
+    node.rpdo[1].transmit.assert_called_once()
+    sink.flush()
+    assert sink.summary() == [
+        "Node 5: target=360.0mm feedback=- (1 commands, 0 feedbacks)"
+    ]
+    assert "Move command sent" not in caplog.text
+
+
+def test_mocked_frame_logging_is_opt_in(mocker, caplog):
+    import electrak
+
+    caplog.set_level(logging.DEBUG, logger="electrak")
+    node = mocker.MagicMock()
+    node.id = 5
+    electrak.set_frame_logging(True)
+    try:
+        electrak.move_actuator(node, 100.0)
+    finally:
+        electrak.set_frame_logging(False)
+    assert "Node 5: Move command sent" in caplog.text
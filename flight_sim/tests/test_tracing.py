@@ -0,0 +1,75 @@
+import math
+
+import can
+import pytest
+
+from geometry import RIG_GEOMETRY, Geometry
+from pipeline import MotionCore
+from tracing import BREAKDOWN, LatencyTracer, read_trace, summarize_trace
+
+
+def tpdo(node_id, position_mm, motion_flags, timestamp):
+    raw = int(position_mm * 10)
+    data = [raw & 0xFF, raw >> 8, 0, 0, 0, 0, motion_flags, 0]
+    return can.Message(
+        arbitration_id=0x180 + node_id, data=data, timestamp=timestamp, is_extended_id=False
+    )
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    return LatencyTracer(str(tmp_path / "trace.csv"), match_timeout=0.5)
+
+
+def test_unit_motion_core_marks_washout_and_ik(tracer):
+    trace = tracer.begin(100.0, 10.0, 10.001)
+    MotionCore(Geometry(**RIG_GEOMETRY)).step([0.1, 0.0, -9.8], [0.0, 0.0, 0.0], trace)
+    assert trace.received <= trace.washout <= trace.ik
+
+
+def test_unit_tick_matched_to_motion_feedback(tracer):
+    trace = tracer.begin(sim_time=100.0, requested=10.000, received=10.004)
+    trace.mark("washout", 10.005)
+    trace.mark("ik", 10.006)
+    tracer.transmitted(trace, 10.008)
+    # Stationary feedback does not complete the tick
+    tracer.on_message_received(tpdo(2, 150.0, 0x00, 10.010))
+    assert tracer.matched == 0
+    tracer.on_message_received(tpdo(2, 150.0, 0x01, 10.030))
+    tracer.stop()
+
+    (row,) = read_trace(tracer.path)
+    assert row["motion_node"] == 2
+    assert row["fetch_ms"] == pytest.approx(4.0)
+    assert row["washout_ms"] == pytest.approx(1.0)
+    assert row["tx_ms"] == pytest.approx(2.0)
+    assert row["motion_ms"] == pytest.approx(22.0)
+    assert row["total_ms"] == pytest.approx(26.0)
+    assert row["sim_lag_ms"] == pytest.approx(0.0)
+
+
+def test_unit_position_change_counts_as_motion(tracer):
+    tracer.on_message_received(tpdo(1, 150.0, 0x00, 1.0))
+    trace = tracer.begin(0.0, 1.0, 1.0)
+    tracer.transmitted(trace, 1.01)
+    tracer.on_message_received(tpdo(1, 150.3, 0x00, 1.05))
+    assert tracer.matched == 1
+    tracer.stop()
+
+
+def test_unit_unmatched_and_discarded_ticks_are_written(tracer):
+    quiet = tracer.begin(0.0, 1.0, 1.0)
+    tracer.discard(quiet)
+    stale = tracer.begin(0.0, 2.0, 2.0)
+    tracer.transmitted(stale, 2.0)
+    tracer.on_message_received(tpdo(1, 150.0, 0x00, 3.0))
+    assert tracer.unmatched == 1
+    tracer.stop()
+
+    rows = read_trace(tracer.path)
+    assert [r["tick"] for r in rows] == [1, 2]
+    assert all(math.isnan(r["motion"]) for r in rows)
+    summary = summarize_trace(tracer.path)
+    assert set(summary) == set(BREAKDOWN)
+    assert summary["motion_ms"]["count"] == 0
+    assert summary["fetch_ms"]["count"] == 2
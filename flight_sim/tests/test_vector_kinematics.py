@@ -0,0 +1,52 @@
+import math
+
+import numpy as np
+import pytest
+
+import vector_kinematics as vk
+from geometry import RIG_GEOMETRY, Geometry
+from Get_data import Get_data
+from pipeline import MotionCore
+from replay import ReplayClient
+from Washout import Washout
+
+
+def sample(i):
+    return [
+        2.0 + 0.5 * i, 5000.0, 100.0 * math.sin(i), 2000.0 * math.cos(i), 60000.0, -300.0,
+        -1500.0, 0.0, 0.0, 0.0, 6000.0, 0.05 * math.sin(0.3 * i), 1.0 + 0.02 * i,
+        -0.04 * math.cos(0.2 * i), 0.0, 100.0 + 0.05 * i,
+    ]
+
+
+def test_unit_rotation_matrices_match_scalar():
+    geometry = Geometry(**RIG_GEOMETRY)
+    angles = np.array([[0.1, -0.2, 0.3], [1.0, 0.5, -0.7]])
+    rb = vk.rotation_matrices(angles[:, 0], angles[:, 1], angles[:, 2])
+    for row, (psi, theta, phi) in zip(rb, angles):
+        assert row == pytest.approx(geometry.rot_matrix(psi, theta, phi))
+
+
+def test_unit_deadband_snaps_like_fallout():
+    values = np.array([sample(0)] * 3)
+    values[:, 1] = [0.05, -0.02, 0.0]
+    values[:, 4] = values[:, 7] = 0.0
+    faa, _ = vk.accelerations(values)
+    assert faa[:, 2] * 6000.0 == pytest.approx([0.1, -0.1, 0.1])
+
+
+def test_integration_vectorized_chain_matches_live_chain():
+    samples = [(float(i), [(v,) for v in sample(i)]) for i in range(40)]
+    washout = Washout({"Faa_scale_hp": [0.6, 0.7, 0.9]})
+    core = MotionCore(Geometry(**RIG_GEOMETRY), washout)
+    data = Get_data(client=ReplayClient(samples), log_inputs=False)
+    expected = []
+    for _ in samples:
+        data.run()
+        expected.append(core.step(data.faa, data.oaa))
+
+    values = np.array([sample(i) for i in range(40)])
+    faa, oaa = vk.accelerations(values)
+    T = vk.washout_translation(faa, oaa, washout)
+    lengths = vk.leg_lengths(core.geometry, oaa[:, 1], oaa[:, 2], oaa[:, 0], T)
+    np.testing.assert_allclose(lengths, np.array(expected), rtol=1e-12)
@@ -0,0 +1,136 @@
+import struct
+import threading
+import time
+
+import can
+import pytest
+
+import electrak
+from watchdog import HeartbeatWatchdog
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_watchdog(mocker, node_ids=(1, 2), **kwargs):
+    network = mocker.Mock()
+    nodes = {}
+    for node_id in node_ids:
+        node = mocker.MagicMock()
+        node.id = node_id
+        nodes[node_id] = node
+    clock = FakeClock()
+    watchdog = HeartbeatWatchdog(network, nodes, clock=clock, **kwargs)
+    return watchdog, network, nodes, clock
+
+
+def test_mocked_configure_sets_producer_heartbeat(mocker):
+    watchdog, network, nodes, clock = make_watchdog(mocker, heartbeat_ms=25)
+    watchdog.configure()
+    for node in nodes.values():
+        node.sdo.__getitem__.assert_called_with("Producer Heartbeat Time")
+        assert node.sdo["Producer Heartbeat Time"].raw == 25
+
+
+def test_mocked_start_subscribes_heartbeat_emcy_and_tpdo(mocker):
+    watchdog, network, nodes, clock = make_watchdog(mocker, node_ids=(3,))
+    watchdog.start()
+    subscribed = sorted(call.args[0] for call in network.subscribe.call_args_list)
+    assert subscribed == [0x83, 0x183, 0x703]
+    watchdog.stop()
+    assert network.unsubscribe.call_count == 3
+
+
+def test_unit_missing_heartbeat_detected_by_check(mocker):
+    watchdog, network, nodes, clock = make_watchdog(mocker, heartbeat_ms=20)
+    watchdog.start()
+    clock.now += 0.04
+    watchdog._on_heartbeat(0x701, bytes([5]), clock.now)
+    watchdog._on_heartbeat(0x702, bytes([5]), clock.now)
+
+    clock.now += 0.045
+    assert not watchdog.check()
+    clock.now += 0.010
+    assert watchdog.check()
+    assert [f.reason for f in watchdog.faults] == ["heartbeat", "heartbeat"]
+    assert watchdog.faults[0].latency == pytest.approx(0.005)
+
+
+def test_unit_callbacks_raise_fault_once_per_reason(mocker):
+    watchdog, network, nodes, clock = make_watchdog(mocker)
+    watchdog._on_emcy(0x81, struct.pack("<HB5s", 0x0000, 0, bytes(5)), clock.now)
+    assert not watchdog.fault.is_set()
+
+    watchdog._on_emcy(0x81, struct.pack("<HB5s", 0x8130, 0x11, bytes(5)), clock.now)
+    watchdog._on_feedback(0x182, bytes(7) + b"\x20", clock.now)
+    watchdog._on_feedback(0x182, bytes(7) + b"\x20", clock.now)
+    watchdog._on_heartbeat(0x702, bytes([0x7F]), clock.now)
+
+    assert watchdog.fault.is_set()
+    assert [(f.node_id, f.reason, f.detail) for f in watchdog.faults] == [
+        (1, "emcy", 0x8130),
+        (2, "error_flags", 0x20),
+        (2, "state", 0x7F),
+    ]
+
+    watchdog.reset()
+    assert not watchdog.fault.is_set()
+    assert watchdog.faults == []
+
+
+def test_integration_detection_latency_on_virtual_bus():
+    network = electrak.connect_can_network(channel="watchdog_test", interface="virtual")
+    actuator = can.Bus(interface="virtual", channel="watchdog_test")
+    nodes = {0x13: None}
+    watchdog = HeartbeatWatchdog(network, nodes, heartbeat_ms=20)
+    stop_heartbeat = threading.Event()
+
+    def produce_heartbeat():
+        while not stop_heartbeat.wait(0.02):
+            actuator.send(can.Message(arbitration_id=0x713, is_extended_id=False, data=[5]))
+
+    producer = threading.Thread(target=produce_heartbeat, daemon=True)
+    try:
+        watchdog.start()
+        producer.start()
+
+        # Simulated 200 Hz control loop
+        control_period = 0.005
+        for _ in range(40):
+            assert not watchdog.check()
+            time.sleep(control_period)
+
+        stop_heartbeat.set()
+        producer.join()
+        deadline = time.time() + 1.0
+        while not watchdog.check() and time.time() < deadline:
+            time.sleep(control_period)
+
+        fault = watchdog.faults[0]
+        assert fault.reason == "heartbeat"
+        # Raised within about one control period of the timeout expiring
+        assert fault.latency < 4 * control_period
+
+        watchdog.reset()
+        actuator.send(
+            can.Message(
+                arbitration_id=0x93,
+                is_extended_id=False,
+                data=struct.pack("<HB5s", 0x8130, 0x11, bytes(5)),
+            )
+        )
+        assert watchdog.fault.wait(1.0)
+        assert watchdog.faults[0].reason == "emcy"
+        assert watchdog.faults[0].latency < control_period
+    finally:
+        stop_heartbeat.set()
+        watchdog.stop()
+        actuator.shutdown()
+        network.disconnect()
@@ -0,0 +1,109 @@
+import socket
+import struct
+
+import numpy as np
+import pytest
+
+import xpc
+from Get_data import Get_data
+from xplane_data import DataOutputClient, DataOutputListener, parse
+
+FRAME = {
+    1: [0.5, 1234.5, 0, 0, 0, 0, 0, 0],
+    3: [0, 0, 0, 100.0, 0, 0, 0, 0],
+    4: [0, 0, 0, 0, 1.2, 0.1, -0.05, 0],
+    17: [3.0, -2.0, 270.0, 268.0, 0, 0, 0, 0],
+    20: [47.5, 8.5, 1000.0, 0, 0, 0, 0, 0],
+}
+
+
+def data_packet(rows: dict) -> bytes:
+    # Same layout as XPlaneConnect.sendDATA
+    buffer = struct.pack(b"<4sx", b"DATA")
+    for index, values in rows.items():
+        buffer += struct.pack(b"<I8f", index, *values)
+    return buffer
+
+
+class PacketClient(xpc.XPlaneConnect):
+    def __init__(self, packet):
+        self.packet = packet
+
+    def readUDP(self):
+        return self.packet
+
+    def close(self):
+        pass
+
+
+def test_unit_parse_is_a_view_matching_read_data():
+    packet = bytearray(data_packet(FRAME))
+    rows = parse(packet)
+    assert list(rows["index"]) == list(FRAME)
+    assert np.shares_memory(rows, np.frombuffer(packet, np.uint8))
+    # readDATA unpacks the same rows, with the index as a float
+    expected = PacketClient(bytes(packet)).readDATA()
+    assert np.allclose(rows["values"], [row[1:] for row in expected])
+    with pytest.raises(ValueError):
+        parse(b"RESP\x00")
+
+
+@pytest.fixture
+def listener():
+    with DataOutputListener(port=0, host="127.0.0.1", timeout=1.0) as listener:
+        yield listener
+
+
+def send(listener, packet):
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.sendto(packet, ("127.0.0.1", listener.port))
+
+
+def test_integration_listener_keeps_latest_row_per_data_set(listener):
+    send(listener, b"RESP\x00junk")
+    send(listener, data_packet({17: FRAME[17], 300: FRAME[1]}))
+    send(listener, data_packet({4: FRAME[4]}))
+    listener.receive()
+    assert listener.ignored == 1
+    assert listener.value("heading") == 270.0
+    assert "heading" not in listener.missing()
+    assert "gload_normal" in listener.missing()
+    with pytest.raises(LookupError, match="Data set 4"):
+        listener.value("gload_normal")
+    listener.receive()
+    assert listener.value("gload_normal") == pytest.approx(1.2)
+    assert listener.value("heading") == 270.0
+    assert listener.packets == 2
+
+
+def test_integration_listener_times_out(listener):
+    listener.sock.settimeout(0.05)
+    with pytest.raises(TimeoutError):
+        listener.receive()
+
+
+def test_integration_get_data_from_data_output(listener):
+    data = Get_data(client=DataOutputClient(listener), log_inputs=False)
+    send(listener, data_packet(FRAME))
+    data.connect()
+    assert data.psiprev == 270.0
+    send(listener, data_packet({**FRAME, 17: [3.0, -2.0, 271.0, 0, 0, 0, 0, 0]}))
+    data.run()
+    assert data.sim_time == 1234.5
+    assert data.oaa == pytest.approx([-2.0, -1.0, 3.0])
+    # Groundspeed is above 5 m/s, so no horizontal scaling
+    assert data.faa == pytest.approx([0.05 * 9.81, 0.1 * 9.81, 1.2 * 9.81], rel=1e-5)
+    with pytest.raises(ValueError):
+        data.client.getDREFs(["sim/flightmodel/position/local_ax"])
+
+
+def test_integration_client_rejects_data_sets_never_received(listener):
+    client = DataOutputClient(listener)
+    partial = {index: row for index, row in FRAME.items() if index != 4}
+    send(listener, data_packet(partial))
+    with pytest.raises(LookupError, match=r"rows \[4\]"):
+        client.getDREFs(["sim/flightmodel/position/theta"])
+    send(listener, data_packet({4: FRAME[4]}))
+    # The g-load row arrives later; the older rows are kept
+    values = client.getDREFs(["sim/flightmodel/position/theta", "sim/time/paused"])
+    assert values == [(3.0,), (0.0,)]
@@ -0,0 +1,262 @@
+import collections
+import csv
+import logging
+import math
+import threading
+import time
+from typing import TYPE_CHECKING, Callable
+
+import can
+
+import electrak
+
+if TYPE_CHECKING:
+    import canopen
+
+logger = logging.getLogger("tracing")
+
+TPDO1_BASE = 0x180
+MOTION_FLAGS_BYTE = 6
+MOTION_MASK = 0x03  # bit 0 extending, bit 1 retracting
+POSITION_DEADBAND_MM = 0.1
+
+# Raw timestamps of a tick, all time.time() except sim_time (X-Plane seconds)
+STAGES = ("sim_time", "requested", "received", "washout", "ik", "tx", "motion")
+# Derived per-tick breakdown written after the raw columns (milliseconds)
+BREAKDOWN = ("fetch_ms", "washout_ms", "ik_ms", "tx_ms", "motion_ms", "total_ms", "sim_lag_ms")
+HEADER = ("tick",) + STAGES + ("motion_node",) + BREAKDOWN
+
+
+class TickTrace:
+    """
+    Timestamps of one control tick from sim sample to observed platform motion.
+    """
+
+    __slots__ = ("tick",) + STAGES + ("motion_node",)
+
+    def __init__(self, tick: int, sim_time: float, requested: float, received: float) -> None:
+        """
+        :param tick: Tick sequence number.
+        :param sim_time: X-Plane total running time of the sample (seconds).
+        :param requested: Local time the sample was requested.
+        :param received: Local time the sample arrived.
+        """
+        self.tick = tick
+        self.sim_time = sim_time
+        self.requested = requested
+        self.received = received
+        self.washout = self.ik = self.tx = self.motion = math.nan
+        self.motion_node = 0
+
+    def mark(self, stage: str, timestamp: float = None) -> None:
+        """
+        Record the completion time of a stage.
+
+        :param stage: One of 'washout', 'ik', 'tx' or 'motion'.
+        :param timestamp: Completion time, now if None.
+        """
+        setattr(self, stage, time.time() if timestamp is None else timestamp)
+
+    def breakdown(self, sim_offset: float = math.nan) -> tuple:
+        """
+        Per-stage latencies of this tick.
+
+        sim_lag_ms is how much later than usual the sample arrived relative to
+        sim time, given the smallest (received - sim_time) offset seen so far.
+
+        :param sim_offset: Smallest received - sim_time observed in the session.
+        :return: Tuple of milliseconds in BREAKDOWN order, NaN where a stage is missing.
+        """
+        return (
+            (self.received - self.requested) * 1e3,
+            (self.washout - self.received) * 1e3,
+            (self.ik - self.washout) * 1e3,
+            (self.tx - self.ik) * 1e3,
+            (self.motion - self.tx) * 1e3,
+            (self.motion - self.received) * 1e3,
+            (self.received - self.sim_time - sim_offset) * 1e3,
+        )
+
+
+class LatencyTracer(can.Listener):
+    """
+    Tags control ticks and matches them to actuator feedback showing motion.
+
+    Ticks are created at sample receipt, marked after washout, IK and CAN
+    transmit, then wait for a TPDO1 frame whose motion flags or measured
+    position show the actuator moving. Completed ticks, and ticks that saw no
+    motion within match_timeout, are appended to a CSV trace file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        match_timeout: float = 0.5,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        :param path: CSV trace file to write.
+        :param match_timeout: Time a transmitted tick waits for motion (seconds).
+        :param clock: Wall clock matching CAN frame timestamps.
+        """
+        self.path = path
+        self.match_timeout = match_timeout
+        self.clock = clock
+        self.ticks = 0
+        self.matched = 0
+        self.unmatched = 0
+        self.sim_offset = math.inf
+        self._pending = collections.deque()
+        self._positions = {}
+        self._lock = threading.Lock()
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(HEADER)
+        self._network = None
+
+    def attach(self, network: "canopen.Network") -> None:
+        """
+        Start watching actuator feedback on a connected network.
+
+        :param network: Network returned by electrak.connect_can_network.
+        """
+        electrak.add_bus_listener(network, self)
+        self._network = network
+
+    def begin(self, sim_time: float, requested: float, received: float) -> TickTrace:
+        """
+        Tag a new tick with its sample times.
+
+        :param sim_time: X-Plane total running time of the sample.
+        :param requested: Local time the sample was requested.
+        :param received: Local time the sample arrived.
+        :return: The tick's trace, to be marked by the later stages.
+        """
+        self.ticks += 1
+        if not math.isnan(sim_time):
+            self.sim_offset = min(self.sim_offset, received - sim_time)
+        return TickTrace(self.ticks, sim_time, requested, received)
+
+    def transmitted(self, trace: TickTrace, timestamp: float = None) -> None:
+        """
+        Mark the tick's commands as sent and queue it for motion matching.
+
+        :param trace: The tick's trace.
+        :param timestamp: Transmit time, now if None.
+        """
+        trace.mark("tx", timestamp)
+        with self._lock:
+            self._pending.append(trace)
+            self._expire(trace.tx)
+
+    def discard(self, trace: TickTrace) -> None:
+        """
+        Write a tick that sent no commands (e.g. unchanged targets) without waiting.
+
+        :param trace: The tick's trace.
+        """
+        with self._lock:
+            self._write(trace)
+
+    def on_message_received(self, msg: can.Message) -> None:
+        """
+        Match TPDO1 frames showing motion to transmitted ticks.
+
+        :param msg: The CAN frame.
+        """
+        node_id = msg.arbitration_id - TPDO1_BASE
+        if not msg.is_rx or not 0 < node_id < 0x80 or len(msg.data) <= MOTION_FLAGS_BYTE:
+            return
+        position = int.from_bytes(msg.data[0:2], "little") / 10.0
+        previous = self._positions.get(node_id)
+        self._positions[node_id] = position
+        moving = msg.data[MOTION_FLAGS_BYTE] & MOTION_MASK or (
+            previous is not None and abs(position - previous) >= POSITION_DEADBAND_MM
+        )
+        with self._lock:
+            if moving:
+                # The actuator responds to the newest command, so every tick
+                # sent before this frame is answered by it
+                while self._pending and self._pending[0].tx <= msg.timestamp:
+                    trace = self._pending.popleft()
+                    trace.motion = msg.timestamp
+                    trace.motion_node = node_id
+                    self.matched += 1
+                    self._write(trace)
+            self._expire(msg.timestamp)
+
+    def _expire(self, now: float) -> None:
+        """
+        Write out ticks that waited longer than match_timeout; the caller holds the lock.
+
+        :param now: Current time.
+        """
+        while self._pending and now - self._pending[0].tx > self.match_timeout:
+            self.unmatched += 1
+            self._write(self._pending.popleft())
+
+    def _write(self, trace: TickTrace) -> None:
+        """
+        Append one tick to the trace file; the caller holds the lock.
+
+        :param trace: The tick's trace.
+        """
+        if self._file is None:
+            return
+        offset = self.sim_offset if math.isfinite(self.sim_offset) else math.nan
+        self._writer.writerow(
+            (trace.tick,)
+            + tuple(getattr(trace, stage) for stage in STAGES)
+            + (trace.motion_node,)
+            + tuple(round(v, 3) for v in trace.breakdown(offset))
+        )
+
+    def stop(self) -> None:
+        """
+        Detach from the network, write pending ticks and close the trace file.
+        """
+        if self._network is not None:
+            electrak.remove_bus_listener(self._network, self)
+            self._network = None
+        with self._lock:
+            self._expire(math.inf)
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        logger.info(
+            "Traced %d ticks to %s (%d matched to motion, %d without motion)",
+            self.ticks,
+            self.path,
+            self.matched,
+            self.unmatched,
+        )
+
+
+def read_trace(path: str) -> list:
+    """
+    Load a trace file.
+
+    :param path: CSV trace written by LatencyTracer.
+    :return: List of dictionaries of column name to float value.
+    """
+    with open(path, newline="") as f:
+        return [{k: float(v) for k, v in row.items()} for row in csv.DictReader(f)]
+
+
+def summarize_trace(path: str) -> dict:
+    """
+    Median and worst case of each breakdown column, ignoring missing stages.
+
+    :param path: CSV trace written by LatencyTracer.
+    :return: Dictionary of column name to {'count', 'p50', 'max'} (milliseconds).
+    """
+    rows = read_trace(path)
+    result = {}
+    for column in BREAKDOWN:
+        values = sorted(r[column] for r in rows if not math.isnan(r[column]))
+        result[column] = {
+            "count": len(values),
+            "p50": values[len(values) // 2] if values else math.nan,
+            "max": values[-1] if values else math.nan,
+        }
+    return result
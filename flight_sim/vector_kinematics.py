@@ -0,0 +1,214 @@
+import numpy as np
+
+from geometry import Geometry
+from Washout import Washout
+
+# NumPy versions of the per-sample motion math for whole recordings at once.
+# Each function mirrors a scalar method of the control path (same angles,
+# clamps and integration), so offline analysis sees what the rig was commanded:
+#   accelerations        Get_data.get_values
+#   washout_translation  Washout.compute2
+#   rotation_matrices    Geometry.rot_matrix and Washout.rot_matrix
+#   leg_lengths          Geometry.inverse_kinematics
+# condition_numbers adds the Jacobian dexterity measure on the same legs.
+
+# Columns of a Get_data sample, as in Get_data.DREFS
+GROUNDSPEED = 0
+FORCES_NORMAL = (1, 4, 7)  # prop, aero, gear
+FORCES_SIDE = (2, 5, 8)
+FORCES_AXIAL = (3, 6, 9)
+M_TOTAL = 10
+THETA = 11
+PSI = 12
+PHI = 13
+PAUSED = 14
+SIM_TIME = 15
+G = 9.8  # m/s^2, as in Washout.sub_g
+
+
+def _total_force(values: np.ndarray, columns: tuple) -> np.ndarray:
+    """
+    :param values: (N, 16) array of Get_data dataref values.
+    :param columns: Prop, aero and gear force columns of one axis.
+    :return: Total force along the axis, summed in Get_data's order.
+    """
+    prop, aero, gear = columns
+    return values[:, prop] + values[:, aero] + values[:, gear]
+
+
+def accelerations(values: np.ndarray, psi_start: float = None) -> tuple:
+    """
+    Normalized accelerations and orientation of consecutive samples.
+
+    :param values: (N, 15 or 16) array of Get_data dataref values.
+    :param psi_start: Heading before the first sample, the first sample's if None.
+    :return: Tuple (faa, oaa) of (N, 3) arrays: [side, axial, normal] and
+        [phi, delta psi, theta].
+    """
+    groundspeed = values[:, GROUNDSPEED]
+    mass = np.maximum(values[:, M_TOTAL], 1.0)
+    normal = _total_force(values, FORCES_NORMAL)
+    side = _total_force(values, FORCES_SIDE)
+    axial = _total_force(values, FORCES_AXIAL)
+    ratio = np.clip(groundspeed * 0.2, 0.0, 1.0)
+    # Utilities.MPD_fallout(normal, -0.1, 0.1): snap the deadband to its nearest bound
+    inside = (normal >= -0.1) & (normal <= 0.1)
+    normal = np.where(inside, np.where(normal < 0.0, -0.1, 0.1), normal)
+
+    faa = np.empty((len(values), 3))
+    faa[:, 0] = -(side / mass * ratio)
+    faa[:, 1] = axial / mass * ratio
+    faa[:, 2] = normal / mass
+
+    psi = values[:, PSI]
+    previous = np.empty_like(psi)
+    previous[1:] = psi[:-1]
+    if len(psi):
+        previous[0] = psi[0] if psi_start is None else psi_start
+    oaa = np.empty((len(values), 3))
+    oaa[:, 0] = values[:, PHI]
+    oaa[:, 1] = previous - psi
+    oaa[:, 2] = values[:, THETA]
+    return faa, oaa
+
+
+def rotation_matrices(psi: np.ndarray, theta: np.ndarray, phi: np.ndarray) -> np.ndarray:
+    """
+    :param psi: Yaw angles (radians).
+    :param theta: Pitch angles (radians).
+    :param phi: Roll angles (radians).
+    :return: (N, 9) array of flattened rotation matrices, laid out as rot_matrix's list.
+    """
+    cpsi, spsi = np.cos(psi), np.sin(psi)
+    cth, sth = np.cos(theta), np.sin(theta)
+    cphi, sphi = np.cos(phi), np.sin(phi)
+    rb = np.empty((len(psi), 9))
+    rb[:, 0] = cpsi * cth
+    rb[:, 1] = spsi * cth
+    rb[:, 2] = -sth
+    rb[:, 3] = -spsi * cphi + cpsi * sth * sphi
+    rb[:, 4] = cpsi * cphi + spsi * sth * sphi
+    rb[:, 5] = cth * sphi
+    rb[:, 6] = spsi * sphi + cpsi * sth * cphi
+    rb[:, 7] = -cpsi * sphi + spsi * sth * cphi
+    rb[:, 8] = cth * cphi
+    return rb
+
+
+def _integration_gain(sample: int) -> float:
+    """
+    :param sample: Washout.sample, the integration steps per call.
+    :return: Factor compute2's double integration applies to a constant input.
+    """
+    velocity = position = 0.0
+    for _ in range(sample):
+        velocity += 1.0 / sample
+        position += velocity * (1.0 / sample)
+    return position
+
+
+def washout_translation(
+    faa: np.ndarray, oaa: np.ndarray, washout: Washout = None, start: np.ndarray = None
+) -> np.ndarray:
+    """
+    Platform translation Washout.compute2 returns for each sample.
+
+    compute2 compensates gravity and rotates with the pose of the previous
+    sample, so row i uses the orientation oaa[i - 1].
+
+    :param faa: (N, 3) accelerations [side, axial, normal].
+    :param oaa: (N, 3) orientations [phi, psi, theta].
+    :param washout: Washout whose parameters apply, the defaults if None.
+    :param start: Orientation [phi, psi, theta] before the first sample, zeros if None.
+    :return: (N, 3) translations (meters).
+    """
+    washout = washout if washout is not None else Washout()
+    scale = np.asarray(washout.params["Faa_scale_hp"], dtype=float)
+    limit = np.asarray(washout.params["Faa_limit_hp"], dtype=float)
+    scaled = np.clip(faa, -limit, limit) * scale
+
+    pose = np.empty_like(oaa)
+    pose[1:] = oaa[:-1]
+    if len(oaa):
+        pose[0] = 0.0 if start is None else start
+    phi, psi, theta = pose[:, 0], pose[:, 1], pose[:, 2]
+    subg = np.empty_like(scaled)
+    subg[:, 0] = scaled[:, 0] - G * np.sin(theta)
+    subg[:, 1] = scaled[:, 1] + G * np.cos(theta) * np.sin(phi)
+    subg[:, 2] = scaled[:, 2] + G * np.cos(theta) * np.cos(phi)
+
+    rb = rotation_matrices(psi, theta, phi).reshape(-1, 3, 3)
+    # faa_rot: out[i] = RB[i] * x + RB[i + 3] * y + RB[i + 6] * z
+    rotated = np.einsum("nji,nj->ni", rb, subg)
+    return rotated * _integration_gain(washout.sample)
+
+
+def leg_vectors(
+    geometry: Geometry, psi: np.ndarray, theta: np.ndarray, phi: np.ndarray, T: np.ndarray
+) -> tuple:
+    """
+    Leg vectors of many poses, as Geometry.inverse_kinematics builds them.
+
+    :param geometry: Platform geometry.
+    :param psi: Yaw angles (radians).
+    :param theta: Pitch angles (radians).
+    :param phi: Roll angles (radians).
+    :param T: (N, 3) translations (meters).
+    :return: Tuple (legs, arms) of (N, 6, 3) arrays: base-to-platform leg vectors
+        and rotated platform attachment points relative to T.
+    """
+    rb = rotation_matrices(psi, theta, phi).reshape(-1, 3, 3)
+    p = np.asarray(geometry.p, dtype=float)
+    b = np.asarray(geometry.b, dtype=float)
+    # L[j] = T[j] + sum_k p[k] * RB[j + 3k] - b[j], RB[j + 3k] being rb[k, j]
+    arms = np.einsum("lk,nkj->nlj", p, rb)
+    return T[:, None, :] + arms - b[None, :, :], arms
+
+
+def leg_lengths(
+    geometry: Geometry, psi: np.ndarray, theta: np.ndarray, phi: np.ndarray, T: np.ndarray
+) -> np.ndarray:
+    """
+    Actuator lengths of many poses, as Geometry.inverse_kinematics computes them.
+
+    :param geometry: Platform geometry.
+    :param psi: Yaw angles (radians).
+    :param theta: Pitch angles (radians).
+    :param phi: Roll angles (radians).
+    :param T: (N, 3) translations (meters).
+    :return: (N, 6) actuator lengths (meters), less the leg offsets.
+    """
+    legs, _ = leg_vectors(geometry, psi, theta, phi, T)
+    offsets = np.asarray(geometry.leg_offsets, dtype=float)
+    return np.sqrt(np.einsum("nlj,nlj->nl", legs, legs)) - offsets
+
+
+def condition_numbers(
+    geometry: Geometry,
+    psi: np.ndarray,
+    theta: np.ndarray,
+    phi: np.ndarray,
+    T: np.ndarray,
+    length_scale: float = None,
+) -> np.ndarray:
+    """
+    Condition number of the platform Jacobian at many poses, a dexterity measure.
+
+    Row i of the inverse Jacobian maps a platform twist to the rate of leg i:
+    [n_i, (a_i x n_i) / length_scale], with n_i the unit leg vector and a_i
+    the rotated platform attachment point. Dividing the rotational part by a
+    characteristic length makes translations and rotations comparable.
+
+    :param geometry: Platform geometry.
+    :param psi: Yaw angles (radians).
+    :param theta: Pitch angles (radians).
+    :param phi: Roll angles (radians).
+    :param T: (N, 3) translations (meters).
+    :param length_scale: Characteristic length (meters), the platform radius if None.
+    :return: (N,) condition numbers, 1 for an isotropic pose and inf at a singularity.
+    """
+    scale = geometry.radius_platform if length_scale is None else length_scale
+    legs, arms = leg_vectors(geometry, psi, theta, phi, T)
+    units = legs / np.linalg.norm(legs, axis=2, keepdims=True)
+    jacobian = np.concatenate((units, np.cross(arms, units) / scale), axis=2)
+    return np.linalg.cond(jacobian)
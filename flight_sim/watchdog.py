@@ -0,0 +1,209 @@
+import logging
+import struct
+import threading
+import time
+from typing import TYPE_CHECKING, Callable
+
+from histogram import LatencyHistogram
+
+if TYPE_CHECKING:
+    import canopen
+
+logger = logging.getLogger("watchdog")
+
+# CANopen COB-ID bases for the frames the watchdog consumes
+HEARTBEAT_BASE = 0x700
+EMCY_BASE = 0x80
+TPDO1_BASE = 0x180
+
+NMT_OPERATIONAL = 5
+ERROR_FLAGS_BYTE = 7  # Error Flags position in the Electrak TPDO1
+DEFAULT_HEARTBEAT_MS = 20
+
+
+class Fault:
+    """
+    A fault detected on one actuator.
+    """
+
+    __slots__ = ("node_id", "reason", "detail", "frame_time", "detected_at")
+
+    def __init__(
+        self, node_id: int, reason: str, detail: int, frame_time: float, detected_at: float
+    ) -> None:
+        """
+        :param node_id: CANopen node ID of the faulted actuator.
+        :param reason: One of 'heartbeat', 'state', 'emcy' or 'error_flags'.
+        :param detail: Reason specific value (NMT state, EMCY code or error flags).
+        :param frame_time: When the fault became observable on the bus.
+        :param detected_at: When the watchdog raised the fault.
+        """
+        self.node_id = node_id
+        self.reason = reason
+        self.detail = detail
+        self.frame_time = frame_time
+        self.detected_at = detected_at
+
+    @property
+    def latency(self) -> float:
+        """
+        :return: Time from the fault being observable to it being raised (seconds).
+        """
+        return self.detected_at - self.frame_time
+
+    def __repr__(self) -> str:
+        return (
+            f"Fault(node={self.node_id}, reason={self.reason}, "
+            f"detail=0x{self.detail:X}, latency={self.latency * 1000:.1f}ms)"
+        )
+
+
+class HeartbeatWatchdog:
+    """
+    Watches actuator heartbeats, EMCY frames and TPDO error flags.
+
+    EMCY frames, error flags and heartbeats reporting a non-operational state
+    raise a fault directly from the CAN receive thread. A missing heartbeat is
+    detected by check(), which the control loop calls once per period. Any fault
+    sets the `fault` event, so the loop can freeze all legs on its next tick.
+    """
+
+    def __init__(
+        self,
+        network: "canopen.Network",
+        nodes: dict,
+        heartbeat_ms: int = DEFAULT_HEARTBEAT_MS,
+        timeout_factor: float = 2.5,
+        error_mask: int = 0xFF,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Initialize the watchdog.
+
+        :param network: Connected canopen.Network carrying the actuators.
+        :param nodes: Dictionary of node_id to canopen.Node.
+        :param heartbeat_ms: Producer Heartbeat Time configured on each node.
+        :param timeout_factor: Missed-heartbeat timeout as a multiple of heartbeat_ms.
+        :param error_mask: Error Flags bits treated as faults.
+        :param clock: Time source matching CAN frame timestamps.
+        """
+        if heartbeat_ms <= 0:
+            raise ValueError("heartbeat_ms must be positive")
+        if timeout_factor <= 1.0:
+            raise ValueError("timeout_factor must be greater than 1")
+        self.network = network
+        self.nodes = nodes
+        self.heartbeat_ms = heartbeat_ms
+        self.timeout = heartbeat_ms * timeout_factor / 1000.0
+        self.error_mask = error_mask
+        self.clock = clock
+        self.fault = threading.Event()
+        self.faults = []
+        self.detection_latency = LatencyHistogram()
+        self._last_heartbeat = {}
+        self._faulted = set()
+        self._subscriptions = []
+        self._lock = threading.Lock()
+
+    def configure(self) -> None:
+        """
+        Set the Producer Heartbeat Time (0x1017) on every node over SDO.
+        """
+        for node in self.nodes.values():
+            node.sdo["Producer Heartbeat Time"].raw = self.heartbeat_ms
+            logger.info(
+                "Node %d: producer heartbeat set to %d ms", node.id, self.heartbeat_ms
+            )
+
+    def start(self) -> None:
+        """
+        Subscribe to heartbeat, EMCY and TPDO1 frames of every node.
+
+        Every node gets one timeout of grace before its first heartbeat is due.
+        """
+        now = self.clock()
+        for node_id in self.nodes:
+            self._last_heartbeat[node_id] = now
+            for cob_id, callback in (
+                (HEARTBEAT_BASE + node_id, self._on_heartbeat),
+                (EMCY_BASE + node_id, self._on_emcy),
+                (TPDO1_BASE + node_id, self._on_feedback),
+            ):
+                self.network.subscribe(cob_id, callback)
+                self._subscriptions.append((cob_id, callback))
+
+    def stop(self) -> None:
+        """
+        Remove all subscriptions made by start.
+        """
+        for cob_id, callback in self._subscriptions:
+            self.network.unsubscribe(cob_id, callback)
+        self._subscriptions = []
+
+    def reset(self) -> None:
+        """
+        Clear recorded faults and restart the heartbeat timers.
+        """
+        with self._lock:
+            self.faults = []
+            self._faulted.clear()
+            self.fault.clear()
+            now = self.clock()
+            for node_id in self._last_heartbeat:
+                self._last_heartbeat[node_id] = now
+
+    def _raise(self, node_id: int, reason: str, detail: int, frame_time: float) -> None:
+        """
+        Record a fault and set the fault event, once per node and reason.
+        """
+        with self._lock:
+            key = (node_id, reason)
+            if key in self._faulted:
+                return
+            self._faulted.add(key)
+            fault = Fault(node_id, reason, detail, frame_time, self.clock())
+            self.faults.append(fault)
+            self.detection_latency.record(fault.latency)
+            self.fault.set()
+        logger.error("Node %d fault: %r", node_id, fault)
+
+    def _on_heartbeat(self, can_id: int, data: bytes, timestamp: float) -> None:
+        """
+        Network callback for heartbeat frames.
+        """
+        node_id = can_id - HEARTBEAT_BASE
+        self._last_heartbeat[node_id] = timestamp
+        state = data[0] & 0x7F
+        if state != NMT_OPERATIONAL:
+            self._raise(node_id, "state", state, timestamp)
+
+    def _on_emcy(self, can_id: int, data: bytes, timestamp: float) -> None:
+        """
+        Network callback for EMCY frames; error resets (code 0x00xx) are ignored.
+        """
+        (code,) = struct.unpack_from("<H", data)
+        if code & 0xFF00:
+            self._raise(can_id - EMCY_BASE, "emcy", code, timestamp)
+
+    def _on_feedback(self, can_id: int, data: bytes, timestamp: float) -> None:
+        """
+        Network callback for TPDO1 frames, checks the Error Flags byte.
+        """
+        if len(data) > ERROR_FLAGS_BYTE:
+            flags = data[ERROR_FLAGS_BYTE] & self.error_mask
+            if flags:
+                self._raise(can_id - TPDO1_BASE, "error_flags", flags, timestamp)
+
+    def check(self, now: float = None) -> bool:
+        """
+        Detect missing heartbeats; call once per control period.
+
+        :param now: Current time on the frame timestamp clock, read if None.
+        :return: True if any fault has been raised.
+        """
+        if now is None:
+            now = self.clock()
+        for node_id, last in self._last_heartbeat.items():
+            if now - last > self.timeout:
+                self._raise(node_id, "heartbeat", 0, last + self.timeout)
+        return self.fault.is_set()
@@ -0,0 +1,276 @@
+import logging
+import math
+import socket
+import time
+
+import numpy as np
+
+logger = logging.getLogger("xplane_data")
+
+DEFAULT_PORT = 49003  # X-Plane's default Data Output destination port
+HEADER_SIZE = 5  # b"DATA" plus one internal-use byte
+# One Data Output row: data set index and its eight values
+DATA_RECORD = np.dtype([("index", "<i4"), ("values", "<f4", (8,))])
+DATA_SETS = 256  # rows kept in the table, above every index X-Plane uses
+MAX_PACKET = HEADER_SIZE + DATA_SETS * DATA_RECORD.itemsize
+G = 9.81  # m/s^2 per g
+KNOTS_TO_MS = 0.514444
+
+# Where each quantity sits in the Data Output stream: (data set index, column).
+# Enable these rows under Settings -> Data Output -> "Send network data output".
+DATA_FIELDS = {
+    "sim_time": (1, 1),  # Times: total time (s)
+    "groundspeed": (3, 3),  # Speeds: Vtrue ktgs (knots)
+    "gload_normal": (4, 4),  # Mach, VVI, g-load: normal (g)
+    "gload_axial": (4, 5),  # axial (g)
+    "gload_side": (4, 6),  # side (g)
+    "pitch": (17, 0),  # Pitch, roll, headings (degrees)
+    "roll": (17, 1),
+    "heading": (17, 2),  # true heading
+    "latitude": (20, 0),  # Latitude, longitude, altitude (degrees, feet MSL)
+    "longitude": (20, 1),
+    "altitude": (20, 2),
+}
+# Sign of each g-load relative to the force dataref of the same axis
+G_LOAD_SIGNS = {"normal": 1.0, "axial": 1.0, "side": 1.0}
+
+
+def parse(buffer, size: int = None) -> np.ndarray:
+    """
+    View a Data Output packet as rows without copying.
+
+    :param buffer: Packet bytes (bytes, bytearray or memoryview).
+    :param size: Bytes of buffer holding the packet, all of it if None.
+    :return: Structured array of DATA_RECORD rows sharing memory with buffer.
+    :raises ValueError: If the packet is not a DATA packet.
+    """
+    size = len(buffer) if size is None else size
+    if size < HEADER_SIZE or bytes(buffer[:4]) != b"DATA":
+        raise ValueError("Not an X-Plane DATA packet")
+    count = (size - HEADER_SIZE) // DATA_RECORD.itemsize
+    return np.frombuffer(buffer, DATA_RECORD, count=count, offset=HEADER_SIZE)
+
+
+class DataOutputListener:
+    """
+    Receiver of X-Plane's built-in Data Output UDP stream.
+
+    X-Plane pushes the selected data sets every frame without being asked.
+    Each packet is received into a reused buffer, viewed as DATA_RECORD rows
+    and scattered into `table`, a (DATA_SETS, 8) array holding the newest
+    values of every data set by index (NaN until first received, see `seen`).
+    """
+
+    def __init__(
+        self,
+        port: int = DEFAULT_PORT,
+        host: str = "0.0.0.0",
+        timeout: float = 1.0,
+        clock=time.time,
+    ) -> None:
+        """
+        :param port: UDP port X-Plane sends Data Output to.
+        :param host: Local address to bind.
+        :param timeout: Longest wait for a packet (seconds).
+        :param clock: Time source stamping each packet.
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.settimeout(timeout)
+        self.clock = clock
+        self.table = np.full((DATA_SETS, 8), np.nan, dtype=np.float32)
+        self.seen = np.zeros(DATA_SETS, dtype=bool)
+        self.packets = 0
+        self.ignored = 0
+        self.received = None
+        self._buffer = bytearray(MAX_PACKET)
+
+    @property
+    def port(self) -> int:
+        """
+        :return: Bound UDP port.
+        """
+        return self.sock.getsockname()[1]
+
+    def receive(self) -> np.ndarray:
+        """
+        Wait for the next DATA packet and update the table.
+
+        :return: The packet's rows; a view into the receive buffer, valid until the next call.
+        :raises TimeoutError: If no packet arrives within the timeout.
+        """
+        while True:
+            size = self.sock.recv_into(self._buffer)
+            try:
+                rows = parse(self._buffer, size)
+            except ValueError:
+                self.ignored += 1
+                continue
+            break
+        self.received = self.clock()
+        self.packets += 1
+        index = rows["index"]
+        valid = (index >= 0) & (index < DATA_SETS)
+        if valid.all():
+            self.table[index] = rows["values"]
+            self.seen[index] = True
+        else:
+            self.table[index[valid]] = rows["values"][valid]
+            self.seen[index[valid]] = True
+        return rows
+
+    def missing(self, fields: dict = DATA_FIELDS) -> list:
+        """
+        :param fields: Field name to (data set index, column).
+        :return: Names of the fields whose data set has not been received yet.
+        """
+        return [name for name, (index, _) in fields.items() if not self.seen[index]]
+
+    def value(self, field: str, fields: dict = DATA_FIELDS) -> float:
+        """
+        :param field: Key of fields, e.g. 'pitch'.
+        :param fields: Field name to (data set index, column).
+        :return: Newest value of the field.
+        :raises LookupError: If the field's data set has not been received.
+        """
+        index, column = fields[field]
+        if not self.seen[index]:
+            raise LookupError(
+                f"Data set {index} ({field}) not received; enable it under Data Output"
+            )
+        return float(self.table[index, column])
+
+    def close(self) -> None:
+        """
+        Close the socket.
+        """
+        self.sock.close()
+
+    def __enter__(self) -> "DataOutputListener":
+        return self
+
+    def __exit__(self, type, value, traceback) -> None:
+        self.close()
+
+
+class DataOutputClient:
+    """
+    Stand-in for XPlaneConnect feeding Get_data from the Data Output stream.
+
+    getDREFs waits for the next Data Output packet and synthesizes the
+    datarefs Get_data asks for. Data Output has no per-source forces or
+    total mass, so the g-loads are returned as the prop forces of a 1 kg
+    aircraft (aero and gear forces zero). Get_data then computes the same
+    accelerations, except that its force deadband applies to m/s^2 instead
+    of newtons.
+
+    Data Output carries no pause flag either, so sim/time/paused always
+    reads 0 (running) from this client.
+    """
+
+    def __init__(
+        self,
+        listener: DataOutputListener = None,
+        fields: dict = DATA_FIELDS,
+        signs: dict = G_LOAD_SIGNS,
+    ) -> None:
+        """
+        :param listener: Listener to read, a new one on the default port if None.
+        :param fields: Field name to (data set index, column), for other X-Plane versions.
+        :param signs: Sign of each g-load axis relative to the force datarefs.
+        """
+        self.listener = listener if listener is not None else DataOutputListener()
+        self.fields = fields
+        self.signs = signs
+        value = self._value
+        self.sources = {
+            "sim/flightmodel/position/groundspeed": lambda: value("groundspeed") * KNOTS_TO_MS,
+            "sim/flightmodel/forces/fnrml_prop": lambda: self._force("normal"),
+            "sim/flightmodel/forces/fside_prop": lambda: self._force("side"),
+            "sim/flightmodel/forces/faxil_prop": lambda: self._force("axial"),
+            "sim/flightmodel/forces/fnrml_aero": lambda: 0.0,
+            "sim/flightmodel/forces/fside_aero": lambda: 0.0,
+            "sim/flightmodel/forces/faxil_aero": lambda: 0.0,
+            "sim/flightmodel/forces/fnrml_gear": lambda: 0.0,
+            "sim/flightmodel/forces/fside_gear": lambda: 0.0,
+            "sim/flightmodel/forces/faxil_gear": lambda: 0.0,
+            "sim/flightmodel/weight/m_total": lambda: 1.0,
+            "sim/flightmodel/position/theta": lambda: value("pitch"),
+            "sim/flightmodel/position/psi": lambda: value("heading"),
+            "sim/flightmodel/position/phi": lambda: value("roll"),
+            "sim/time/paused": lambda: 0.0,  # not in Data Output, see the class docstring
+            "sim/time/total_running_time_sec": lambda: value("sim_time"),
+        }
+
+    def _value(self, field: str) -> float:
+        """
+        :param field: Key of self.fields.
+        :return: Newest value of the field.
+        """
+        return self.listener.value(field, self.fields)
+
+    def _force(self, axis: str) -> float:
+        """
+        :param axis: 'normal', 'axial' or 'side'.
+        :return: Specific force along the axis (m/s^2), i.e. the force on 1 kg.
+        """
+        return self._value(f"gload_{axis}") * G * self.signs[axis]
+
+    def _check_fields(self) -> None:
+        """
+        :raises LookupError: If a data set named in self.fields has not been received.
+        """
+        missing = self.listener.missing(self.fields)
+        if missing:
+            indices = sorted({self.fields[name][0] for name in missing})
+            raise LookupError(
+                f"Data Output rows {indices} not received (fields {missing}); "
+                "enable them under Settings -> Data Output"
+            )
+
+    def getPOSI(self, ac: int = 0) -> tuple:
+        """
+        Position of the player aircraft, waiting for a packet if none was received yet.
+
+        :param ac: Aircraft number; Data Output only describes aircraft 0.
+        :return: Tuple (lat, lon, alt_m, pitch, roll, heading, gear), gear NaN.
+        :raises ValueError: For another aircraft.
+        :raises LookupError: If a data set named in fields has not been received.
+        """
+        if ac != 0:
+            raise ValueError("Data Output only describes aircraft 0")
+        if self.listener.packets == 0:
+            self.listener.receive()
+        self._check_fields()
+        value = self._value
+        return (
+            value("latitude"),
+            value("longitude"),
+            value("altitude") * 0.3048,
+            value("pitch"),
+            value("roll"),
+            value("heading"),
+            math.nan,
+        )
+
+    def getDREFs(self, drefs: list) -> list:
+        """
+        :param drefs: Dataref names, all from Get_data.DREFS.
+        :return: List of one-element value tuples, as returned by XPlaneConnect.getDREFs.
+        :raises ValueError: If a dataref has no Data Output equivalent.
+        :raises TimeoutError: If no packet arrives within the listener's timeout.
+        :raises LookupError: If a data set named in fields has not been received.
+        """
+        missing = [dref for dref in drefs if dref not in self.sources]
+        if missing:
+            raise ValueError(f"No Data Output equivalent for {missing}")
+        self.listener.receive()
+        self._check_fields()
+        return [(self.sources[dref](),) for dref in drefs]
+
+    def close(self) -> None:
+        """
+        Close the listener.
+        """
+        self.listener.close()